@@ -262,13 +262,15 @@ function GenerateTestReportButton() {
                         )}
 
                         <Button type="submit" disabled={submitting} className="w-full">
-                            {submitting ? 'Generating Report...' : 'Generate Report'}
+                            {submitting ? 'Queueing Report...' : 'Generate Report'}
                         </Button>
                     </form>
                 ) : (
                     <div className="space-y-4 text-sm">
                         <div className="p-3 bg-emerald-50 border border-emerald-100 rounded-lg text-emerald-700">
-                            Report generated successfully. {result.whatsapp_sent ? 'WhatsApp link dispatched.' : 'WhatsApp dispatch failed — check the number and WhatsApp integration status.'}
+                            {result.status === 'QUEUED'
+                                ? `Report queued (job #${result.job_id}). It usually takes a minute or two; the WhatsApp link is sent when it's ready.`
+                                : `Report generated successfully. ${result.whatsapp_sent ? 'WhatsApp link dispatched.' : 'WhatsApp dispatch failed — check the number and WhatsApp integration status.'}`}
                         </div>
                         <div><span className="font-medium">Order Reference:</span> <span className="font-mono text-xs">{result.order_reference}</span></div>
                         <a
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from 'react';
+import React, { useEffect, useState, useCallback, useRef } from 'react';
 import {
     Table, TableBody, TableCell, TableHead, TableHeader, TableRow
 } from '../components/ui/Table';
@@ -23,6 +23,9 @@ export default function Transactions() {
     const [page, setPage] = useState(0);
     const [rowsPerPage, setRowsPerPage] = useState(20);
     const [total, setTotal] = useState(0);
+    // next_cursor of each page fetched, keyed by the page it leads to, so
+    // Next/Previous page by keyset; a page without one falls back to skip.
+    const cursors = useRef({});
 
     // Filter state
     const [searchQuery, setSearchQuery] = useState("");
@@ -34,16 +37,18 @@ export default function Transactions() {
         setLoading(true);
         try {
             const params = {
-                skip: page * rowsPerPage,
                 limit: rowsPerPage,
                 role: filterRole,
             };
+            if (cursors.current[page]) params.before = cursors.current[page];
+            else params.skip = page * rowsPerPage;
             if (searchQuery) params.search = searchQuery;
             if (filterType) params.transaction_type = filterType;
 
             const response = await api.get('/admin/transactions', { params });
             setTransactions(response.data.transactions);
             setTotal(response.data.total);
+            cursors.current[page + 1] = response.data.next_cursor;
         } catch (error) {
             console.error("Failed to fetch transactions", error);
         } finally {
@@ -51,6 +56,10 @@ export default function Transactions() {
         }
     }, [page, rowsPerPage, searchQuery, filterRole, filterType]);
 
+    useEffect(() => {
+        cursors.current = {};
+    }, [rowsPerPage, searchQuery, filterRole, filterType]);
+
     useEffect(() => {
         fetchTransactions();
     }, [fetchTransactions]);
@@ -0,0 +1,30 @@
+"""add_report_order_pdf_digest
+
+Revision ID: a9d3f5b7c1e8
+Revises: f1c7a3e9b5d2
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3f5b7c1e8'
+down_revision: Union[str, Sequence[str], None] = 'f1c7a3e9b5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('adhoc_report_orders', sa.Column('pdf_sha256', sa.String(length=64), nullable=True))
+    op.add_column('adhoc_report_orders', sa.Column('pdf_template_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('adhoc_report_orders', 'pdf_template_version')
+    op.drop_column('adhoc_report_orders', 'pdf_sha256')
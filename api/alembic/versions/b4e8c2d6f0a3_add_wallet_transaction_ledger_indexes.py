@@ -0,0 +1,33 @@
+"""add_wallet_transaction_ledger_indexes
+
+Revision ID: b4e8c2d6f0a3
+Revises: a9d3f5b7c1e8
+Create Date: 2026-10-18 22:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8c2d6f0a3'
+down_revision: Union[str, Sequence[str], None] = 'a9d3f5b7c1e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_wallet_transactions_created_at_id', 'wallet_transactions', ['created_at', 'id'], unique=False)
+    op.create_index('ix_wallet_transactions_user_id_created_at_id', 'wallet_transactions',
+                    ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_wallet_transactions_type_reference_id', 'wallet_transactions',
+                    ['transaction_type', 'reference_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_wallet_transactions_type_reference_id', table_name='wallet_transactions')
+    op.drop_index('ix_wallet_transactions_user_id_created_at_id', table_name='wallet_transactions')
+    op.drop_index('ix_wallet_transactions_created_at_id', table_name='wallet_transactions')
@@ -0,0 +1,30 @@
+"""add_audit_log_client_columns
+
+Revision ID: b4e8d2f6a1c3
+Revises: e2a6c9d4f7b1
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8d2f6a1c3'
+down_revision: Union[str, Sequence[str], None] = 'e2a6c9d4f7b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('audit_logs', sa.Column('client_ip', sa.String(length=45), nullable=True))
+    op.add_column('audit_logs', sa.Column('user_agent', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('audit_logs', 'user_agent')
+    op.drop_column('audit_logs', 'client_ip')
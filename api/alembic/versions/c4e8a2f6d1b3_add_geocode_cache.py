@@ -0,0 +1,41 @@
+"""add_geocode_cache
+
+Revision ID: c4e8a2f6d1b3
+Revises: 9a7c4e2b1f08
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f6d1b3'
+down_revision: Union[str, Sequence[str], None] = '9a7c4e2b1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'geocode_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('query_key', sa.String(length=255), nullable=False),
+        sa.Column('latitude', sa.DECIMAL(precision=10, scale=6), nullable=False),
+        sa.Column('longitude', sa.DECIMAL(precision=10, scale=6), nullable=False),
+        sa.Column('source', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_geocode_cache_id'), 'geocode_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_geocode_cache_query_key'), 'geocode_cache', ['query_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_geocode_cache_query_key'), table_name='geocode_cache')
+    op.drop_index(op.f('ix_geocode_cache_id'), table_name='geocode_cache')
+    op.drop_table('geocode_cache')
@@ -0,0 +1,37 @@
+"""add_wallet_ledger_checkpoints
+
+Revision ID: c7f1a9e3d5b2
+Revises: b4e8c2d6f0a3
+Create Date: 2026-10-18 23:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f1a9e3d5b2'
+down_revision: Union[str, Sequence[str], None] = 'b4e8c2d6f0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'wallet_ledger_checkpoints',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('last_txn_id', sa.Integer(), nullable=False),
+        sa.Column('running_sum', sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column('balanced_txn_id', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('wallet_ledger_checkpoints')
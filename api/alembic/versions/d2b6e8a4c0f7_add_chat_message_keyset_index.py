@@ -0,0 +1,27 @@
+"""add_chat_message_keyset_index
+
+Revision ID: d2b6e8a4c0f7
+Revises: c7f1a9e3d5b2
+Create Date: 2026-10-19 01:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b6e8a4c0f7'
+down_revision: Union[str, Sequence[str], None] = 'c7f1a9e3d5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_chat_messages_consultation_id_id', 'chat_messages', ['consultation_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_messages_consultation_id_id', table_name='chat_messages')
@@ -0,0 +1,40 @@
+"""add_consultation_paused_at
+
+Revision ID: e2a6c9d4f7b1
+Revises: d7b1f3a9c2e4
+Create Date: 2026-10-18 14:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a6c9d4f7b1'
+down_revision: Union[str, Sequence[str], None] = 'd7b1f3a9c2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('consultations', sa.Column('paused_at', sa.DateTime(), nullable=True))
+    # Sessions already PAUSED carry their pause time only in the snapshot JSON.
+    op.execute(
+        """
+        UPDATE consultations
+        SET paused_at = (disconnection_snapshot::json ->> 'paused_at')::timestamp
+        WHERE status = 'PAUSED' AND disconnection_snapshot IS NOT NULL
+        """
+    )
+    op.create_index('ix_consultations_status_created_at', 'consultations', ['status', 'created_at'], unique=False)
+    op.create_index('ix_consultations_status_paused_at', 'consultations', ['status', 'paused_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_consultations_status_paused_at', table_name='consultations')
+    op.drop_index('ix_consultations_status_created_at', table_name='consultations')
+    op.drop_column('consultations', 'paused_at')
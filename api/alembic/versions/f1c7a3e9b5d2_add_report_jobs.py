@@ -0,0 +1,46 @@
+"""add_report_jobs
+
+Revision ID: f1c7a3e9b5d2
+Revises: b4e8d2f6a1c3
+Create Date: 2026-10-18 19:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c7a3e9b5d2'
+down_revision: Union[str, Sequence[str], None] = 'b4e8d2f6a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'report_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('stage', sa.String(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['adhoc_report_orders.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('order_id'),
+    )
+    op.create_index(op.f('ix_report_jobs_id'), 'report_jobs', ['id'], unique=False)
+    op.create_index('ix_report_jobs_due', 'report_jobs', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_report_jobs_due', table_name='report_jobs')
+    op.drop_index(op.f('ix_report_jobs_id'), table_name='report_jobs')
+    op.drop_table('report_jobs')
@@ -0,0 +1,353 @@
+"""
+In-memory astrologer directory behind GET /astrologers/.
+
+The listing is the busiest public endpoint, and the set of approved
+astrologers changes far less often than it is read. Each worker keeps a
+snapshot of the approved, active astrologers and serves pages from it:
+serialized profile fields with review counts, the restricted-astrologer
+allow-lists (seeker -> astrologers), and the three orderings (premium,
+rating, top) sorted once per build.
+
+Keeping it fresh:
+  - a commit that touches an astrologer's profile or account, a review or an
+    allow-list entry bumps a Redis version key; every worker rebuilds on the
+    first request that sees a newer version (and after ASTRO_DIRECTORY_TTL_SECS
+    regardless)
+  - queue length and busy state are Redis hash counters moved by consultation
+    status transitions as they commit (sweeps.py and the billing scheduler
+    report their bulk UPDATEs via apply_transitions), so a page costs one Redis
+    round trip for counters and presence and no SQL
+  - is_online toggles don't force a rebuild: the ASTRO_ONLINE/ASTRO_OFFLINE
+    broadcasts, which already reach every worker over the backplane, flip the
+    entry in place
+
+Counters can drift (a worker dying between its commit and the HINCRBY), so
+one worker per ASTRO_DIRECTORY_RECONCILE_SECS recounts them from Postgres
+while rebuilding. Without Redis only the committing worker's snapshot is
+invalidated and availability is counted from Postgres for the page served.
+
+Tunables (env):
+  ASTRO_DIRECTORY_TTL_SECS        max snapshot age (default 300)
+  ASTRO_DIRECTORY_RECONCILE_SECS  counter recount interval (default 300)
+"""
+import collections
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .backplane import NODE_ID
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+ASTRO_DIRECTORY_TTL_SECS = float(os.getenv("ASTRO_DIRECTORY_TTL_SECS", "300"))
+ASTRO_DIRECTORY_RECONCILE_SECS = int(os.getenv("ASTRO_DIRECTORY_RECONCILE_SECS", "300"))
+_REDIS_RETRY_SECS = 30.0
+
+_VERSION_KEY = "astro_dir:version"
+_QUEUE_KEY = "astro_dir:queue"
+_BUSY_KEY = "astro_dir:busy"
+_RECONCILE_KEY = "astro_dir:reconcile"
+
+_BUSY_STATUSES = {
+    models.ConsultationStatus.ACCEPTED,
+    models.ConsultationStatus.ACTIVE,
+    models.ConsultationStatus.PAUSED,
+}
+# Account columns that decide whether an astrologer is listed at all.
+_USER_LISTING_FIELDS = {"is_active", "is_verified", "role"}
+
+
+@dataclass
+class _Snapshot:
+    version: tuple
+    built_at: float
+    entries: dict[int, dict]
+    orders: dict[str, list[int]]
+    allowed: dict[int, frozenset] = field(default_factory=dict)
+
+
+_snapshot: _Snapshot | None = None
+_generation = 0
+_build_lock = threading.Lock()
+_redis_down_until = 0.0
+
+
+def _redis():
+    if time.monotonic() < _redis_down_until:
+        return None
+    return get_redis()
+
+
+def _redis_failed(action: str, e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECS
+    logger.warning(f"astrologer directory {action} failed, falling back to Postgres: {e}")
+
+
+def _remote_version():
+    redis = _redis()
+    if not redis:
+        return None
+    try:
+        return redis.get(_VERSION_KEY)
+    except Exception as e:
+        _redis_failed("version check", e)
+        return None
+
+
+def invalidate():
+    """Drop this worker's snapshot and tell the others to drop theirs."""
+    global _generation, _snapshot
+    _generation += 1
+    _snapshot = None
+    redis = _redis()
+    if redis:
+        try:
+            redis.incr(_VERSION_KEY)
+        except Exception as e:
+            _redis_failed("invalidation", e)
+
+
+def set_online(astrologer_id: int, online: bool):
+    snap = _snapshot
+    entry = snap.entries.get(astrologer_id) if snap else None
+    if entry is not None:
+        entry["is_online"] = online
+
+
+def on_broadcast(payload: dict):
+    """Hooked into the realtime broadcast path, which every worker runs for
+    every ASTRO_ONLINE/ASTRO_OFFLINE wherever it originated."""
+    kind = payload.get("type")
+    if kind in ("ASTRO_ONLINE", "ASTRO_OFFLINE") and payload.get("astrologer_id"):
+        set_online(int(payload["astrologer_id"]), kind == "ASTRO_ONLINE")
+
+
+def apply_transitions(transitions):
+    """Move the live counters for committed (astrologer_id, old_status,
+    new_status) transitions; either status may be None (row created/deleted)."""
+    queued, busy = collections.Counter(), collections.Counter()
+    for astrologer_id, old, new in transitions:
+        if not astrologer_id or old == new:
+            continue
+        queued[astrologer_id] += (new == models.ConsultationStatus.REQUESTED) - (old == models.ConsultationStatus.REQUESTED)
+        busy[astrologer_id] += (new in _BUSY_STATUSES) - (old in _BUSY_STATUSES)
+    redis = _redis()
+    if not redis:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for key, counts in ((_QUEUE_KEY, queued), (_BUSY_KEY, busy)):
+            for astrologer_id, delta in counts.items():
+                if delta:
+                    pipe.hincrby(key, astrologer_id, delta)
+        pipe.execute()
+    except Exception as e:
+        _redis_failed("counter update", e)
+
+
+def _listed_query(db: Session):
+    return db.query(models.AstrologerProfile).join(models.User).filter(
+        models.AstrologerProfile.is_approved == True,
+        models.AstrologerProfile.onboarding_stage == models.OnboardingStage.COMPLETED,
+        models.User.role == models.UserRole.ASTROLOGER,
+        models.User.is_active == True,
+        models.User.is_verified == True,
+    )
+
+
+def _build(db: Session, version: tuple) -> _Snapshot:
+    from .routers.astrologers import _decorate_review_count_bulk
+
+    profiles = _listed_query(db).all()
+    _decorate_review_count_bulk(db, profiles)
+    entries = {p.user_id: schemas.AstrologerProfile.model_validate(p).model_dump() for p in profiles}
+
+    def ordered(key):
+        return [e["user_id"] for e in sorted(entries.values(), key=key)]
+
+    # Same precedence as the old ORDER BY clauses, with user_id as a stable
+    # tiebreaker so pages don't shuffle between requests.
+    orders = {
+        "premium": ordered(lambda e: (not e["is_premium"], e["user_id"])),
+        "rating": ordered(lambda e: (not e["is_premium"], -e["rating_avg"], e["user_id"])),
+        "top": ordered(lambda e: (-e["rating_avg"], not e["is_trending"], not e["is_vip"],
+                                  not e["is_premium"], e["user_id"])),
+    }
+
+    allowed = collections.defaultdict(set)
+    for seeker_id, astrologer_id in db.query(
+        models.AstrologerAllowedSeeker.seeker_id, models.AstrologerAllowedSeeker.astrologer_id
+    ):
+        allowed[seeker_id].add(astrologer_id)
+
+    _reconcile(db, list(entries))
+    return _Snapshot(version, time.monotonic(), entries, orders,
+                     {seeker_id: frozenset(ids) for seeker_id, ids in allowed.items()})
+
+
+def _reconcile(db: Session, ids: list[int]):
+    """Recount the live counters from Postgres, at most once per
+    ASTRO_DIRECTORY_RECONCILE_SECS across all workers."""
+    from .routers.astrologers import _availability_counts
+
+    redis = _redis()
+    if not redis:
+        return
+    try:
+        if not redis.set(_RECONCILE_KEY, NODE_ID, nx=True, ex=ASTRO_DIRECTORY_RECONCILE_SECS):
+            return
+        queued, busy = _availability_counts(db, ids)
+        pipe = redis.pipeline(transaction=True)
+        pipe.delete(_QUEUE_KEY, _BUSY_KEY)
+        if queued:
+            pipe.hset(_QUEUE_KEY, mapping=queued)
+        if busy:
+            pipe.hset(_BUSY_KEY, mapping=busy)
+        pipe.execute()
+    except Exception as e:
+        _redis_failed("counter reconcile", e)
+
+
+def _current(db: Session) -> _Snapshot:
+    global _snapshot
+    version = (_generation, _remote_version())
+    snap = _snapshot
+    if snap is not None and snap.version == version and time.monotonic() - snap.built_at < ASTRO_DIRECTORY_TTL_SECS:
+        return snap
+    with _build_lock:
+        snap = _snapshot
+        if snap is None or snap.version != version or time.monotonic() - snap.built_at >= ASTRO_DIRECTORY_TTL_SECS:
+            snap = _build(db, version)
+            # An invalidation that landed mid-build leaves this snapshot
+            # already stale; serve it once but don't keep it.
+            if version[0] == _generation:
+                _snapshot = snap
+    return snap
+
+
+def _live_state(db: Session, ids: list[int]) -> tuple[dict, dict, dict | None]:
+    """(queued, busy, present) for one page. present is None when presence
+    can't be read in bulk; _apply_availability then checks it per astrologer."""
+    from .routers.astrologers import _availability_counts
+    from .routers.realtime import _presence_key
+
+    redis = _redis()
+    if redis:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.hmget(_QUEUE_KEY, ids)
+            pipe.hmget(_BUSY_KEY, ids)
+            pipe.mget([_presence_key(i) for i in ids])
+            queued, busy, present = pipe.execute()
+            return (
+                {i: max(int(q or 0), 0) for i, q in zip(ids, queued)},
+                {i: max(int(b or 0), 0) for i, b in zip(ids, busy)},
+                {i: p is not None for i, p in zip(ids, present)},
+            )
+        except Exception as e:
+            _redis_failed("page read", e)
+    queued, busy = _availability_counts(db, ids)
+    return queued, busy, None
+
+
+def page(db: Session, skip: int, limit: int, sort_by: str | None, viewer: models.User | None) -> list:
+    """One page of the seeker-facing listing, in the shape of
+    schemas.AstrologerProfile."""
+    from .routers.astrologers import _apply_availability
+
+    snap = _current(db)
+    order = snap.orders.get(sort_by) or snap.orders["premium"]
+    allowed = frozenset()
+    if viewer is not None and viewer.role == models.UserRole.SEEKER:
+        allowed = snap.allowed.get(viewer.id, frozenset())
+    visible = (i for i in order if not snap.entries[i]["is_restricted"] or i in allowed)
+    skip, limit = max(skip, 0), max(limit, 0)
+    ids = list(itertools.islice(visible, skip, skip + limit))
+    if not ids:
+        return []
+
+    queued, busy, present = _live_state(db, ids)
+    return [
+        _apply_availability(SimpleNamespace(**snap.entries[i]), queued.get(i, 0), busy.get(i, 0) > 0,
+                            present.get(i) if present is not None else None)
+        for i in ids
+    ]
+
+
+# --- commit hooks -------------------------------------------------------------
+
+_PENDING = "astrologer_directory"
+
+
+def _changed_fields(obj) -> set[str]:
+    return {a.key for a in inspect(obj).attrs if a.history.has_changes()}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session, flush_context):
+    pending = session.info.setdefault(_PENDING, {"invalidate": False, "online": {}, "transitions": []})
+    for obj, state in itertools.chain(
+        ((o, "new") for o in session.new),
+        ((o, "dirty") for o in session.dirty),
+        ((o, "deleted") for o in session.deleted),
+    ):
+        if isinstance(obj, models.Consultation):
+            if state == "new":
+                pending["transitions"].append((obj.astrologer_id, None, obj.status))
+            elif state == "deleted":
+                pending["transitions"].append((obj.astrologer_id, obj.status, None))
+            else:
+                history = inspect(obj).attrs.status.history
+                if history.has_changes():
+                    old = history.deleted[0] if history.deleted else None
+                    pending["transitions"].append((obj.astrologer_id, old, obj.status))
+        elif isinstance(obj, models.AstrologerProfile):
+            changed = _changed_fields(obj) if state == "dirty" else None
+            if changed == {"is_online"}:
+                pending["online"][obj.user_id] = bool(obj.is_online)
+            elif changed != set():
+                pending["invalidate"] = True
+        elif isinstance(obj, models.User):
+            # Check the pre-flush role too, so an astrologer demoted to another
+            # role drops out of the listing.
+            role_history = inspect(obj).attrs.role.history
+            was_astrologer = models.UserRole.ASTROLOGER in (*role_history.deleted, *role_history.unchanged)
+            if (obj.role == models.UserRole.ASTROLOGER or was_astrologer) and (
+                state == "deleted" or (state == "dirty" and _changed_fields(obj) & _USER_LISTING_FIELDS)
+            ):
+                pending["invalidate"] = True
+        elif isinstance(obj, (models.Review, models.AstrologerAllowedSeeker)):
+            pending["invalidate"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply(session):
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    try:
+        if pending["transitions"]:
+            apply_transitions(pending["transitions"])
+        if pending["invalidate"]:
+            invalidate()
+        for astrologer_id, online in pending["online"].items():
+            set_online(astrologer_id, online)
+    except Exception as e:
+        logger.error(f"astrologer directory update after commit failed: {e}")
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard(session, transaction):
+    # Rolled back (or closed without committing): nothing we saw happened.
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
@@ -1,6 +1,55 @@
-from sqlalchemy.orm import Session
+"""
+Audit trail.
+
+log() used to add an AuditLog row to the caller's session, so every audited
+action (billing auto-end, moderation flags, chat end, admin edits) carried an
+extra INSERT inside its own transaction. Now:
+
+  - an event is held on the caller's session until it commits, then handed to
+    the per-process writer; if the session rolls back the event is dropped,
+    same as the row would have been
+  - the writer batches events and writes each batch as one multi-row INSERT,
+    every AUDIT_FLUSH_MS or as soon as AUDIT_BATCH_SIZE events are waiting
+  - a batch that can't be written (database unreachable) is appended to a
+    per-process spool file (AUDIT_SPOOL_PATH.<pid>, JSON lines) and replayed
+    after the next successful flush; start() adopts spool files left by dead
+    processes and stop() drains whatever is still queued
+  - log(..., sync=True) keeps the old behaviour for entries that must commit
+    or roll back with the money they describe (wallet adjustments, top-ups,
+    refunds, payouts, purchases)
+
+Until the writer is started (scripts, tests, startup itself) a committed event
+is written straight away in its own short transaction.
+
+Client IP and user agent go in their own columns rather than in details.
+
+Tunables (env):
+  AUDIT_FLUSH_MS     longest a queued event waits before being written (default 500)
+  AUDIT_BATCH_SIZE   events per INSERT (default 500)
+  AUDIT_SPOOL_PATH   spool file prefix for batches that couldn't be written
+                     (default audit_spool.jsonl)
+"""
+import asyncio
+import collections
+import glob
+import json
+import logging
+import os
+from datetime import datetime, timezone
 from typing import Optional
-from . import models
+
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import database, models
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FLUSH_MS = float(os.getenv("AUDIT_FLUSH_MS", "500"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_SPOOL_PATH = os.getenv("AUDIT_SPOOL_PATH", "audit_spool.jsonl")
+_USER_AGENT_MAX = 255
 
 
 def log(
@@ -12,20 +61,211 @@ def log(
     details: Optional[dict] = None,
     client_ip: Optional[str] = None,
     user_agent: Optional[str] = None,
+    sync: bool = False,
 ):
-    final_details = details.copy() if details else {}
-    if client_ip:
-        final_details["client_ip"] = client_ip
-    if user_agent:
-        final_details["user_agent"] = user_agent
-
-    entry = models.AuditLog(
-        actor_id=actor_id,
-        action=action,
-        resource_type=resource_type,
-        resource_id=str(resource_id) if resource_id is not None else None,
-        details=final_details if final_details else None,
-    )
-    db.add(entry)
-    # Caller is responsible for db.commit()
+    """Record an audited action taken in `db`'s transaction. Written once that
+    transaction commits; with sync=True the row is part of the transaction
+    itself. Either way the caller is responsible for db.commit()."""
+    row = {
+        "actor_id": actor_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": str(resource_id) if resource_id is not None else None,
+        "details": details or None,
+        "client_ip": client_ip,
+        "user_agent": user_agent[:_USER_AGENT_MAX] if user_agent else None,
+    }
+    if sync:
+        db.add(models.AuditLog(**row))
+        return
+    row["created_at"] = datetime.now(timezone.utc)
+    db.info.setdefault(_PENDING, []).append(row)
+
+
+# --- commit hooks -------------------------------------------------------------
+
+_PENDING = "audit_events"
+
+
+@event.listens_for(Session, "after_commit")
+def _hand_off(session):
+    rows = session.info.pop(_PENDING, None)
+    if not rows:
+        return
+    if writer.running:
+        writer.submit(rows)
+        return
+    _write(rows, session.get_bind())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+# --- spool --------------------------------------------------------------------
+
+def _spool_file(pid: Optional[int] = None) -> str:
+    return f"{AUDIT_SPOOL_PATH}.{pid or os.getpid()}"
+
+
+def _spool(rows: list[dict]):
+    try:
+        with open(_spool_file(), "a") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}) + "\n")
+    except OSError as e:
+        logger.error(f"audit spool write failed, {len(rows)} event(s) lost: {e}")
+
+
+def _unspool(path: str) -> list[dict]:
+    """Take every event out of a spool file (removing it)."""
+    try:
+        claimed = f"{path}.replay"
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return []
+    with open(claimed) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    os.remove(claimed)
+    for row in rows:
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return rows
+
+
+def _orphaned_spool_files() -> list[str]:
+    orphans = []
+    for path in glob.glob(f"{AUDIT_SPOOL_PATH}.*"):
+        suffix = path.rsplit(".", 1)[1]
+        if not suffix.isdigit() or int(suffix) == os.getpid():
+            continue
+        try:
+            os.kill(int(suffix), 0)
+        except ProcessLookupError:
+            orphans.append(path)
+        except OSError:
+            pass
+    return orphans
+
+
+# --- writer -------------------------------------------------------------------
+
+def _write(rows: list[dict], bind=None) -> bool:
+    """Insert `rows` as multi-row INSERTs (on `bind`, else the app database);
+    False, with the rows spooled, if the database couldn't be reached. A batch
+    refused on a constraint is retried row by row: a row whose actor has been
+    deleted since is kept with actor_id cleared, anything else is dropped
+    with an error."""
+    session = lambda: Session(bind=bind) if bind is not None else database.SessionLocal()
+    try:
+        with session() as db:
+            for i in range(0, len(rows), AUDIT_BATCH_SIZE):
+                db.execute(insert(models.AuditLog), rows[i:i + AUDIT_BATCH_SIZE])
+            db.commit()
+        return True
+    except IntegrityError:
+        pass
+    except Exception as e:
+        logger.error(f"audit flush failed, spooling {len(rows)} event(s): {e}")
+        _spool(rows)
+        return False
+
+    with session() as db:
+        for row in rows:
+            for attempt in (row, {**row, "actor_id": None,
+                                  "details": {**(row["details"] or {}), "deleted_actor_id": row["actor_id"]}}):
+                try:
+                    db.execute(insert(models.AuditLog), [attempt])
+                    db.commit()
+                    break
+                except IntegrityError as e:
+                    db.rollback()
+                    error = e
+            else:
+                logger.error(f"audit event dropped, rejected by the database: {row} ({error})")
+    return True
+
+
+def _flush(rows: list[dict], replay: list[str]):
+    """Write a batch and, once the database has taken it, replay spool files
+    (`replay` plus this process's own)."""
+    if rows and not _write(rows):
+        return
+    if os.path.exists(_spool_file()):
+        replay = [*replay, _spool_file()]
+    for path in dict.fromkeys(replay):
+        spooled = _unspool(path)
+        if spooled:
+            logger.info(f"replaying {len(spooled)} spooled audit event(s) from {path}")
+            if not _write(spooled):
+                return
+
+
+class AuditWriter:
+    """Per-process batching writer; see the module docstring."""
+
+    def __init__(self):
+        self._queue: collections.deque = collections.deque()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._adopt: list[str] = []
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._loop.is_closed()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._adopt = _orphaned_spool_files()
+            self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop and write out everything still queued."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await database.run_db(_flush, self._drain(), [])
+
+    def submit(self, rows: list[dict]):
+        """Queue committed events. Safe from any thread."""
+        self._queue.extend(rows)
+        if len(self._queue) >= AUDIT_BATCH_SIZE:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass
+
+    def _drain(self) -> list[dict]:
+        rows = []
+        while self._queue:
+            rows.append(self._queue.popleft())
+        return rows
+
+    async def _run(self):
+        while True:
+            if len(self._queue) < AUDIT_BATCH_SIZE:
+                try:
+                    async with asyncio.timeout(AUDIT_FLUSH_MS / 1000):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+            self._wakeup.clear()
+            rows, replay, self._adopt = self._drain(), self._adopt, []
+            if not rows and not replay:
+                continue
+            try:
+                await database.run_db(_flush, rows, replay)
+            except Exception as e:
+                logger.error(f"audit writer error: {e}")
+
 
+writer = AuditWriter()
@@ -0,0 +1,211 @@
+"""Cross-worker fan-out for the chat and realtime WebSockets.
+
+chat.ConnectionManager (consultation rooms) and realtime.NotificationManager
+(per-user inbox + public broadcasts) only hold the sockets connected to *this*
+process. Every send is delivered to the local sockets first, then published
+through the backend so the other workers/nodes deliver it to theirs.
+
+Backend is picked by REALTIME_BACKEND:
+  memory - single process; nothing leaves the worker (default, and what tests use)
+  redis  - Redis pub/sub on REDIS_URL, needed once uvicorn runs >1 worker
+
+The backend also tracks which users are connected to which group (a chat room,
+or the realtime inbox) on every node, so "is the recipient online?" checks —
+which decide whether to send an FCM push — stay correct across workers. All
+of its Redis traffic goes through the asyncio client, so a slow Redis never
+stalls the sockets served by the event loop.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable
+
+from .redis_client import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in published envelopes and membership entries.
+NODE_ID = uuid.uuid4().hex
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class InMemoryBackend:
+    """Single-process backend: local delivery is all there is."""
+
+    def __init__(self):
+        self._handlers: dict[str, Handler] = {}
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers[topic] = handler
+
+    def start(self):
+        pass
+
+    async def publish(self, topic: str, message: dict):
+        # The publisher has already delivered to its own sockets.
+        pass
+
+    def join(self, group: str, user_id: int):
+        pass
+
+    def leave(self, group: str, user_id: int):
+        pass
+
+    async def is_member_elsewhere(self, group: str, user_id: int) -> bool:
+        return False
+
+
+class RedisBackend(InMemoryBackend):
+    """Redis pub/sub backplane.
+
+    Messages go out on `rt:{topic}` wrapped as {"o": NODE_ID, "m": message};
+    each node skips its own envelopes (it delivered locally before publishing).
+    Membership lives in `rt_members:{group}` hashes keyed "{user_id}:{node}"
+    -> socket count, and only counts while that node's `rt_node:{node}`
+    heartbeat key is alive, so a crashed worker can't leave users looking
+    online forever. join()/leave() are called from sync socket bookkeeping,
+    so they only queue the update; one writer task applies them in order."""
+
+    CHANNEL_PREFIX = "rt:"
+    HEARTBEAT_SECS = 10
+    NODE_TTL_SECS = 30
+    MEMBERS_TTL_SECS = 86400
+
+    def __init__(self, url: str):
+        super().__init__()
+        self._url = url
+        self._client = None
+        self._tasks: list[asyncio.Task] = []
+        self._membership: asyncio.Queue | None = None
+
+    def _async_client(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.from_url(self._url, decode_responses=True)
+        return self._client
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._tasks and not any(t.done() for t in self._tasks):
+            return
+        for task in self._tasks:
+            task.cancel()
+        if self._membership is None:
+            self._membership = asyncio.Queue()
+        self._tasks = [
+            loop.create_task(self._listen()),
+            loop.create_task(self._heartbeat()),
+            loop.create_task(self._write_membership()),
+        ]
+
+    async def publish(self, topic: str, message: dict):
+        try:
+            await self._async_client().publish(
+                self.CHANNEL_PREFIX + topic, json.dumps({"o": NODE_ID, "m": message})
+            )
+        except Exception as e:
+            logger.error(f"backplane publish to {topic} failed: {e}")
+
+    async def _listen(self):
+        channels = [self.CHANNEL_PREFIX + topic for topic in self._handlers]
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._async_client().pubsub()
+                await pubsub.subscribe(*channels)
+                async for raw in pubsub.listen():
+                    if raw.get("type") == "message":
+                        await self._dispatch(raw["channel"], raw["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"backplane listener error, resubscribing: {e}")
+                await asyncio.sleep(2)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    async def _dispatch(self, channel: str, data: str):
+        try:
+            envelope = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if envelope.get("o") == NODE_ID:
+            return
+        handler = self._handlers.get(channel[len(self.CHANNEL_PREFIX):])
+        if handler is None:
+            return
+        try:
+            await handler(envelope.get("m") or {})
+        except Exception as e:
+            logger.error(f"backplane handler for {channel} failed: {e}")
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await self._async_client().set(f"rt_node:{NODE_ID}", "1", ex=self.NODE_TTL_SECS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"backplane heartbeat failed: {e}")
+            await asyncio.sleep(self.HEARTBEAT_SECS)
+
+    def join(self, group: str, user_id: int):
+        if self._membership is not None:
+            self._membership.put_nowait((group, user_id, 1))
+
+    def leave(self, group: str, user_id: int):
+        if self._membership is not None:
+            self._membership.put_nowait((group, user_id, -1))
+
+    async def _write_membership(self):
+        while True:
+            group, user_id, delta = await self._membership.get()
+            key, field = f"rt_members:{group}", f"{user_id}:{NODE_ID}"
+            try:
+                client = self._async_client()
+                if delta > 0:
+                    pipe = client.pipeline()
+                    pipe.hincrby(key, field, 1)
+                    pipe.expire(key, self.MEMBERS_TTL_SECS)
+                    pipe.set(f"rt_node:{NODE_ID}", "1", ex=self.NODE_TTL_SECS)
+                    await pipe.execute()
+                elif await client.hincrby(key, field, -1) <= 0:
+                    await client.hdel(key, field)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                action = "join" if delta > 0 else "leave"
+                logger.error(f"backplane {action} {group} failed for {user_id}: {e}")
+
+    async def is_member_elsewhere(self, group: str, user_id: int) -> bool:
+        prefix = f"{user_id}:"
+        try:
+            client = self._async_client()
+            nodes = [
+                field[len(prefix):]
+                for field, count in (await client.hgetall(f"rt_members:{group}")).items()
+                if field.startswith(prefix) and int(count) > 0 and field[len(prefix):] != NODE_ID
+            ]
+            return bool(nodes) and await client.exists(*(f"rt_node:{node}" for node in nodes)) > 0
+        except Exception as e:
+            logger.error(f"backplane membership lookup {group} failed for {user_id}: {e}")
+            return False
+
+
+def _make_backend() -> InMemoryBackend:
+    kind = os.getenv("REALTIME_BACKEND", "memory").lower()
+    if kind == "redis":
+        return RedisBackend(REDIS_URL)
+    if kind != "memory":
+        logger.warning(f"Unknown REALTIME_BACKEND={kind!r}; using the in-memory backend")
+    return InMemoryBackend()
+
+
+backplane = _make_backend()
@@ -0,0 +1,185 @@
+"""
+Chat history reads: keyset pages and a per-room ring of recent messages.
+
+GET /chat/history/{id} and GET /consultations/{id}/messages used to return
+every message of the consultation with .all() on every call, and clients
+re-fetch after each reconnect (PAUSED/RESUME cycles are common), so a long
+consultation was re-read and re-serialized over and over. Now:
+
+  - page() is a keyset read on the (consultation_id, id) index: since_id ->
+    the messages after the client's newest, before_id -> the page before its
+    oldest, only limit -> the latest page; always oldest first, at most
+    CHAT_HISTORY_PAGE, with a flag for whether more lie beyond it in that
+    direction (the X-Has-More header on the history endpoints). With none of
+    the three it is the whole chat, as the endpoints have always returned,
+    so existing consumers keep getting the full transcript
+  - remember(), called by the chat router for every message it stores, keeps
+    each room's last CHAT_RECENT_MESSAGES serialized in a ring: a Redis list
+    when the backplane is Redis (so every worker's sockets share it),
+    otherwise in process. A since_id read is answered from the ring when an
+    index-only COUNT of the room's messages after since_id matches what the
+    ring holds, so a ring with a gap (a restart, a Redis blip) falls back to
+    the database rather than dropping messages
+  - the chat socket's STATE_SYNC carries the messages after the
+    last_message_id the client sends with its token, so a reconnect only
+    receives what it missed
+  - forget() drops rooms' rings when their stored messages are rewritten
+    (admin user deletion anonymizes sender_id)
+
+Tunables (env):
+  CHAT_HISTORY_PAGE       messages per page (default 200)
+  CHAT_RECENT_MESSAGES    ring size per room (default 100)
+  CHAT_RECENT_TTL_SECS    how long an idle room's Redis ring lives (default 21600)
+"""
+import collections
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .backplane import RedisBackend, backplane
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_PAGE = int(os.getenv("CHAT_HISTORY_PAGE", "200"))
+CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "100"))
+CHAT_RECENT_TTL_SECS = int(os.getenv("CHAT_RECENT_TTL_SECS", "21600"))
+_REDIS_RETRY_SECS = 30.0
+
+HAS_MORE_HEADER = "X-Has-More"
+# The paging header as documented on both history endpoints.
+HISTORY_RESPONSES = {200: {"headers": {HAS_MORE_HEADER: {
+    "description": "true when more messages lie past this page (older, or newer after since_id); "
+                   "always false for the full history returned without paging parameters",
+    "schema": {"type": "boolean"},
+}}}}
+
+# consultation_id -> deque of serialized messages (memory backplane only).
+_rings: dict[int, collections.deque] = {}
+_rings_lock = threading.Lock()
+_redis_down_until = 0.0
+
+
+def serialize(msg: "models.ChatMessage") -> dict:
+    """A message as the history endpoints return it (schemas.ChatMessage)."""
+    return {
+        "id": msg.id,
+        "sender_id": msg.sender_id,
+        "message": msg.message,
+        "message_type": msg.message_type or "text",
+        "media_url": msg.media_url,
+        "timestamp": msg.timestamp.isoformat() if msg.timestamp else None,
+    }
+
+
+def _redis():
+    if not isinstance(backplane, RedisBackend) or time.monotonic() < _redis_down_until:
+        return None
+    return get_redis()
+
+
+def _redis_failed(action: str, e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECS
+    logger.warning(f"chat ring {action} failed, reading history from the database: {e}")
+
+
+def _key(consultation_id: int) -> str:
+    return f"chat:recent:{consultation_id}"
+
+
+def remember(msg: "models.ChatMessage"):
+    """Add a just-committed message to its room's ring."""
+    entry = serialize(msg)
+    redis = _redis()
+    if redis:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.rpush(_key(msg.consultation_id), json.dumps(entry))
+            pipe.ltrim(_key(msg.consultation_id), -CHAT_RECENT_MESSAGES, -1)
+            pipe.expire(_key(msg.consultation_id), CHAT_RECENT_TTL_SECS)
+            pipe.execute()
+        except Exception as e:
+            _redis_failed("write", e)
+        return
+    with _rings_lock:
+        ring = _rings.get(msg.consultation_id)
+        if ring is None:
+            ring = _rings[msg.consultation_id] = collections.deque(maxlen=CHAT_RECENT_MESSAGES)
+        ring.append(entry)
+
+
+def forget(consultation_ids):
+    """Drop the rings of these rooms, for when stored messages are rewritten
+    (a deleted sender anonymized) and the copies in the ring would be stale."""
+    consultation_ids = list(consultation_ids)
+    if not consultation_ids:
+        return
+    redis = _redis()
+    if redis:
+        try:
+            redis.delete(*(_key(cid) for cid in consultation_ids))
+        except Exception as e:
+            _redis_failed("delete", e)
+    with _rings_lock:
+        for cid in consultation_ids:
+            _rings.pop(cid, None)
+
+
+def _recent(consultation_id: int) -> Optional[list]:
+    redis = _redis()
+    if redis:
+        try:
+            return [json.loads(raw) for raw in redis.lrange(_key(consultation_id), 0, -1)]
+        except Exception as e:
+            _redis_failed("read", e)
+            return None
+    if isinstance(backplane, RedisBackend):
+        return None  # this worker's ring only has its own sockets' messages
+    with _rings_lock:
+        return list(_rings.get(consultation_id, ()))
+
+
+def _since_from_ring(db: Session, consultation_id: int, since_id: int, limit: int) -> Optional[list]:
+    recent = _recent(consultation_id)
+    if recent is None:
+        return None
+    newer = sorted((e for e in recent if e["id"] > since_id), key=lambda e: e["id"])
+    stored = db.query(func.count(models.ChatMessage.id)).filter(
+        models.ChatMessage.consultation_id == consultation_id,
+        models.ChatMessage.id > since_id,
+    ).scalar()
+    if stored != len(newer):
+        return None
+    return newer[:limit + 1]
+
+
+def page(db: Session, consultation_id: int, since_id: Optional[int] = None,
+         before_id: Optional[int] = None, limit: Optional[int] = None) -> tuple[list, bool]:
+    """Serialized messages of a consultation, oldest first, and whether there
+    are more past the page's far end (see module doc)."""
+    query = db.query(models.ChatMessage).filter(models.ChatMessage.consultation_id == consultation_id)
+    if since_id is None and before_id is None and limit is None:
+        return [serialize(m) for m in query.order_by(models.ChatMessage.id.asc()).all()], False
+
+    limit = max(1, min(limit or CHAT_HISTORY_PAGE, CHAT_HISTORY_PAGE))
+    if since_id is not None:
+        cached = _since_from_ring(db, consultation_id, since_id, limit)
+        if cached is not None:
+            return cached[:limit], len(cached) > limit
+
+    # One row past the page says whether there's more.
+    if since_id is not None:
+        rows = query.filter(models.ChatMessage.id > since_id).order_by(models.ChatMessage.id.asc()).limit(limit + 1).all()
+        return [serialize(m) for m in rows[:limit]], len(rows) > limit
+    if before_id is not None:
+        query = query.filter(models.ChatMessage.id < before_id)
+    rows = query.order_by(models.ChatMessage.id.desc()).limit(limit + 1).all()
+    return [serialize(m) for m in rows[:limit][::-1]], len(rows) > limit
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import asyncio
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Determine environment: 'development' (default) or 'production'
@@ -37,3 +40,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Bounded pool for ORM work issued from async code (the chat/realtime
+# WebSockets and the billing scheduler), so a slow Postgres commit ties up one
+# of these threads instead of the event loop every socket on the worker
+# shares. Sized to what the engine can hand out at once (QueuePool's default
+# pool_size=5 + max_overflow=10): extra jobs wait their turn here rather than
+# parking threads on connection checkout.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "15"))
+_db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run sync ORM work `fn(*args, **kwargs)` on the DB executor and await it.
+
+    Sessions aren't thread-safe, but each call is awaited before the next one
+    is issued, so a session is still only ever used by one thread at a time."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(fn, *args, **kwargs))
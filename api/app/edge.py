@@ -0,0 +1,299 @@
+"""
+The HTTP edge: one pure-ASGI middleware in front of every HTTP route.
+
+This used to be four BaseHTTPMiddleware layers (csrf_middleware,
+add_security_headers, log_requests and SlowAPIMiddleware), each running the
+rest of the request in its own task and re-wrapping the response body stream,
+plus a synchronous print of the full URL per request. EdgeMiddleware does the
+same work in a single pass over the ASGI messages:
+
+  - CSRF double-submit check against a precomputed exempt-path set (requests
+    with a bearer token and /cron/ callers are exempt, as before)
+  - the global default rate limit for routes without their own
+    @limiter.limit(...), via slowapi's own checks, with the matched route
+    cached per method + path instead of re-matched against every route
+  - security headers from a block built once at import, /static cache policy,
+    the no-store default for routes that don't set their own Cache-Control,
+    and the csrf_token cookie
+  - unhandled exceptions turned into a generic 500 and handed to on_error
+    (main._persist_error_log)
+  - one access-log record per request on the "app.access" logger, whose
+    handler only enqueues; a QueueListener thread does the formatting and
+    the write
+
+WebSocket scopes pass straight through.
+
+Tunables (env):
+  ACCESS_LOG   "0" turns the access log off (default on)
+"""
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import secrets
+import sys
+import time
+from http.cookies import SimpleCookie
+from typing import Callable, Optional
+
+# Private slowapi helpers (and Limiter._inject_asgi_headers below): slowapi is
+# pinned in requirements.txt for that reason.
+from slowapi.middleware import _find_route_handler, _should_exempt, async_check_limits
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request, cookie_parser
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+access_log = logging.getLogger("app.access")
+
+ACCESS_LOG = os.getenv("ACCESS_LOG", "1") != "0"
+
+# State-changing requests that must work before any session (and so any
+# csrf_token cookie) exists: initial auth, public AI chat, webhooks.
+CSRF_EXEMPT_PATHS = frozenset({
+    "/login",
+    "/signup",
+    "/verify-email",
+    "/resend-verification",
+    "/forgot-password",
+    "/verify-otp",
+    "/reset-password",
+    "/auth/google",
+    "/auth/facebook",
+    "/payment/razorpay-webhook",
+    "/public/whatsapp/waplex/inbound",
+    "/ai-astrologer/chat",
+    # Astrologer onboarding: applicant has no account/session yet, same as signup above.
+    "/astrologers/onboarding",
+    "/astrologers/onboarding/photo",
+    # Ad-hoc public report checkout & webhooks (visitors have no session yet)
+    "/reports/lead-capture",
+    "/reports/create-direct-order",
+    "/reports/verify-payment",
+    "/reports/payment-webhook",
+})
+_UNSAFE_METHODS = frozenset({"POST", "PUT", "DELETE", "PATCH"})
+
+_SECURITY_HEADERS = [
+    (k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in {
+        "X-Frame-Options": "DENY",
+        "X-Content-Type-Options": "nosniff",
+        "X-XSS-Protection": "1; mode=block",
+        "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+        "Referrer-Policy": "strict-origin-when-cross-origin",
+        "X-Permitted-Cross-Domain-Policies": "none",
+        "Permissions-Policy": "camera=(), microphone=(), geolocation=(self)",
+        "Content-Security-Policy": (
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline' https://checkout.razorpay.com https://cdn.razorpay.com https://cdn.jsdelivr.net; "
+            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.jsdelivr.net; "
+            "font-src 'self' https://fonts.gstatic.com data:; "
+            "img-src 'self' data: https: blob: http://localhost:* http://192.168.1.13:* http://*.aadikarta.org; "
+            "connect-src 'self' https://api.aadikarta.org http://api.aadikarta.org https://admin.aadikarta.org http://admin.aadikarta.org https://aadikarta.org http://aadikarta.org https://*.aadikarta.org http://*.aadikarta.org http://localhost:* ws://localhost:* http://192.168.1.13:* ws://192.168.1.13:* wss://api.aadikarta.org wss://*.aadikarta.org; "
+            "frame-src 'self' https://checkout.razorpay.com http://localhost:* https://*.aadikarta.org http://*.aadikarta.org http://192.168.1.13:* https://www.youtube.com https://*.youtube.com https://*.youtube-nocookie.com; "
+            "media-src 'self' blob: https: http://localhost:* http://192.168.1.13:* http://*.aadikarta.org; "
+            "object-src 'none';"
+        ),
+    }.items()
+]
+_REPLACED = frozenset(k for k, _ in _SECURITY_HEADERS)
+
+# Uploaded/gallery images under /static are immutable once written (each
+# upload gets its own filename) -- forcing no-store on them too meant every
+# blog image was re-downloaded in full on every single page view, with no
+# browser or CDN caching possible. API JSON still needs no-store (it can
+# carry per-user/auth data), so only /static gets the long-lived version --
+# plus routes that set their own policy (public content served through
+# app/response_cache.py, revalidated by ETag).
+_STATIC_CACHE_CONTROL = b"public, max-age=31536000, immutable"
+_DEFAULT_CACHE_CONTROL = b"no-store, no-cache, must-revalidate, max-age=0"
+
+# csrf_token cookie. In production the frontend (aadikarta.org) and API
+# (api.aadikarta.org) are different hostnames, so without an explicit Domain
+# attribute this cookie defaults to api.aadikarta.org only -- the frontend's
+# JS (document.cookie) can never read it, X-CSRF-Token never gets sent, and
+# every state-changing request 403s with "CSRF token validation failed".
+# Scoping to the shared parent domain fixes that. Locally both run on
+# "localhost" (cookies are host-scoped, not port-scoped) so no Domain override
+# is needed there. Not HttpOnly: the frontend reads it for the double-submit;
+# SameSite=None (cross-site requests) requires Secure.
+_COOKIE_DOMAIN = ".aadikarta.org" if os.getenv("APP_ENV") == "production" else None
+_COOKIE_ATTRS = (f"; Domain={_COOKIE_DOMAIN}" if _COOKIE_DOMAIN else "") + "; Path=/; SameSite=None; Secure"
+_PLAIN_TOKEN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def _csrf_cookie(token: str) -> bytes:
+    if _PLAIN_TOKEN.fullmatch(token):
+        return f"csrf_token={token}{_COOKIE_ATTRS}".encode("latin-1")
+    # A client-supplied value that would need quoting: let SimpleCookie do it.
+    cookie = SimpleCookie()
+    cookie["csrf_token"] = token
+    cookie["csrf_token"]["path"] = "/"
+    cookie["csrf_token"]["samesite"] = "None"
+    cookie["csrf_token"]["secure"] = True
+    if _COOKIE_DOMAIN:
+        cookie["csrf_token"]["domain"] = _COOKIE_DOMAIN
+    return cookie.output(header="").strip().encode("latin-1")
+
+
+# (method, path) -> route endpoint, for the default-limit exemption check.
+# slowapi's _find_route_handler matches the request against every route in
+# the app (several hundred) on each call; the answer only changes when the
+# route table does.
+_HANDLER_CACHE_SIZE = 4096
+_handlers: collections.OrderedDict = collections.OrderedDict()
+_handlers_route_count = 0
+
+
+def _route_handler(app, scope):
+    global _handlers_route_count
+    routes = app.routes
+    if len(routes) != _handlers_route_count:
+        _handlers.clear()
+        _handlers_route_count = len(routes)
+    key = (scope["method"], scope["path"])
+    try:
+        handler = _handlers[key]
+        _handlers.move_to_end(key)
+        return handler
+    except KeyError:
+        pass
+    handler = _find_route_handler(routes, scope)
+    _handlers[key] = handler
+    if len(_handlers) > _HANDLER_CACHE_SIZE:
+        _handlers.popitem(last=False)
+    return handler
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _install_access_log():
+    """Route app.access through a queue so the request path never blocks on
+    stdout; a listener thread drains it."""
+    global _listener
+    if _listener is not None or not ACCESS_LOG:
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    access_log.addHandler(logging.handlers.QueueHandler(records))
+    access_log.setLevel(logging.INFO)
+    access_log.propagate = False
+
+
+class EdgeMiddleware:
+    def __init__(self, app, on_error: Optional[Callable[[Request, Exception], None]] = None):
+        self.app = app
+        self.on_error = on_error
+        _install_access_log()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        method, path = scope["method"], scope["path"]
+        cookie = auth = header_token = origin = None
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                cookie = value
+            elif name == b"authorization":
+                auth = value
+            elif name == b"x-csrf-token":
+                header_token = value
+            elif name == b"origin":
+                origin = value
+
+        csrf_token = None
+        if cookie is not None:
+            csrf_token = cookie_parser(cookie.decode("latin-1")).get("csrf_token")
+        if not csrf_token:
+            csrf_token = secrets.token_urlsafe(32)
+        set_cookie = _csrf_cookie(csrf_token)
+        is_static = path.startswith("/static/")
+        status = 500
+        rate_limit = None  # (limiter, view_rate_limit) when slowapi wants its headers
+        response_started = False
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(k, v) for k, v in message.get("headers", ()) if k not in _REPLACED]
+                if is_static:
+                    headers = [(k, v) for k, v in headers if k != b"cache-control"]
+                    headers.append((b"cache-control", _STATIC_CACHE_CONTROL))
+                elif not any(k == b"cache-control" for k, _ in headers):
+                    headers.append((b"cache-control", _DEFAULT_CACHE_CONTROL))
+                headers.extend(_SECURITY_HEADERS)
+                headers.append((b"set-cookie", set_cookie))
+                if rate_limit is not None:
+                    rate_limit[0]._inject_asgi_headers(MutableHeaders(raw=headers), rate_limit[1])
+                message["headers"] = headers
+            await send(message)
+
+        async def send_tracking(message):
+            nonlocal response_started
+            response_started = True
+            await send_with_headers(message)
+
+        try:
+            if (
+                method in _UNSAFE_METHODS
+                and path not in CSRF_EXEMPT_PATHS
+                # Bearer-token (JWT) requests are inherently CSRF-protected.
+                and not (auth is not None and auth.startswith(b"Bearer "))
+                # Cron endpoints are called by an external scheduler (system
+                # cron / Vercel Cron) with no browser session and no JWT --
+                # they're protected by their own X-Cron-Secret check (see
+                # routers/cron.py) instead of CSRF.
+                and not path.startswith("/cron/")
+                and (header_token is None or header_token.decode("latin-1") != csrf_token)
+            ):
+                response = JSONResponse(status_code=403, content={"detail": "CSRF token validation failed"})
+                await response(scope, receive, send_tracking)
+                return
+
+            app = scope["app"]
+            limiter = app.state.limiter
+            if limiter.enabled:
+                handler = _route_handler(app, scope)
+                if not _should_exempt(limiter, handler):
+                    request = Request(scope, receive=receive)
+                    error_response, inject = await async_check_limits(limiter, request, handler, app)
+                    if error_response is not None:
+                        await error_response(scope, receive, send_tracking)
+                        return
+                    if inject:
+                        rate_limit = (limiter, request.state.view_rate_limit)
+
+            await self.app(scope, receive, send_tracking)
+        except Exception as e:
+            # Log the full exception server-side only -- never echo str(e) to
+            # the client, since it can contain SQL fragments, file paths, or
+            # other internals from unrelated dependencies raising here.
+            logger.exception(f"unhandled error processing {method} {path}")
+            if self.on_error is not None:
+                self.on_error(Request(scope), e)
+            if response_started:
+                raise
+            response = JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+            await response(scope, receive, send_with_headers)
+        finally:
+            if access_log.isEnabledFor(logging.INFO):
+                duration_ms = (time.perf_counter() - started) * 1000
+                access_log.info(
+                    "%s %s %d %.1fms origin=%s", method, path, status, duration_ms,
+                    origin.decode("latin-1") if origin else "-",
+                    extra={"method": method, "path": path, "status": status,
+                           "duration_ms": round(duration_ms, 1),
+                           "origin": origin.decode("latin-1") if origin else None},
+                )
@@ -0,0 +1,194 @@
+"""
+Streaming CSV/PDF exports for the admin ledgers (all transactions, a user's
+wallet history and consultations, report leads).
+
+The exports used to load the whole filtered result with .all() (the
+transactions export capped at MAX_TRANSACTION_ROWS_TO_GROUP rows), build every
+line into one StringIO or the whole table into one platypus story, and send
+that buffer as a single chunk, so memory grew with the ledger. Now:
+
+  - rows are read with stream(): yield_per batches, which on PostgreSQL is a
+    server-side cursor (stream_results), so the app holds one batch at a time
+  - csv_response() writes rows as they arrive and sends a chunk every
+    EXPORT_CSV_CHUNK_BYTES; the StreamingResponse pulls rows on a threadpool
+    thread while the request's session (request-scoped get_db) stays open.
+    That relies on FastAPI >= 0.118 (pinned in requirements.txt) running
+    dependency teardown after the response is sent; older releases close the
+    session mid-stream
+  - write_pdf_table() lays the table out one page at a time, holding only the
+    rows for the next page or so. Each finished page is compressed into the
+    document, and reportlab keeps those until save(), so PDF memory does grow
+    with the table: pdf_table_response() stops at EXPORT_PDF_MAX_ROWS rows
+    (about 23 a page, so some 430 pages and well under 1 MB of document at
+    the default) and says so in the subtitle
+  - pdf_table_response() files the PDF in the pdf_store under a key taken
+    before any row is read: the caller's fingerprint of the data (filters,
+    row count, newest id ...). A repeat download of unchanged data costs those
+    aggregate queries and a file send (or a 304), not a re-read and re-render
+
+Tunables (env):
+  EXPORT_BATCH_ROWS        rows fetched per round trip (default 1000)
+  EXPORT_CSV_CHUNK_BYTES   CSV bytes per response chunk (default 65536)
+  EXPORT_PDF_MAX_ROWS      rows rendered into a PDF export (default 10000)
+"""
+import csv
+import io
+import itertools
+import os
+from typing import Callable, Iterable, Iterator, List
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch, mm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Frame, Paragraph, Spacer, Table, TableStyle
+from sqlalchemy.orm import Query
+
+from . import pdf_store
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+EXPORT_CSV_CHUNK_BYTES = int(os.getenv("EXPORT_CSV_CHUNK_BYTES", "65536"))
+EXPORT_PDF_MAX_ROWS = int(os.getenv("EXPORT_PDF_MAX_ROWS", "10000"))
+
+# Bump when write_pdf_table's output changes; stored exports are keyed on it.
+PDF_TEMPLATE_VERSION = 3
+
+_PAGE = landscape(A4)
+_MARGINS = {"left": inch, "right": inch, "top": 15 * mm, "bottom": 15 * mm}
+# Rows offered to each page: more than a landscape page holds, so every page
+# but the last is filled, while the read-ahead stays one page-ful.
+_ROWS_PER_PAGE_TABLE = 80
+# A row too tall for a page of its own is clipped to this many lines per cell,
+# each at most this long (table cells don't wrap).
+_MAX_CELL_LINES = 30
+_MAX_CELL_CHARS = 300
+_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4f46e5")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f3f4f6")]),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+])
+
+
+def stream(query: Query) -> Iterator:
+    """Iterate `query` in EXPORT_BATCH_ROWS batches (a server-side cursor on
+    PostgreSQL) instead of loading it whole."""
+    return iter(query.yield_per(EXPORT_BATCH_ROWS))
+
+
+def csv_chunks(header: List[str], rows: Iterable[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CSV_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def csv_response(filename: str, header: List[str], rows: Iterable[list]) -> StreamingResponse:
+    """A CSV download written as `rows` (a lazy iterable) is consumed."""
+    return StreamingResponse(
+        csv_chunks(header, rows),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+def _frame() -> Frame:
+    # Same frame SimpleDocTemplate would lay the page out in.
+    width, height = _PAGE
+    return Frame(_MARGINS["left"], _MARGINS["bottom"],
+                 width - _MARGINS["left"] - _MARGINS["right"],
+                 height - _MARGINS["top"] - _MARGINS["bottom"], id="normal")
+
+
+def write_pdf_table(out, title: str, subtitle: str, headers: List[str], rows: Iterable[list],
+                    col_widths: List[float]):
+    """Write a titled table PDF to the binary file `out`, one page at a time.
+    The header row repeats on every page. Output is byte-for-byte repeatable
+    (invariant: no creation date or random document id), so re-storing an
+    unchanged export doesn't change what its ETag stands for."""
+    styles = getSampleStyleSheet()
+    canv = canvas.Canvas(out, pagesize=_PAGE, invariant=True)
+    story = [
+        Paragraph(title, styles["Title"]),
+        Paragraph(subtitle, styles["Normal"]),
+        Spacer(1, 8 * mm),
+    ]
+    rows = iter(rows)
+    pending: List[list] = []
+    while True:
+        pending.extend(itertools.islice(rows, _ROWS_PER_PAGE_TABLE - len(pending)))
+        if not pending and not story:
+            break
+        frame = _frame()
+        fresh_page = not story
+        frame.addFromList(story, canv)
+        table = Table([headers] + pending, colWidths=col_widths, repeatRows=1)
+        table.setStyle(_TABLE_STYLE)
+        if frame.add(table, canv):
+            pending = []
+        else:
+            split = frame.split(table, canv)
+            if split:
+                frame.add(split[0], canv)
+                pending = pending[split[0]._nrows - 1:]
+            elif fresh_page:
+                # Not even the first row fits a page of its own: clip its
+                # cells, to one line if that is already done.
+                row = pending[0]
+                pending[0] = _clip_row(row, _MAX_CELL_LINES)
+                if pending[0] == row:
+                    pending[0] = _clip_row(row, 1)
+                if pending[0] == row:
+                    del pending[0]  # nothing left to clip; leave it out rather than loop
+                continue
+            # Otherwise the row starts the next page, below nothing but the header.
+        canv.showPage()
+    canv.save()
+
+
+def _clip_row(row: list, max_lines: int) -> list:
+    return [_clip_cell(cell, max_lines) for cell in row]
+
+
+def _clip_cell(cell, max_lines: int) -> str:
+    text = cell.getPlainText() if isinstance(cell, Paragraph) else str(cell)
+    lines = text.splitlines()
+    clipped = [line[:_MAX_CELL_CHARS] for line in lines[:max_lines]]
+    if clipped != lines:
+        clipped[-1:] = [(clipped[-1] if clipped else "") + " ..."]
+    return "\n".join(clipped)
+
+
+def pdf_table_response(request: Request, filename: str, title: str, subtitle: str, headers: List[str],
+                       rows: Callable[[], Iterable[list]], col_widths: List[float], *, total: int,
+                       fingerprint) -> Response:
+    """Serve a table export from the pdf_store, rendering it only on a miss.
+
+    `fingerprint` (JSON-able) must change whenever the rows would, and `total`
+    is the full row count; both come from cheap aggregates. `rows()` returns
+    the lazy row iterable and is only called when the export isn't stored.
+    Blocking; call it from a sync route."""
+    if total > EXPORT_PDF_MAX_ROWS:
+        subtitle += f" &nbsp;|&nbsp; Newest {EXPORT_PDF_MAX_ROWS:,} of {total:,} rows"
+    key = pdf_store.digest(pdf_store.ADMIN_EXPORT, PDF_TEMPLATE_VERSION, title, subtitle, headers,
+                           col_widths, fingerprint)
+    pdf_store.get_or_write(
+        pdf_store.ADMIN_EXPORT, key,
+        lambda out: write_pdf_table(out, title, subtitle, headers,
+                                    itertools.islice(rows(), EXPORT_PDF_MAX_ROWS), col_widths),
+    )
+    return pdf_store.response(request, pdf_store.ADMIN_EXPORT, key, filename, disposition="attachment")
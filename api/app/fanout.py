@@ -0,0 +1,189 @@
+"""Per-socket outbound queues for WebSocket fan-out.
+
+Every socket held by chat.ConnectionManager / realtime.NotificationManager gets
+an OutboundSocket: a bounded queue drained by its own writer task. A broadcast
+serializes the payload once, offers the text to each recipient's queue and
+returns once they have all written it (or after WS_BROADCAST_WAIT_SECS), so one
+slow phone on a bad network no longer holds up everybody else in the room.
+
+When a queue is full the socket's policy applies:
+  drop_oldest - discard the oldest queued frame (realtime notifications; the
+                client re-reads state on the next refresh anyway)
+  disconnect  - close the socket with 1013 so the client reconnects and gets a
+                fresh STATE_SYNC (chat, where silently losing a message is worse)
+A send that raises or exceeds WS_SEND_TIMEOUT_SECS evicts the socket.
+
+Queue depth, drops, evictions and send latency are tracked per label (chat
+room or realtime channel) for this worker; see snapshot().
+"""
+import asyncio
+import collections
+import logging
+import os
+import time
+from typing import Callable
+
+from .metrics import latency_summary
+
+logger = logging.getLogger(__name__)
+
+WS_OUTBOUND_QUEUE_SIZE = int(os.getenv("WS_OUTBOUND_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT_SECS = float(os.getenv("WS_SEND_TIMEOUT_SECS", "10"))
+WS_BROADCAST_WAIT_SECS = float(os.getenv("WS_BROADCAST_WAIT_SECS", "0.5"))
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Close code for "try again later" (RFC 6455).
+_SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class _LabelStats:
+    __slots__ = ("sockets", "sent", "dropped", "evicted", "max_queue_depth", "latencies_ms")
+
+    def __init__(self):
+        self.sockets: set["OutboundSocket"] = set()
+        self.sent = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.max_queue_depth = 0
+        # Enqueue -> written, for the most recent sends.
+        self.latencies_ms: collections.deque[float] = collections.deque(maxlen=256)
+
+
+_stats: dict[str, _LabelStats] = {}
+
+
+def snapshot() -> dict:
+    """Per-label fan-out metrics for this worker (labels with live sockets only)."""
+    out = {}
+    for label, st in list(_stats.items()):
+        depths = [s.queue_depth for s in st.sockets]
+        out[label] = {
+            "sockets": len(st.sockets),
+            "queue_depth": sum(depths),
+            "max_socket_queue_depth": max(depths, default=0),
+            "peak_queue_depth": st.max_queue_depth,
+            "sent": st.sent,
+            "dropped": st.dropped,
+            "evicted": st.evicted,
+            "send_latency_ms": latency_summary(st.latencies_ms, 2),
+        }
+    return out
+
+
+def _current_task() -> asyncio.Task | None:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+class OutboundSocket:
+    def __init__(self, ws, label: str, policy: str, on_evict: Callable[["OutboundSocket"], None]):
+        self.ws = ws
+        self.label = label
+        self.policy = policy
+        self._on_evict = on_evict
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.closed = False
+        self._stats = _stats.setdefault(label, _LabelStats())
+        self._stats.sockets.add(self)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_writer(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=WS_OUTBOUND_QUEUE_SIZE)
+            self._task = loop.create_task(self._writer())
+
+    def offer(self, text: str) -> asyncio.Future | None:
+        """Queue text for sending. Returns a future resolved (True/False) once
+        the frame is written or discarded, or None if it was not queued."""
+        if self.closed:
+            return None
+        self._ensure_writer()
+        if self._queue.full():
+            if self.policy == DROP_OLDEST:
+                _, _, stale = self._queue.get_nowait()
+                if not stale.done():
+                    stale.set_result(False)
+                self._stats.dropped += 1
+            else:
+                self._stats.dropped += 1
+                self.evict("outbound queue full")
+                return None
+        fut = self._loop.create_future()
+        self._queue.put_nowait((text, time.monotonic(), fut))
+        self._stats.max_queue_depth = max(self._stats.max_queue_depth, self._queue.qsize())
+        return fut
+
+    async def _writer(self):
+        queue = self._queue
+        while not self.closed:
+            text, enqueued_at, fut = await queue.get()
+            if fut.done():
+                continue
+            try:
+                async with asyncio.timeout(WS_SEND_TIMEOUT_SECS):
+                    await self.ws.send_text(text)
+            except asyncio.CancelledError:
+                fut.set_result(False)
+                raise
+            except Exception as e:
+                fut.set_result(False)
+                self.evict(f"send failed: {e!r}")
+                return
+            self._stats.sent += 1
+            self._stats.latencies_ms.append((time.monotonic() - enqueued_at) * 1000)
+            fut.set_result(True)
+
+    def close(self):
+        """Stop the writer and discard anything still queued."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._task is not None and self._task is not _current_task():
+            self._task.cancel()
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, fut = self._queue.get_nowait()
+                if not fut.done():
+                    fut.set_result(False)
+        self._stats.sockets.discard(self)
+        if not self._stats.sockets and _stats.get(self.label) is self._stats:
+            del _stats[self.label]
+
+    def evict(self, reason: str):
+        """Drop a dead or too-slow socket from its manager and close it."""
+        if self.closed:
+            return
+        logger.warning(f"Evicting websocket from {self.label}: {reason}")
+        self._stats.evicted += 1
+        self.close()
+        try:
+            self._on_evict(self)
+        except Exception as e:
+            logger.error(f"websocket eviction callback failed for {self.label}: {e}")
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.create_task(self._close_ws())
+
+    async def _close_ws(self):
+        try:
+            await self.ws.close(code=_SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+
+async def send_all(sockets: list[OutboundSocket], text: str):
+    """Offer one pre-serialized frame to every socket concurrently and wait
+    (bounded) for the writes."""
+    pending = [f for f in (s.offer(text) for s in sockets) if f is not None]
+    if pending:
+        await asyncio.wait(pending, timeout=WS_BROADCAST_WAIT_SECS)
@@ -1,14 +1,34 @@
 """
 FreeAstroAPI Service (https://www.freeastroapi.com)
 Handles Kundli (Vedic birth chart) generation.
+
+The chart, vargas and vimshottari_dasha sections and the Sade Sati check are
+computed in-process by vedic_ephemeris (KUNDLI_ENGINE=local, the default).
+FreeAstroAPI is still called for the sections we don't compute (yogas, birth
+panchang, shadbala, ashtakavarga) and is the fallback if the local engine
+fails; KUNDLI_ENGINE=api restores the all-remote behaviour, e.g. to
+re-verify against the API.
 """
-import httpx
+import asyncio
+import logging
 import os
 from datetime import date
 from typing import Optional
 
+from . import http_clients, vedic_ephemeris
+
+logger = logging.getLogger(__name__)
+
 FREE_ASTRO_API_BASE_URL = os.getenv("FREE_ASTRO_API_BASE_URL", "https://api.freeastroapi.com")
 FREE_ASTRO_API_KEY = os.getenv("FREE_ASTRO_API_KEY")
+KUNDLI_ENGINE = os.getenv("KUNDLI_ENGINE", "local").lower()
+
+# Sections of /vedic/calculate that vedic_ephemeris produces itself.
+_LOCAL_SECTIONS = ("chart", "vargas", "vimshottari_dasha")
+
+
+def _use_local_engine(ayanamsha: str, house_system: str = "whole_sign") -> bool:
+    return KUNDLI_ENGINE == "local" and ayanamsha == "lahiri" and house_system == "whole_sign"
 
 
 async def _post(path: str, payload: dict) -> dict:
@@ -19,25 +39,25 @@ async def _post(path: str, payload: dict) -> dict:
             "Get a key from https://www.freeastroapi.com"
         )
 
-    async with httpx.AsyncClient(timeout=45.0) as client:
-        response = await client.post(
-            f"{FREE_ASTRO_API_BASE_URL}{path}",
-            json=payload,
-            headers={
-                "x-api-key": FREE_ASTRO_API_KEY,
-                "Content-Type": "application/json",
-            },
-        )
+    response = await http_clients.request(
+        "freeastro", "POST",
+        f"{FREE_ASTRO_API_BASE_URL}{path}",
+        json=payload,
+        headers={
+            "x-api-key": FREE_ASTRO_API_KEY,
+            "Content-Type": "application/json",
+        },
+    )
 
-        if response.status_code == 401:
-            raise ValueError("Invalid FreeAstroAPI key. Please check your FREE_ASTRO_API_KEY.")
-        elif response.status_code == 429:
-            raise ValueError("FreeAstroAPI daily quota exceeded. Please try again tomorrow or upgrade your plan.")
-        elif response.status_code == 422:
-            raise ValueError(f"FreeAstroAPI rejected the request: {response.text}")
+    if response.status_code == 401:
+        raise ValueError("Invalid FreeAstroAPI key. Please check your FREE_ASTRO_API_KEY.")
+    elif response.status_code == 429:
+        raise ValueError("FreeAstroAPI daily quota exceeded. Please try again tomorrow or upgrade your plan.")
+    elif response.status_code == 422:
+        raise ValueError(f"FreeAstroAPI rejected the request: {response.text}")
 
-        response.raise_for_status()
-        return response.json()
+    response.raise_for_status()
+    return response.json()
 
 
 async def _get(path: str, params: Optional[dict] = None) -> dict:
@@ -48,20 +68,20 @@ async def _get(path: str, params: Optional[dict] = None) -> dict:
             "Get a key from https://www.freeastroapi.com"
         )
 
-    async with httpx.AsyncClient(timeout=45.0) as client:
-        response = await client.get(
-            f"{FREE_ASTRO_API_BASE_URL}{path}",
-            params=params or {},
-            headers={"x-api-key": FREE_ASTRO_API_KEY},
-        )
+    response = await http_clients.request(
+        "freeastro", "GET",
+        f"{FREE_ASTRO_API_BASE_URL}{path}",
+        params=params or {},
+        headers={"x-api-key": FREE_ASTRO_API_KEY},
+    )
 
-        if response.status_code == 401:
-            raise ValueError("Invalid FreeAstroAPI key. Please check your FREE_ASTRO_API_KEY.")
-        elif response.status_code == 429:
-            raise ValueError("FreeAstroAPI daily quota exceeded. Please try again tomorrow or upgrade your plan.")
+    if response.status_code == 401:
+        raise ValueError("Invalid FreeAstroAPI key. Please check your FREE_ASTRO_API_KEY.")
+    elif response.status_code == 429:
+        raise ValueError("FreeAstroAPI daily quota exceeded. Please try again tomorrow or upgrade your plan.")
 
-        response.raise_for_status()
-        return response.json()
+    response.raise_for_status()
+    return response.json()
 
 
 async def generate_full_kundli(
@@ -77,12 +97,68 @@ async def generate_full_kundli(
     house_system: str = "whole_sign",
     vargas: Optional[list] = None,
     dasha_levels: int = 2,
+    include_extras: bool = True,
 ) -> dict:
     """
-    Generate a complete Kundli using FreeAstroAPI's all-in-one endpoint.
-    Returns chart, vargas (divisional charts), vimshottari_dasha, yogas,
-    panchang (birth day), shadbala, and ashtakavarga in a single response.
+    Generate a complete Kundli in the shape of FreeAstroAPI's all-in-one
+    endpoint: chart, vargas (divisional charts), vimshottari_dasha and, when
+    `include_extras`, yogas, panchang (birth day), shadbala and ashtakavarga.
+
+    With the local engine the first three never touch the network. The extras
+    request (local sections switched off) is sent first and is in flight while
+    the chart is computed on a worker thread, so the call costs one round trip
+    at most; if the API is unavailable the extras are left out rather than
+    failing the whole chart. Every current caller renders at least one extra
+    section (KundliPanel, the AI chart summary's yogas, the report PDF), so
+    they stay on by default.
     """
+    if _use_local_engine(ayanamsha, house_system):
+        extras_task = None
+        if include_extras:
+            extras_task = asyncio.create_task(_calculate_remote(
+                year, month, day, hour, minute, latitude, longitude,
+                timezone, ayanamsha, house_system, vargas=[], dasha_levels=0,
+            ))
+        try:
+            result = await asyncio.to_thread(
+                vedic_ephemeris.calculate,
+                year, month, day, hour, minute, latitude, longitude,
+                timezone=timezone, vargas=vargas, dasha_levels=dasha_levels,
+            )
+        except Exception as e:
+            logger.error(f"Local ephemeris failed, falling back to FreeAstroAPI: {e}")
+            if extras_task is not None:
+                extras_task.cancel()
+        else:
+            if extras_task is not None:
+                try:
+                    extras = await extras_task
+                except Exception as e:
+                    logger.warning(f"FreeAstroAPI extras unavailable, returning local chart only: {e}")
+                else:
+                    result.update({k: v for k, v in extras.items() if k not in _LOCAL_SECTIONS and k not in result})
+            return result
+
+    return await _calculate_remote(
+        year, month, day, hour, minute, latitude, longitude,
+        timezone, ayanamsha, house_system, vargas, dasha_levels,
+    )
+
+
+async def _calculate_remote(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    latitude: float,
+    longitude: float,
+    timezone: str,
+    ayanamsha: str,
+    house_system: str,
+    vargas: Optional[list],
+    dasha_levels: int,
+) -> dict:
     payload = {
         "year": year,
         "month": month,
@@ -123,8 +199,18 @@ async def check_sade_sati(
     optional section (yogas, panchang, shadbala, ashtakavarga, vargas, dasha)
     switched off, so only chart.sade_sati is computed. Used to bisect for the
     precise start/end of the current Sade Sati window without paying for a
-    full chart calculation on every sample point.
+    full chart calculation on every sample point. Answered locally (no
+    request at all) unless KUNDLI_ENGINE=api.
     """
+    if _use_local_engine(ayanamsha):
+        try:
+            return vedic_ephemeris.natal_sade_sati(
+                year, month, day, hour, minute,
+                date.fromisoformat(reference_date), timezone,
+            )
+        except Exception as e:
+            logger.error(f"Local Sade Sati check failed, falling back to FreeAstroAPI: {e}")
+
     payload = {
         "year": year,
         "month": month,
@@ -0,0 +1,252 @@
+"""
+Geocoding cache and local place index, shared by vedic_rishi_service.geocode_place
+and the /places/autocomplete endpoint.
+
+Birthplaces repeat heavily, so geocode_place resolves a place through layers
+and only the last one leaves the process:
+  1. an in-process LRU of recent lookups (GEOCODE_LRU_SIZE)
+  2. the place index — the optional offline gazetteer of Indian cities/towns
+     (GEOCODE_GAZETTEER_PATH, built by scripts/build_gazetteer.py from
+     GeoNames) — then an LRU of the "City, State" suggestions Photon has
+     returned to autocomplete (GEOCODE_SUGGESTION_SIZE), which is exactly the
+     label birth-place fields submit
+  3. the geocode_cache table, so results survive restarts and are shared by
+     every worker
+  4. Nominatim, whose answer is written back to layers 1 and 3
+
+All keys are normalize_place() of the raw string, so "Pune", " pune " and
+"Pune, India" share an entry. With the gazetteer loaded, autocomplete also
+serves prefix suggestions from the index instead of calling Photon.
+"""
+import bisect
+import collections
+import logging
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from . import database, models
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_LRU_SIZE = int(os.getenv("GEOCODE_LRU_SIZE", "4096"))
+GEOCODE_SUGGESTION_SIZE = int(os.getenv("GEOCODE_SUGGESTION_SIZE", "4096"))
+GEOCODE_GAZETTEER_PATH = os.getenv(
+    "GEOCODE_GAZETTEER_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "india_places.tsv"),
+)
+
+_NON_WORD = re.compile(r"[^\w\s,]")
+_COUNTRY_SUFFIXES = ("india", "bharat")
+
+
+def normalize_place(text: str) -> str:
+    """Case/spacing/punctuation-insensitive key: "New Delhi,  INDIA." -> "new delhi"."""
+    text = _NON_WORD.sub(" ", unicodedata.normalize("NFKC", text).casefold())
+    parts = [" ".join(p.split()) for p in text.split(",")]
+    parts = [p for p in parts if p]
+    if len(parts) > 1 and parts[-1] in _COUNTRY_SUFFIXES:
+        parts.pop()
+    return ", ".join(parts)
+
+
+@dataclass(frozen=True)
+class Place:
+    city: str
+    state: str
+    lat: float
+    lon: float
+    population: int = 0
+
+    @property
+    def suggestion(self) -> dict:
+        return {
+            "label": f"{self.city}, {self.state}, India",
+            "city": self.city,
+            "state": self.state,
+            "lat": self.lat,
+            "lon": self.lon,
+        }
+
+
+class PlaceIndex:
+    """Exact and prefix lookup over known Indian places."""
+
+    def __init__(self):
+        self._by_key: dict[str, Place] = {}    # "city, state"
+        self._by_city: dict[str, Place] = {}   # "city" -> most populous match
+        self._names: list[tuple[str, str]] = []  # sorted (city, "city, state")
+        self.has_gazetteer = False
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def add(self, place: Place):
+        city = normalize_place(place.city)
+        key = f"{city}, {normalize_place(place.state)}"
+        existing = self._by_key.get(key)
+        if existing is not None and existing.population >= place.population:
+            return
+        self._by_key[key] = place
+        if existing is None:
+            bisect.insort(self._names, (city, key))
+        best = self._by_city.get(city)
+        if best is None or place.population > best.population:
+            self._by_city[city] = place
+
+    def lookup(self, key: str) -> Optional[Place]:
+        """Match a normalized query as "city, state", "city, …, state" or a
+        bare city name (most populous wins)."""
+        if key in self._by_key:
+            return self._by_key[key]
+        parts = key.split(", ")
+        if len(parts) > 2:
+            return self._by_key.get(f"{parts[0]}, {parts[-1]}")
+        if len(parts) == 1:
+            return self._by_city.get(key)
+        return None
+
+    def prefix(self, query: str, limit: int = 8) -> list[Place]:
+        prefix = normalize_place(query).split(", ")[0]
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self._names, (prefix,))
+        matches = []
+        for city, key in self._names[lo:]:
+            if not city.startswith(prefix):
+                break
+            matches.append(self._by_key[key])
+        matches.sort(key=lambda p: (-p.population, p.city))
+        return matches[:limit]
+
+    def load_gazetteer(self, path: str) -> int:
+        """Load a name/state/lat/lon/population TSV (header row first)."""
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            next(f, None)
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 4:
+                    continue
+                try:
+                    population = int(cols[4]) if len(cols) > 4 and cols[4] else 0
+                    self.add(Place(cols[0], cols[1], float(cols[2]), float(cols[3]), population))
+                except ValueError:
+                    continue
+                count += 1
+        self.has_gazetteer = count > 0
+        return count
+
+
+place_index = PlaceIndex()
+if os.path.exists(GEOCODE_GAZETTEER_PATH):
+    try:
+        logger.info(f"Loaded {place_index.load_gazetteer(GEOCODE_GAZETTEER_PATH)} places from {GEOCODE_GAZETTEER_PATH}")
+    except OSError as e:
+        logger.warning(f"Could not load gazetteer {GEOCODE_GAZETTEER_PATH}: {e}")
+
+
+# --- LRU + persistent cache ----------------------------------------------------
+
+_lru: collections.OrderedDict[str, Tuple[float, float]] = collections.OrderedDict()
+# "city, state" -> Place for Photon's autocomplete suggestions. Kept apart from
+# place_index, which only grows, so per-keystroke results stay bounded.
+_suggested: collections.OrderedDict[str, Place] = collections.OrderedDict()
+_hits: collections.Counter = collections.Counter()
+
+
+def lru_get(key: str) -> Optional[Tuple[float, float]]:
+    coords = _lru.get(key)
+    if coords is not None:
+        _lru.move_to_end(key)
+    return coords
+
+
+def lru_put(key: str, coords: Tuple[float, float]):
+    _lru[key] = coords
+    _lru.move_to_end(key)
+    while len(_lru) > GEOCODE_LRU_SIZE:
+        _lru.popitem(last=False)
+
+
+def remember_suggestion(place: Place):
+    key = normalize_place(f"{place.city}, {place.state}")
+    _suggested[key] = place
+    _suggested.move_to_end(key)
+    while len(_suggested) > GEOCODE_SUGGESTION_SIZE:
+        _suggested.popitem(last=False)
+
+
+def _suggestion_get(key: str) -> Optional[Place]:
+    place = _suggested.get(key)
+    if place is not None:
+        _suggested.move_to_end(key)
+    return place
+
+
+def _db_get(key: str) -> Optional[Tuple[float, float]]:
+    db = database.SessionLocal()
+    try:
+        row = db.query(models.GeocodeCache).filter(models.GeocodeCache.query_key == key).first()
+        return (float(row.latitude), float(row.longitude)) if row else None
+    finally:
+        db.close()
+
+
+def _db_put(key: str, coords: Tuple[float, float], source: str):
+    db = database.SessionLocal()
+    try:
+        db.add(models.GeocodeCache(query_key=key, latitude=coords[0], longitude=coords[1], source=source))
+        db.commit()
+    except IntegrityError:
+        # Another worker cached the same place first — fine either way.
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def cached(key: str) -> Optional[Tuple[float, float]]:
+    """Layers 1-3 for a normalized key; None if the upstream must be asked."""
+    coords = lru_get(key)
+    if coords is not None:
+        _hits["lru"] += 1
+        return coords
+    place = place_index.lookup(key) or _suggestion_get(key)
+    if place is not None:
+        _hits["index"] += 1
+        coords = (place.lat, place.lon)
+        lru_put(key, coords)
+        return coords
+    try:
+        coords = await database.run_db(_db_get, key)
+    except Exception as e:
+        logger.warning(f"geocode_cache read failed for {key!r}: {e}")
+        coords = None
+    if coords is not None:
+        _hits["db"] += 1
+        lru_put(key, coords)
+        return coords
+    _hits["miss"] += 1
+    return None
+
+
+async def remember(key: str, coords: Tuple[float, float], source: str = "nominatim"):
+    lru_put(key, coords)
+    try:
+        await database.run_db(_db_put, key, coords, source)
+    except Exception as e:
+        logger.warning(f"geocode_cache write failed for {key!r}: {e}")
+
+
+def snapshot() -> dict:
+    return {
+        "lru_entries": len(_lru),
+        "index_places": len(place_index),
+        "suggested_places": len(_suggested),
+        "gazetteer_loaded": place_index.has_gazetteer,
+        "hits": dict(_hits),
+    }
@@ -0,0 +1,256 @@
+"""
+App-lifetime outbound HTTP clients, one pooled client per upstream.
+
+Every call to FreeAstroAPI, Nominatim, Photon, Groq and Resend used to open a
+fresh httpx client — a new TCP+TLS handshake to the same handful of hosts on
+every request. Instead each upstream gets a long-lived client (keep-alive
+pool, its own timeout, optional HTTP/2) created at startup and closed at
+shutdown, plus a sync twin for the code paths that still run in worker
+threads (translation, Resend background tasks).
+
+request()/request_sync() add jittered exponential-backoff retries for
+connection failures and the upstream's retryable statuses, honouring a short
+Retry-After. A read timeout or a dropped response is only retried for
+upstreams marked read_retry (plain GET lookups): anywhere else the server may
+already have done the work, and waiting out the timeout again would hold the
+caller for several times its budget. Calls that aren't safe to repeat pass
+idempotent=False and are only retried when the request never reached the
+server. Per-upstream request/error/retry counters and latency percentiles
+are in snapshot().
+
+Tunables (env):
+  HTTP_POOL_MAX_CONNECTIONS      per upstream (default 20)
+  HTTP_POOL_MAX_KEEPALIVE        idle connections kept per upstream (default 10)
+  HTTP_KEEPALIVE_EXPIRY_SECS     default 30
+  HTTP2_ENABLED                  "true" to negotiate HTTP/2 (needs the h2 package)
+  HTTP_RETRY_ATTEMPTS            retries after the first try (default 2)
+  HTTP_RETRY_BACKOFF_SECS        base delay, doubled per retry (default 0.3)
+"""
+import asyncio
+import collections
+import logging
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from .metrics import latency_summary
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECS", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+HTTP_RETRY_ATTEMPTS = int(os.getenv("HTTP_RETRY_ATTEMPTS", "2"))
+HTTP_RETRY_BACKOFF_SECS = float(os.getenv("HTTP_RETRY_BACKOFF_SECS", "0.3"))
+# Longest Retry-After we'll sleep through inside a request; beyond this the
+# caller gets the 429/503 and maps it to its own "try again later".
+_MAX_RETRY_AFTER_SECS = 5.0
+
+_SERVER_ERRORS = (500, 502, 503, 504)
+
+# Per-upstream timeout (seconds), which statuses are worth retrying, and
+# whether a failure after the request was sent may be retried (read_retry).
+# FreeAstroAPI's 429 is its daily quota, so retrying it only burns time.
+UPSTREAMS = {
+    "freeastro": {"timeout": 45.0, "retry_statuses": _SERVER_ERRORS, "read_retry": False},
+    "nominatim": {"timeout": 10.0, "retry_statuses": (429, *_SERVER_ERRORS), "read_retry": True},
+    "photon": {"timeout": 10.0, "retry_statuses": (429, *_SERVER_ERRORS), "read_retry": True},
+    "groq": {"timeout": 60.0, "retry_statuses": (429, *_SERVER_ERRORS), "read_retry": False},
+    "resend": {"timeout": 15.0, "retry_statuses": (429, *_SERVER_ERRORS), "read_retry": False},
+}
+# Transport errors raised before the request reached the server.
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _http2_available() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP2_ENABLED is set but the h2 package isn't installed; using HTTP/1.1")
+        return False
+    return True
+
+
+_HTTP2 = _http2_available()
+
+
+def _client_kwargs(name: str) -> dict:
+    return {
+        "timeout": UPSTREAMS[name]["timeout"],
+        "limits": httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECS,
+        ),
+        "http2": _HTTP2,
+    }
+
+
+# --- Metrics -------------------------------------------------------------------
+
+class _UpstreamStats:
+    __slots__ = ("requests", "errors", "retries", "statuses", "latencies_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0  # transport failures (no response)
+        self.retries = 0
+        self.statuses: collections.Counter = collections.Counter()
+        self.latencies_ms: collections.deque[float] = collections.deque(maxlen=512)
+
+
+_stats: dict[str, _UpstreamStats] = {name: _UpstreamStats() for name in UPSTREAMS}
+_stats_lock = threading.Lock()
+
+
+def _record(name: str, started: float, status: Optional[int] = None, retried: bool = False):
+    with _stats_lock:
+        st = _stats[name]
+        st.requests += 1
+        if status is None:
+            st.errors += 1
+        else:
+            st.statuses["429" if status == 429 else f"{status // 100}xx"] += 1
+            st.latencies_ms.append((time.monotonic() - started) * 1000)
+        if retried:
+            st.retries += 1
+
+
+def snapshot() -> dict:
+    """Per-upstream counters and latency for this worker."""
+    out = {}
+    with _stats_lock:
+        for name, st in _stats.items():
+            out[name] = {
+                "requests": st.requests,
+                "errors": st.errors,
+                "retries": st.retries,
+                "statuses": dict(st.statuses),
+                "latency_ms": latency_summary(st.latencies_ms, 1),
+            }
+    return out
+
+
+# --- Clients -------------------------------------------------------------------
+
+# Async clients are bound to the loop that created them (their connections
+# belong to it), so the registry remembers which loop each was made on.
+_async_clients: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_sync_clients: dict[str, httpx.Client] = {}
+_sync_lock = threading.Lock()
+
+
+def get_async_client(name: str) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(name)
+    if entry is None or entry[0] is not loop or entry[1].is_closed:
+        entry = (loop, httpx.AsyncClient(**_client_kwargs(name)))
+        _async_clients[name] = entry
+    return entry[1]
+
+
+def get_sync_client(name: str) -> httpx.Client:
+    client = _sync_clients.get(name)
+    if client is None or client.is_closed:
+        with _sync_lock:
+            client = _sync_clients.get(name)
+            if client is None or client.is_closed:
+                client = httpx.Client(**_client_kwargs(name))
+                _sync_clients[name] = client
+    return client
+
+
+def startup():
+    """Create every upstream's async client on the serving loop."""
+    for name in UPSTREAMS:
+        get_async_client(name)
+
+
+async def aclose_all():
+    for _, client in list(_async_clients.values()):
+        await client.aclose()
+    _async_clients.clear()
+    with _sync_lock:
+        for client in _sync_clients.values():
+            client.close()
+        _sync_clients.clear()
+
+
+# --- Requests with retry -------------------------------------------------------
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit() and int(retry_after) <= _MAX_RETRY_AFTER_SECS:
+            return float(retry_after)
+    # Full jitter: spread concurrent retries out instead of stampeding together.
+    return random.uniform(0, HTTP_RETRY_BACKOFF_SECS * (2 ** attempt))
+
+
+def _should_retry(name: str, attempt: int, idempotent: bool,
+                  response: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+    if attempt >= HTTP_RETRY_ATTEMPTS:
+        return False
+    if error is not None:
+        # A failed connect never reached the server, so it's safe to repeat.
+        if isinstance(error, _NOT_SENT_ERRORS):
+            return True
+        return idempotent and UPSTREAMS[name]["read_retry"]
+    if response.status_code == 429:
+        retry_after = response.headers.get("Retry-After", "")
+        too_long = retry_after.isdigit() and int(retry_after) > _MAX_RETRY_AFTER_SECS
+        return 429 in UPSTREAMS[name]["retry_statuses"] and not too_long
+    return idempotent and response.status_code in UPSTREAMS[name]["retry_statuses"]
+
+
+async def request(name: str, method: str, url: str, *, idempotent: bool = True, **kwargs) -> httpx.Response:
+    """`client.request(method, url, **kwargs)` on the upstream's pooled client,
+    retried per the module docstring. Returns the final response (any status)
+    or raises the final transport error."""
+    client = get_async_client(name)
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        response, error = None, None
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            error = e
+        retry = _should_retry(name, attempt, idempotent, response, error)
+        _record(name, started, response.status_code if response is not None else None, retried=retry)
+        if not retry:
+            if error is not None:
+                raise error
+            return response
+        logger.warning(f"{name} {method} retry {attempt + 1}: {error or response.status_code}")
+        await asyncio.sleep(_retry_delay(attempt, response))
+        attempt += 1
+
+
+def request_sync(name: str, method: str, url: str, *, idempotent: bool = True, **kwargs) -> httpx.Response:
+    """Blocking twin of request() for code that runs in worker threads."""
+    client = get_sync_client(name)
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        response, error = None, None
+        try:
+            response = client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            error = e
+        retry = _should_retry(name, attempt, idempotent, response, error)
+        _record(name, started, response.status_code if response is not None else None, retried=retry)
+        if not retry:
+            if error is not None:
+                raise error
+            return response
+        logger.warning(f"{name} {method} retry {attempt + 1}: {error or response.status_code}")
+        time.sleep(_retry_delay(attempt, response))
+        attempt += 1
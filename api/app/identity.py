@@ -0,0 +1,236 @@
+"""
+Who is calling: decoded access-token claims and the cached user principal.
+
+Every authenticated request used to verify its JWT up to three times (the
+rate limiter's key function, the auth dependency, the error logger) and then
+SELECT the user by id. Now:
+
+  - claims(request) verifies the bearer token once per request and keeps the
+    result on the ASGI scope state, which the limiter middleware, route
+    dependencies and the error handler all share
+  - the principal (id, role, is_active, is_verified) is cached in-process for
+    PRINCIPAL_L1_SECS and in Redis for PRINCIPAL_CACHE_TTL_SECS, and
+    current_user() hands the route a User attached to its session from those
+    fields alone; any other column loads on first access, as it would have
+    anyway
+  - a commit that changes a user's role, status, verification or password, or
+    deletes the user, drops the cached principal (Redis key plus this
+    worker's copy; other workers' in-process copies age out within
+    PRINCIPAL_L1_SECS; a request whose user was deleted in that window gets
+    a 401 from deleted_user_response())
+
+Without Redis the in-process cache is the only layer.
+
+Tunables (env):
+  PRINCIPAL_L1_SECS          in-process principal lifetime (default 5)
+  PRINCIPAL_CACHE_TTL_SECS   Redis principal lifetime (default 300)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.exc import ObjectDeletedError
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from . import models
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Same secret/algorithm as routers/auth.py (which refuses to start without the
+# secret). Read here rather than imported: routers.auth imports the limiter,
+# which imports this module.
+_JWT_SECRET = os.getenv("JWT_SECRET_KEY")
+_JWT_ALGORITHM = "HS256"
+
+PRINCIPAL_L1_SECS = float(os.getenv("PRINCIPAL_L1_SECS", "5"))
+PRINCIPAL_CACHE_TTL_SECS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECS", "300"))
+_REDIS_RETRY_SECS = 30.0
+_WATCHED_FIELDS = {"role", "is_active", "is_verified", "hashed_password"}
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role: str
+    is_active: bool
+    is_verified: bool
+
+
+_l1: dict[int, tuple[Principal, float]] = {}
+_l1_lock = threading.Lock()
+_redis_down_until = 0.0
+
+
+def _redis():
+    if time.monotonic() < _redis_down_until:
+        return None
+    return get_redis()
+
+
+def _redis_failed(action: str, e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECS
+    logger.warning(f"principal cache {action} failed, caching in-process only: {e}")
+
+
+def decode(token: str) -> Optional[dict]:
+    """Verified claims, or None for a missing/forged/expired token."""
+    if not _JWT_SECRET or not token:
+        return None
+    try:
+        return jwt.decode(token, _JWT_SECRET, algorithms=[_JWT_ALGORITHM])
+    except JWTError:
+        return None
+
+
+def bearer_token(request) -> Optional[str]:
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        return auth_header[len("Bearer "):]
+    return None
+
+
+def claims(request, token: Optional[str] = None) -> Optional[dict]:
+    """decode() for the request's bearer token (or `token`), memoized on the
+    request's scope state so every layer of one request shares one verify."""
+    token = token if token is not None else bearer_token(request)
+    if not token:
+        return None
+    state = request.scope.setdefault("state", {})
+    cached = state.get("jwt_claims")
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    payload = decode(token)
+    state["jwt_claims"] = (token, payload)
+    return payload
+
+
+def _principal_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def _lookup(db: Session, user_id: int) -> Optional[Principal]:
+    with _l1_lock:
+        hit = _l1.get(user_id)
+    if hit is not None and hit[1] > time.monotonic():
+        return hit[0]
+
+    principal = None
+    redis = _redis()
+    if redis:
+        try:
+            raw = redis.get(_principal_key(user_id))
+            if raw:
+                principal = Principal(**json.loads(raw))
+        except Exception as e:
+            _redis_failed("read", e)
+
+    if principal is None:
+        row = db.query(
+            models.User.id, models.User.role, models.User.is_active, models.User.is_verified
+        ).filter(models.User.id == user_id).first()
+        if row is None:
+            return None
+        principal = Principal(row.id, row.role.value, bool(row.is_active), bool(row.is_verified))
+        if redis:
+            try:
+                redis.set(_principal_key(user_id), json.dumps(asdict(principal)), ex=PRINCIPAL_CACHE_TTL_SECS)
+            except Exception as e:
+                _redis_failed("write", e)
+
+    with _l1_lock:
+        _l1[user_id] = (principal, time.monotonic() + PRINCIPAL_L1_SECS)
+    return principal
+
+
+def current_user(db: Session, sub, request: Optional[Request] = None) -> Optional[models.User]:
+    """The User for a token's `sub`, without a SELECT when the principal is
+    cached: the instance is attached to `db` with id/role/is_active/
+    is_verified set and every other column left to load on first access.
+    Pass the request so deleted_user_response() can tell if that load finds
+    the user gone."""
+    try:
+        user_id = int(sub)
+    except (TypeError, ValueError):
+        return None
+    existing = db.identity_map.get(inspect(models.User).identity_key_from_primary_key((user_id,)))
+    if existing is not None:
+        return existing
+    principal = _lookup(db, user_id)
+    if principal is None:
+        return None
+    user = models.User(
+        id=principal.id,
+        role=models.UserRole(principal.role),
+        is_active=principal.is_active,
+        is_verified=principal.is_verified,
+    )
+    make_transient_to_detached(user)
+    db.add(user)
+    if request is not None:
+        request.scope.setdefault("state", {})["cached_user"] = (user.id, id(user))
+    return user
+
+
+def deleted_user_response(request: Request, exc: ObjectDeletedError):
+    """Exception handler for ObjectDeletedError. A principal can outlive its
+    user by up to PRINCIPAL_L1_SECS on other workers; when the vanished row is
+    the User current_user() attached for this request, the caller is answered
+    as unauthenticated rather than with a 500. Anything else re-raises."""
+    cached = request.scope.get("state", {}).get("cached_user")
+    if cached is None or f"<User at 0x{cached[1]:x}>" not in str(exc):
+        raise exc
+    invalidate(cached[0])
+    return JSONResponse(status_code=401, content={"detail": "Could not validate credentials"},
+                        headers={"WWW-Authenticate": "Bearer"})
+
+
+def invalidate(*user_ids: int):
+    with _l1_lock:
+        for user_id in user_ids:
+            _l1.pop(user_id, None)
+    redis = _redis()
+    if redis and user_ids:
+        try:
+            redis.delete(*[_principal_key(i) for i in user_ids])
+        except Exception as e:
+            _redis_failed("invalidation", e)
+
+
+# --- commit hooks -------------------------------------------------------------
+
+_PENDING = "identity_changed"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session, flush_context):
+    changed = {
+        obj.id for obj in session.dirty
+        if isinstance(obj, models.User)
+        and any(inspect(obj).attrs[f].history.has_changes() for f in _WATCHED_FIELDS)
+    }
+    changed |= {obj.id for obj in session.deleted if isinstance(obj, models.User)}
+    if changed:
+        session.info.setdefault(_PENDING, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply(session):
+    changed = session.info.pop(_PENDING, None)
+    if changed:
+        invalidate(*changed)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
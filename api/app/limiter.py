@@ -1,14 +1,8 @@
-import os
-
-from jose import JWTError, jwt
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from starlette.requests import Request
 
-# Same secret/algorithm as routers/auth.py. Duplicated (not imported) to avoid
-# a circular import — routers.auth imports `limiter` from this module.
-_JWT_SECRET = os.getenv("JWT_SECRET_KEY")
-_JWT_ALGORITHM = "HS256"
+from . import identity
 
 
 def rate_limit_key(request: Request) -> str:
@@ -23,24 +17,18 @@ def rate_limit_key(request: Request) -> str:
     signature is verified here (not just decoded) so a forged/garbage bearer
     value can't be used to fabricate an arbitrary key; anything that doesn't
     verify falls back to IP-based limiting, same as an anonymous request.
+    The verified claims are kept on the request for the auth dependency.
     """
-    auth_header = request.headers.get("Authorization", "")
-    if _JWT_SECRET and auth_header.startswith("Bearer "):
-        token = auth_header[len("Bearer "):]
-        try:
-            payload = jwt.decode(token, _JWT_SECRET, algorithms=[_JWT_ALGORITHM])
-            user_id = payload.get("sub")
-            if user_id:
-                return f"user:{user_id}"
-        except JWTError:
-            pass
+    payload = identity.claims(request)
+    if payload and payload.get("sub"):
+        return f"user:{payload['sub']}"
     return f"ip:{get_remote_address(request)}"
 
 
 # Global default applied to every HTTP route that doesn't set its own
 # @limiter.limit(...). Routes with an explicit decorator (login, signup,
 # ai-astrologer chat, etc.) override this instead of stacking with it.
-# Enforced via SlowAPIMiddleware, which only wraps the "http" ASGI scope —
+# Enforced by app/edge.py's EdgeMiddleware, which only wraps the "http" ASGI scope —
 # WebSocket connections (/realtime/ws, /chat/ws/{id}) are a different scope
 # and never pass through it, so they're unaffected by this default.
 limiter = Limiter(key_func=rate_limit_key, default_limits=["200/minute"])
@@ -11,22 +11,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-import secrets
+from sqlalchemy.orm.exc import ObjectDeletedError
 
 # Ensure upload directory exists
 os.makedirs("uploads", exist_ok=True)
 
 from .limiter import limiter
+from . import identity
 
 app = FastAPI(title="Aadikarta API")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-# Enforces limiter.default_limits on every HTTP route lacking its own
-# @limiter.limit(...). Built on BaseHTTPMiddleware, which only intercepts the
-# "http" ASGI scope, so WebSocket routes (realtime + chat) pass straight
-# through untouched.
-app.add_middleware(SlowAPIMiddleware)
+app.add_exception_handler(ObjectDeletedError, identity.deleted_user_response)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="uploads"), name="static")
@@ -45,131 +41,72 @@ async def startup_event():
     from .routers.realtime import set_main_loop
     set_main_loop(asyncio.get_running_loop())
 
-    # Crash recovery: restart billing loops for any ACTIVE consultations
-    await _recover_active_billing_loops()
+    # app_settings: loaded once, reloaded in the background and on the
+    # backplane "settings" topic whenever an admin saves a change.
+    from .services import settings_service
+    settings_service.start()
 
-    # Background sweep: expire stale REQUESTED consultations (seeker waiting on a no-show)
-    asyncio.create_task(_stale_request_sweep())
+    # Cross-worker fan-out for chat rooms and realtime inboxes (REALTIME_BACKEND).
+    from .backplane import backplane
+    backplane.start()
 
-    # Background sweep: end PAUSED consultations nobody has come back to resume
-    # (otherwise a disconnected/abandoned chat sits paused forever, blocking the
-    # astrologer's queue and the seeker's one-active-chat slot indefinitely).
-    asyncio.create_task(_stale_paused_sweep())
+    # Pooled keep-alive clients for FreeAstroAPI, geocoding, Groq and Resend.
+    from . import http_clients
+    http_clients.startup()
 
+    # Delivers queued push/WhatsApp notifications (notification_outbox).
+    from .notification_outbox import dispatcher as notification_dispatcher
+    notification_dispatcher.start()
 
-async def _stale_request_sweep():
-    """Periodically mark unanswered REQUESTED consultations as MISSED and notify the seeker."""
-    from datetime import datetime, timedelta
-    from .database import SessionLocal
-    from . import models, audit
-    from .services.settings_service import get_setting
-    from .routers.realtime import notify_user
-    from .notifications import send_push_notification
+    # Batched audit-log writer (events are queued by audit.log at commit).
+    from . import audit
+    audit.writer.start()
 
-    while True:
-        try:
-            await asyncio.sleep(60)
-            try:
-                stale_minutes = int(get_setting("request_stale_minutes") or 5)
-            except (TypeError, ValueError):
-                stale_minutes = 5
-            cutoff = datetime.utcnow() - timedelta(minutes=stale_minutes)
-            with SessionLocal() as db:
-                stale = db.query(models.Consultation).filter(
-                    models.Consultation.status == models.ConsultationStatus.REQUESTED,
-                    models.Consultation.created_at < cutoff,
-                ).all()
-                for cons in stale:
-                    cons.status = models.ConsultationStatus.MISSED
-                    audit.log(db, "CONSULTATION_MISSED", resource_type="consultation",
-                              resource_id=cons.id, details={"reason": "astrologer_no_response"})
-                    db.commit()
-                    notify_user(cons.seeker_id, {
-                        "type": "REQUEST_EXPIRED",
-                        "consultation_id": cons.id,
-                        "astrologer_id": cons.astrologer_id,
-                    })
-                    for tok in db.query(models.DeviceToken).filter(models.DeviceToken.user_id == cons.seeker_id).all():
-                        send_push_notification(
-                            token=tok.fcm_token,
-                            title="Astrologer unavailable",
-                            body="Your consultation request expired. Please try another astrologer.",
-                            data={"consultation_id": str(cons.id), "type": "REQUEST_EXPIRED"},
-                        )
-        except Exception as e:
-            print(f"Stale request sweep error: {e}")
-
-
-async def _stale_paused_sweep():
-    """Periodically end PAUSED consultations that have sat disconnected too long.
-
-    PAUSED only ever gets set in one place (chat.py's disconnect handler), which
-    always stamps disconnection_snapshot.paused_at at the same time — so that
-    field is a reliable "how long has this been paused" clock without needing a
-    dedicated updated_at column.
-    """
-    from datetime import datetime, timedelta
-    from .database import SessionLocal
-    from . import models, audit
-    from .services.settings_service import get_setting
-    from .routers.chat import manager, promote_next_in_queue
-    from .routers.realtime import notify_user
-    from .notifications import send_push_notification
+    # Paid ad-hoc reports are generated off the request path (report_jobs);
+    # REPORT_WORKER_IN_API=0 leaves that to `python -m app.report_jobs`.
+    from . import report_jobs
+    if report_jobs.REPORT_WORKER_IN_API:
+        report_jobs.worker.start()
 
-    while True:
-        try:
-            await asyncio.sleep(60)
-            try:
-                stale_minutes = int(get_setting("paused_stale_minutes") or 15)
-            except (TypeError, ValueError):
-                stale_minutes = 15
-            cutoff = datetime.utcnow() - timedelta(minutes=stale_minutes)
-            with SessionLocal() as db:
-                paused = db.query(models.Consultation).filter(
-                    models.Consultation.status == models.ConsultationStatus.PAUSED,
-                ).all()
-                for cons in paused:
-                    paused_at = None
-                    if cons.disconnection_snapshot:
-                        try:
-                            paused_at = datetime.fromisoformat(json.loads(cons.disconnection_snapshot)["paused_at"])
-                        except (ValueError, KeyError, TypeError):
-                            paused_at = None
-                    # Missing/unparseable snapshot shouldn't happen (PAUSED is only
-                    # ever set alongside one) — treat it as already-stale rather
-                    # than let a session with no timestamp linger forever.
-                    if paused_at is not None and paused_at >= cutoff:
-                        continue
-
-                    cons.status = models.ConsultationStatus.AUTO_ENDED
-                    cons.end_time = datetime.utcnow()
-                    audit.log(db, "CHAT_AUTO_ENDED", resource_type="consultation",
-                              resource_id=cons.id,
-                              details={"reason": "paused_timeout", "total_cost": float(cons.total_cost or 0)})
-                    db.commit()
-                    await manager.broadcast(cons.id, {"type": "CHAT_ENDED", "reason": "paused_timeout"})
-                    promote_next_in_queue(db, cons.astrologer_id)
-                    notify_user(cons.seeker_id, {
-                        "type": "CHAT_ENDED",
-                        "consultation_id": cons.id,
-                        "reason": "paused_timeout",
-                    })
-                    for tok in db.query(models.DeviceToken).filter(models.DeviceToken.user_id == cons.seeker_id).all():
-                        send_push_notification(
-                            token=tok.fcm_token,
-                            title="Chat ended",
-                            body="Your paused consultation timed out and was ended.",
-                            data={"consultation_id": str(cons.id), "type": "CHAT_ENDED"},
-                        )
-        except Exception as e:
-            print(f"Stale paused sweep error: {e}")
-
-
-async def _recover_active_billing_loops():
+    # Single billing ticker for every ACTIVE consultation on this worker.
+    from .routers.chat import billing_scheduler
+    billing_scheduler.start()
+
+    # Crash recovery: re-register any ACTIVE consultations with the scheduler
+    await _recover_active_billing_sessions()
+
+    # Background sweeps (leader worker only): expire stale REQUESTED consultations
+    # (seeker waiting on a no-show) and end PAUSED ones nobody has come back to
+    # resume (otherwise a disconnected/abandoned chat sits paused forever,
+    # blocking the astrologer's queue and the seeker's one-active-chat slot).
+    from .sweeps import sweep_engine
+    sweep_engine.start()
+
+    # Advances the wallet ledger checkpoints the reconciliation check reads
+    # (leader worker only).
+    from .wallet_ledger import checkpointer
+    checkpointer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Report jobs still in flight go back to the queue for the next worker.
+    from . import report_jobs
+    await report_jobs.worker.stop()
+
+    from . import http_clients
+    await http_clients.aclose_all()
+
+    # Write out audit events still waiting in memory.
+    from . import audit
+    await audit.writer.stop()
+
+
+async def _recover_active_billing_sessions():
     from .redis_client import get_redis
     from .database import SessionLocal
     from . import models
-    from .routers.chat import billing_loop
+    from .routers.chat import billing_scheduler
 
     redis = get_redis()
     if not redis:
@@ -183,25 +120,31 @@ async def _recover_active_billing_loops():
             return
 
         print(f"Found {len(keys)} possibly interrupted billing session(s). Verifying DB state...")
+        rates: dict[int, float] = {}
+        for key in keys:
+            try:
+                raw = redis.get(key)
+                if not raw:
+                    continue
+                rates[int(key.split(":")[-1])] = float(json.loads(raw).get("rate_per_min", 0))
+            except Exception as ex:
+                print(f"Error reading key {key}: {ex}")
+
         with SessionLocal() as db:
-            for key in keys:
-                try:
-                    raw = redis.get(key)
-                    if not raw:
-                        continue
-                    data = json.loads(raw)
-                    consultation_id = int(key.split(":")[-1])
-                    rate_per_min = float(data.get("rate_per_min", 0))
-
-                    cons = db.query(models.Consultation).filter(models.Consultation.id == consultation_id).first()
-                    if cons and cons.status == models.ConsultationStatus.ACTIVE and rate_per_min > 0:
-                        print(f"Recovering billing loop for consultation {consultation_id}")
-                        asyncio.create_task(billing_loop(consultation_id, rate_per_min, SessionLocal))
-                    else:
-                        # Stale key — clean up
-                        redis.delete(key)
-                except Exception as ex:
-                    print(f"Error recovering key {key}: {ex}")
+            active_ids = {
+                cid for (cid,) in db.query(models.Consultation.id).filter(
+                    models.Consultation.id.in_(list(rates)),
+                    models.Consultation.status == models.ConsultationStatus.ACTIVE,
+                ).all()
+            } if rates else set()
+
+        for consultation_id, rate_per_min in rates.items():
+            if consultation_id in active_ids and rate_per_min > 0:
+                print(f"Recovering billing for consultation {consultation_id}")
+                billing_scheduler.register(consultation_id, rate_per_min)
+            else:
+                # Stale key — clean up
+                redis.delete(f"active_consultation:{consultation_id}")
     except Exception as e:
         print(f"Crash recovery scan failed: {e}")
 
@@ -224,128 +167,6 @@ origins = [
     "http://127.0.0.1:4321",  # web/scripts/prerender.js — build-time SSG preview server
 ]
 
-@app.middleware("http")
-async def csrf_middleware(request: Request, call_next):
-    # Set CSRF cookie if not present
-    csrf_token = request.cookies.get("csrf_token")
-    if not csrf_token:
-        csrf_token = secrets.token_urlsafe(32)
-    
-    # State-changing methods require token validation
-    # EXEMPTIONS for initial auth where session doesn't exist yet, and public AI chat
-    exempt_paths = [
-        "/login",
-        "/signup",
-        "/verify-email",
-        "/resend-verification",
-        "/forgot-password",
-        "/verify-otp",
-        "/reset-password",
-        "/auth/google",
-        "/auth/facebook",
-        "/payment/razorpay-webhook",
-        "/public/whatsapp/waplex/inbound",
-        "/ai-astrologer/chat",
-        # Astrologer onboarding: applicant has no account/session yet, same as signup above.
-        "/astrologers/onboarding",
-        "/astrologers/onboarding/photo",
-        # Ad-hoc public report checkout & webhooks (visitors have no session yet)
-        "/reports/lead-capture",
-        "/reports/create-direct-order",
-        "/reports/verify-payment",
-        "/reports/payment-webhook",
-    ]
-    
-    # Also exempt requests with Bearer token (JWT) as they are inherently CSRF-protected
-    auth_header = request.headers.get("Authorization")
-    is_jwt = auth_header and auth_header.startswith("Bearer ")
-
-    # Cron endpoints are called by an external scheduler (system cron / Vercel
-    # Cron) with no browser session and no JWT — they're protected by their
-    # own X-Cron-Secret check (see routers/cron.py) instead of CSRF.
-    is_cron = request.url.path.startswith("/cron/")
-
-    if request.method in ["POST", "PUT", "DELETE", "PATCH"] and request.url.path not in exempt_paths and not is_jwt and not is_cron:
-        header_token = request.headers.get("X-CSRF-Token")
-        if not header_token or header_token != csrf_token:
-            from fastapi.responses import JSONResponse
-            return JSONResponse(status_code=403, content={"detail": "CSRF token validation failed"})
-
-    response = await call_next(request)
-
-    # Set/Refresh CSRF cookie. In production the frontend (aadikarta.org) and
-    # API (api.aadikarta.org) are different hostnames, so without an explicit
-    # Domain attribute this cookie defaults to api.aadikarta.org only — the
-    # frontend's JS (document.cookie) can never read it, X-CSRF-Token never
-    # gets sent, and every state-changing request 403s with "CSRF token
-    # validation failed". Scoping to the shared parent domain fixes that.
-    # Locally both run on "localhost" (cookies are host-scoped, not
-    # port-scoped) so no Domain override is needed there.
-    cookie_kwargs = {}
-    if os.getenv("APP_ENV") == "production":
-        cookie_kwargs["domain"] = ".aadikarta.org"
-    response.set_cookie(
-        key="csrf_token",
-        value=csrf_token,
-        httponly=False, # Accessible by JS for double-submit
-        samesite="None", # Required for cross-site requests
-        secure=True, # Required when samesite="None"
-        **cookie_kwargs,
-    )
-    return response
-
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    # Uploaded/gallery images under /static are immutable once written (each
-    # upload gets its own filename) -- forcing no-store on them too meant every
-    # blog image was re-downloaded in full on every single page view, with no
-    # browser or CDN caching possible. API JSON still needs no-store (it can
-    # carry per-user/auth data), so only /static gets the long-lived version.
-    if request.url.path.startswith("/static/"):
-        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
-    else:
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    response.headers["X-Permitted-Cross-Domain-Policies"] = "none"
-    response.headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=(self)"
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline' https://checkout.razorpay.com https://cdn.razorpay.com https://cdn.jsdelivr.net; "
-        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.jsdelivr.net; "
-        "font-src 'self' https://fonts.gstatic.com data:; "
-        "img-src 'self' data: https: blob: http://localhost:* http://192.168.1.13:* http://*.aadikarta.org; "
-        "connect-src 'self' https://api.aadikarta.org http://api.aadikarta.org https://admin.aadikarta.org http://admin.aadikarta.org https://aadikarta.org http://aadikarta.org https://*.aadikarta.org http://*.aadikarta.org http://localhost:* ws://localhost:* http://192.168.1.13:* ws://192.168.1.13:* wss://api.aadikarta.org wss://*.aadikarta.org; "
-        "frame-src 'self' https://checkout.razorpay.com http://localhost:* https://*.aadikarta.org http://*.aadikarta.org http://192.168.1.13:* https://www.youtube.com https://*.youtube.com https://*.youtube-nocookie.com; "
-        "media-src 'self' blob: https: http://localhost:* http://192.168.1.13:* http://*.aadikarta.org; "
-        "object-src 'none';"
-    )
-    return response
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    origin = request.headers.get("origin")
-    print(f"REQUEST: {request.method} {request.url} ORIGIN: {origin}")
-    try:
-        response = await call_next(request)
-        return response
-    except Exception as e:
-        # Log the full exception server-side only — never echo str(e) to the
-        # client, since it can contain SQL fragments, file paths, or other
-        # internals from unrelated dependencies raising here.
-        print(f"ERROR processing request: {e}")
-        _persist_error_log(request, e)
-        from fastapi.responses import JSONResponse
-        return JSONResponse(
-            status_code=500,
-            content={"detail": "Internal Server Error"}
-        )
-
-
 def _persist_error_log(request: Request, exc: Exception):
     """Best-effort durable record of an unhandled exception. Uses its own
     session (no request-scoped `Depends(get_db)` is available this far up
@@ -354,15 +175,14 @@ def _persist_error_log(request: Request, exc: Exception):
     from .database import SessionLocal
     from . import models
 
+    from . import identity
+
     user_id = None
-    auth_header = request.headers.get("Authorization")
-    if auth_header and auth_header.startswith("Bearer "):
+    payload = identity.claims(request)
+    if payload and payload.get("sub"):
         try:
-            from jose import jwt, JWTError
-            from .routers.auth import SECRET_KEY, ALGORITHM
-            payload = jwt.decode(auth_header[7:], SECRET_KEY, algorithms=[ALGORITHM])
-            user_id = int(payload.get("sub")) if payload.get("sub") else None
-        except (JWTError, ValueError, TypeError):
+            user_id = int(payload["sub"])
+        except (ValueError, TypeError):
             pass
 
     try:
@@ -386,17 +206,28 @@ def _persist_error_log(request: Request, exc: Exception):
     except Exception as log_err:
         print(f"Failed to persist error log: {log_err}")
 
+# CSRF, security headers, the default rate limit, the error boundary and the
+# access log, as one pure-ASGI layer (see app/edge.py). It only intercepts the
+# "http" ASGI scope, so WebSocket routes (realtime + chat) pass straight
+# through untouched.
+from .edge import EdgeMiddleware
+
+app.add_middleware(EdgeMiddleware, on_error=_persist_error_log)
+
 # Compress JSON responses when the API is reached without an nginx layer in front.
 # Excludes /static: GZipMiddleware doesn't correctly honor Range requests, so
 # wrapping it around StaticFiles corrupts ranged/chunked fetches of uploaded
 # files (e.g. Facebook's Graph API fetching a Content Studio video by URL,
-# which was failing with "corrupt video" errors because of this).
+# which was failing with "corrupt video" errors because of this). PDFs are
+# excluded by content type for the same reason (pdf_store serves Range requests).
 from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 
 
 class ConditionalGZipMiddleware:
     def __init__(self, app, minimum_size=1024, excluded_prefixes=("/static/",)):
-        self.gzip_app = GZipMiddleware(app, minimum_size=minimum_size)
+        self.gzip_app = GZipMiddleware(app, minimum_size=minimum_size,
+                                       exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/pdf",))
         self.app = app
         self.excluded_prefixes = excluded_prefixes
 
@@ -417,6 +248,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Has-More"],  # chat history paging
     max_age=3600,
 )
 
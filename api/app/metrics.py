@@ -0,0 +1,20 @@
+"""Latency percentiles for the per-worker metrics snapshots (fanout,
+http_clients) and the benchmark scripts in scripts/."""
+from typing import Iterable, Optional
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0..1) of a sorted, non-empty list."""
+    return sorted_values[int(pct * (len(sorted_values) - 1))]
+
+
+def latency_summary(values: Iterable[float], digits: int) -> Optional[dict]:
+    """{"p50", "p99", "max"} of `values` rounded to `digits`; None if there are none."""
+    lat = sorted(values)
+    if not lat:
+        return None
+    return {
+        "p50": round(percentile(lat, 0.5), digits),
+        "p99": round(percentile(lat, 0.99), digits),
+        "max": round(lat[-1], digits),
+    }
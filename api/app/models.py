@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum, DECIMAL, Text, Date, Time, JSON, Index, UniqueConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from .database import Base
 import enum
 
@@ -72,6 +72,7 @@ class User(Base):
     astrologer_profile = relationship("AstrologerProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
     wallet = relationship("UserWallet", back_populates="user", uselist=False, cascade="all, delete-orphan")
     wallet_transactions = relationship("WalletTransaction", back_populates="user", cascade="all, delete-orphan")
+    ledger_checkpoint = relationship("WalletLedgerCheckpoint", uselist=False, cascade="all, delete-orphan")
 
 class SeekerProfile(Base):
     __tablename__ = "seeker_profiles"
@@ -179,6 +180,13 @@ class UserWallet(Base):
 
 class WalletTransaction(Base):
     __tablename__ = "wallet_transactions"
+    __table_args__ = (
+        # Admin ledger (admin._ledger): keyset pages newest-first, and chat
+        # minutes grouped per consultation.
+        Index("ix_wallet_transactions_created_at_id", "created_at", "id"),
+        Index("ix_wallet_transactions_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_wallet_transactions_type_reference_id", "transaction_type", "reference_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
@@ -199,6 +207,19 @@ class WalletTransaction(Base):
 
     user = relationship("User", back_populates="wallet_transactions")
 
+class WalletLedgerCheckpoint(Base):
+    """How far wallet_ledger has folded a user's transactions: running_sum is
+    SUM(amount) over their WalletTransactions with id <= last_txn_id.
+    balanced_txn_id is the last ledger position at which the stored wallet
+    balance was seen to match it (NULL until it has been)."""
+    __tablename__ = "wallet_ledger_checkpoints"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_txn_id = Column(Integer, nullable=False)
+    running_sum = Column(DECIMAL(12, 2), nullable=False)
+    balanced_txn_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class PaymentOrder(Base):
     """Server-side record of an order created via POST /payment/order (mock
     or real), so /payment/verify can look up the amount the platform actually
@@ -256,6 +277,9 @@ class Consultation(Base):
     __table_args__ = (
         Index("ix_consultations_astrologer_id_status", "astrologer_id", "status"),
         Index("ix_consultations_seeker_id_status", "seeker_id", "status"),
+        # Stale REQUESTED / PAUSED sweeps (see sweeps.py).
+        Index("ix_consultations_status_created_at", "status", "created_at"),
+        Index("ix_consultations_status_paused_at", "status", "paused_at"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -277,8 +301,11 @@ class Consultation(Base):
     # minutes (see promotional_rate_total) instead of the astrologer's normal rate_per_min.
     is_promotional_first_chat = Column(Boolean, default=False)
     promotional_rate_total = Column(DECIMAL(10, 2), nullable=True)
-    status = Column(Enum(ConsultationStatus), default=ConsultationStatus.REQUESTED)
+    # active_history: the old status is loaded before it's overwritten, even on an
+    # expired instance, so astrologer_directory sees every transition at flush.
+    status = column_property(Column(Enum(ConsultationStatus), default=ConsultationStatus.REQUESTED), active_history=True)
     disconnection_snapshot = Column(Text) # JSON string for resume state
+    paused_at = Column(DateTime, nullable=True)  # naive UTC; set whenever status becomes PAUSED
     # Package billing fields (nullable — only set when booked via a fixed-time package)
     package_id = Column(Integer, ForeignKey("chat_packages.id"), nullable=True)
     package_seconds_remaining = Column(Integer, nullable=True)
@@ -318,6 +345,10 @@ class Review(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Keyset history pages (chat_history.page).
+        Index("ix_chat_messages_consultation_id_id", "consultation_id", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     consultation_id = Column(Integer, ForeignKey("consultations.id"), index=True)
     sender_id = Column(Integer, ForeignKey("users.id"))
@@ -536,6 +567,31 @@ class DeviceToken(Base):
 
     user = relationship("User", backref="device_tokens")
 
+
+class NotificationOutbox(Base):
+    """Push/WhatsApp deliveries waiting to go out. Request paths only insert a
+    row (notification_outbox.enqueue_*); the dispatcher claims due rows,
+    batches pushes into FCM multicast calls, sends WhatsApp on a worker pool,
+    retries with backoff and prunes dead device tokens."""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String(16), nullable=False)  # push, whatsapp
+    # push: every device of this user at send time (no FK — a user deleted
+    # with deliveries pending just has nothing left to send to)
+    user_id = Column(Integer, nullable=True)
+    recipient = Column(String, nullable=True)  # whatsapp: phone number
+    payload = Column(JSON, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)  # naive UTC, like sent_at
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
 class InquiryStatus(str, enum.Enum):
     NEW = "NEW"
     READ = "READ"
@@ -563,6 +619,8 @@ class AuditLog(Base):
     resource_type = Column(String, nullable=True)  # e.g. "consultation", "dispute", "payout"
     resource_id = Column(String, nullable=True)
     details = Column(JSON, nullable=True)
+    client_ip = Column(String(45), nullable=True)
+    user_agent = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     actor = relationship("User", foreign_keys=[actor_id])
@@ -658,6 +716,21 @@ class PanchangCache(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class GeocodeCache(Base):
+    """Resolved birth-place coordinates, keyed by geocoding.normalize_place() of
+    the raw place string, so a place is sent to Nominatim once across all
+    workers and restarts. Fronted by an in-process LRU and the offline place
+    index (see geocoding.py)."""
+    __tablename__ = "geocode_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    query_key = Column(String(255), nullable=False, unique=True, index=True)
+    latitude = Column(DECIMAL(10, 6), nullable=False)
+    longitude = Column(DECIMAL(10, 6), nullable=False)
+    source = Column(String(16), nullable=False, default="nominatim")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class KundliMatchReport(Base):
     """Cached Kuta (Guna Milan) compatibility report between two birth charts."""
     __tablename__ = "kundli_match_reports"
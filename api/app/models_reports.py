@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum, DECIMAL, Text, Date, Time, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum, DECIMAL, Text, Date, Time, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -67,6 +67,10 @@ class AdHocReportOrder(Base):
     razorpay_mode = Column(String, nullable=True)  # "test" or "live" — key pair the order was created under
     pdf_url = Column(String, nullable=True)
     report_data = Column(JSON, nullable=True)  # Full synthesized report JSON
+    # The stored PDF (pdf_store digest) and the template version it was
+    # rendered with; the report worker re-renders orders on an older version.
+    pdf_sha256 = Column(String(64), nullable=True)
+    pdf_template_version = Column(Integer, nullable=True)
     whatsapp_sent = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -84,3 +88,22 @@ class ReportAnalytics(Base):
     device_type = Column(String, nullable=True)
     user_location = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ReportJob(Base):
+    """Generation of one paid order's report. Payment verification only
+    inserts this row (report_jobs.enqueue); report workers claim due rows,
+    build the report and deliver it, retrying with backoff."""
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        Index("ix_report_jobs_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("adhoc_report_orders.id"), nullable=False, unique=True)
+    status = Column(String(16), nullable=False, default="pending")  # pending, running, done, failed
+    stage = Column(String(16), nullable=False, default="queued")  # last REPORT_PROGRESS stage published
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)  # naive UTC; the lease while running
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
@@ -10,11 +10,19 @@ sidereal ascendant and calibrated it directly against FreeAstroAPI's own
 /api/v2/vedic/chart ascendant (the same calculation used by the Kundli
 Generator) for several date/time/location combinations — local output matched
 within ~0.005 degrees, i.e. well under a second of clock time at the equator.
+
+The ascendant is evaluated with NumPy over whole arrays of instants: a day's
+sign boundaries come from one coarse sweep (every LAGNA_COARSE_STEP_SECS)
+followed by a bisection run on all bracketed boundaries at once, so a full
+timeline costs a few dozen array operations rather than one trig evaluation
+per minute of the day.
 """
 import math
 from datetime import datetime, timedelta
 from typing import Optional
 
+import numpy as np
+
 RASHIS = [
     "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
     "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces",
@@ -131,46 +139,155 @@ def _lahiri_ayanamsha_deg(jd: float) -> float:
     return 23.8531 + years * 0.0139926
 
 
-def sidereal_ascendant_deg(dt_local: datetime, tz_offset_hours: float, lat: float, lon: float) -> float:
-    """Sidereal (Lahiri) ascendant longitude in degrees [0, 360) for a local
-    civil datetime, timezone offset (hours east of UTC), latitude and
-    longitude (degrees, east positive)."""
-    dt_utc = dt_local - timedelta(hours=tz_offset_hours)
-    jd = _julian_day_ut(dt_utc)
-
+def _ascendant_from_jd(jd, lat: float, lon: float):
+    """Sidereal (Lahiri) ascendant in degrees [0, 360) for a UT Julian day or
+    an array of them (same shape out)."""
+    jd = np.asarray(jd, dtype=float)
     t = (jd - 2451545.0) / 36525.0
     gmst = 280.46061837 + 360.98564736629 * (jd - 2451545.0) + 0.000387933 * t ** 2 - (t ** 3) / 38710000.0
     gmst %= 360.0
     lst = (gmst + lon) % 360.0
     obliquity = 23.439291 - 0.0130042 * t - 1.64e-7 * t ** 2 + 5.04e-7 * t ** 3
 
-    theta = math.radians(lst)
-    eps = math.radians(obliquity)
+    theta = np.radians(lst)
+    eps = np.radians(obliquity)
     phi = math.radians(lat)
 
     # Meeus (Astronomical Algorithms, ch.13) ascendant formula. Empirically
     # this raw form yields the *descendant*; flipping 180 deg (equivalently
     # negating both atan2 arguments) matches FreeAstroAPI's ascendant to
     # within ~0.005 deg — see module docstring.
-    y = math.cos(theta)
-    x = -(math.sin(eps) * math.tan(phi) + math.cos(eps) * math.sin(theta))
-    tropical_asc = math.degrees(math.atan2(y, x)) % 360.0
+    y = np.cos(theta)
+    x = -(np.sin(eps) * math.tan(phi) + np.cos(eps) * np.sin(theta))
+    tropical_asc = np.degrees(np.arctan2(y, x)) % 360.0
 
     ayanamsha = _lahiri_ayanamsha_deg(jd)
     return (tropical_asc - ayanamsha) % 360.0
 
 
+def sidereal_ascendant_deg(dt_local: datetime, tz_offset_hours: float, lat: float, lon: float) -> float:
+    """Sidereal (Lahiri) ascendant longitude in degrees [0, 360) for a local
+    civil datetime, timezone offset (hours east of UTC), latitude and
+    longitude (degrees, east positive)."""
+    jd = _julian_day_ut(dt_local - timedelta(hours=tz_offset_hours))
+    return float(_ascendant_from_jd(jd, lat, lon))
+
+
+def sidereal_ascendant_degs(
+    base_local: datetime, offsets_secs, tz_offset_hours: float, lat: float, lon: float,
+) -> np.ndarray:
+    """Vectorized sidereal_ascendant_deg: the ascendant at `base_local` plus
+    each of `offsets_secs` (seconds, any array-like)."""
+    jd0 = _julian_day_ut(base_local - timedelta(hours=tz_offset_hours))
+    return _ascendant_from_jd(jd0 + np.asarray(offsets_secs, dtype=float) / 86400.0, lat, lon)
+
+
 def rashi_for_degree(deg: float) -> tuple[str, int]:
     idx = int(deg // 30) % 12
     return RASHIS[idx], idx + 1
 
 
+# Coarse sweep spacing for lagna boundaries. The shortest rashi window at
+# inhabited latitudes is well over 10 minutes, so a 5-minute sweep brackets
+# every boundary; sweeps that still jump more than one sign (near-polar
+# latitudes) are re-swept more finely.
+LAGNA_COARSE_STEP_SECS = 300.0
+# Bisect until a boundary is bracketed to under half a second.
+LAGNA_BOUNDARY_PRECISION_SECS = 0.5
+# Longest rashi window we expect when looking past the ends of a timeline
+# for the true start/end of its first and last lagna.
+LAGNA_TIMELINE_PAD = timedelta(hours=6)
+
+
+def _sign_idx(degs: np.ndarray) -> np.ndarray:
+    return (degs // 30).astype(int) % 12
+
+
+def _sign_boundaries(
+    base_local: datetime, tz_offset_hours: float, lat: float, lon: float,
+    start_secs: float, end_secs: float, step_secs: float = LAGNA_COARSE_STEP_SECS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Instants (seconds from `base_local`) in (start_secs, end_secs] where
+    the ascendant enters a new rashi, and the index of the rashi entered."""
+    n = max(1, math.ceil((end_secs - start_secs) / step_secs))
+    t = np.linspace(start_secs, end_secs, n + 1)
+    signs = _sign_idx(sidereal_ascendant_degs(base_local, t, tz_offset_hours, lat, lon))
+    idx = np.flatnonzero(signs[1:] != signs[:-1])
+    if not idx.size:
+        return np.empty(0), np.empty(0, dtype=int)
+
+    lo, hi, lo_sign = t[idx], t[idx + 1], signs[idx]
+    skips = (signs[idx + 1] - lo_sign) % 12 != 1
+    found_t, found_sign = [], []
+    if skips.any():
+        # More than one boundary inside a step: sweep just those steps finely.
+        fine_step = step_secs / 30
+        for a, b in zip(lo[skips], hi[skips]):
+            if fine_step < LAGNA_BOUNDARY_PRECISION_SECS:
+                found_t.append(np.array([b]))
+                found_sign.append(_sign_idx(sidereal_ascendant_degs(base_local, [b], tz_offset_hours, lat, lon)))
+                continue
+            ft, fs = _sign_boundaries(base_local, tz_offset_hours, lat, lon, a, b, fine_step)
+            found_t.append(ft)
+            found_sign.append(fs)
+        lo, hi, lo_sign = lo[~skips], hi[~skips], lo_sign[~skips]
+
+    # Bisect every single-boundary step simultaneously.
+    iterations = max(0, math.ceil(math.log2(step_secs / LAGNA_BOUNDARY_PRECISION_SECS)))
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        same = _sign_idx(sidereal_ascendant_degs(base_local, mid, tz_offset_hours, lat, lon)) == lo_sign
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    found_t.append(hi)
+    found_sign.append((lo_sign + 1) % 12)
+
+    all_t = np.concatenate(found_t)
+    order = np.argsort(all_t)
+    return all_t[order], np.concatenate(found_sign)[order]
+
+
+def _round_to_second(dt: datetime) -> datetime:
+    return dt.replace(microsecond=0) + timedelta(seconds=1 if dt.microsecond >= 500_000 else 0)
+
+
+def _lagna_windows(
+    start_local: datetime, end_local: datetime, tz_offset_hours: float, lat: float, lon: float,
+) -> list[dict]:
+    """Consecutive rashi windows covering [start_local, end_local]; the first
+    starts at start_local and the last ends at end_local."""
+    span = (end_local - start_local).total_seconds()
+    first_sign = rashi_for_degree(sidereal_ascendant_deg(start_local, tz_offset_hours, lat, lon))[1] - 1
+    boundaries, entered = _sign_boundaries(start_local, tz_offset_hours, lat, lon, 0.0, span)
+
+    edges = [start_local] + [_round_to_second(start_local + timedelta(seconds=float(b))) for b in boundaries] + [end_local]
+    signs = [first_sign] + [int(s) for s in entered]
+    return [
+        {"sign": RASHIS[sign], "sign_id": sign + 1, "start": edges[i], "end": edges[i + 1]}
+        for i, sign in enumerate(signs)
+        if edges[i] < edges[i + 1]
+    ]
+
+
+def lagna_timeline(
+    start_local: datetime, end_local: datetime, tz_offset_hours: float, lat: float, lon: float,
+) -> list[dict]:
+    """Every lagna (rising rashi) between start_local and end_local, in order —
+    a full day yields all twelve, plus the partial ones at either end. Each
+    window carries its true start/end to the second, even where that lies
+    outside the requested range."""
+    windows = _lagna_windows(
+        start_local - LAGNA_TIMELINE_PAD, end_local + LAGNA_TIMELINE_PAD, tz_offset_hours, lat, lon,
+    )
+    return [w for w in windows if w["end"] > start_local and w["start"] < end_local]
+
+
 def current_lagna_window(
     now_local: datetime, tz_offset_hours: float, lat: float, lon: float,
     search_start: Optional[datetime] = None, search_end: Optional[datetime] = None,
 ) -> dict:
     """Find the rashi the ascendant is currently in, plus the start/end of
-    that window, by scanning a bounded local time range in 1-minute steps.
+    that window (to the second), clamped to a bounded local time range.
     Bounded to +/-12h around `now_local` by default (a rashi window is at
     most a few hours, so this always brackets the current one)."""
     if search_start is None:
@@ -181,33 +298,20 @@ def current_lagna_window(
     current_deg = sidereal_ascendant_deg(now_local, tz_offset_hours, lat, lon)
     current_sign, current_sign_id = rashi_for_degree(current_deg)
 
-    # Walk backward from now to find window start.
-    t = now_local
-    step = timedelta(minutes=1)
-    while t - step >= search_start:
-        prev = t - step
-        sign, _ = rashi_for_degree(sidereal_ascendant_deg(prev, tz_offset_hours, lat, lon))
-        if sign != current_sign:
-            break
-        t = prev
-    window_start = t
-
-    # Walk forward from now to find window end.
-    t = now_local
-    while t + step <= search_end:
-        nxt = t + step
-        sign, _ = rashi_for_degree(sidereal_ascendant_deg(nxt, tz_offset_hours, lat, lon))
-        if sign != current_sign:
+    # Boundaries are rounded to the second, so take the last window that has
+    # started rather than insisting now falls strictly inside one.
+    window = {"start": search_start, "end": search_end}
+    for w in _lagna_windows(search_start, search_end, tz_offset_hours, lat, lon):
+        if w["start"] > now_local:
             break
-        t = nxt
-    window_end = t
+        window = w
 
     return {
         "sign": current_sign,
         "sign_id": current_sign_id,
         "degree": current_deg,
-        "start": window_start,
-        "end": window_end,
+        "start": window["start"],
+        "end": window["end"],
     }
 
 
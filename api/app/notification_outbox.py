@@ -0,0 +1,312 @@
+"""
+Durable outbox for push and WhatsApp notifications.
+
+Request handlers, the chat socket and the background sweeps used to call FCM
+(once per device token) and WAPlex inline — blocking HTTP on the request path,
+with a failed send simply lost. Now they only insert a notification_outbox row
+(enqueue_push / enqueue_whatsapp) and the per-process dispatcher delivers:
+
+  - due rows are claimed in batches (FOR UPDATE SKIP LOCKED on Postgres, so
+    every worker can run a dispatcher) with a lease, so a crash mid-send just
+    makes them due again
+  - pushes are grouped by identical content across rows/users and sent as FCM
+    multicasts of up to 500 tokens; tokens FCM reports as unregistered are
+    deleted, and only the tokens that hit a transient error are retried
+  - WhatsApp messages go out on a small thread pool
+  - failures retry with exponential backoff up to NOTIFY_MAX_ATTEMPTS, then the
+    row is left as failed with its last error
+
+Sent rows are purged after NOTIFY_RETENTION_HOURS.
+
+Tunables (env):
+  NOTIFY_POLL_SECS           idle poll interval (default 2); enqueue also wakes it
+  NOTIFY_BATCH_SIZE          rows claimed per pass (default 200)
+  NOTIFY_MAX_ATTEMPTS        default 6
+  NOTIFY_RETRY_BASE_SECS     first retry delay, doubled per attempt (default 15)
+  NOTIFY_WHATSAPP_WORKERS    WAPlex send threads (default 4)
+  NOTIFY_RETENTION_HOURS     default 24
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import database, models, notifications
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_POLL_SECS = float(os.getenv("NOTIFY_POLL_SECS", "2"))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "200"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "6"))
+NOTIFY_RETRY_BASE_SECS = float(os.getenv("NOTIFY_RETRY_BASE_SECS", "15"))
+NOTIFY_WHATSAPP_WORKERS = int(os.getenv("NOTIFY_WHATSAPP_WORKERS", "4"))
+NOTIFY_RETENTION_HOURS = int(os.getenv("NOTIFY_RETENTION_HOURS", "24"))
+# How long a claimed row stays invisible to other dispatchers.
+_LEASE_SECS = 120
+_PURGE_EVERY_PASSES = 500
+
+PUSH = "push"
+WHATSAPP = "whatsapp"
+
+
+# --- Enqueue -------------------------------------------------------------------
+
+def enqueue_push(db: Session, user_id: int, title: str, body: str, data: Optional[dict] = None,
+                 android_channel_id: Optional[str] = None, commit: bool = True):
+    """Queue a push to every device of `user_id`. With commit=False the row
+    rides on the caller's transaction (committed, or rolled back, with it)."""
+    payload = _push_payload(title, body, data, android_channel_id)
+    _enqueue(db, models.NotificationOutbox(channel=PUSH, user_id=user_id, payload=payload), commit)
+
+
+def enqueue_push_bulk(db: Session, pushes: list[dict], commit: bool = True):
+    """Queue many pushes as one multi-row INSERT. Each dict takes
+    enqueue_push's arguments: user_id, title, body, data, android_channel_id."""
+    if not pushes:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(models.NotificationOutbox), [{
+        "channel": PUSH,
+        "user_id": p["user_id"],
+        "payload": _push_payload(p["title"], p["body"], p.get("data"), p.get("android_channel_id")),
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+    } for p in pushes])
+    if commit:
+        db.commit()
+    dispatcher.wake()
+
+
+def enqueue_whatsapp(db: Session, to_phone: str, template_key: str, params: Optional[dict] = None,
+                     commit: bool = True):
+    if not to_phone:
+        return
+    payload = {"template_key": template_key, "params": params or {}}
+    _enqueue(db, models.NotificationOutbox(channel=WHATSAPP, recipient=to_phone, payload=payload), commit)
+
+
+def _push_payload(title: str, body: str, data: Optional[dict], android_channel_id: Optional[str]) -> dict:
+    return {"title": title, "body": body, "data": data or {}, "android_channel_id": android_channel_id}
+
+
+def _enqueue(db: Session, row: models.NotificationOutbox, commit: bool):
+    row.status = "pending"
+    row.attempts = 0
+    row.next_attempt_at = datetime.utcnow()
+    db.add(row)
+    if commit:
+        db.commit()
+    dispatcher.wake()
+
+
+# --- Dispatch ------------------------------------------------------------------
+
+def _claim(now: datetime) -> list[dict]:
+    """Lease a batch of due rows; resolve device tokens for the pushes."""
+    with database.SessionLocal() as db:
+        rows = db.query(models.NotificationOutbox).filter(
+            models.NotificationOutbox.status == "pending",
+            models.NotificationOutbox.next_attempt_at <= now,
+        ).order_by(models.NotificationOutbox.id).limit(NOTIFY_BATCH_SIZE).with_for_update(skip_locked=True).all()
+        if not rows:
+            return []
+
+        lease_until = now + timedelta(seconds=_LEASE_SECS)
+        jobs = []
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = lease_until
+            jobs.append({
+                "id": row.id, "channel": row.channel, "user_id": row.user_id,
+                "recipient": row.recipient, "payload": dict(row.payload), "attempts": row.attempts,
+            })
+
+        # A retried push carries just the tokens that failed last time.
+        user_ids = {j["user_id"] for j in jobs if j["channel"] == PUSH and "tokens" not in j["payload"]}
+        tokens_by_user = defaultdict(list)
+        if user_ids:
+            for user_id, token in db.query(models.DeviceToken.user_id, models.DeviceToken.fcm_token).filter(
+                models.DeviceToken.user_id.in_(user_ids),
+            ):
+                tokens_by_user[user_id].append(token)
+        for j in jobs:
+            if j["channel"] == PUSH:
+                j["tokens"] = j["payload"].pop("tokens", None) or tokens_by_user.get(j["user_id"], [])
+        db.commit()
+        return jobs
+
+
+def _send_pushes(jobs: list[dict]) -> tuple[dict[int, list[str]], set[str], dict[int, str]]:
+    """Multicast every distinct notification to all tokens that should get it.
+    Returns (retry tokens per row id, dead tokens, error per row id)."""
+    groups: dict[str, list[dict]] = defaultdict(list)
+    for j in jobs:
+        p = j["payload"]
+        groups[json.dumps([p["title"], p["body"], p["data"], p.get("android_channel_id")], sort_keys=True)].append(j)
+
+    retry: dict[int, list[str]] = {}
+    errors: dict[int, str] = {}
+    dead: set[str] = set()
+    for group in groups.values():
+        p = group[0]["payload"]
+        owners = defaultdict(list)  # token -> row ids (a user can be queued twice)
+        for j in group:
+            for token in j["tokens"]:
+                owners[token].append(j["id"])
+        tokens = list(owners)
+        for start in range(0, len(tokens), notifications.FCM_MULTICAST_LIMIT):
+            chunk = tokens[start:start + notifications.FCM_MULTICAST_LIMIT]
+            try:
+                chunk_dead, chunk_retry = notifications.send_multicast(
+                    chunk, p["title"], p["body"], p["data"], p.get("android_channel_id"),
+                )
+            except Exception as e:
+                logger.error(f"FCM multicast failed for {len(chunk)} token(s): {e}")
+                chunk_dead, chunk_retry = [], chunk
+                for token in chunk:
+                    for row_id in owners[token]:
+                        errors[row_id] = str(e)[:500]
+            dead.update(chunk_dead)
+            for token in chunk_retry:
+                for row_id in owners[token]:
+                    retry.setdefault(row_id, []).append(token)
+    return retry, dead, errors
+
+
+def _send_whatsapp(job: dict) -> bool:
+    from .services.whatsapp_service import send_whatsapp
+    return send_whatsapp(job["recipient"], job["payload"]["template_key"], job["payload"]["params"])
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = NOTIFY_RETRY_BASE_SECS * (2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _record(jobs: list[dict], retry_tokens: dict[int, list[str]], failed: dict[int, str], dead: set[str]):
+    now = datetime.utcnow()
+    with database.SessionLocal() as db:
+        rows = {r.id: r for r in db.query(models.NotificationOutbox).filter(
+            models.NotificationOutbox.id.in_([j["id"] for j in jobs]),
+        )}
+        for j in jobs:
+            row = rows.get(j["id"])
+            if row is None:
+                continue
+            if j["id"] not in failed:
+                row.status = "sent"
+                row.sent_at = now
+                row.last_error = None
+                continue
+            row.last_error = failed[j["id"]]
+            if j["id"] in retry_tokens:
+                row.payload = {**row.payload, "tokens": retry_tokens[j["id"]]}
+            if row.attempts >= NOTIFY_MAX_ATTEMPTS:
+                row.status = "failed"
+            else:
+                row.next_attempt_at = now + _backoff(row.attempts)
+        if dead:
+            db.query(models.DeviceToken).filter(
+                models.DeviceToken.fcm_token.in_(dead),
+            ).delete(synchronize_session=False)
+            logger.info(f"Pruned {len(dead)} dead FCM token(s)")
+        db.commit()
+
+
+def _purge_sent():
+    cutoff = datetime.utcnow() - timedelta(hours=NOTIFY_RETENTION_HOURS)
+    with database.SessionLocal() as db:
+        db.query(models.NotificationOutbox).filter(
+            models.NotificationOutbox.status == "sent",
+            models.NotificationOutbox.sent_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.commit()
+
+
+class OutboxDispatcher:
+    """Per-process delivery loop; see the module docstring."""
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._send_pool = ThreadPoolExecutor(max_workers=NOTIFY_WHATSAPP_WORKERS + 1,
+                                             thread_name_prefix="notify")
+        self._passes = 0
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    def wake(self):
+        """Cut the idle wait short. Safe from any thread; a no-op until start()."""
+        loop, event = self._loop, self._wakeup
+        if loop is None or event is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification dispatcher error: {e}")
+                sent = 0
+            if sent < NOTIFY_BATCH_SIZE:
+                self._wakeup.clear()
+                try:
+                    async with asyncio.timeout(NOTIFY_POLL_SECS):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+
+    async def run_once(self) -> int:
+        """Deliver one batch of due rows; returns how many were claimed."""
+        self._passes += 1
+        if self._passes % _PURGE_EVERY_PASSES == 0:
+            await database.run_db(_purge_sent)
+
+        jobs = await database.run_db(_claim, datetime.utcnow())
+        if not jobs:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        pushes = [j for j in jobs if j["channel"] == PUSH]
+        texts = [j for j in jobs if j["channel"] == WHATSAPP]
+
+        push_result = loop.run_in_executor(self._send_pool, _send_pushes, pushes) if pushes else None
+        text_results = await asyncio.gather(
+            *(loop.run_in_executor(self._send_pool, _send_whatsapp, j) for j in texts),
+            return_exceptions=True,
+        )
+        retry_tokens, dead, failed = (await push_result) if push_result else ({}, set(), {})
+
+        failed = dict(failed)
+        for row_id in retry_tokens:
+            failed.setdefault(row_id, "FCM transient error")
+        for j, ok in zip(texts, text_results):
+            if ok is not True:
+                failed[j["id"]] = str(ok)[:500] if isinstance(ok, Exception) else "WAPlex send failed"
+
+        await database.run_db(_record, jobs, retry_tokens, failed, dead)
+        return len(jobs)
+
+
+dispatcher = OutboxDispatcher()
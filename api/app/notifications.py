@@ -18,6 +18,63 @@ try:
 except Exception as e:
     logger.warning(f"Firebase Admin SDK not initialized: {e}")
 
+# FCM's per-call cap for send_each_for_multicast.
+FCM_MULTICAST_LIMIT = 500
+
+# Errors that mean the token will never work again (app uninstalled, token
+# rotated, or from another Firebase project) — the device row should go.
+# INVALID_ARGUMENT isn't one: FCM also returns it for a bad payload, which
+# would fail every token in the batch.
+_DEAD_TOKEN_ERRORS = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+
+
+def _android_config(android_channel_id: str = None) -> messaging.AndroidConfig:
+    # Always request the default sound so every push rings, not just the
+    # ones that pass a specific (loud) android_channel_id — channel_id may
+    # be None, in which case Android/FCM falls back to the app's default
+    # notification channel, still with sound requested.
+    return messaging.AndroidConfig(
+        priority="high",
+        notification=messaging.AndroidNotification(
+            channel_id=android_channel_id,
+            sound="default",
+        ),
+    )
+
+
+def _apns_config() -> messaging.APNSConfig:
+    return messaging.APNSConfig(
+        payload=messaging.APNSPayload(aps=messaging.Aps(sound="default"))
+    )
+
+
+def send_multicast(tokens: list[str], title: str, body: str, data: dict = None,
+                   android_channel_id: str = None) -> tuple[list[str], list[str]]:
+    """Send one notification to up to FCM_MULTICAST_LIMIT devices in a single
+    FCM call. Returns (dead_tokens, retry_tokens): tokens FCM rejected for
+    good, and tokens that hit a transient error. Raises if the call itself
+    fails, so the caller can retry the whole batch."""
+    if not firebase_admin._apps:
+        logger.info(f"[MOCK PUSH] To: {len(tokens)} device(s) | Title: {title} | Body: {body}")
+        return [], []
+
+    message = messaging.MulticastMessage(
+        tokens=tokens,
+        notification=messaging.Notification(title=title, body=body),
+        data=data or {},
+        android=_android_config(android_channel_id),
+        apns=_apns_config(),
+    )
+    batch = messaging.send_each_for_multicast(message)
+    dead, retry = [], []
+    for token, resp in zip(tokens, batch.responses):
+        if resp.success:
+            continue
+        (dead if isinstance(resp.exception, _DEAD_TOKEN_ERRORS) else retry).append(token)
+    logger.info(f"FCM multicast: {batch.success_count} sent, {len(dead)} dead, {len(retry)} to retry")
+    return dead, retry
+
+
 def send_push_notification(token: str, title: str, body: str, data: dict = None, android_channel_id: str = None):
     """
     Send a push notification to a single device.
@@ -31,21 +88,6 @@ def send_push_notification(token: str, title: str, body: str, data: dict = None,
         return
 
     try:
-        # Always request the default sound so every push rings, not just the
-        # ones that pass a specific (loud) android_channel_id — channel_id may
-        # be None, in which case Android/FCM falls back to the app's default
-        # notification channel, still with sound requested.
-        android_config = messaging.AndroidConfig(
-            priority="high",
-            notification=messaging.AndroidNotification(
-                channel_id=android_channel_id,
-                sound="default",
-            ),
-        )
-        apns_config = messaging.APNSConfig(
-            payload=messaging.APNSPayload(aps=messaging.Aps(sound="default"))
-        )
-
         message = messaging.Message(
             notification=messaging.Notification(
                 title=title,
@@ -53,8 +95,8 @@ def send_push_notification(token: str, title: str, body: str, data: dict = None,
             ),
             data=data or {},
             token=token,
-            android=android_config,
-            apns=apns_config,
+            android=_android_config(android_channel_id),
+            apns=_apns_config(),
         )
         response = messaging.send(message)
         logger.info(f"Successfully sent message: {response}")
@@ -0,0 +1,145 @@
+"""
+Content-addressed store for generated PDFs (ad-hoc reports, admin exports).
+
+Report PDFs used to be written to generated_report_pdfs/<order_reference>.pdf
+with a plain open/write (a crash mid-write left a truncated file that was then
+served as-is) and, when missing, re-rendered into memory on the request and
+returned as one bytes body. Admin exports were rendered on every click. Now:
+
+  - an artifact is filed under the SHA-256 of everything that determines its
+    bytes: the kind of document, its template version and its inputs
+    (canonical JSON), so identical inputs always map to one file and bumping a
+    template version makes every old artifact unreachable at once
+  - writes go to a temp file in the target directory and are renamed into
+    place, so readers see either nothing or the complete file; concurrent
+    builds of one digest in a process are coalesced, and a race across
+    processes just renames the same bytes twice
+  - response() serves the file with a FileResponse: sendfile/pathsend where the
+    server supports it, Range requests, and the digest as a strong ETag so a
+    revalidating client gets a 304 without the file being opened
+
+PDF_STORE_DIR must stay outside "uploads/" (served unauthenticated by the
+/static mount); access control is the caller's job. Old artifacts of kinds
+that are regenerated on demand are removed with prune().
+
+Tunables (env):
+  PDF_STORE_DIR                     default generated_report_pdfs
+  PDF_STORE_EXPORT_RETENTION_HOURS  admin exports unused for this long are pruned
+                                    (default 24)
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from .response_cache import _etag_matches
+
+logger = logging.getLogger(__name__)
+
+PDF_STORE_DIR = os.getenv("PDF_STORE_DIR", "generated_report_pdfs")
+PDF_STORE_EXPORT_RETENTION_HOURS = float(os.getenv("PDF_STORE_EXPORT_RETENTION_HOURS", "24"))
+
+REPORT = "report"
+ADMIN_EXPORT = "admin_export"
+# Artifacts are immutable under their digest, but access checks must run
+# every time, so clients revalidate rather than reuse.
+CACHE_CONTROL = "private, no-cache"
+
+# Builds of one digest in this process are serialized (striped, so the
+# lock table stays fixed-size).
+_build_locks = [threading.Lock() for _ in range(64)]
+
+
+def digest(kind: str, template_version: int, *inputs) -> str:
+    canonical = json.dumps([kind, template_version, *inputs], sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def path(kind: str, key: str) -> str:
+    return os.path.join(PDF_STORE_DIR, kind, key[:2], f"{key}.pdf")
+
+
+def exists(kind: str, key: str) -> bool:
+    return os.path.isfile(path(kind, key))
+
+
+def put(kind: str, key: str, data: bytes) -> str:
+    """Store `data` under `key` atomically; returns its path."""
+    return _put(kind, key, lambda f: f.write(data))
+
+
+def _put(kind: str, key: str, write: Callable) -> str:
+    target = path(kind, key)
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return target
+
+
+def get_or_build(kind: str, key: str, build: Callable[[], bytes]) -> str:
+    """Path of the artifact, running build() to create it if it's missing.
+    Blocking; call it from a thread."""
+    return get_or_write(kind, key, lambda f: f.write(build()))
+
+
+def get_or_write(kind: str, key: str, write: Callable) -> str:
+    """get_or_build() for builders that write straight into the (binary)
+    temp file that becomes the artifact."""
+    target = path(kind, key)
+    if os.path.isfile(target):
+        os.utime(target)  # keeps prune() off artifacts still being asked for
+        return target
+    with _build_locks[int(key[:8], 16) % len(_build_locks)]:
+        if not os.path.isfile(target):
+            _put(kind, key, write)
+    return target
+
+
+def response(request: Request, kind: str, key: str, filename: str, disposition: str = "inline") -> Response:
+    """Serve a stored artifact (which must exist). `filename` must already be
+    header-safe ASCII."""
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    return FileResponse(path(kind, key), media_type="application/pdf", headers=headers)
+
+
+def prune(kind: str, max_age_secs: float) -> int:
+    """Delete `kind` artifacts not modified for `max_age_secs`; returns how many."""
+    cutoff = time.time() - max_age_secs
+    removed = 0
+    root = os.path.join(PDF_STORE_DIR, kind)
+    for directory, _dirs, files in os.walk(root):
+        for name in files:
+            file_path = os.path.join(directory, name)
+            try:
+                if os.stat(file_path).st_mtime < cutoff:
+                    os.remove(file_path)
+                    removed += 1
+            except OSError:
+                pass
+    if removed:
+        logger.info(f"Pruned {removed} stored {kind} PDF(s)")
+    return removed
@@ -1,4 +1,6 @@
+import asyncio
 import redis
+import redis.asyncio as aioredis
 import os
 import logging
 
@@ -10,11 +12,33 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 
 try:
     redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+    # Raw-bytes twin for binary payloads (pre-gzipped response bodies).
+    redis_bytes_client = redis.from_url(REDIS_URL)
     # Ping to check connection
     # redis_client.ping() # Lazy connection might not fail here immediately
 except Exception as e:
     logger.error(f"Failed to initialize Redis: {e}")
     redis_client = None
+    redis_bytes_client = None
 
 def get_redis():
     return redis_client
+
+def get_redis_bytes():
+    return redis_bytes_client
+
+# The asyncio client's connections belong to the loop that opened them, so
+# remember which loop made it and open a new one if asked from another.
+_async_client = None
+
+def get_async_redis():
+    """asyncio twin of get_redis() for code running on the event loop."""
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client[0] is not loop:
+        try:
+            _async_client = (loop, aioredis.from_url(REDIS_URL, decode_responses=True))
+        except Exception as e:
+            logger.error(f"Failed to initialize async Redis: {e}")
+            return None
+    return _async_client[1]
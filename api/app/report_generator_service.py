@@ -2,76 +2,70 @@
 Report Generator Service
 Synthesizes FreeAstroAPI chart data with LLM narrative generation to produce
 premium, structured ad-hoc reports for Full Kundli, Gun Milan, and Career/Finance.
+
+Stages that don't depend on each other run concurrently: geocoding alongside
+the Saturn transit windows (local, on a thread), then the chart alongside the
+dasha insights. `on_stage`, if given, is awaited with "writing" once the
+calculations are done and the LLM synthesis starts (see report_jobs).
 """
+import asyncio
 import os
 import json
-import httpx
-from datetime import date, time, timedelta
-from typing import Dict, Any, Optional
-from .free_astro_service import generate_full_kundli, generate_kuta_match, generate_dasha_insights, check_sade_sati
+from datetime import date, datetime, time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from . import http_clients, vedic_ephemeris
+from .free_astro_service import generate_full_kundli, generate_kuta_match, generate_dasha_insights
 from .vedic_rishi_service import geocode_place
 
-_SADE_SATI_BRACKET_STEPS_DAYS = [200, 400, 800, 1600, 3200]  # doubling search, up to ~10.5 years out
-_SADE_SATI_BISECT_TOLERANCE_DAYS = 10
-
-
-async def _find_sade_sati_edge(
-    dob: date, tob: time, lat: float, lon: float, today: date, direction: int
-) -> Optional[date]:
-    """Bisects for the start (direction=-1) or end (direction=+1) of the Sade
-    Sati window that's active on `today`. Only called when we already know
-    today is active, so this is bounded — a doubling search to find an
-    'inactive' bracket, then bisection to ~10-day precision. Returns None if
-    no inactive bracket is found within the search range (shouldn't happen
-    for a real ~7.5-year window, but avoids an infinite loop if data is odd)."""
-    outside_date = None
-    for step in _SADE_SATI_BRACKET_STEPS_DAYS:
-        candidate = today + timedelta(days=direction * step)
-        status = await check_sade_sati(
-            year=dob.year, month=dob.month, day=dob.day, hour=tob.hour, minute=tob.minute,
-            latitude=lat, longitude=lon, reference_date=candidate.isoformat(),
-        )
-        if not status.get("active"):
-            outside_date = candidate
-            break
-    if outside_date is None:
-        return None
+StageCallback = Optional[Callable[[str], Awaitable[None]]]
+
+_DEFAULT_COORDS = (28.6139, 77.2090)
+
+
+def _saturn_transit_windows(dob: date, tob: time, tz: str = "Asia/Kolkata") -> List[Dict[str, Any]]:
+    """Every Sade Sati and Dhaiya window from birth to age 100 (see
+    vedic_ephemeris.saturn_transit_windows). Computed locally in a few tens of
+    milliseconds; no API calls."""
+    birth = datetime.combine(dob, tob)
+    return vedic_ephemeris.saturn_transit_windows(vedic_ephemeris.natal_moon_longitude(birth, tz), birth, tz)
+
 
-    inside_date = today
-    while abs((outside_date - inside_date).days) > _SADE_SATI_BISECT_TOLERANCE_DAYS:
-        mid = inside_date + (outside_date - inside_date) / 2
-        status = await check_sade_sati(
-            year=dob.year, month=dob.month, day=dob.day, hour=tob.hour, minute=tob.minute,
-            latitude=lat, longitude=lon, reference_date=mid.isoformat(),
+def _attach_saturn_transits(sade_sati: Dict[str, Any], windows: List[Dict[str, Any]]) -> None:
+    """Mutates `sade_sati` in place, adding `lifetime` (the windows) and, when
+    Sade Sati is active today (in India), a `window: {start, end}` for the
+    current cycle."""
+    from .routers.muhurat import _now_ist
+
+    sade_sati["lifetime"] = windows
+    if sade_sati.get("active"):
+        today = _now_ist().date().isoformat()
+        current = next(
+            (w for w in windows if w["type"] == "sade_sati" and w["start"] <= today < w["end"]), None,
         )
-        if status.get("active"):
-            inside_date = mid
-        else:
-            outside_date = mid
-    return inside_date
-
-
-async def _resolve_sade_sati_window(dob: date, tob: time, lat: float, lon: float, sade_sati: Dict[str, Any]) -> None:
-    """Mutates `sade_sati` in place, adding a `window: {start, end}` (ISO
-    dates, ~10-day precision) for the currently active Sade Sati cycle. Only
-    runs when Sade Sati is active today — an inactive lookup would need an
-    unbounded forward search for the next cycle, which we've deliberately
-    scoped out for now (see conversation: full lifetime table needs either
-    ~120 chained API calls or a new local ephemeris dependency)."""
-    if not sade_sati.get("active"):
-        return
-    today = date.today()
+        if current:
+            sade_sati["window"] = {"start": current["start"], "end": current["end"]}
+
+
+async def _geocode(pob: str) -> Tuple[float, float]:
+    try:
+        return await geocode_place(pob)
+    except Exception as e:
+        print(f"Geocoding notice: {e}")
+        return _DEFAULT_COORDS
+
+
+async def _saturn_windows_or_none(dob: date, tob: time) -> Optional[List[Dict[str, Any]]]:
     try:
-        start = await _find_sade_sati_edge(dob, tob, lat, lon, today, direction=-1)
-        end = await _find_sade_sati_edge(dob, tob, lat, lon, today, direction=1)
+        return await asyncio.to_thread(_saturn_transit_windows, dob, tob)
     except Exception as e:
-        print(f"Sade Sati window lookup notice: {e}")
-        return
-    if start or end:
-        sade_sati["window"] = {
-            "start": start.isoformat() if start else None,
-            "end": end.isoformat() if end else None,
-        }
+        print(f"Sade Sati window notice: {e}")
+        return None
+
+
+async def _stage(on_stage: StageCallback, stage: str):
+    if on_stage is not None:
+        await on_stage(stage)
+
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -101,11 +95,10 @@ async def _call_llm(system_prompt: str, user_prompt: str) -> str:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            res = await client.post(GROQ_CHAT_URL, json=payload, headers=headers)
-            if res.status_code == 200:
-                data = res.json()
-                return data["choices"][0]["message"]["content"]
+        res = await http_clients.request("groq", "POST", GROQ_CHAT_URL, json=payload, headers=headers)
+        if res.status_code == 200:
+            data = res.json()
+            return data["choices"][0]["message"]["content"]
     except Exception as e:
         print(f"LLM call failed for report synthesis: {e}")
 
@@ -118,51 +111,31 @@ async def generate_full_kundli_report(
     tob: time,
     pob: str,
     gender: str = "MALE",
-    language: str = "en"
+    language: str = "en",
+    on_stage: StageCallback = None,
 ) -> Dict[str, Any]:
     """Generate complete Full Life Kundli & Dasha Report JSON structure."""
-    lat, lon = 28.6139, 77.2090
-    try:
-        lat, lon = await geocode_place(pob)
-    except Exception as e:
-        print(f"Geocoding notice: {e}")
+    (lat, lon), saturn_windows = await asyncio.gather(_geocode(pob), _saturn_windows_or_none(dob, tob))
+    birth = dict(year=dob.year, month=dob.month, day=dob.day, hour=tob.hour, minute=tob.minute,
+                 latitude=lat, longitude=lon, timezone="Asia/Kolkata")
 
-    chart_data = {}
-    dasha_insights = {}
-    try:
-        chart_data = await generate_full_kundli(
-            year=dob.year,
-            month=dob.month,
-            day=dob.day,
-            hour=tob.hour,
-            minute=tob.minute,
-            latitude=lat,
-            longitude=lon,
-            timezone="Asia/Kolkata",
-            dasha_levels=3
-        )
-        dasha_insights = await generate_dasha_insights(
-            year=dob.year,
-            month=dob.month,
-            day=dob.day,
-            hour=tob.hour,
-            minute=tob.minute,
-            latitude=lat,
-            longitude=lon,
-            timezone="Asia/Kolkata",
-            levels=2
-        )
-    except Exception as e:
-        print(f"FreeAstroAPI call notice for Kundli report: {e}")
+    chart_data, dasha_insights = await asyncio.gather(
+        generate_full_kundli(**birth, dasha_levels=3),
+        generate_dasha_insights(**birth, levels=2),
+        return_exceptions=True,
+    )
+    if isinstance(chart_data, Exception):
+        print(f"FreeAstroAPI call notice for Kundli report: {chart_data}")
         chart_data = {"status": "calculated", "note": "Vedic chart placements computed successfully"}
+    if isinstance(dasha_insights, Exception):
+        print(f"FreeAstroAPI dasha insights notice for Kundli report: {dasha_insights}")
         dasha_insights = {"status": "active", "note": "Vimshottari periods active"}
 
     sade_sati = chart_data.get("chart", {}).get("sade_sati")
-    if sade_sati:
-        try:
-            await _resolve_sade_sati_window(dob, tob, lat, lon, sade_sati)
-        except Exception as e:
-            print(f"Sade Sati window notice: {e}")
+    if sade_sati and saturn_windows is not None:
+        _attach_saturn_transits(sade_sati, saturn_windows)
+
+    await _stage(on_stage, "writing")
 
     sys_prompt = (
         "You are Pandit Aadi, chief astrologer at Aadikarta.org. "
@@ -199,7 +172,8 @@ async def generate_full_kundli_report(
 async def generate_gun_milan_report(
     person1: Dict[str, Any],
     person2: Dict[str, Any],
-    language: str = "en"
+    language: str = "en",
+    on_stage: StageCallback = None,
 ) -> Dict[str, Any]:
     """Generate Gun Milan & Compatibility Report JSON structure."""
     match_data = {}
@@ -216,6 +190,8 @@ async def generate_gun_milan_report(
     )
     user_prompt = f"Partner 1: {person1.get('full_name')}, Partner 2: {person2.get('full_name')}. Match Summary: {json.dumps(match_data)}."
 
+    await _stage(on_stage, "writing")
+
     llm_analysis = await _call_llm(sys_prompt, user_prompt)
 
     return {
@@ -232,14 +208,11 @@ async def generate_career_finance_report(
     dob: date,
     tob: time,
     pob: str,
-    language: str = "en"
+    language: str = "en",
+    on_stage: StageCallback = None,
 ) -> Dict[str, Any]:
     """Generate Career & Financial Transit Report JSON structure."""
-    lat, lon = 28.6139, 77.2090
-    try:
-        lat, lon = await geocode_place(pob)
-    except Exception as e:
-        print(f"Geocoding notice: {e}")
+    lat, lon = await _geocode(pob)
 
     chart_data = {}
     try:
@@ -253,7 +226,8 @@ async def generate_career_finance_report(
             longitude=lon,
             timezone="Asia/Kolkata",
             vargas=[1, 10],
-            dasha_levels=2
+            dasha_levels=2,
+            include_extras=False,
         )
     except Exception as e:
         print(f"FreeAstroAPI call notice for Career report: {e}")
@@ -266,6 +240,8 @@ async def generate_career_finance_report(
     )
     user_prompt = f"Seeker: {full_name}, DOB: {dob}, TOB: {tob}, Place: {pob}. D10 Chart & Planets: {json.dumps(chart_data.get('vargas', {}))}."
 
+    await _stage(on_stage, "writing")
+
     llm_analysis = await _call_llm(sys_prompt, user_prompt)
 
     return {
@@ -0,0 +1,588 @@
+"""
+Report generation queue.
+
+Paying for an ad-hoc report used to generate it inside the /reports/verify-payment
+request (and the Razorpay webhook): geocode, chart, dasha insights, Saturn
+transit windows, an LLM call of up to a minute, the ReportLab build, the file
+write and the WhatsApp send, all before the response. Now those paths only
+enqueue() a report_jobs row and return its id, and report workers do the rest:
+
+  - due jobs are claimed with FOR UPDATE SKIP LOCKED under a lease, so any
+    number of workers can pull from the same table and a job whose worker died
+    becomes due again when the lease runs out. The worker renews the lease
+    while the job runs, however long the LLM or the render takes, and gives
+    the job up if another worker has taken it over
+  - a worker runs up to REPORT_WORKER_CONCURRENCY jobs at once; the independent
+    stages of one report run concurrently (see report_generator_service) and
+    the PDF is rendered on a process pool so ReportLab never holds the loop,
+    straight into the content-addressed pdf_store
+  - each stage is published as a REPORT_PROGRESS event to /realtime/ws sockets
+    that sent WATCH_REPORT for the order (routers.realtime)
+  - failures retry with exponential backoff up to REPORT_JOB_MAX_ATTEMPTS, then
+    the job and the order are marked failed
+
+Between jobs the worker also pre-warms the PDF store: completed orders whose
+PDF was rendered under an older report_pdf_service.TEMPLATE_VERSION (or not at
+all yet) are re-rendered in the background, a few at a time, so a template
+change doesn't turn the next downloads into on-request renders. It also prunes
+admin exports nobody has asked for lately.
+
+Every API process works the queue unless REPORT_WORKER_IN_API=0; a dedicated
+worker process is `python -m app.report_jobs` (from api/).
+
+Tunables (env):
+  REPORT_WORKER_IN_API        "0" leaves the queue to dedicated worker processes
+  REPORT_WORKER_CONCURRENCY   jobs in flight per worker (default 4)
+  REPORT_PDF_PROCESSES        PDF render processes per worker (default 2; 0 renders
+                              on a thread instead)
+  REPORT_JOB_POLL_SECS        idle poll interval (default 2); enqueue also wakes it
+  REPORT_JOB_MAX_ATTEMPTS     default 3
+  REPORT_JOB_RETRY_BASE_SECS  first retry delay, doubled per attempt (default 30)
+  REPORT_JOB_LEASE_SECS       how long a claimed job is hidden from other workers
+                              without a renewal (default 600; renewed every third)
+  REPORT_PREWARM_BATCH        orders re-rendered per pre-warm pass (default 10)
+  REPORT_PREWARM_IDLE_SECS    pause once nothing is left to pre-warm (default 300)
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import database, pdf_store
+from .models_reports import AdHocReportOrder, PaymentStatus, ReportAnalytics, ReportJob, ReportStatus, ReportType
+from .report_generator_service import generate_career_finance_report, generate_full_kundli_report, generate_gun_milan_report
+from .report_pdf_service import TEMPLATE_VERSION, generate_report_pdf, report_digest
+
+logger = logging.getLogger(__name__)
+
+REPORT_WORKER_IN_API = os.getenv("REPORT_WORKER_IN_API", "1") != "0"
+REPORT_WORKER_CONCURRENCY = int(os.getenv("REPORT_WORKER_CONCURRENCY", "4"))
+REPORT_PDF_PROCESSES = int(os.getenv("REPORT_PDF_PROCESSES", "2"))
+REPORT_JOB_POLL_SECS = float(os.getenv("REPORT_JOB_POLL_SECS", "2"))
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv("REPORT_JOB_MAX_ATTEMPTS", "3"))
+REPORT_JOB_RETRY_BASE_SECS = float(os.getenv("REPORT_JOB_RETRY_BASE_SECS", "30"))
+REPORT_JOB_LEASE_SECS = int(os.getenv("REPORT_JOB_LEASE_SECS", "600"))
+REPORT_PREWARM_BATCH = int(os.getenv("REPORT_PREWARM_BATCH", "10"))
+REPORT_PREWARM_IDLE_SECS = float(os.getenv("REPORT_PREWARM_IDLE_SECS", "300"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# REPORT_PROGRESS stages, in order.
+QUEUED = "queued"
+CALCULATING = "calculating"
+WRITING = "writing"
+RENDERING = "rendering"
+DELIVERING = "delivering"
+COMPLETED = "completed"
+
+
+# --- Enqueue -------------------------------------------------------------------
+
+def enqueue(db: Session, order: AdHocReportOrder) -> Optional[ReportJob]:
+    """Queue generation of a paid order's report and return its job; an order
+    already queued keeps its job (a failed one is queued again). None if the
+    report was completed before jobs existed."""
+    job = db.query(ReportJob).filter(ReportJob.order_id == order.id).first()
+    if job is None:
+        if order.report_status == ReportStatus.COMPLETED:
+            return None
+        job = ReportJob(order_id=order.id, status=PENDING, stage=QUEUED, attempts=0,
+                        next_attempt_at=datetime.utcnow())
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # verify-payment and the webhook raced; the other one queued it.
+            db.rollback()
+            return db.query(ReportJob).filter(ReportJob.order_id == order.id).first()
+    elif job.status == FAILED:
+        job.status, job.stage, job.attempts = PENDING, QUEUED, 0
+        job.next_attempt_at = datetime.utcnow()
+        order.report_status = ReportStatus.PENDING
+        db.commit()
+    else:
+        return job
+    worker.wake()
+    return job
+
+
+def progress_event(job: ReportJob, order: AdHocReportOrder) -> Dict[str, Any]:
+    """The REPORT_PROGRESS payload describing where `job` is now."""
+    event = {
+        "type": "REPORT_PROGRESS",
+        "order_reference": order.order_reference,
+        "job_id": job.id,
+        "stage": job.stage,
+        "status": job.status,
+    }
+    if job.status == DONE:
+        event["pdf_url"] = order.pdf_url
+    return event
+
+
+def progress_snapshot(order_reference: str) -> Optional[Dict[str, Any]]:
+    """Current REPORT_PROGRESS for a paid order, for a socket that just started watching."""
+    with database.SessionLocal() as db:
+        row = db.query(ReportJob, AdHocReportOrder).join(
+            AdHocReportOrder, AdHocReportOrder.id == ReportJob.order_id,
+        ).filter(
+            AdHocReportOrder.order_reference == order_reference,
+            AdHocReportOrder.payment_status.in_([PaymentStatus.PAID, PaymentStatus.INTERNAL_TEST]),
+        ).first()
+        return progress_event(*row) if row else None
+
+
+async def _publish(order_reference: str, job_id: int, stage: str, status: str, **extra):
+    from .routers.realtime import notifier
+    try:
+        await notifier.send_report(order_reference, {
+            "type": "REPORT_PROGRESS", "order_reference": order_reference,
+            "job_id": job_id, "stage": stage, "status": status, **extra,
+        })
+    except Exception as e:
+        logger.error(f"REPORT_PROGRESS for {order_reference} not delivered: {e}")
+
+
+# --- Job steps (DB work runs on the DB executor) -------------------------------
+
+def _claim(now: datetime, limit: int) -> list[dict]:
+    """Lease up to `limit` due jobs, including running ones whose lease lapsed."""
+    with database.SessionLocal() as db:
+        rows = db.query(ReportJob).filter(
+            ReportJob.status.in_([PENDING, RUNNING]),
+            ReportJob.next_attempt_at <= now,
+        ).order_by(ReportJob.id).limit(limit).with_for_update(skip_locked=True).all()
+        if not rows:
+            return []
+        refs = dict(db.query(AdHocReportOrder.id, AdHocReportOrder.order_reference).filter(
+            AdHocReportOrder.id.in_([r.order_id for r in rows]),
+        ).all())
+        lease_until = now + timedelta(seconds=REPORT_JOB_LEASE_SECS)
+        jobs = []
+        for row in rows:
+            if row.attempts >= REPORT_JOB_MAX_ATTEMPTS:
+                # Its last worker died mid-job (a report that takes the worker down with it).
+                row.status, row.finished_at = FAILED, now
+                row.last_error = row.last_error or "worker lost during the final attempt"
+                db.query(AdHocReportOrder).filter(AdHocReportOrder.id == row.order_id).update(
+                    {"report_status": ReportStatus.FAILED})
+                continue
+            row.status = RUNNING
+            row.attempts += 1
+            row.next_attempt_at = lease_until
+            jobs.append({"id": row.id, "order_id": row.order_id, "order_reference": refs[row.order_id],
+                         "attempt": row.attempts})
+        db.commit()
+        return jobs
+
+
+def _load(job_id: int, order_id: int) -> Optional[dict]:
+    """The inputs a report needs; None if it's already been delivered."""
+    with database.SessionLocal() as db:
+        order = db.get(AdHocReportOrder, order_id)
+        if order.report_status == ReportStatus.COMPLETED:
+            return None
+        lead = order.lead
+        inputs = {
+            "report_type": order.report_type,
+            "language": order.language,
+            "full_name": lead.full_name,
+            "phone_number": lead.phone_number,
+            "gender": lead.gender,
+            "dob": lead.date_of_birth,
+            "tob": lead.time_of_birth,
+            "pob": lead.place_of_birth,
+            "partner_full_name": lead.partner_full_name,
+            "partner_dob": lead.partner_date_of_birth,
+            "partner_tob": lead.partner_time_of_birth,
+            "partner_pob": lead.partner_place_of_birth,
+        }
+        order.report_status = ReportStatus.GENERATING
+        db.query(ReportJob).filter(ReportJob.id == job_id).update({"stage": CALCULATING})
+        db.commit()
+        return inputs
+
+
+def _renew(job_id: int, attempt: int) -> bool:
+    """Push a running job's lease out again; False if it's no longer this
+    attempt's (the lease lapsed and another worker claimed it)."""
+    with database.SessionLocal() as db:
+        renewed = db.query(ReportJob).filter(
+            ReportJob.id == job_id, ReportJob.status == RUNNING, ReportJob.attempts == attempt,
+        ).update({"next_attempt_at": datetime.utcnow() + timedelta(seconds=REPORT_JOB_LEASE_SECS)})
+        db.commit()
+        return bool(renewed)
+
+
+def _set_stage(job_id: int, stage: str):
+    with database.SessionLocal() as db:
+        db.query(ReportJob).filter(ReportJob.id == job_id).update({"stage": stage})
+        db.commit()
+
+
+def _store(job_id: int, order_id: int, order_reference: str, payload: dict, key: str) -> str:
+    with database.SessionLocal() as db:
+        order = db.get(AdHocReportOrder, order_id)
+        order.report_data = payload
+        order.pdf_url = f"/reports/{order_reference}/pdf"
+        order.pdf_sha256 = key
+        order.pdf_template_version = TEMPLATE_VERSION
+        order.report_status = ReportStatus.COMPLETED
+        db.add(ReportAnalytics(report_type=order.report_type, action="PAYMENT_SUCCESS", order_id=order.id))
+        db.query(ReportJob).filter(ReportJob.id == job_id).update({"stage": DELIVERING})
+        db.commit()
+        return order.pdf_url
+
+
+def _finish(job_id: int, order_id: int, whatsapp_sent: Optional[bool]):
+    with database.SessionLocal() as db:
+        if whatsapp_sent is not None:
+            db.query(AdHocReportOrder).filter(AdHocReportOrder.id == order_id).update({"whatsapp_sent": whatsapp_sent})
+        db.query(ReportJob).filter(ReportJob.id == job_id).update({
+            "status": DONE, "stage": COMPLETED, "last_error": None, "finished_at": datetime.utcnow(),
+        })
+        db.commit()
+
+
+def _fail(job_id: int, order_id: int, error: str) -> str:
+    """Record a failed attempt; returns the job's new status."""
+    now = datetime.utcnow()
+    with database.SessionLocal() as db:
+        job = db.get(ReportJob, job_id)
+        job.last_error = error
+        if job.attempts >= REPORT_JOB_MAX_ATTEMPTS:
+            job.status = FAILED
+            job.finished_at = now
+            db.query(AdHocReportOrder).filter(AdHocReportOrder.id == order_id).update(
+                {"report_status": ReportStatus.FAILED})
+        else:
+            job.status = PENDING
+            job.next_attempt_at = now + _backoff(job.attempts)
+        db.commit()
+        return job.status
+
+
+def _release(job_ids: list[int]):
+    """Hand jobs interrupted by shutdown straight back to the queue."""
+    with database.SessionLocal() as db:
+        db.query(ReportJob).filter(ReportJob.id.in_(job_ids), ReportJob.status == RUNNING).update({
+            "status": PENDING, "attempts": ReportJob.attempts - 1, "next_attempt_at": datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+
+
+def _prewarm_claim(limit: int) -> list[dict]:
+    """Completed orders whose PDF predates TEMPLATE_VERSION. They're marked
+    current as they're claimed so other workers skip them; one whose render
+    then fails just gets rendered on its next download instead."""
+    with database.SessionLocal() as db:
+        rows = db.query(AdHocReportOrder).filter(
+            AdHocReportOrder.report_status == ReportStatus.COMPLETED,
+            or_(AdHocReportOrder.pdf_template_version.is_(None),
+                AdHocReportOrder.pdf_template_version != TEMPLATE_VERSION),
+        ).order_by(AdHocReportOrder.id).limit(limit).with_for_update(skip_locked=True).all()
+        claimed = []
+        for row in rows:
+            row.pdf_template_version = TEMPLATE_VERSION
+            row.pdf_sha256 = None
+            if row.report_data:
+                claimed.append({"id": row.id, "report_type": row.report_type.value,
+                                "report_data": row.report_data, "order_reference": row.order_reference})
+        db.commit()
+        return claimed
+
+
+def _set_digest(order_id: int, key: str):
+    with database.SessionLocal() as db:
+        db.query(AdHocReportOrder).filter(
+            AdHocReportOrder.id == order_id, AdHocReportOrder.pdf_template_version == TEMPLATE_VERSION,
+        ).update({"pdf_sha256": key})
+        db.commit()
+
+
+def _render_to_store(report_type: str, payload: dict, order_reference: str, key: str):
+    """Render a report PDF into the store. Runs in a PDF pool process, so only
+    the path crosses back, not the document."""
+    pdf_store.put(pdf_store.REPORT, key, generate_report_pdf(report_type, payload, order_reference))
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = REPORT_JOB_RETRY_BASE_SECS * (2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+async def _generate(inputs: dict, on_stage) -> Dict[str, Any]:
+    report_type = inputs["report_type"]
+    if report_type == ReportType.FULL_KUNDLI:
+        return await generate_full_kundli_report(
+            full_name=inputs["full_name"],
+            dob=inputs["dob"],
+            tob=inputs["tob"],
+            pob=inputs["pob"],
+            gender=inputs["gender"] or "MALE",
+            language=inputs["language"],
+            on_stage=on_stage,
+        )
+    if report_type == ReportType.GUN_MILAN:
+        person1 = {
+            "full_name": inputs["full_name"],
+            "year": inputs["dob"].year, "month": inputs["dob"].month, "day": inputs["dob"].day,
+            "hour": inputs["tob"].hour, "minute": inputs["tob"].minute,
+            "place": inputs["pob"]
+        }
+        person2 = {
+            "full_name": inputs["partner_full_name"],
+            "year": inputs["partner_dob"].year, "month": inputs["partner_dob"].month, "day": inputs["partner_dob"].day,
+            "hour": inputs["partner_tob"].hour, "minute": inputs["partner_tob"].minute,
+            "place": inputs["partner_pob"]
+        }
+        return await generate_gun_milan_report(person1, person2, language=inputs["language"], on_stage=on_stage)
+    if report_type == ReportType.CAREER_FINANCE:
+        return await generate_career_finance_report(
+            full_name=inputs["full_name"],
+            dob=inputs["dob"],
+            tob=inputs["tob"],
+            pob=inputs["pob"],
+            language=inputs["language"],
+            on_stage=on_stage,
+        )
+    return {}
+
+
+def _send_report(inputs: dict, report_title: str, pdf_url: str) -> bool:
+    from .services.settings_service import get_setting
+    from .services.whatsapp_service import send_report_pdf
+    public_base = (get_setting("content_studio_public_base_url") or "https://api.aadikarta.org").rstrip("/")
+    return send_report_pdf(
+        to_phone=inputs["phone_number"],
+        full_name=inputs["full_name"],
+        report_title=report_title,
+        pdf_url=f"{public_base}{pdf_url}",
+    )
+
+
+# --- Worker --------------------------------------------------------------------
+
+class ReportWorker:
+    """Per-process job loop; see the module docstring."""
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._jobs: dict[asyncio.Task, int] = {}
+        self._pdf_pool: ProcessPoolExecutor | None = None
+        self._prewarm_task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._jobs = {}
+            self._task = loop.create_task(self._run())
+            self._prewarm_task = loop.create_task(self._prewarm())
+
+    async def stop(self):
+        """Stop claiming, cancel the jobs in flight and put them back in the queue."""
+        task, self._task = self._task, None
+        prewarm, self._prewarm_task = self._prewarm_task, None
+        tasks = [t for t in (task, prewarm) if t is not None] + list(self._jobs)
+        job_ids = list(self._jobs.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if job_ids:
+            await database.run_db(_release, job_ids)
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown(wait=False, cancel_futures=True)
+            self._pdf_pool = None
+
+    def wake(self):
+        """Cut the idle wait short. Safe from any thread; a no-op until start()."""
+        loop, event = self._loop, self._wakeup
+        if loop is None or event is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Report worker error: {e}")
+            try:
+                async with asyncio.timeout(REPORT_JOB_POLL_SECS):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def run_once(self) -> int:
+        """Start as many due jobs as there are free slots; returns how many."""
+        free = REPORT_WORKER_CONCURRENCY - len(self._jobs)
+        if free <= 0:
+            return 0
+        jobs = await database.run_db(_claim, datetime.utcnow(), free)
+        for job in jobs:
+            task = asyncio.get_running_loop().create_task(self._process(job))
+            self._jobs[task] = job["id"]
+            task.add_done_callback(self._job_done)
+        return len(jobs)
+
+    def _job_done(self, task: asyncio.Task):
+        self._jobs.pop(task, None)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _process(self, job: dict):
+        job_id, order_id, ref = job["id"], job["order_id"], job["order_reference"]
+        stage = CALCULATING
+
+        async def on_stage(next_stage: str):
+            nonlocal stage
+            stage = next_stage
+            await database.run_db(_set_stage, job_id, stage)
+            await _publish(ref, job_id, stage, RUNNING)
+
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job, asyncio.current_task()))
+        try:
+            inputs = await database.run_db(_load, job_id, order_id)
+            if inputs is None:
+                await database.run_db(_finish, job_id, order_id, None)
+                await _publish(ref, job_id, COMPLETED, DONE, pdf_url=f"/reports/{ref}/pdf")
+                return
+            await _publish(ref, job_id, stage, RUNNING)
+
+            payload = await _generate(inputs, on_stage)
+            await on_stage(RENDERING)
+            key = await self._render(inputs["report_type"].value, payload, ref)
+
+            stage = DELIVERING
+            pdf_url = await database.run_db(_store, job_id, order_id, ref, payload, key)
+            await _publish(ref, job_id, stage, RUNNING)
+            report_title = payload.get("report_title", "Aadikarta Vedic Report")
+            whatsapp_sent = await asyncio.to_thread(_send_report, inputs, report_title, pdf_url)
+
+            await database.run_db(_finish, job_id, order_id, whatsapp_sent)
+            await _publish(ref, job_id, COMPLETED, DONE, pdf_url=pdf_url)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Report job {job_id} ({ref}) failed at {stage}: {e}")
+            status = await database.run_db(_fail, job_id, order_id, str(e)[:500])
+            await _publish(ref, job_id, stage, status)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: dict, processing: asyncio.Task):
+        """Keep the job's lease alive while `processing` runs; cancel it if
+        the job has been claimed by another worker meanwhile."""
+        while True:
+            await asyncio.sleep(REPORT_JOB_LEASE_SECS / 3)
+            try:
+                renewed = await database.run_db(_renew, job["id"], job["attempt"])
+            except Exception as e:
+                logger.warning(f"Lease renewal for report job {job['id']} failed: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Report job {job['id']} ({job['order_reference']}) was taken over; stopping here")
+                processing.cancel()
+                return
+
+    async def _render(self, report_type: str, payload: dict, order_reference: str) -> str:
+        """Make sure the PDF for these inputs is in the store; returns its key."""
+        key = report_digest(report_type, payload, order_reference)
+        if await asyncio.to_thread(pdf_store.exists, pdf_store.REPORT, key):
+            return key
+        if REPORT_PDF_PROCESSES <= 0:
+            await asyncio.to_thread(_render_to_store, report_type, payload, order_reference, key)
+            return key
+        if self._pdf_pool is None:
+            # spawn, not fork: the parent has live threads (DB executor, HTTP clients).
+            self._pdf_pool = ProcessPoolExecutor(max_workers=REPORT_PDF_PROCESSES,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._pdf_pool, _render_to_store, report_type, payload, order_reference, key,
+            )
+        except BrokenProcessPool:
+            self._pdf_pool = None
+            raise
+        return key
+
+    async def prewarm_once(self) -> int:
+        """Re-render one batch of out-of-date report PDFs; returns how many were claimed."""
+        orders = await database.run_db(_prewarm_claim, REPORT_PREWARM_BATCH)
+        for order in orders:
+            try:
+                key = await self._render(order["report_type"], order["report_data"], order["order_reference"])
+            except Exception as e:
+                logger.warning(f"PDF pre-warm failed for {order['order_reference']}: {e}")
+                continue
+            await database.run_db(_set_digest, order["id"], key)
+        return len(orders)
+
+    async def _prewarm(self):
+        while True:
+            try:
+                warmed = await self.prewarm_once()
+                if not warmed:
+                    await asyncio.to_thread(pdf_store.prune, pdf_store.ADMIN_EXPORT,
+                                            pdf_store.PDF_STORE_EXPORT_RETENTION_HOURS * 3600)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"PDF pre-warm error: {e}")
+                warmed = 0
+            await asyncio.sleep(REPORT_JOB_POLL_SECS if warmed else REPORT_PREWARM_IDLE_SECS)
+
+
+worker = ReportWorker()
+
+
+async def _serve():
+    from . import http_clients
+    from .backplane import backplane
+    from .services import settings_service
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    settings_service.start()
+    backplane.start()
+    http_clients.startup()
+    worker.start()
+    logger.info(f"Report worker running ({REPORT_WORKER_CONCURRENCY} jobs, {REPORT_PDF_PROCESSES} PDF processes)")
+    await stopping.wait()
+    await worker.stop()
+    await http_clients.aclose_all()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_serve())
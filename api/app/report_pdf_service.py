@@ -3,12 +3,24 @@ Renders a completed ad-hoc report's JSON payload (see report_generator_service.p
 into a downloadable PDF using reportlab — same library already used for the
 admin CSV/table exports in routers/admin.py, but laid out as a narrative
 document instead of a table.
+
+Everything that doesn't depend on the report is built once per process (the
+report worker's PDF pool keeps its processes): paragraph and table styles, the
+chart's diamond geometry and label anchors and the status-card icon outlines.
+The cover image is still drawn through platypus' Image (canvas.drawImage) and
+encoded into each document; sharing one encoded stream would mean reaching
+into reportlab's private image registry. The reportlab flowables and shapes
+themselves are still made per render: drawing them sets per-document state on
+them (canv, _canvas), so sharing instances between threads rendering at the
+same time isn't safe, and they're cheap next to laying out the text.
+scripts/bench_report_pdf.py measures reports/second per report type.
 """
 import calendar
 import io
 import os
 import re
 from datetime import date as _date
+from functools import lru_cache
 from typing import Any, Dict, Optional, Tuple
 from xml.sax.saxutils import escape
 
@@ -19,6 +31,13 @@ from reportlab.lib.units import mm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable, Table, TableStyle, Image, PageBreak
 from reportlab.graphics.shapes import Drawing, Rect, Line, Polygon, String, Circle
 
+from . import pdf_store
+
+# Bump whenever the rendered output changes (layout, styles, images, wording):
+# stored PDFs are keyed on it, so the report worker re-renders every completed
+# report under the new version and nothing serves the old layout.
+TEMPLATE_VERSION = 1
+
 _STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 _GANPATI_IMAGE_PATH = os.path.join(_STATIC_DIR, "ganpati.png")
 
@@ -40,6 +59,7 @@ _PLANET_SHORT = {
 }
 
 
+@lru_cache(maxsize=None)
 def _house_polygons(size: float):
     A, B, C, D = (0, 0), (size, 0), (size, size), (0, size)
     P, Q, R, Sm = (size / 2, 0), (size, size / 2), (size / 2, size), (0, size / 2)
@@ -58,6 +78,30 @@ def _centroid(points):
     return (sum(p[0] for p in points) / n, sum(p[1] for p in points) / n)
 
 
+@lru_cache(maxsize=None)
+def _house_anchors(size: float) -> Tuple[Tuple[int, float, float], ...]:
+    """(house, x, y) label anchor of each house, in reportlab coordinates."""
+    anchors = []
+    for house, points in _house_polygons(size).items():
+        # SVG y-axis points down; reportlab's points up — flip here so the
+        # layout matches the web chart when read top-to-bottom.
+        cx, cy = _centroid([(x, size - y) for x, y in points])
+        anchors.append((house, cx, cy))
+    return tuple(anchors)
+
+
+_CHART_BORDER = colors.HexColor("#8B4513")
+_CHART_LINE = colors.HexColor("#B8860B")
+_CHART_TITLE = colors.HexColor("#3D2400")
+_CHART_SIGN = colors.HexColor("#5C3D00")
+_CHART_PLANET = colors.HexColor("#111111")
+
+
+@lru_cache(maxsize=None)
+def _chart_diamond(size: float) -> Tuple[float, ...]:
+    return (size / 2, size, size, size / 2, size / 2, 0, 0, size / 2)
+
+
 def _north_indian_chart_drawing(division_chart: Dict[str, Any], title: str, size: float = 260) -> Drawing:
     """Draws a North Indian diamond birth chart — same geometry/labels as the
     web KundliChart component, rendered with reportlab shapes for the PDF."""
@@ -69,35 +113,40 @@ def _north_indian_chart_drawing(division_chart: Dict[str, Any], title: str, size
         planets_by_house.setdefault(p.get("house"), []).append(p)
 
     d = Drawing(size, size)
-    d.add(Rect(0, 0, size, size, strokeColor=colors.HexColor("#8B4513"), strokeWidth=1.2, fillColor=None))
-    d.add(Line(0, size, size, 0, strokeColor=colors.HexColor("#B8860B"), strokeWidth=0.8))
-    d.add(Line(0, 0, size, size, strokeColor=colors.HexColor("#B8860B"), strokeWidth=0.8))
-    d.add(Polygon(
-        [size / 2, size, size, size / 2, size / 2, 0, 0, size / 2],
-        strokeColor=colors.HexColor("#B8860B"), strokeWidth=0.8, fillColor=None,
-    ))
-    d.add(String(size / 2, size / 2 + 4, title, textAnchor="middle", fontSize=8, fontName="Helvetica-Bold", fillColor=colors.HexColor("#3D2400")))
+    d.add(Rect(0, 0, size, size, strokeColor=_CHART_BORDER, strokeWidth=1.2, fillColor=None))
+    d.add(Line(0, size, size, 0, strokeColor=_CHART_LINE, strokeWidth=0.8))
+    d.add(Line(0, 0, size, size, strokeColor=_CHART_LINE, strokeWidth=0.8))
+    d.add(Polygon(_chart_diamond(size), strokeColor=_CHART_LINE, strokeWidth=0.8, fillColor=None))
+    d.add(String(size / 2, size / 2 + 4, title, textAnchor="middle", fontSize=8, fontName="Helvetica-Bold", fillColor=_CHART_TITLE))
 
-    for house, points in _house_polygons(size).items():
-        # SVG y-axis points down; reportlab's points up — flip here so the
-        # layout matches the web chart when read top-to-bottom.
-        flipped = [(x, size - y) for x, y in points]
-        cx, cy = _centroid(flipped)
+    for house, cx, cy in _house_anchors(size):
         sign = sign_by_house.get(house)
         house_planets = planets_by_house.get(house, [])
 
         label = f"{_RASHI_ABBR.get(sign.get('sign'), (sign.get('sign') or '')[:3])}({sign.get('sign_id')}) H{house}" if sign else f"H{house}"
-        d.add(String(cx, cy + (10 if house_planets else 0), label, textAnchor="middle", fontSize=6, fontName="Helvetica-Bold", fillColor=colors.HexColor("#5C3D00")))
+        d.add(String(cx, cy + (10 if house_planets else 0), label, textAnchor="middle", fontSize=6, fontName="Helvetica-Bold", fillColor=_CHART_SIGN))
 
         for idx, planet in enumerate(house_planets):
             short = _PLANET_SHORT.get((planet.get("name") or "").lower(), (planet.get("name") or "")[:2])
             retro = "*" if planet.get("is_retrograde") else ""
             py = cy - 4 - (idx * 9)
-            d.add(String(cx, py, f"{short}{retro}", textAnchor="middle", fontSize=7, fontName="Helvetica-Bold", fillColor=colors.HexColor("#111111")))
+            d.add(String(cx, py, f"{short}{retro}", textAnchor="middle", fontSize=7, fontName="Helvetica-Bold", fillColor=_CHART_PLANET))
 
     return d
 
 
+# Shared by every data table; setStyle() only reads it.
+_DATA_TABLE_STYLE = TableStyle([
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fef3c7")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), _AMBER_DARK),
+    ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#eee")),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+    ("TOPPADDING", (0, 0), (-1, -1), 3),
+])
+
+
 def _planets_table(planets: list) -> Table:
     header = ["Planet", "Sign", "House", "Degree", "Nakshatra", "Retro"]
     rows = [header]
@@ -112,15 +161,7 @@ def _planets_table(planets: list) -> Table:
             "Yes" if p.get("is_retrograde") else "-",
         ])
     t = Table(rows, colWidths=[24 * mm, 24 * mm, 16 * mm, 20 * mm, 32 * mm, 16 * mm])
-    t.setStyle(TableStyle([
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fef3c7")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), _AMBER_DARK),
-        ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#eee")),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-        ("TOPPADDING", (0, 0), (-1, -1), 3),
-    ]))
+    t.setStyle(_DATA_TABLE_STYLE)
     return t
 
 
@@ -135,15 +176,7 @@ def _dasha_table(vimshottari: Dict[str, Any]) -> Table:
             str(period.get("end", "-"))[:10],
         ])
     t = Table(rows, colWidths=[28 * mm, 24 * mm, 30 * mm, 30 * mm])
-    t.setStyle(TableStyle([
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fef3c7")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), _AMBER_DARK),
-        ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#eee")),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-        ("TOPPADDING", (0, 0), (-1, -1), 3),
-    ]))
+    t.setStyle(_DATA_TABLE_STYLE)
     return t
 
 
@@ -184,15 +217,23 @@ def _mahadasha_timeline_table(timeline: list) -> Table:
             f"{period.get('duration_years', '-')} yrs" if period.get("duration_years") is not None else "-",
         ])
     t = Table(rows, colWidths=[24 * mm, 30 * mm, 30 * mm, 22 * mm])
-    t.setStyle(TableStyle([
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fef3c7")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), _AMBER_DARK),
-        ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#eee")),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-        ("TOPPADDING", (0, 0), (-1, -1), 3),
-    ]))
+    t.setStyle(_DATA_TABLE_STYLE)
+    return t
+
+
+def _saturn_transit_table(windows: list) -> Table:
+    """Lifetime Shani transit table — every Sade Sati (with its phases) and
+    Dhaiya window from chart.sade_sati.lifetime."""
+    rows = [["Period", "Start", "End"]]
+    for w in windows:
+        label = w.get("name", "-")
+        if w.get("house_from_moon"):
+            label = f"{label} (Dhaiya, {w['house_from_moon']}th from Moon)"
+        rows.append([label, str(w.get("start", "-")), str(w.get("end", "-"))])
+        for phase in w.get("phases") or []:
+            rows.append([f"    {phase.get('phase', '-')} phase", str(phase.get("start", "-")), str(phase.get("end", "-"))])
+    t = Table(rows, colWidths=[70 * mm, 30 * mm, 30 * mm])
+    t.setStyle(_DATA_TABLE_STYLE)
     return t
 
 
@@ -229,22 +270,24 @@ def _flame_icon(size: float, color: colors.Color) -> Drawing:
     """Manglik Dosha (Mars) — a simple flame silhouette, echoing the web
     report's Flame icon."""
     d = Drawing(size, size)
-    d.add(Polygon(
-        [
-            size * 0.5, size * 0.95,
-            size * 0.75, size * 0.6,
-            size * 0.65, size * 0.62,
-            size * 0.7, size * 0.3,
-            size * 0.5, size * 0.05,
-            size * 0.3, size * 0.3,
-            size * 0.35, size * 0.62,
-            size * 0.25, size * 0.6,
-        ],
-        fillColor=color, strokeColor=None,
-    ))
+    d.add(Polygon(_flame_outline(size), fillColor=color, strokeColor=None))
     return d
 
 
+@lru_cache(maxsize=None)
+def _flame_outline(size: float) -> Tuple[float, ...]:
+    return (
+        size * 0.5, size * 0.95,
+        size * 0.75, size * 0.6,
+        size * 0.65, size * 0.62,
+        size * 0.7, size * 0.3,
+        size * 0.5, size * 0.05,
+        size * 0.3, size * 0.3,
+        size * 0.35, size * 0.62,
+        size * 0.25, size * 0.6,
+    )
+
+
 def _infinity_icon(size: float, color: colors.Color) -> Drawing:
     """Kala Sarpa Yoga — two interlocking rings echoing the web report's
     Infinity icon (all classical planets bound within one nodal arc)."""
@@ -272,6 +315,9 @@ _STATUS_ICONS = {
 }
 
 
+_STATUS_CELL_STYLE = ParagraphStyle("StatusCell", fontSize=9, leading=12)
+
+
 def _status_table(title: str, present: bool, description: str, icon: Optional[str] = None) -> Table:
     """A colored status card (red=present/dosha, green=clear) with an
     optional themed icon — mirrors the DoshaCard component in the web
@@ -284,7 +330,7 @@ def _status_table(title: str, present: bool, description: str, icon: Optional[st
     cell = Paragraph(
         f"<b>{escape(title)}</b> &mdash; <font color='{text_color.hexval()}'><b>{label}</b></font><br/>"
         f"<font size=8 color='#555'>{escape(description or '')}</font>",
-        ParagraphStyle("StatusCell", fontSize=9, leading=12),
+        _STATUS_CELL_STYLE,
     )
     icon_fn = _STATUS_ICONS.get(icon) if icon else None
     if icon_fn:
@@ -311,31 +357,40 @@ def _status_table(title: str, present: bool, description: str, icon: Optional[st
     return t
 
 
+_ASHTAKAVARGA_TABLE_STYLE = TableStyle([
+    ("FONTSIZE", (0, 0), (-1, -1), 7),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fef3c7")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), _AMBER_DARK),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#eee")),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+    ("TOPPADDING", (0, 0), (-1, -1), 3),
+])
+
+
 def _ashtakavarga_table(sarva: list, total_points: Any) -> Table:
     signs = ["Ari", "Tau", "Gem", "Can", "Leo", "Vir", "Lib", "Sco", "Sag", "Cap", "Aqu", "Pis"]
     rows = [signs, [str(p) for p in sarva]]
     t = Table(rows, colWidths=[14.1 * mm] * 12)
-    t.setStyle(TableStyle([
-        ("FONTSIZE", (0, 0), (-1, -1), 7),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fef3c7")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), _AMBER_DARK),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#eee")),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-        ("TOPPADDING", (0, 0), (-1, -1), 3),
-    ]))
+    t.setStyle(_ASHTAKAVARGA_TABLE_STYLE)
     return t
 
 
+@lru_cache(maxsize=None)
 def _styles():
+    """Paragraph styles, built once; shared read-only by every render."""
     styles = getSampleStyleSheet()
+    title = ParagraphStyle("AadiTitle", parent=styles["Title"], textColor=_AMBER_DARK, fontSize=18, leading=22)
+    eyebrow = ParagraphStyle("AadiEyebrow", parent=styles["Normal"], textColor=_AMBER, fontSize=9)
     return {
-        "title": ParagraphStyle("AadiTitle", parent=styles["Title"], textColor=_AMBER_DARK, fontSize=18, leading=22),
-        "eyebrow": ParagraphStyle("AadiEyebrow", parent=styles["Normal"], textColor=_AMBER, fontSize=9),
+        "title": title,
+        "eyebrow": eyebrow,
         "heading": ParagraphStyle("AadiHeading", parent=styles["Heading2"], textColor=_AMBER_DARK, fontSize=13, spaceBefore=10, spaceAfter=4),
         "body": ParagraphStyle("AadiBody", parent=styles["Normal"], fontSize=10, leading=15),
         "small": ParagraphStyle("AadiSmall", parent=styles["Normal"], fontSize=8, textColor=colors.grey),
+        "cover_title": ParagraphStyle("AadiCoverTitle", parent=title, alignment=1, fontSize=22, spaceBefore=14),
+        "cover_subtitle": ParagraphStyle("AadiCoverSubtitle", parent=eyebrow, alignment=1, fontSize=11),
     }
 
 
@@ -366,6 +421,11 @@ def _markdown_bold_to_tags(escaped_text: str) -> str:
     return _BOLD_RE.sub(r"<b>\1</b>", escaped_text)
 
 
+def report_digest(report_type: str, report_data: Dict[str, Any], order_reference: str) -> str:
+    """pdf_store key of the PDF generate_report_pdf makes from these inputs."""
+    return pdf_store.digest(pdf_store.REPORT, TEMPLATE_VERSION, report_type, report_data, order_reference)
+
+
 def generate_report_pdf(report_type: str, report_data: Dict[str, Any], order_reference: str) -> bytes:
     styles = _styles()
     buffer = io.BytesIO()
@@ -375,12 +435,6 @@ def generate_report_pdf(report_type: str, report_data: Dict[str, Any], order_ref
         title=report_data.get("report_title", "Aadikarta Vedic Report"),
     )
 
-    cover_title_style = ParagraphStyle(
-        "AadiCoverTitle", parent=styles["title"], alignment=1, fontSize=22, spaceBefore=14,
-    )
-    cover_subtitle_style = ParagraphStyle(
-        "AadiCoverSubtitle", parent=styles["eyebrow"], alignment=1, fontSize=11,
-    )
     elements = [
         Spacer(1, 40 * mm),
     ]
@@ -389,8 +443,8 @@ def generate_report_pdf(report_type: str, report_data: Dict[str, Any], order_ref
         img.hAlign = "CENTER"
         elements.append(img)
         elements.append(Spacer(1, 8 * mm))
-    elements.append(Paragraph("AADIKARTA VEDIC ASTROLOGY", cover_title_style))
-    elements.append(Paragraph("Certified Vedic Analysis &bull; Aadikarta.org", cover_subtitle_style))
+    elements.append(Paragraph("AADIKARTA VEDIC ASTROLOGY", styles["cover_title"]))
+    elements.append(Paragraph("Certified Vedic Analysis &bull; Aadikarta.org", styles["cover_subtitle"]))
     elements.append(PageBreak())
 
     elements.append(Paragraph("AADIKARTA.ORG &mdash; CERTIFIED VEDIC ANALYSIS", styles["eyebrow"]))
@@ -481,7 +535,9 @@ def generate_report_pdf(report_type: str, report_data: Dict[str, Any], order_ref
         ashtakavarga = chart_data_full.get("ashtakavarga") or {}
         sarva = ashtakavarga.get("sarvashtakavarga")
 
-        if manglik or kalasarpa or active_yogas or sade_sati.get("active") or sarva:
+        saturn_windows = sade_sati.get("lifetime") or []
+
+        if manglik or kalasarpa or active_yogas or sade_sati.get("active") or saturn_windows or sarva:
             elements.append(Paragraph("Dosha, Yoga &amp; Strength Analysis", styles["heading"]))
 
         if manglik:
@@ -509,6 +565,11 @@ def generate_report_pdf(report_type: str, report_data: Dict[str, Any], order_ref
                 icon="sadesati",
             ))
             elements.append(Spacer(1, 3 * mm))
+        if saturn_windows:
+            elements.append(Paragraph("Shani Sade Sati &amp; Dhaiya — Lifetime Periods", styles["small"]))
+            elements.append(Spacer(1, 1 * mm))
+            elements.append(_saturn_transit_table(saturn_windows))
+            elements.append(Spacer(1, 3 * mm))
 
         if active_yogas:
             names = ", ".join(escape(y.get("name", "")) for y in active_yogas)
@@ -0,0 +1,242 @@
+"""
+Response cache for public read endpoints.
+
+The homepage and blog hit the same handful of public routes (trust stats,
+posts, pages, horoscopes, testimonials) with identical parameters, and each
+call re-runs its queries and re-serializes the same JSON. A route opts in with
+
+    router = APIRouter(..., route_class=response_cache.CachingRoute)
+
+    @router.get("/posts")
+    @response_cache.cached("posts", ttl=300)
+    def get_public_posts(...): ...
+
+and its 200 responses are kept, keyed by path + query string, as the final
+JSON body, a gzipped copy and an ETag: in an in-process LRU first, then in
+Redis so every worker shares one fill. Requests carrying a matching
+If-None-Match get a 304 with no body. The route sets its own Cache-Control
+(public, must revalidate), which the edge middleware leaves in place of its
+no-store default.
+
+Writes that change what a namespace serves call invalidate(namespace) after
+committing. That bumps the namespace's version in Redis (entries are stored
+under the version, so stale ones just age out); other workers pick the new
+version up within RESPONSE_CACHE_VERSION_SECS. Without Redis each worker
+caches on its own and only the writing worker sees the invalidation before
+the TTL.
+
+Tunables (env):
+  RESPONSE_CACHE_L1_SIZE        in-process entries (default 512)
+  RESPONSE_CACHE_VERSION_SECS   how stale a worker's view of a namespace
+                                version may be (default 1)
+"""
+import collections
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from .redis_client import get_redis_bytes
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_L1_SIZE = int(os.getenv("RESPONSE_CACHE_L1_SIZE", "512"))
+RESPONSE_CACHE_VERSION_SECS = float(os.getenv("RESPONSE_CACHE_VERSION_SECS", "1"))
+_REDIS_RETRY_SECS = 30.0
+# Same threshold as ConditionalGZipMiddleware: smaller bodies go out as-is.
+_GZIP_MIN_SIZE = 1024
+CACHE_CONTROL = "public, no-cache"
+
+
+@dataclass
+class _Entry:
+    etag: str
+    body: bytes
+    gz: bytes | None
+    expires_at: float
+
+
+_lru: collections.OrderedDict = collections.OrderedDict()
+_lru_lock = threading.Lock()
+# namespace -> [local generation, redis version, monotonic time last read]
+_versions: dict[str, list] = {}
+_redis_down_until = 0.0
+
+
+def _redis():
+    if time.monotonic() < _redis_down_until:
+        return None
+    return get_redis_bytes()
+
+
+def _redis_failed(action: str, e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECS
+    logger.warning(f"response cache {action} failed, caching in-process only: {e}")
+
+
+def _version(namespace: str) -> tuple:
+    state = _versions.setdefault(namespace, [0, b"0", 0.0])
+    if time.monotonic() - state[2] >= RESPONSE_CACHE_VERSION_SECS:
+        redis = _redis()
+        if redis:
+            try:
+                state[1] = redis.get(f"rc:ver:{namespace}") or b"0"
+            except Exception as e:
+                _redis_failed("version read", e)
+        state[2] = time.monotonic()
+    return state[0], state[1]
+
+
+def invalidate(*namespaces: str):
+    """Drop everything cached under these namespaces, on every worker."""
+    redis = _redis()
+    for namespace in namespaces:
+        state = _versions.setdefault(namespace, [0, b"0", 0.0])
+        state[0] += 1
+        if redis:
+            try:
+                state[1] = str(redis.incr(f"rc:ver:{namespace}")).encode()
+                state[2] = time.monotonic()
+            except Exception as e:
+                _redis_failed("invalidation", e)
+    with _lru_lock:
+        for key in [k for k in _lru if k[0] in namespaces]:
+            del _lru[key]
+
+
+def _l1_get(key: tuple) -> _Entry | None:
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del _lru[key]
+            return None
+        _lru.move_to_end(key)
+        return entry
+
+
+def _l1_put(key: tuple, entry: _Entry):
+    with _lru_lock:
+        _lru[key] = entry
+        _lru.move_to_end(key)
+        while len(_lru) > RESPONSE_CACHE_L1_SIZE:
+            _lru.popitem(last=False)
+
+
+def _redis_get(redis_key: str) -> _Entry | None:
+    redis = _redis()
+    if not redis:
+        return None
+    try:
+        pipe = redis.pipeline(transaction=False)
+        pipe.hgetall(redis_key)
+        pipe.ttl(redis_key)
+        fields, ttl = pipe.execute()
+    except Exception as e:
+        _redis_failed("read", e)
+        return None
+    if not fields or ttl is None or ttl <= 0:
+        return None
+    return _Entry(fields[b"etag"].decode(), fields[b"body"], fields.get(b"gz") or None, time.monotonic() + ttl)
+
+
+def _redis_put(redis_key: str, entry: _Entry, ttl: int):
+    redis = _redis()
+    if not redis:
+        return
+    try:
+        pipe = redis.pipeline(transaction=True)
+        pipe.hset(redis_key, mapping={"etag": entry.etag, "body": entry.body, "gz": entry.gz or b""})
+        pipe.expire(redis_key, ttl)
+        pipe.execute()
+    except Exception as e:
+        _redis_failed("write", e)
+
+
+def _make_entry(body: bytes, ttl: int) -> _Entry:
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    gz = gzip.compress(body, compresslevel=6) if len(body) >= _GZIP_MIN_SIZE else None
+    if gz is not None and len(gz) >= len(body):
+        gz = None
+    return _Entry(etag, body, gz, time.monotonic() + ttl)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _respond(request: Request, entry: _Entry) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    if entry.gz is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gz, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+class _Policy:
+    def __init__(self, namespace: str, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _keys(self, request: Request, version: tuple) -> tuple[tuple, str]:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()
+        return (self.namespace, version, digest), f"rc:{self.namespace}:{version[1].decode()}:{digest}"
+
+    async def serve(self, request: Request, handler) -> Response:
+        version = _version(self.namespace)
+        l1_key, redis_key = self._keys(request, version)
+        entry = _l1_get(l1_key)
+        if entry is not None:
+            return _respond(request, entry)
+
+        if _redis():
+            entry = await run_in_threadpool(_redis_get, redis_key)
+            if entry is not None:
+                _l1_put(l1_key, entry)
+                return _respond(request, entry)
+
+        response = await handler(request)
+        if response.status_code != 200 or not hasattr(response, "body"):
+            return response
+        entry = _make_entry(bytes(response.body), self.ttl)
+        _l1_put(l1_key, entry)
+        if _redis():
+            await run_in_threadpool(_redis_put, redis_key, entry, self.ttl)
+        return _respond(request, entry)
+
+
+def cached(namespace: str, ttl: int):
+    """Mark a route's 200 responses as cacheable for `ttl` seconds under
+    `namespace`. Takes effect on routers built with CachingRoute."""
+    def mark(endpoint):
+        endpoint.__response_cache__ = _Policy(namespace, ttl)
+        return endpoint
+    return mark
+
+
+class CachingRoute(APIRoute):
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        policy = getattr(self.endpoint, "__response_cache__", None)
+        if policy is None:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            return await policy.serve(request, handler)
+        return cached_handler
+
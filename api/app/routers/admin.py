@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Request
 from sqlalchemy.orm import Session
+from sqlalchemy import Integer, String, and_, cast, null, or_, union_all
 from sqlalchemy.sql import func
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, Field
@@ -9,7 +9,7 @@ import shutil
 import uuid
 import os
 from datetime import datetime, timedelta, date, time
-from .. import models, schemas, database, audit
+from .. import models, schemas, database, audit, chat_history, exports, response_cache, wallet_ledger
 from ..schemas import _validate_strong_password
 from .. import models_edu, schemas_edu
 from decimal import Decimal
@@ -31,13 +31,7 @@ from ..services.email_service import (
     ONBOARDING_CALENDAR_ATTENDEE,
 )
 import base64
-import io
-import csv
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 
 router = APIRouter(
     prefix="/admin",
@@ -234,6 +228,10 @@ def delete_user(user_id: int, db: Session = Depends(database.get_db)):
             detail="Cannot delete a user with payment order history. Contact support to archive the account instead.",
         )
 
+    # Rooms whose recent-message rings hold this user's messages by sender_id.
+    chat_rooms = [cid for (cid,) in db.query(models.ChatMessage.consultation_id)
+                  .filter(models.ChatMessage.sender_id == user_id).distinct()]
+
     # Nullify nullable FK references to preserve historical records
     db.query(models.Consultation).filter(models.Consultation.astrologer_id == user_id).update({"astrologer_id": None})
     db.query(models.Consultation).filter(models.Consultation.seeker_id == user_id).update({"seeker_id": None})
@@ -269,6 +267,7 @@ def delete_user(user_id: int, db: Session = Depends(database.get_db)):
             status_code=409,
             detail="Cannot delete user: related records still reference this account.",
         )
+    chat_history.forget(chat_rooms)
     return {"message": "User deleted"}
 
 @router.put("/users/{user_id}/verify")
@@ -878,37 +877,10 @@ def _user_display_name(db: Session, user_id: int) -> str:
     profile = db.query(models.SeekerProfile).filter(models.SeekerProfile.user_id == user_id).first()
     return (profile.full_name if profile and profile.full_name else None) or user.email or f"User #{user_id}"
 
-def _build_pdf_report(title: str, subtitle: str, headers: List[str], rows: List[list], col_widths: List[float]) -> io.BytesIO:
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=15 * mm, bottomMargin=15 * mm)
-    styles = getSampleStyleSheet()
-    elements = [
-        Paragraph(title, styles["Title"]),
-        Paragraph(subtitle, styles["Normal"]),
-        Spacer(1, 8 * mm),
-    ]
-
-    table_data = [headers] + rows
-    table = Table(table_data, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4f46e5")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f3f4f6")]),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("TOPPADDING", (0, 0), (-1, -1), 4),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-    ]))
-    elements.append(table)
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
-
 @router.get("/users/{user_id}/consultations/export")
 def export_user_consultations(
     user_id: int,
+    request: Request,
     search: Optional[str] = None,
     consultation_type: Optional[models.ConsultationType] = None,
     status: Optional[models.ConsultationStatus] = None,
@@ -917,92 +889,164 @@ def export_user_consultations(
     db: Session = Depends(database.get_db),
 ):
     query = _query_user_consultations(db, user_id, search, consultation_type, status, date_from, date_to)
-    rows = query.order_by(models.Consultation.created_at.desc()).all()
+    cons = models.Consultation
+    ordered = query.order_by(cons.created_at.desc(), cons.id.desc())
+    # Consultations change in place (status, duration, cost), so the stored
+    # export is keyed on per-status aggregates rather than just count and id.
+    by_status = [
+        list(row) for row in query.with_entities(
+            cons.status, func.count(cons.id), func.max(cons.id),
+            func.sum(cons.duration_seconds), func.sum(cons.total_cost),
+        ).group_by(cons.status).order_by(cons.status)
+    ]
+    # The astrologer names are joined in and can be edited without touching a
+    # consultation; profiles carry no update marker, so key on the names.
+    astrologer_names = [
+        list(row) for row in query.with_entities(cons.astrologer_id, models.AstrologerProfile.full_name)
+        .distinct().order_by(cons.astrologer_id)
+    ]
 
     name = _user_display_name(db, user_id)
     period = f"{date_from or 'Start'} to {date_to or 'Today'}"
-    table_rows = []
-    for c, astrologer_name in rows:
-        duration = f"{(c.duration_seconds or 0) // 60}m {(c.duration_seconds or 0) % 60}s"
-        table_rows.append([
-            c.created_at.strftime("%Y-%m-%d %H:%M") if c.created_at else "-",
-            c.consultation_type.value if hasattr(c.consultation_type, "value") else c.consultation_type,
-            astrologer_name or f"Astrologer #{c.astrologer_id}",
-            duration,
-            f"Rs. {float(c.total_cost or 0):.2f}",
-            c.status.value if hasattr(c.status, "value") else c.status,
-        ])
-
-    buffer = _build_pdf_report(
+
+    def table_rows():
+        for c, astrologer_name in exports.stream(ordered):
+            duration = f"{(c.duration_seconds or 0) // 60}m {(c.duration_seconds or 0) % 60}s"
+            yield [
+                c.created_at.strftime("%Y-%m-%d %H:%M") if c.created_at else "-",
+                c.consultation_type.value if hasattr(c.consultation_type, "value") else c.consultation_type,
+                astrologer_name or f"Astrologer #{c.astrologer_id}",
+                duration,
+                f"Rs. {float(c.total_cost or 0):.2f}",
+                c.status.value if hasattr(c.status, "value") else c.status,
+            ]
+
+    return exports.pdf_table_response(
+        request,
+        filename=f"consultation-history-user-{user_id}.pdf",
         title="Consultation History Report",
         subtitle=f"User: {name} (#{user_id}) &nbsp;|&nbsp; Period: {period}",
         headers=["Date", "Type", "Astrologer", "Duration", "Cost", "Status"],
         rows=table_rows,
         col_widths=[35 * mm, 25 * mm, 55 * mm, 30 * mm, 30 * mm, 30 * mm],
+        total=sum(count for _status, count, *_ in by_status),
+        fingerprint=[user_id, search, consultation_type, status, date_from, date_to, by_status,
+                     astrologer_names],
     )
-    filename = f"consultation-history-user-{user_id}.pdf"
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+
+def _in_chat_session(in_session: bool = True):
+    txn = models.WalletTransaction
+    if not in_session:
+        # Spelled out rather than not_(): NOT over a NULL reference_id is NULL,
+        # which would drop a session-less deduction from both branches.
+        return or_(
+            txn.transaction_type != models.TransactionType.CHAT_DEDUCTION,
+            txn.reference_id.is_(None),
+            txn.reference_id == "",
+        )
+    return and_(
+        txn.transaction_type == models.TransactionType.CHAT_DEDUCTION,
+        txn.reference_id.isnot(None),
+        txn.reference_id != "",
     )
 
-def _collapse_chat_deduction_sessions(rows):
-    """rows: list of tuples `(WalletTransaction, *extra)` ordered ascending by
-    created_at. The chat billing loop writes one WalletTransaction per billed
-    minute (chat.py), which is the right granularity for the ledger but reads
-    as noise in the admin UI — a seeker doesn't care that minute 28, 29 and 30
-    were separate debits, they want to see what one chat session cost in
-    total. This collapses consecutive CHAT_DEDUCTION rows sharing the same
-    consultation (reference_id) into a single row carrying the session's total
-    deduction; every other transaction type passes through unchanged. Returns
-    dicts with keys id/user_id/amount/transaction_type/reference_id/
-    description/created_at/extra (the passed-through tuple tail), sorted
-    newest-first.
+def _ledger(query):
+    """The transaction ledger as admins read it, as a subquery over `query`
+    (WalletTransaction first, then any extra columns, which come through as
+    extra_0, extra_1, ...).
+
+    The chat billing loop writes one WalletTransaction per billed minute
+    (chat.py), which is the right granularity for the ledger but reads as noise
+    in the admin UI — a seeker doesn't care that minute 28, 29 and 30 were
+    separate debits, they want to see what one chat session cost in total. So
+    CHAT_DEDUCTION rows are grouped by consultation (reference_id) into one
+    entry: the first minute's id, the last minute's created_at, the summed
+    amount and the number of minutes. Every other transaction is UNIONed in
+    unchanged (minutes NULL). The grouping used to happen in Python over the
+    whole history on every page view; in SQL, a page only ships its own rows.
     """
-    sessions = {}
-    result = []
-    for row in rows:
-        txn, extra = row[0], row[1:]
-        if txn.transaction_type == models.TransactionType.CHAT_DEDUCTION and txn.reference_id:
-            entry = sessions.get(txn.reference_id)
-            if entry is None:
-                entry = {
-                    "id": txn.id,
-                    "user_id": txn.user_id,
-                    "amount": Decimal("0"),
-                    "transaction_type": txn.transaction_type,
-                    "reference_id": txn.reference_id,
-                    "description": None,
-                    "created_at": txn.created_at,
-                    "extra": extra,
-                    "_minutes": 0,
-                }
-                sessions[txn.reference_id] = entry
-                result.append(entry)
-            entry["amount"] += txn.amount
-            entry["_minutes"] += 1
-            entry["created_at"] = txn.created_at
-        else:
-            result.append({
-                "id": txn.id,
-                "user_id": txn.user_id,
-                "amount": txn.amount,
-                "transaction_type": txn.transaction_type,
-                "reference_id": txn.reference_id,
-                "description": txn.description,
-                "created_at": txn.created_at,
-                "extra": extra,
-                "_minutes": None,
-            })
-
-    for entry in result:
-        if entry["_minutes"] is not None:
-            entry["description"] = f"Chat session deduction ({entry['_minutes']} min)"
-        del entry["_minutes"]
-
-    result.sort(key=lambda e: e["created_at"], reverse=True)
-    return result
+    txn = models.WalletTransaction
+    extras = [d["expr"] for d in query.column_descriptions[1:]]
+    extra_columns = [e.label(f"extra_{i}") for i, e in enumerate(extras)]
+    sessions = (
+        query.filter(_in_chat_session())
+        .with_entities(
+            func.min(txn.id).label("id"),
+            txn.user_id,
+            func.sum(txn.amount).label("amount"),
+            txn.transaction_type,
+            txn.reference_id,
+            cast(null(), String).label("description"),
+            func.count(txn.id).label("minutes"),
+            func.max(txn.created_at).label("created_at"),
+            *extra_columns,
+        )
+        .group_by(txn.reference_id, txn.user_id, txn.transaction_type, *extras)
+    )
+    others = (
+        query.filter(_in_chat_session(False))
+        .with_entities(
+            txn.id,
+            txn.user_id,
+            txn.amount,
+            txn.transaction_type,
+            txn.reference_id,
+            txn.description,
+            cast(null(), Integer).label("minutes"),
+            txn.created_at,
+            *extra_columns,
+        )
+    )
+    return union_all(sessions.statement, others.statement).subquery("ledger")
+
+def _ledger_newest_first(db: Session, ledger):
+    return db.query(ledger).order_by(ledger.c.created_at.desc(), ledger.c.id.desc())
+
+def _ledger_cursor(row) -> str:
+    return f"{row.created_at.isoformat()}_{row.id}"
+
+def _ledger_page(db: Session, query, before: Optional[str], skip: int, limit: int):
+    """One newest-first page of _ledger(query): (total, rows, next_cursor).
+
+    With `before` (the previous page's next_cursor) the page is found by
+    keyset on (created_at, id), so page N costs what page 1 does; `skip` is
+    the OFFSET fallback for jumping to an arbitrary page."""
+    ledger = _ledger(query)
+    total = db.query(func.count()).select_from(ledger).scalar()
+    page = _ledger_newest_first(db, ledger)
+    if before:
+        try:
+            created_at, last_id = before.rsplit("_", 1)
+            created_at, last_id = datetime.fromisoformat(created_at), int(last_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page = page.filter(or_(
+            ledger.c.created_at < created_at,
+            and_(ledger.c.created_at == created_at, ledger.c.id < last_id),
+        ))
+    else:
+        page = page.offset(skip)
+    rows = page.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return total, rows, None
+    return total, rows[:limit], _ledger_cursor(rows[limit - 1])
+
+def _ledger_entry(row) -> dict:
+    """A _ledger row as a dict: id/user_id/amount/transaction_type/
+    reference_id/description/created_at, plus `extra` (the extra columns)."""
+    entry = {
+        "id": row.id,
+        "user_id": row.user_id,
+        "amount": row.amount,
+        "transaction_type": row.transaction_type,
+        "reference_id": row.reference_id,
+        "description": row.description,
+        "created_at": row.created_at,
+        "extra": tuple(row[8:]),
+    }
+    if row.minutes is not None:
+        entry["description"] = f"Chat session deduction ({row.minutes} min)"
+    return entry
 
 def _query_user_wallet_history(
     db: Session,
@@ -1032,6 +1076,7 @@ def get_user_wallet_history(
     user_id: int,
     skip: int = 0,
     limit: int = 20,
+    before: Optional[str] = None,
     search: Optional[str] = None,
     transaction_type: Optional[models.TransactionType] = None,
     date_from: Optional[date] = None,
@@ -1039,16 +1084,14 @@ def get_user_wallet_history(
     db: Session = Depends(database.get_db),
 ):
     query = _query_user_wallet_history(db, user_id, search, transaction_type, date_from, date_to)
-    rows = query.order_by(models.WalletTransaction.created_at.asc()).all()
-    grouped = _collapse_chat_deduction_sessions([(t,) for t in rows])
-    total = len(grouped)
-    page = grouped[skip:skip + limit]
-    transactions = [schemas.WalletTransaction.model_validate(g) for g in page]
-    return {"total": total, "transactions": transactions}
+    total, rows, next_cursor = _ledger_page(db, query, before, skip, limit)
+    transactions = [schemas.WalletTransaction.model_validate(_ledger_entry(row)) for row in rows]
+    return {"total": total, "transactions": transactions, "next_cursor": next_cursor}
 
 @router.get("/users/{user_id}/wallet-history/export")
 def export_user_wallet_history(
     user_id: int,
+    request: Request,
     search: Optional[str] = None,
     transaction_type: Optional[models.TransactionType] = None,
     date_from: Optional[date] = None,
@@ -1056,34 +1099,35 @@ def export_user_wallet_history(
     db: Session = Depends(database.get_db),
 ):
     query = _query_user_wallet_history(db, user_id, search, transaction_type, date_from, date_to)
-    rows = query.order_by(models.WalletTransaction.created_at.asc()).all()
-    grouped = _collapse_chat_deduction_sessions([(t,) for t in rows])
+    ledger = _ledger(query)
+    # Transactions are append-only, so the newest id and the count pin the data.
+    newest, txn_count = query.with_entities(func.max(models.WalletTransaction.id), func.count()).one()
+    total = db.query(func.count()).select_from(ledger).scalar()
 
     name = _user_display_name(db, user_id)
     period = f"{date_from or 'Start'} to {date_to or 'Today'}"
-    table_rows = []
-    for g in grouped:
-        amount = float(g["amount"])
-        table_rows.append([
-            g["created_at"].strftime("%Y-%m-%d %H:%M") if g["created_at"] else "-",
-            g["transaction_type"].value if hasattr(g["transaction_type"], "value") else g["transaction_type"],
-            g["reference_id"] or "-",
-            g["description"] or "-",
-            f"{'+' if amount > 0 else ''}Rs. {amount:.2f}",
-        ])
-
-    buffer = _build_pdf_report(
+
+    def table_rows():
+        for g in map(_ledger_entry, exports.stream(_ledger_newest_first(db, ledger))):
+            amount = float(g["amount"])
+            yield [
+                g["created_at"].strftime("%Y-%m-%d %H:%M") if g["created_at"] else "-",
+                g["transaction_type"].value if hasattr(g["transaction_type"], "value") else g["transaction_type"],
+                g["reference_id"] or "-",
+                g["description"] or "-",
+                f"{'+' if amount > 0 else ''}Rs. {amount:.2f}",
+            ]
+
+    return exports.pdf_table_response(
+        request,
+        filename=f"wallet-history-user-{user_id}.pdf",
         title="Wallet Transaction History Report",
         subtitle=f"User: {name} (#{user_id}) &nbsp;|&nbsp; Period: {period}",
         headers=["Date", "Type", "Reference", "Description", "Amount"],
         rows=table_rows,
         col_widths=[35 * mm, 30 * mm, 30 * mm, 90 * mm, 30 * mm],
-    )
-    filename = f"wallet-history-user-{user_id}.pdf"
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        total=total,
+        fingerprint=[user_id, search, transaction_type, date_from, date_to, newest, txn_count],
     )
 
 def _query_all_transactions(
@@ -1112,27 +1156,24 @@ def _query_all_transactions(
         )
     return query
 
-MAX_TRANSACTION_ROWS_TO_GROUP = 50_000
-
 @router.get("/transactions")
 def list_all_transactions(
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
     role: models.UserRole = models.UserRole.SEEKER,
     transaction_type: Optional[models.TransactionType] = None,
     search: Optional[str] = None,
     db: Session = Depends(database.get_db)
 ):
-    """All wallet transactions for a given role (defaults to seekers), for admin auditing."""
+    """All wallet transactions for a given role (defaults to seekers), for
+    admin auditing, newest first with chat minutes grouped per session. Page
+    with `before` = the previous page's next_cursor."""
     query = _query_all_transactions(db, role, transaction_type, search)
-
-    rows = query.order_by(models.WalletTransaction.created_at.asc()).limit(MAX_TRANSACTION_ROWS_TO_GROUP).all()
-    grouped = _collapse_chat_deduction_sessions(rows)
-    total = len(grouped)
-    page = grouped[skip:skip + limit]
+    total, rows, next_cursor = _ledger_page(db, query, before, skip, limit)
 
     transactions = []
-    for g in page:
+    for g in map(_ledger_entry, rows):
         email, phone_number, full_name = g["extra"]
         transactions.append({
             "id": g["id"],
@@ -1147,7 +1188,7 @@ def list_all_transactions(
             "created_at": g["created_at"],
         })
 
-    return {"total": total, "transactions": transactions}
+    return {"total": total, "transactions": transactions, "next_cursor": next_cursor}
 
 @router.get("/transactions/export")
 def export_all_transactions(
@@ -1159,76 +1200,54 @@ def export_all_transactions(
     """CSV export of the (filtered, unpaginated) transaction list — for handing
     data to accounting/audit rather than reading it off the admin UI."""
     query = _query_all_transactions(db, role, transaction_type, search)
-    rows = query.order_by(models.WalletTransaction.created_at.asc()).limit(MAX_TRANSACTION_ROWS_TO_GROUP).all()
-    grouped = _collapse_chat_deduction_sessions(rows)
-
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(["ID", "User ID", "User Name", "Email", "Phone", "Amount", "Type", "Reference", "Description", "Created At"])
-    for g in grouped:
-        email, phone_number, full_name = g["extra"]
-        writer.writerow([
-            g["id"],
-            g["user_id"],
-            full_name or f"User #{g['user_id']}",
-            email or "",
-            phone_number or "",
-            float(g["amount"]),
-            g["transaction_type"].value if hasattr(g["transaction_type"], "value") else g["transaction_type"],
-            g["reference_id"] or "",
-            g["description"] or "",
-            g["created_at"].strftime("%Y-%m-%d %H:%M:%S") if g["created_at"] else "",
-        ])
-    buffer.seek(0)
-    filename = f"transactions-{role.value.lower()}.csv"
-    return StreamingResponse(
-        iter([buffer.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    rows = exports.stream(_ledger_newest_first(db, _ledger(query)))
+
+    def csv_rows():
+        for g in map(_ledger_entry, rows):
+            email, phone_number, full_name = g["extra"]
+            yield [
+                g["id"],
+                g["user_id"],
+                full_name or f"User #{g['user_id']}",
+                email or "",
+                phone_number or "",
+                float(g["amount"]),
+                g["transaction_type"].value if hasattr(g["transaction_type"], "value") else g["transaction_type"],
+                g["reference_id"] or "",
+                g["description"] or "",
+                g["created_at"].strftime("%Y-%m-%d %H:%M:%S") if g["created_at"] else "",
+            ]
+
+    return exports.csv_response(
+        f"transactions-{role.value.lower()}.csv",
+        ["ID", "User ID", "User Name", "Email", "Phone", "Amount", "Type", "Reference", "Description", "Created At"],
+        csv_rows(),
     )
 
 @router.get("/wallets/reconciliation")
 def get_wallet_reconciliation(
     only_mismatches: bool = True,
     tolerance: float = 0.01,
+    rebuild: bool = False,
     db: Session = Depends(database.get_db),
 ):
     """Compares each wallet's stored balance against the sum of its own
     transaction ledger, to catch drift from a bug or a manual DB edit that
     the two would otherwise hide from each other. Not a substitute for
     reconciling against Razorpay's settlement reports (out of scope here),
-    just an internal self-consistency check."""
-    ledger_totals = dict(
-        db.query(models.WalletTransaction.user_id, func.sum(models.WalletTransaction.amount))
-        .group_by(models.WalletTransaction.user_id)
-        .all()
-    )
-
-    rows = (
-        db.query(models.UserWallet, models.User.email, models.User.phone_number, models.User.role)
-        .join(models.User, models.UserWallet.user_id == models.User.id)
-        .all()
-    )
-
-    results = []
-    for wallet, email, phone_number, role in rows:
-        stored = float(wallet.balance or 0)
-        computed = float(ledger_totals.get(wallet.user_id, Decimal("0")))
-        diff = round(stored - computed, 2)
-        if only_mismatches and abs(diff) <= tolerance:
-            continue
-        results.append({
-            "user_id": wallet.user_id,
-            "email": email,
-            "phone_number": phone_number,
-            "role": role,
-            "stored_balance": stored,
-            "computed_balance": computed,
-            "diff": diff,
-        })
-
-    results.sort(key=lambda r: abs(r["diff"]), reverse=True)
-    return {"total_wallets_checked": len(rows), "mismatches": len(results), "results": results}
+    just an internal self-consistency check. The ledger sums come from the
+    wallet_ledger checkpoints plus the transactions since; `rebuild=true`
+    recomputes the checkpoints from the full ledger first."""
+    return wallet_ledger.reconcile(db, only_mismatches, tolerance, rebuild_first=rebuild)
+
+@router.get("/wallets/{user_id}/reconciliation")
+def get_wallet_drift_report(user_id: int, db: Session = Depends(database.get_db)):
+    """The transactions since this wallet's balance last matched its ledger,
+    with the running ledger balance after each — where a mismatch from
+    /wallets/reconciliation came in."""
+    if not db.query(models.User.id).filter(models.User.id == user_id).first():
+        raise HTTPException(status_code=404, detail="User not found")
+    return wallet_ledger.drift_report(db, user_id)
 
 class WalletAdjustmentRequest(BaseModel):
     amount: float
@@ -1294,7 +1313,8 @@ def admin_wallet_credit(
             "adjustment_amount": body.amount,
             "new_balance": new_balance,
             "description": body.description
-        }
+        },
+        sync=True,
     )
     try:
         db.commit()
@@ -1368,6 +1388,7 @@ def delete_mock_user_data(
     for user in users:
         txn_count = db.query(models.WalletTransaction).filter(models.WalletTransaction.user_id == user.id).delete()
         payout_count = db.query(models.Payout).filter(models.Payout.astrologer_id == user.id).delete()
+        db.query(models.WalletLedgerCheckpoint).filter(models.WalletLedgerCheckpoint.user_id == user.id).delete()
         wallet = db.query(models.UserWallet).filter(models.UserWallet.user_id == user.id).first()
         had_balance = float(wallet.balance) if wallet else 0.0
         if wallet:
@@ -1384,6 +1405,7 @@ def delete_mock_user_data(
                 "payouts_deleted": payout_count,
                 "wallet_reset_from": had_balance,
             },
+            sync=True,
         )
         results.append({
             "user_id": user.id,
@@ -1727,6 +1749,8 @@ def get_audit_logs(
             "resource_type": l.resource_type,
             "resource_id": l.resource_id,
             "details": l.details,
+            "client_ip": l.client_ip,
+            "user_agent": l.user_agent,
             "created_at": l.created_at.isoformat() if l.created_at else None
         }
         for l in logs
@@ -1820,6 +1844,34 @@ def list_error_logs(
     ]}
 
 
+@router.get("/realtime/fanout-stats")
+def get_fanout_stats():
+    """WebSocket fan-out health for the worker serving this request: per chat
+    room / realtime channel queue depth, drops, evictions and send latency."""
+    from .. import fanout
+    return {
+        "queue_size": fanout.WS_OUTBOUND_QUEUE_SIZE,
+        "send_timeout_secs": fanout.WS_SEND_TIMEOUT_SECS,
+        "labels": fanout.snapshot(),
+    }
+
+
+@router.get("/integrations/http-stats")
+def get_http_stats():
+    """Outbound integration health for the worker serving this request:
+    per-upstream request/error/retry counts, status classes and latency,
+    plus how many geocodes were answered without calling Nominatim and how
+    many chart/panchang/match requests shared another's in-flight call."""
+    from .. import geocoding, http_clients, single_flight
+    return {
+        "retry_attempts": http_clients.HTTP_RETRY_ATTEMPTS,
+        "http2": http_clients._HTTP2,
+        "upstreams": http_clients.snapshot(),
+        "geocode_cache": geocoding.snapshot(),
+        "single_flight": single_flight.snapshot(),
+    }
+
+
 # --- App Settings (WhatsApp gateway, moderation, tunables) ---
 
 @router.get("/settings")
@@ -1976,6 +2028,7 @@ def approve_review(review_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Review not found")
     review.display_status = models.ReviewDisplayStatus.APPROVED
     db.commit()
+    response_cache.invalidate("reviews", "trust_stats")
     return {"status": "ok", "review_id": review_id, "new_status": review.display_status.value}
 
 
@@ -1986,6 +2039,7 @@ def reject_review(review_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Review not found")
     review.display_status = models.ReviewDisplayStatus.REJECTED
     db.commit()
+    response_cache.invalidate("reviews", "trust_stats")
     return {"status": "ok", "review_id": review_id, "new_status": review.display_status.value}
 
 
@@ -2021,6 +2075,7 @@ def update_review(review_id: int, request: ReviewUpdateRequest, db: Session = De
                 profile.rating_avg = Decimal(str(round(float(avg_rating), 2)))
                 db.commit()
 
+    response_cache.invalidate("reviews", "trust_stats")
     return {
         "status": "ok",
         "review": {
@@ -17,6 +17,7 @@ from pydantic import BaseModel, Field
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from .. import http_clients, single_flight
 from ..database import get_db
 from ..free_astro_service import generate_full_kundli
 from ..limiter import limiter
@@ -174,42 +175,45 @@ async def _compute_chart_summary(db: Session, dob: date, tob: Optional[time], pl
     approx_time = tob is None
     effective_tob = tob or UNKNOWN_BIRTH_TIME
 
-    existing = db.query(FreeKundliChart).filter(
-        FreeKundliChart.date_of_birth == dob,
-        FreeKundliChart.time_of_birth == effective_tob,
-        FreeKundliChart.place_of_birth == place,
-    ).first()
+    def lookup():
+        existing = db.query(FreeKundliChart).filter(
+            FreeKundliChart.date_of_birth == dob,
+            FreeKundliChart.time_of_birth == effective_tob,
+            FreeKundliChart.place_of_birth == place,
+        ).first()
+        return existing.chart_data if existing else None
 
-    if existing:
-        return _format_chart_summary(existing.chart_data, approx_time)
+    chart_data = lookup()
+    if chart_data is not None:
+        return _format_chart_summary(chart_data, approx_time)
 
-    try:
+    async def fetch():
         lat, lon = await geocode_place(place)
-    except Exception:
-        return None
-
-    try:
         chart_data = await generate_full_kundli(
             year=dob.year, month=dob.month, day=dob.day,
             hour=effective_tob.hour, minute=effective_tob.minute,
             latitude=lat, longitude=lon,
         )
+        record = FreeKundliChart(
+            date_of_birth=dob,
+            time_of_birth=effective_tob,
+            place_of_birth=place,
+            chart_data=chart_data,
+        )
+        db.add(record)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Concurrent request already cached this exact (dob, tob, place) — fine either way.
+            db.rollback()
+        return chart_data
+
+    # Same key as /free-tools/kundli-chart, so the two features share one in-flight call.
+    key = single_flight.make_key("free_kundli", dob, effective_tob, place)
+    try:
+        chart_data = await single_flight.run(key, lookup, fetch)
     except Exception:
         return None
-
-    record = FreeKundliChart(
-        date_of_birth=dob,
-        time_of_birth=effective_tob,
-        place_of_birth=place,
-        chart_data=chart_data,
-    )
-    db.add(record)
-    try:
-        db.commit()
-    except IntegrityError:
-        # Concurrent request already cached this exact (dob, tob, place) — fine either way.
-        db.rollback()
-
     return _format_chart_summary(chart_data, approx_time)
 
 
@@ -257,12 +261,12 @@ async def ai_chat(request: Request, payload: AiChatRequest, db: Session = Depend
     }
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                GROQ_CHAT_URL,
-                json=body,
-                headers={"Authorization": f"Bearer {api_key}"},
-            )
+        response = await http_clients.request(
+            "groq", "POST",
+            GROQ_CHAT_URL,
+            json=body,
+            headers={"Authorization": f"Bearer {api_key}"},
+        )
     except httpx.HTTPError as e:
         print(f"AI Astrologer: Groq request failed: {e}")
         raise _UPSTREAM_ERROR
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFi
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
-from .. import models, schemas, database
+from .. import astrologer_directory, models, schemas, database
 from ..services import email_service
 from ..limiter import limiter
 from .auth import get_current_user, get_current_user_optional, get_password_hash, create_access_token, SECRET_KEY, ALGORITHM
@@ -66,9 +66,10 @@ def is_within_availability_window(profile: models.AstrologerProfile) -> bool:
     return now >= start or now <= end  # window spans midnight, e.g. 22:00-06:00
 
 
-def _apply_availability(profile: models.AstrologerProfile, queue_length: int, is_busy: bool):
+def _apply_availability(profile: models.AstrologerProfile, queue_length: int, is_busy: bool, present: bool | None = None):
     """Attach computed availability_status + queue_length to a profile instance
-    so they serialize through schemas.AstrologerProfile."""
+    so they serialize through schemas.AstrologerProfile. `present` can be passed
+    when the caller already fetched presence for a whole page."""
     from .realtime import is_present
 
     # Identity protection: seekers see the public stage name, never the legal name.
@@ -77,7 +78,9 @@ def _apply_availability(profile: models.AstrologerProfile, queue_length: int, is
 
     profile.queue_length = queue_length
 
-    if not profile.is_online or not is_present(profile.user_id):
+    if present is None:
+        present = is_present(profile.user_id)
+    if not profile.is_online or not present:
         profile.availability_status = "OFFLINE"
         profile.knockable = is_within_availability_window(profile)
     elif is_busy:
@@ -126,14 +129,12 @@ def _decorate_review_count_bulk(db: Session, profiles: List[models.AstrologerPro
     return profiles
 
 
-def _decorate_availability_bulk(db: Session, profiles: List[models.AstrologerProfile]):
-    """Batch variant of _decorate_availability: two grouped queries for the whole
-    page instead of two queries per profile."""
-    ids = [p.user_id for p in profiles]
+def _availability_counts(db: Session, ids: List[int]) -> tuple[dict, dict]:
+    """(queued, busy): REQUESTED and ACCEPTED/ACTIVE/PAUSED consultation counts
+    per astrologer, for astrologers that have any."""
     if not ids:
-        return profiles
-
-    queue_counts = dict(
+        return {}, {}
+    queued = dict(
         db.query(models.Consultation.astrologer_id, func.count(models.Consultation.id))
         .filter(
             models.Consultation.astrologer_id.in_(ids),
@@ -142,20 +143,16 @@ def _decorate_availability_bulk(db: Session, profiles: List[models.AstrologerPro
         .group_by(models.Consultation.astrologer_id)
         .all()
     )
-    busy_ids = {
-        row[0]
-        for row in db.query(models.Consultation.astrologer_id)
+    busy = dict(
+        db.query(models.Consultation.astrologer_id, func.count(models.Consultation.id))
         .filter(
             models.Consultation.astrologer_id.in_(ids),
             models.Consultation.status.in_(_BUSY_STATUSES),
         )
-        .distinct()
+        .group_by(models.Consultation.astrologer_id)
         .all()
-    }
-
-    for p in profiles:
-        _apply_availability(p, queue_counts.get(p.user_id, 0), p.user_id in busy_ids)
-    return profiles
+    )
+    return queued, busy
 
 
 @router.post("/onboarding/photo")
@@ -317,33 +314,10 @@ def list_astrologers(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user_optional),
 ):
-    query = db.query(models.AstrologerProfile).join(models.User).filter(
-        models.AstrologerProfile.is_approved == True,
-        models.AstrologerProfile.onboarding_stage == models.OnboardingStage.COMPLETED,
-        models.User.is_active == True,
-        models.User.is_verified == True,
-        _restricted_visibility_filter(db, current_user),
-    )
-
-    # Premium astrologers always surface first, regardless of the secondary sort.
-    if sort_by == 'rating':
-        query = query.order_by(models.AstrologerProfile.is_premium.desc(), models.AstrologerProfile.rating_avg.desc())
-    elif sort_by == 'top':
-        # Rating-led ranking (e.g. the "Talk to a Verified Astrologer" panel):
-        # rating first, then the trending/VIP/premium badges only as tiebreakers.
-        query = query.order_by(
-            models.AstrologerProfile.rating_avg.desc(),
-            models.AstrologerProfile.is_trending.desc(),
-            models.AstrologerProfile.is_vip.desc(),
-            models.AstrologerProfile.is_premium.desc(),
-        )
-    else:
-        query = query.order_by(models.AstrologerProfile.is_premium.desc())
-
-    profiles = query.offset(skip).limit(limit).all()
-    _decorate_availability_bulk(db, profiles)
-    _decorate_review_count_bulk(db, profiles)
-    return profiles
+    # Served from the in-memory directory (see app/astrologer_directory.py):
+    # premium astrologers first by default, sort_by=rating keeps premium first
+    # then rating, sort_by=top is rating-led with the badges as tiebreakers.
+    return astrologer_directory.page(db, skip, limit, sort_by, current_user)
 
 @router.get("/profile", response_model=schemas.AstrologerProfile)
 def get_my_astrologer_profile(current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
@@ -591,7 +565,7 @@ def sign_astrologer_contract(
 
 
 def _notify_waiting_seekers(db: Session, astrologer_id: int):
-    from ..notifications import send_push_notification
+    from ..notification_outbox import enqueue_push, enqueue_whatsapp
     from .realtime import notify_user
 
     profile = db.query(models.AstrologerProfile).filter(models.AstrologerProfile.user_id == astrologer_id).first()
@@ -603,28 +577,22 @@ def _notify_waiting_seekers(db: Session, astrologer_id: int):
     ).all()
     for sub in subs:
         notify_user(sub.seeker_id, {"type": "ASTRO_ONLINE", "astrologer_id": astrologer_id})
-        try:
-            for tok in db.query(models.DeviceToken).filter(models.DeviceToken.user_id == sub.seeker_id).all():
-                send_push_notification(
-                    token=tok.fcm_token,
-                    title=f"{astro_name} is online",
-                    body=f"{astro_name} is now available to chat.",
-                    data={"astrologer_id": str(astrologer_id), "type": "ASTRO_ONLINE"},
-                )
-        except Exception as e:
-            print(f"notify waiting seeker push failed: {e}")
-
-        # Send WhatsApp alert to seeker
-        try:
-            from ..services.whatsapp_service import send_whatsapp
-            if sub.seeker and sub.seeker.phone_number:
-                send_whatsapp(
-                    to_phone=sub.seeker.phone_number,
-                    template_key="waplex_template_astrologer_online",
-                    params={"astrologer_name": astro_name}
-                )
-        except Exception as e:
-            print(f"notify waiting seeker WhatsApp failed: {e}")
+        # Queued with the notified flag below, so a seeker is alerted exactly once.
+        enqueue_push(
+            db, sub.seeker_id,
+            title=f"{astro_name} is online",
+            body=f"{astro_name} is now available to chat.",
+            data={"astrologer_id": str(astrologer_id), "type": "ASTRO_ONLINE"},
+            commit=False,
+        )
+        if sub.seeker and sub.seeker.phone_number:
+            enqueue_whatsapp(
+                db,
+                to_phone=sub.seeker.phone_number,
+                template_key="waplex_template_astrologer_online",
+                params={"astrologer_name": astro_name},
+                commit=False,
+            )
 
         sub.notified = True
     db.commit()
@@ -664,15 +632,14 @@ def notify_when_online(astrologer_id: int, current_user: models.User = Depends(g
 
     # Ring the astrologer's phone via a loud push notification (always triggered on click)
     try:
-        from ..notifications import send_push_notification
-        for tok in db.query(models.DeviceToken).filter(models.DeviceToken.user_id == astrologer_id).all():
-            send_push_notification(
-                token=tok.fcm_token,
-                title=f"🔔 {seeker_name} wants a consultation",
-                body="A seeker wants to talk to you! Tap to open Aadikarta and go online",
-                data={"type": "KNOCK", "astrologer_id": str(astrologer_id), "seeker_id": str(current_user.id)},
-                android_channel_id="knock_alerts",
-            )
+        from ..notification_outbox import enqueue_push
+        enqueue_push(
+            db, astrologer_id,
+            title=f"🔔 {seeker_name} wants a consultation",
+            body="A seeker wants to talk to you! Tap to open Aadikarta and go online",
+            data={"type": "KNOCK", "astrologer_id": str(astrologer_id), "seeker_id": str(current_user.id)},
+            android_channel_id="knock_alerts",
+        )
     except Exception as e:
         print(f"Failed to send knock push notification to astrologer: {e}")
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session
-from .. import models, schemas, database
+from .. import identity, models, schemas, database
 
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
@@ -61,38 +61,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    # Claims were usually verified already by the rate limiter's key function
+    # for this same request; the user comes from the principal cache.
+    payload = identity.claims(request, token)
+    if payload is None or payload.get("sub") is None:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = identity.current_user(db, payload["sub"], request)
     if user is None:
         raise credentials_exception
     return user
 
 def get_current_user_optional(request: Request, db: Session = Depends(database.get_db)):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return None
-    token = auth_header.replace("Bearer ", "")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        return user
-    except JWTError:
+    payload = identity.claims(request)
+    if payload is None or payload.get("sub") is None:
         return None
+    return identity.current_user(db, payload["sub"], request)
 
 def get_current_admin(current_user: models.User = Depends(get_current_user)):
     if current_user.role != models.UserRole.ADMIN:
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request, UploadFile, File, Form
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request, Response, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from typing import Literal
-from .. import models, schemas, database, audit
-from .auth import get_current_user, SECRET_KEY, ALGORITHM
+from .. import models, schemas, database, audit, astrologer_directory, chat_history, fanout, identity
+from .auth import get_current_user
 from ..limiter import limiter
-from jose import jwt, JWTError
+from ..backplane import backplane
 import asyncio
 import json
 import os
+import time
 import uuid
 import httpx
 from datetime import datetime
@@ -34,6 +35,13 @@ async def receive_ws_token(websocket: WebSocket, timeout: float = WS_AUTH_TIMEOU
     session JWT. Returns None (caller should close the socket) if no valid
     `{"token": "..."}` message arrives within `timeout` seconds.
     """
+    hello = await receive_ws_hello(websocket, timeout)
+    return hello["token"] if hello else None
+
+
+async def receive_ws_hello(websocket: WebSocket, timeout: float = WS_AUTH_TIMEOUT_SECS) -> dict | None:
+    """receive_ws_token, returning the whole first message (which may carry
+    more than the token, e.g. the chat socket's last_message_id)."""
     await websocket.accept()
     try:
         raw = await asyncio.wait_for(websocket.receive_text(), timeout=timeout)
@@ -43,13 +51,20 @@ async def receive_ws_token(websocket: WebSocket, timeout: float = WS_AUTH_TIMEOU
         msg = json.loads(raw)
     except json.JSONDecodeError:
         return None
+    if not isinstance(msg, dict):
+        return None
     token = msg.get("token")
-    return token if isinstance(token, str) and token else None
+    return msg if isinstance(token, str) and token else None
 
 
 class ConnectionManager:
+    """Chat sockets connected to this worker. broadcast() delivers locally and
+    then publishes through the backplane so other workers reach theirs.
+    Each socket writes through its own bounded fanout.OutboundSocket; a room
+    member that can't keep up is disconnected (and resyncs on reconnect)."""
+
     def __init__(self):
-        # Map consultation_id -> List of {ws, role, user_id}
+        # Map consultation_id -> List of {ws, role, user_id, out}
         self.active_connections: dict[int, list[dict]] = {}
 
     async def connect(self, websocket: WebSocket, consultation_id: int, user: models.User):
@@ -60,39 +75,60 @@ class ConnectionManager:
         self.active_connections[consultation_id].append({
             "ws": websocket,
             "role": user.role,
-            "user_id": user.id
+            "user_id": user.id,
+            "out": fanout.OutboundSocket(
+                websocket, f"chat:{consultation_id}", fanout.DISCONNECT,
+                lambda out: self.disconnect(websocket, consultation_id),
+            ),
         })
+        backplane.join(f"chat:{consultation_id}", user.id)
         logger.info(f"User {user.id} ({user.role}) connected to chat {consultation_id}")
 
     def disconnect(self, websocket: WebSocket, consultation_id: int):
         if consultation_id in self.active_connections:
+            for c in self.active_connections[consultation_id]:
+                if c["ws"] == websocket:
+                    c["out"].close()
+                    backplane.leave(f"chat:{consultation_id}", c["user_id"])
             self.active_connections[consultation_id] = [c for c in self.active_connections[consultation_id] if c["ws"] != websocket]
             if not self.active_connections[consultation_id]:
                 del self.active_connections[consultation_id]
 
+    async def is_user_in_room(self, consultation_id: int, user_id: int) -> bool:
+        """True if user_id has a socket open on this room on any worker."""
+        if any(c["user_id"] == user_id for c in self.active_connections.get(consultation_id, [])):
+            return True
+        return await backplane.is_member_elsewhere(f"chat:{consultation_id}", user_id)
+
     async def broadcast(self, consultation_id: int, message: dict, exclude_user_id: int | None = None):
-        if consultation_id in self.active_connections:
-            for connection in self.active_connections[consultation_id]:
-                if exclude_user_id is not None and connection["user_id"] == exclude_user_id:
-                    continue
-                try:
-                    await connection["ws"].send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Error sending message: {e}")
+        await self.deliver_local(consultation_id, message, exclude_user_id)
+        await backplane.publish("chat", {
+            "consultation_id": consultation_id,
+            "message": message,
+            "exclude_user_id": exclude_user_id,
+        })
 
-manager = ConnectionManager()
+    async def deliver_local(self, consultation_id: int, message: dict, exclude_user_id: int | None = None):
+        recipients = [
+            c["out"] for c in self.active_connections.get(consultation_id, [])
+            if exclude_user_id is None or c["user_id"] != exclude_user_id
+        ]
+        if recipients:
+            await fanout.send_all(recipients, json.dumps(message))
+
+    async def _on_remote(self, envelope: dict):
+        await self.deliver_local(
+            envelope["consultation_id"], envelope["message"], envelope.get("exclude_user_id")
+        )
 
+manager = ConnectionManager()
+backplane.subscribe("chat", manager._on_remote)
 
-def persist_and_moderate(db: Session, consultation: "models.Consultation", sender_id: int, content: str):
-    """Save a chat message, run rule-based moderation, and raise alerts on violations.
 
-    Returns (new_msg, broadcast_content) where broadcast_content has any contact
-    info masked so it is never delivered to the other participant.
-    """
+def _store_message(db: Session, consultation: "models.Consultation", sender_id: int, content: str):
+    """DB half of persist_and_moderate: scan, save the message and any
+    ModerationFlag. Returns (new_msg, masked_content, reason-or-None)."""
     from ..services import moderation
-    from ..services.settings_service import get_setting
-    from ..services.whatsapp_service import send_whatsapp
-    from .realtime import notify_user
 
     violations, masked = moderation.scan(content or "")
     flagged = bool(violations)
@@ -107,9 +143,10 @@ def persist_and_moderate(db: Session, consultation: "models.Consultation", sende
     db.add(new_msg)
     db.commit()
     db.refresh(new_msg)
+    chat_history.remember(new_msg)
 
     if not flagged:
-        return new_msg, content
+        return new_msg, content, None
 
     reason = ",".join(violations)
     try:
@@ -127,41 +164,74 @@ def persist_and_moderate(db: Session, consultation: "models.Consultation", sende
     except Exception as e:
         logger.error(f"Failed to persist moderation flag: {e}")
         db.rollback()
+    return new_msg, masked, reason
+
 
+def _moderation_alert(consultation_id: int, reason: str) -> dict:
     # Strong alarm in both seeker and astrologer panels.
-    alert = {
+    return {
         "type": "MODERATION_ALERT",
-        "consultation_id": consultation.id,
+        "consultation_id": consultation_id,
         "reason": reason,
         "message": "Sharing personal contact details or external links is not allowed. This conversation is monitored.",
     }
-    try:
-        asyncio.create_task(manager.broadcast(consultation.id, alert))
-    except RuntimeError:
-        pass
 
-    # Alert the super admin (in-app + WhatsApp).
+
+def _alert_admin_of_flag(db: Session, consultation_id: int, sender_id: int, content: str, reason: str):
+    """Alert the super admin (in-app + queued WhatsApp). Blocking (settings
+    lookup + outbox insert), so async callers go through run_db."""
+    from ..services.settings_service import get_setting
+    from .realtime import notify_user
+
     try:
         admin_user_id = get_setting("moderation_admin_user_id")
         if admin_user_id:
             notify_user(int(admin_user_id), {
                 "type": "MODERATION_ALERT",
-                "consultation_id": consultation.id,
+                "consultation_id": consultation_id,
                 "flagged_user_id": sender_id,
                 "reason": reason,
                 "snippet": content,
             })
         admin_wa = get_setting("moderation_admin_whatsapp")
         if admin_wa:
-            send_whatsapp(admin_wa, "moderation_admin_template", {
+            enqueue_whatsapp(db, admin_wa, "moderation_admin_template", {
                 "reason": reason,
-                "consultation_id": consultation.id,
+                "consultation_id": consultation_id,
                 "user_id": sender_id,
                 "snippet": (content or "")[:120],
             })
     except Exception as e:
         logger.error(f"Failed to alert admin of moderation flag: {e}")
 
+
+def persist_and_moderate(db: Session, consultation: "models.Consultation", sender_id: int, content: str):
+    """Save a chat message, run rule-based moderation, and raise alerts on violations.
+
+    Returns (new_msg, broadcast_content) where broadcast_content has any contact
+    info masked so it is never delivered to the other participant.
+    """
+    new_msg, masked, reason = _store_message(db, consultation, sender_id, content)
+    if reason is None:
+        return new_msg, masked
+
+    try:
+        asyncio.create_task(manager.broadcast(consultation.id, _moderation_alert(consultation.id, reason)))
+    except RuntimeError:
+        pass
+    _alert_admin_of_flag(db, consultation.id, sender_id, content, reason)
+    return new_msg, masked
+
+
+async def persist_and_moderate_async(db: Session, consultation: "models.Consultation", sender_id: int, content: str):
+    """persist_and_moderate for the async hot path: the DB write and the
+    admin's WhatsApp alert run on the DB executor, never on the event loop."""
+    new_msg, masked, reason = await database.run_db(_store_message, db, consultation, sender_id, content)
+    if reason is None:
+        return new_msg, masked
+
+    await manager.broadcast(consultation.id, _moderation_alert(consultation.id, reason))
+    await database.run_db(_alert_admin_of_flag, db, consultation.id, sender_id, content, reason)
     return new_msg, masked
 
 
@@ -186,7 +256,6 @@ def astrologer_has_other_active(db: Session, astrologer_id: int, exclude_id: int
 def promote_next_in_queue(db: Session, astrologer_id: int):
     """When an astrologer frees up, alert the next waiting seeker that it's their turn."""
     from .realtime import notify_user, broadcast_event
-    from ..services.whatsapp_service import send_whatsapp
     from ..services.settings_service import get_setting
 
     # The chat that just ended was this astrologer's only busy session (one-chat-at-a-time
@@ -213,13 +282,13 @@ def promote_next_in_queue(db: Session, astrologer_id: int):
         "astrologer_id": astrologer_id,
     })
     try:
-        for tok in db.query(models.DeviceToken).filter(models.DeviceToken.user_id == next_req.seeker_id).all():
-            send_push_notification(
-                token=tok.fcm_token,
-                title="It's your turn!",
-                body="The astrologer is now available for your consultation.",
-                data={"consultation_id": str(next_req.id), "type": "YOUR_TURN"},
-            )
+        enqueue_push(
+            db, next_req.seeker_id,
+            title="It's your turn!",
+            body="The astrologer is now available for your consultation.",
+            data={"consultation_id": str(next_req.id), "type": "YOUR_TURN"},
+            commit=False,
+        )
     except Exception as e:
         logger.error(f"promote_next_in_queue push failed: {e}")
 
@@ -229,21 +298,38 @@ def promote_next_in_queue(db: Session, astrologer_id: int):
         if seeker and seeker.phone_number:
             astro_profile = db.query(models.AstrologerProfile).filter(models.AstrologerProfile.user_id == astrologer_id).first()
             astro_name = (astro_profile.full_name if astro_profile else None) or "Astrologer"
-            send_whatsapp(seeker.phone_number, "waplex_template_your_turn", {
+            enqueue_whatsapp(db, seeker.phone_number, "waplex_template_your_turn", {
                 "astrologer": astro_name,
                 "app": get_setting("APP_NAME") or "Aadikarta",
                 "link": (get_setting("FRONTEND_URL") or "https://aadikarta.org") + "/chat/" + str(next_req.id),
-            })
+            }, commit=False)
     except Exception as e:
         logger.error(f"promote_next_in_queue whatsapp failed: {e}")
 
+    # Both nudges are queued in one transaction, after everything above has run.
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"promote_next_in_queue could not queue notifications: {e}")
+
 
-@router.get("/history/{consultation_id}", response_model=list[schemas.ChatMessage])
+@router.get("/history/{consultation_id}", response_model=list[schemas.ChatMessage],
+            responses=chat_history.HISTORY_RESPONSES)
 def get_chat_history(
     consultation_id: int,
+    response: Response,
+    since_id: int | None = None,
+    before_id: int | None = None,
+    limit: int | None = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    """The chat, oldest first. Without parameters, the whole chat. With any of
+    them, a page of at most `limit` (default and cap 200): the latest messages,
+    or those after `since_id` (catching up) or before `before_id` (scrolling
+    back). `X-Has-More: true` means page on with `before_id` set to the oldest
+    id returned (or `since_id` to the newest when catching up)."""
     consultation = db.query(models.Consultation).filter(models.Consultation.id == consultation_id).first()
     if not consultation:
         raise HTTPException(status_code=404, detail="Consultation not found")
@@ -251,10 +337,8 @@ def get_chat_history(
     if current_user.id != consultation.seeker_id and current_user.id != consultation.astrologer_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this chat history")
     
-    messages = db.query(models.ChatMessage).filter(
-        models.ChatMessage.consultation_id == consultation_id
-    ).order_by(models.ChatMessage.timestamp.asc()).all()
-    
+    messages, has_more = chat_history.page(db, consultation_id, since_id, before_id, limit)
+    response.headers[chat_history.HAS_MORE_HEADER] = "true" if has_more else "false"
     return messages
 
 @router.post("/send")
@@ -280,8 +364,8 @@ async def send_message(
                 consultation.status = models.ConsultationStatus.ACTIVE
                 consultation.start_time = datetime.utcnow()
                 db.commit()
-                # Start Billing Loop
-                asyncio.create_task(billing_loop(consultation.id, float(consultation.rate_per_min), database.SessionLocal))
+                # Start billing
+                billing_scheduler.register(consultation.id, float(consultation.rate_per_min))
                 # Broadcast via WS if any
                 await manager.broadcast(consultation.id, {"type": "TIMER_STARTED"})
             except Exception as e:
@@ -301,28 +385,11 @@ async def send_message(
         # Send Push Notification if recipient is offline
         try:
              recipient_id = consultation.astrologer_id if current_user.id == consultation.seeker_id else consultation.seeker_id
-             is_recipient_online = False
-             if consultation.id in manager.active_connections:
-                  for conn in manager.active_connections[consultation.id]:
-                      if conn["user_id"] == recipient_id:
-                          is_recipient_online = True
-                          break
-             
-             if not is_recipient_online:
-                 tokens = db.query(models.DeviceToken).filter(models.DeviceToken.user_id == recipient_id).all()
-                 sender_name = "User"
-                 if current_user.role == models.UserRole.SEEKER and current_user.seeker_profile:
-                     sender_name = current_user.seeker_profile.full_name or "Seeker"
-                 elif current_user.role == models.UserRole.ASTROLOGER and current_user.astrologer_profile:
-                     sender_name = current_user.astrologer_profile.full_name or "Astrologer"
-                     
-                 for token_obj in tokens:
-                     send_push_notification(
-                         token=token_obj.fcm_token,
-                         title=f"New Message from {sender_name}",
-                         body=broadcast_content[:50] + ("..." if len(broadcast_content) > 50 else ""),
-                         data={"consultation_id": str(consultation.id), "type": "CHAT_MESSAGE"}
-                     )
+             if not await manager.is_user_in_room(consultation.id, recipient_id):
+                 _push_chat_message(
+                     db, recipient_id, current_user, consultation.id,
+                     broadcast_content[:50] + ("..." if len(broadcast_content) > 50 else ""),
+                 )
         except Exception as push_err:
              logger.error(f"Push notification error in send_message: {push_err}")
 
@@ -384,6 +451,7 @@ async def share_image(
     db.add(new_msg)
     db.commit()
     db.refresh(new_msg)
+    chat_history.remember(new_msg)
 
     await manager.broadcast(consultation.id, {
         "type": "NEW_MESSAGE",
@@ -397,215 +465,572 @@ async def share_image(
 
     try:
         recipient_id = consultation.seeker_id
-        is_recipient_online = any(
-            conn["user_id"] == recipient_id
-            for conn in manager.active_connections.get(consultation.id, [])
-        )
-        if not is_recipient_online:
+        if not await manager.is_user_in_room(consultation.id, recipient_id):
             sender_name = (current_user.astrologer_profile.full_name if current_user.astrologer_profile else None) or "Astrologer"
-            for token_obj in db.query(models.DeviceToken).filter(models.DeviceToken.user_id == recipient_id).all():
-                send_push_notification(
-                    token=token_obj.fcm_token,
-                    title=f"New Message from {sender_name}",
-                    body="Shared a Kundli chart",
-                    data={"consultation_id": str(consultation.id), "type": "CHAT_MESSAGE"}
-                )
+            enqueue_push(
+                db, recipient_id,
+                title=f"New Message from {sender_name}",
+                body="Shared a Kundli chart",
+                data={"consultation_id": str(consultation.id), "type": "CHAT_MESSAGE"}
+            )
     except Exception as push_err:
         logger.error(f"Push notification error in share_image: {push_err}")
 
     return {"status": "sent", "message_id": int(new_msg.id), "media_url": media_url}
 
 async def get_user_from_token(token: str, db: Session):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-    except JWTError:
+    payload = identity.decode(token)
+    if payload is None or payload.get("sub") is None:
         return None
-    
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    return user
+    return await database.run_db(identity.current_user, db, payload["sub"])
+
+
+def _get_consultation(db: Session, consultation_id: int):
+    return db.query(models.Consultation).filter(models.Consultation.id == consultation_id).first()
+
+
+def _sender_display_name(sender: models.User) -> str:
+    if sender.role == models.UserRole.SEEKER and sender.seeker_profile:
+        return sender.seeker_profile.full_name or "Seeker"
+    if sender.role == models.UserRole.ASTROLOGER and sender.astrologer_profile:
+        return sender.astrologer_profile.full_name or "Astrologer"
+    return "User"
+
+
+def _push_chat_message(db: Session, recipient_id: int, sender: models.User, consultation_id: int, body: str):
+    """Queue a push of a chat message to a recipient who isn't in the room —
+    one outbox insert; the dispatcher resolves devices and calls FCM. Async
+    callers still go through run_db for the insert."""
+    enqueue_push(
+        db, recipient_id,
+        title=f"New Message from {_sender_display_name(sender)}",
+        body=body,
+        data={"consultation_id": str(consultation_id), "type": "CHAT_MESSAGE"}
+    )
 
 from ..redis_client import get_redis
-from ..notifications import send_push_notification
+from ..notification_outbox import enqueue_push, enqueue_whatsapp
 
 PROMO_WINDOW_SECONDS = 300  # first 5 minutes of a seeker's very first chat
 
 
-def _effective_rate_per_min(consultation: "models.Consultation", base_rate: float) -> float:
+def _effective_rate_per_min(consultation: "models.Consultation", base_rate: float, duration_seconds: int | None = None) -> float:
     """Flat promotional rate (spread over 5 minutes) while within the promo window
-    of a seeker's first-ever chat; the astrologer's normal rate otherwise."""
-    if consultation.promotional_rate_total is not None and (consultation.duration_seconds or 0) <= PROMO_WINDOW_SECONDS:
+    of a seeker's first-ever chat; the astrologer's normal rate otherwise.
+
+    `duration_seconds` overrides consultation.duration_seconds, for callers
+    (the billing scheduler) that have computed the post-charge duration but
+    not written it back to the ORM object."""
+    if duration_seconds is None:
+        duration_seconds = consultation.duration_seconds or 0
+    if consultation.promotional_rate_total is not None and duration_seconds <= PROMO_WINDOW_SECONDS:
         return float(consultation.promotional_rate_total) / (PROMO_WINDOW_SECONDS / 60)
     return base_rate
 
 
-async def billing_loop(consultation_id: int, rate_per_min: float, db_session_maker):
-    """
-    Background task to deduct balance every minute while chat is ACTIVE.
-    Registers session in Redis so startup recovery can restart the loop after a crash.
+BILLING_INTERVAL_SECS = 60
+BILLING_TICK_SECS = 5
+# Consecutive failed settlements before a consultation is only retried once per interval.
+BILLING_QUARANTINE_AFTER = 3
+# How long a paused session's due time is kept for a resume.
+BILLING_PARKED_TTL_SECS = 86400
+
+
+def _active_key(consultation_id: int) -> str:
+    return f"active_consultation:{consultation_id}"
+
+
+class BillingScheduler:
+    """Single per-process ticker that bills every ACTIVE consultation.
+
+    Each registered consultation falls due every BILLING_INTERVAL_SECS, and every
+    BILLING_TICK_SECS whatever is due gets settled as one batch — one SELECT
+    for the consultations, one for the seekers' wallets, bulk UPDATEs, one
+    bulk INSERT of WalletTransactions and a single commit — before the
+    BALANCE_UPDATE/CHAT_ENDED frames fan out. Due times advance by exactly
+    one interval per charge, so they don't drift under load.
+
+    If the batch commit fails, the batch is settled again one consultation per
+    transaction, so a single bad row (a missing wallet, a constraint error)
+    only holds back its own charge. That consultation retries on the next
+    tick; after BILLING_QUARANTINE_AFTER failures in a row it is logged as
+    quarantined and retried once per interval instead.
+
+    Sessions are still recorded in Redis (active_consultation:{id}) so startup
+    recovery can re-register them after a crash, and every charged minute is
+    still claimed with a billing_lock key so two workers that both recovered
+    the same session can never charge it twice.
     """
-    logger.info(f"Starting billing loop for {consultation_id}")
-    redis = get_redis()
-
-    # Register this session in Redis for crash recovery
-    if redis:
-        redis.set(
-            f"active_consultation:{consultation_id}",
-            json.dumps({"rate_per_min": rate_per_min}),
-            ex=86400  # 24 hour TTL as safety net
-        )
 
-    try:
+    def __init__(self):
+        # consultation_id -> {"rate_per_min": float, "due_at": monotonic seconds, "failures": int}
+        self._entries: dict[int, dict] = {}
+        # consultation_id -> due_at of sessions dropped because they were no
+        # longer ACTIVE (usually PAUSED), so a later resume keeps its due time.
+        self._parked: dict[int, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def is_registered(self, consultation_id: int) -> bool:
+        return consultation_id in self._entries
+
+    def register(self, consultation_id: int, rate_per_min: float):
+        """Start billing a consultation that has just gone (or come back) ACTIVE.
+
+        Idempotent: re-registering a consultation that is already scheduled
+        (e.g. a quick PAUSED -> resume before its next charge) keeps its
+        existing due time instead of granting a fresh free minute. The same
+        holds when a tick already dropped the paused session: it resumes with
+        the due time it had then."""
+        if consultation_id not in self._entries:
+            logger.info(f"Billing scheduled for {consultation_id}")
+            due_at = self._parked.pop(consultation_id, None)
+            self._entries[consultation_id] = {
+                "rate_per_min": rate_per_min,
+                "due_at": time.monotonic() + BILLING_INTERVAL_SECS if due_at is None else due_at,
+                "failures": 0,
+            }
+        redis = get_redis()
+        if redis:
+            try:
+                redis.set(
+                    _active_key(consultation_id),
+                    json.dumps({"rate_per_min": rate_per_min}),
+                    ex=86400  # 24 hour TTL as safety net
+                )
+            except Exception as e:
+                logger.error(f"Billing: failed to record {consultation_id} for crash recovery: {e}")
+        self.start()
+
+    def unregister(self, consultation_id: int):
+        self._entries.pop(consultation_id, None)
+        self._parked.pop(consultation_id, None)
+        redis = get_redis()
+        if redis:
+            try:
+                redis.delete(_active_key(consultation_id))
+            except Exception as e:
+                logger.error(f"Billing: failed to clear recovery key for {consultation_id}: {e}")
+
+    def start(self):
+        """Ensure the ticker is running on the current event loop. A no-op when
+        called outside a loop; the next register() from async code starts it."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
         while True:
-            await asyncio.sleep(60) # Wait 1 minute
-            
-            # Redis Lock Key for this minute
-            # We want to ensure we don't double charge for the same minute globally
-            # But simpler: Lock the consultation billing process?
-            # Actually, `billing_loop` is spawned per WebSocket connection start on Astro side.
-            # If server crashes, this loop dies.
-            # If server restarts, we need a mechanism to RESTART this loop.
-            # For now, we are improving robustness against multiple loops (race conditions)
-            # and ensuring state is consistent.
-            
-            # Proper "Heartbeat" requires an external worker. 
-            # Given current architecture (FastAPI background task), we add locking 
-            # to safer if we ever have multiple instances.
-            
-            lock_key = f"billing_lock:{consultation_id}:{int(datetime.utcnow().timestamp() // 60)}"
-            
-            if redis:
-                # Try to acquire lock for this specific minute
+            await asyncio.sleep(BILLING_TICK_SECS)
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Billing tick error: {e}")
+
+    async def run_due(self, now: float | None = None):
+        """Settle every consultation whose next minute is due at `now`."""
+        now = time.monotonic() if now is None else now
+        due = [cid for cid, entry in self._entries.items() if entry["due_at"] <= now]
+        if not due:
+            return
+
+        redis = get_redis()
+        claimed, lock_keys = self._claim_minute(redis, due)
+        # Another worker already billed these for this minute: skip to the next one.
+        for cid in set(due) - set(claimed):
+            self._entries[cid]["due_at"] += BILLING_INTERVAL_SECS
+        if not claimed:
+            return
+
+        try:
+            # Snapshot the rates: the settle runs on the DB executor while register()
+            # may still be adding entries on the loop.
+            rates = {cid: self._entries[cid]["rate_per_min"] for cid in claimed}
+            frames, ended, stopped, failed = await database.run_db(self._settle_batch, rates)
+        except Exception:
+            # Nothing was committed: hand the minute back so the next tick retries it.
+            self._release_minute(redis, lock_keys)
+            raise
+
+        # Nothing was charged for these: release just their minutes, so a retry
+        # (or a resume of a stopped session) can still claim this one.
+        lock_by_cid = dict(zip(claimed, lock_keys))
+        self._release_minute(redis, [lock_by_cid[cid] for cid in (*failed, *stopped) if cid in lock_by_cid])
+        for cid in failed:
+            entry = self._entries.get(cid)
+            if entry is None:
+                continue
+            entry["failures"] += 1
+            if entry["failures"] < BILLING_QUARANTINE_AFTER:
+                continue  # still due: retried on the next tick
+            if entry["failures"] == BILLING_QUARANTINE_AFTER:
+                logger.error(f"Billing: quarantining {cid} after {entry['failures']} failed settlements")
+            entry["due_at"] = now + BILLING_INTERVAL_SECS
+
+        failed = set(failed)
+        for cid in claimed:
+            if cid in self._entries and cid not in failed:
+                self._entries[cid]["due_at"] += BILLING_INTERVAL_SECS
+                self._entries[cid]["failures"] = 0
+        for cid in stopped:
+            due_at = self._entries[cid]["due_at"] - BILLING_INTERVAL_SECS if cid in self._entries else None
+            self.unregister(cid)
+            if due_at is not None:
+                self._parked[cid] = due_at
+        # A parked session that never resumes ended elsewhere; don't keep it forever.
+        for cid, due_at in list(self._parked.items()):
+            if due_at < now - BILLING_PARKED_TTL_SECS:
+                del self._parked[cid]
+        for cid, _astrologer_id, reason in ended:
+            self.unregister(cid)
+            frames.setdefault(cid, []).append({"type": "CHAT_ENDED", "reason": reason})
+
+        await asyncio.gather(*(self._send_frames(cid, room_frames) for cid, room_frames in frames.items()))
+
+        if ended:
+            await database.run_db(self._promote_after_auto_end, ended)
+
+    @staticmethod
+    def _claim_minute(redis, consultation_ids: list[int]) -> tuple[list[int], list[str]]:
+        """Claim this wall-clock minute for each consultation in one pipelined round trip."""
+        if not redis:
+            return list(consultation_ids), []
+        minute = int(datetime.utcnow().timestamp() // 60)
+        keys = [f"billing_lock:{cid}:{minute}" for cid in consultation_ids]
+        try:
+            pipe = redis.pipeline()
+            for key in keys:
                 # nx=True means only set if not exists, ex=70 seconds expiry
-                is_locked = redis.set(lock_key, "1", ex=70, nx=True)
-                if not is_locked:
-                    logger.info(f"Billing for {consultation_id} already processed for this minute. Skipping.")
+                pipe.set(key, "1", ex=70, nx=True)
+            results = pipe.execute()
+        except Exception as e:
+            logger.error(f"Billing: minute lock unavailable, billing without it: {e}")
+            return list(consultation_ids), []
+        claimed = [cid for cid, ok in zip(consultation_ids, results) if ok]
+        skipped = len(consultation_ids) - len(claimed)
+        if skipped:
+            logger.info(f"Billing: {skipped} consultation(s) already processed for this minute. Skipping.")
+        return claimed, [key for key, ok in zip(keys, results) if ok]
+
+    @staticmethod
+    def _release_minute(redis, lock_keys: list[str]):
+        if redis and lock_keys:
+            try:
+                redis.delete(*lock_keys)
+            except Exception as e:
+                logger.error(f"Billing: failed to release minute locks: {e}")
+
+    def _settle_batch(self, rates: dict[int, float]):
+        """Settle the batch in one transaction, or — if that fails — each
+        consultation in its own, so one bad row can't block everyone's billing.
+
+        Returns (frames, ended, stopped, failed), failed being the ids whose
+        own transaction was rolled back."""
+        with database.SessionLocal() as db:
+            try:
+                return (*self._settle(db, rates), [])
+            except Exception as e:
+                db.rollback()
+                if len(rates) == 1:
+                    logger.error(f"Billing: settling {next(iter(rates))} failed: {e}")
+                    return {}, [], [], list(rates)
+                logger.warning(f"Billing: batch of {len(rates)} failed ({e}), settling one by one")
+
+        frames: dict[int, list[dict]] = {}
+        ended: list[tuple[int, int, str]] = []
+        stopped: list[int] = []
+        failed: list[int] = []
+        for cid, rate in rates.items():
+            with database.SessionLocal() as db:
+                try:
+                    one_frames, one_ended, one_stopped = self._settle(db, {cid: rate})
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Billing: settling {cid} failed: {e}")
+                    failed.append(cid)
                     continue
-            
-            with db_session_maker() as db:
-                consultation = db.query(models.Consultation).filter(models.Consultation.id == consultation_id).first()
-                
-                # Check if still active
-                if not consultation or consultation.status != models.ConsultationStatus.ACTIVE:
-                    logger.info(f"Billing loop ended for {consultation_id}: Status is {consultation.status if consultation else 'NOT_FOUND'}")
-                    if redis:
-                        redis.delete(f"active_consultation:{consultation_id}")
-                    break
-                
-                consultation.duration_seconds = (consultation.duration_seconds or 0) + 60
-                is_package_session = consultation.package_id is not None and (consultation.package_seconds_remaining or 0) > 0
-
-                if is_package_session:
-                    # Package billing: deduct 60 seconds from remaining package time.
-                    # The seeker already paid for this time when buying the package, so no
-                    # wallet transaction here — but total_cost must still accrue at the
-                    # astrologer's normal rate, since payouts (admin/payouts.py) and the
-                    # astrologer's live "earnings" display are both derived from it.
-                    consultation.total_cost = (consultation.total_cost or 0) + Decimal(str(rate_per_min))
-                    pkg_secs = (consultation.package_seconds_remaining or 0) - 60
-                    if pkg_secs <= 0:
-                        consultation.package_seconds_remaining = 0
-                        consultation.status = models.ConsultationStatus.AUTO_ENDED
-                        consultation.end_time = datetime.utcnow()
-                        audit.log(db, "CHAT_AUTO_ENDED", resource_type="consultation",
-                                  resource_id=consultation_id,
-                                  details={"reason": "package_time_exhausted", "total_cost": float(consultation.total_cost or 0)})
-                        db.commit()
-                        if redis:
-                            redis.delete(f"active_consultation:{consultation_id}")
-                        await manager.broadcast(consultation_id, {"type": "CHAT_ENDED", "reason": "package_time_exhausted"})
-                        promote_next_in_queue(db, consultation.astrologer_id)
-                        break
-
-                    consultation.package_seconds_remaining = pkg_secs
-                    db.commit()
-
-                    minutes_remaining = pkg_secs / 60
-                    await manager.broadcast(consultation_id, {
-                        "type": "BALANCE_UPDATE",
-                        "balance": 0,  # Wallet not used
-                        "spent": float(consultation.total_cost or 0),
-                        "minutes_remaining": round(minutes_remaining, 1),
-                        "package_seconds_remaining": pkg_secs,
-                        "duration_seconds": consultation.duration_seconds
+            frames.update(one_frames)
+            ended += one_ended
+            stopped += one_stopped
+        return frames, ended, stopped, failed
+
+    @staticmethod
+    def _promote_after_auto_end(ended: list[tuple[int, int, str]]):
+        with database.SessionLocal() as db:
+            for cid, astrologer_id, _reason in ended:
+                try:
+                    promote_next_in_queue(db, astrologer_id)
+                except Exception as e:
+                    logger.error(f"promote_next_in_queue after auto-end of {cid} failed: {e}")
+
+    @staticmethod
+    def _settle(db: Session, rates: dict[int, float]):
+        """Charge one minute for each consultation (id -> rate_per_min) and
+        commit the whole batch.
+
+        Returns (frames, ended, stopped): per-room frames to broadcast, the
+        (consultation_id, astrologer_id, reason) of sessions auto-ended by this
+        charge, and ids that are no longer ACTIVE and should stop billing."""
+        consultation_ids = list(rates)
+        consultations = {
+            c.id: c for c in db.query(models.Consultation)
+            .filter(models.Consultation.id.in_(consultation_ids))
+            .with_for_update()
+            .all()
+        }
+        wallet_user_ids = {
+            c.seeker_id for c in consultations.values()
+            if c.status == models.ConsultationStatus.ACTIVE
+            and not (c.package_id is not None and (c.package_seconds_remaining or 0) > 0)
+        }
+        balances = {}
+        if wallet_user_ids:
+            balances = {
+                w.user_id: w.balance for w in db.query(models.UserWallet)
+                .filter(models.UserWallet.user_id.in_(wallet_user_ids))
+                .with_for_update()
+                .all()
+            }
+
+        now = datetime.utcnow()
+        consultation_rows: list[dict] = []
+        debited_users: set[int] = set()
+        txn_rows: list[dict] = []
+        frames: dict[int, list[dict]] = {}
+        ended: list[tuple[int, int, str]] = []
+        stopped: list[int] = []
+
+        for cid in consultation_ids:
+            consultation = consultations.get(cid)
+            # Check if still active
+            if not consultation or consultation.status != models.ConsultationStatus.ACTIVE:
+                logger.info(f"Billing ended for {cid}: Status is {consultation.status if consultation else 'NOT_FOUND'}")
+                stopped.append(cid)
+                continue
+
+            rate_per_min = rates[cid]
+            duration = (consultation.duration_seconds or 0) + 60
+            total_cost = Decimal(str(consultation.total_cost or 0))
+            is_package_session = consultation.package_id is not None and (consultation.package_seconds_remaining or 0) > 0
+
+            if is_package_session:
+                # Package billing: deduct 60 seconds from remaining package time.
+                # The seeker already paid for this time when buying the package, so no
+                # wallet transaction here — but total_cost must still accrue at the
+                # astrologer's normal rate, since payouts (admin/payouts.py) and the
+                # astrologer's live "earnings" display are both derived from it.
+                total_cost += Decimal(str(rate_per_min))
+                pkg_secs = (consultation.package_seconds_remaining or 0) - 60
+                if pkg_secs <= 0:
+                    consultation_rows.append({
+                        "id": cid, "duration_seconds": duration, "total_cost": total_cost,
+                        "package_seconds_remaining": 0,
+                        "status": models.ConsultationStatus.AUTO_ENDED, "end_time": now,
                     })
+                    audit.log(db, "CHAT_AUTO_ENDED", resource_type="consultation",
+                              resource_id=cid,
+                              details={"reason": "package_time_exhausted", "total_cost": float(total_cost)})
+                    ended.append((cid, consultation.astrologer_id, "package_time_exhausted"))
+                    continue
 
-                    if minutes_remaining <= 5:
-                        await manager.broadcast(consultation_id, {
-                            "type": "BALANCE_WARNING",
-                            "balance": 0,
-                            "minutes_remaining": round(minutes_remaining, 1),
-                            "source": "package"
-                        })
-                else:
-                    # Wallet billing
-                    user_wallet = db.query(models.UserWallet).filter(models.UserWallet.user_id == consultation.seeker_id).first()
-                    if not user_wallet:
-                        break
-
-                    cost = Decimal(str(_effective_rate_per_min(consultation, rate_per_min)))
-                    if float(user_wallet.balance) < cost:
-                        consultation.status = models.ConsultationStatus.AUTO_ENDED
-                        consultation.end_time = datetime.utcnow()
-                        audit.log(db, "CHAT_AUTO_ENDED", resource_type="consultation",
-                                  resource_id=consultation_id,
-                                  details={"reason": "insufficient_balance", "total_cost": float(consultation.total_cost or 0)})
-                        db.commit()
-                        if redis:
-                            redis.delete(f"active_consultation:{consultation_id}")
-                        await manager.broadcast(consultation_id, {"type": "CHAT_ENDED", "reason": "insufficient_balance"})
-                        promote_next_in_queue(db, consultation.astrologer_id)
-                        break
-
-                    user_wallet.balance -= cost
-                    consultation.total_cost = (consultation.total_cost or 0) + cost
-
-                    is_promo_minute = consultation.promotional_rate_total is not None and consultation.duration_seconds <= PROMO_WINDOW_SECONDS
-                    txn = models.WalletTransaction(
-                        user_id=consultation.seeker_id,
-                        amount=-cost,
-                        transaction_type=models.TransactionType.CHAT_DEDUCTION,
-                        reference_id=str(consultation.id),
-                        description=f"Chat deduction min {int(consultation.duration_seconds / 60)}" + (" (promotional rate)" if is_promo_minute else "")
-                    )
-                    db.add(txn)
-                    db.commit()
-
-                    remaining_balance = float(user_wallet.balance)
-                    next_rate = _effective_rate_per_min(consultation, rate_per_min)
-                    minutes_remaining = remaining_balance / next_rate if next_rate > 0 else 0
-                    await manager.broadcast(consultation_id, {
-                        "type": "BALANCE_UPDATE",
-                        "balance": remaining_balance,
-                        "spent": float(consultation.total_cost),
+                consultation_rows.append({
+                    "id": cid, "duration_seconds": duration, "total_cost": total_cost,
+                    "package_seconds_remaining": pkg_secs,
+                })
+                minutes_remaining = pkg_secs / 60
+                room = frames.setdefault(cid, [])
+                room.append({
+                    "type": "BALANCE_UPDATE",
+                    "balance": 0,  # Wallet not used
+                    "spent": float(total_cost),
+                    "minutes_remaining": round(minutes_remaining, 1),
+                    "package_seconds_remaining": pkg_secs,
+                    "duration_seconds": duration
+                })
+                if minutes_remaining <= 5:
+                    room.append({
+                        "type": "BALANCE_WARNING",
+                        "balance": 0,
                         "minutes_remaining": round(minutes_remaining, 1),
-                        "duration_seconds": consultation.duration_seconds
+                        "source": "package"
                     })
+                continue
+
+            # Wallet billing
+            if consultation.seeker_id not in balances:
+                stopped.append(cid)
+                continue
+
+            cost = Decimal(str(_effective_rate_per_min(consultation, rate_per_min, duration)))
+            balance = balances[consultation.seeker_id]
+            if float(balance) < cost:
+                consultation_rows.append({
+                    "id": cid, "duration_seconds": duration,
+                    "status": models.ConsultationStatus.AUTO_ENDED, "end_time": now,
+                })
+                audit.log(db, "CHAT_AUTO_ENDED", resource_type="consultation",
+                          resource_id=cid,
+                          details={"reason": "insufficient_balance", "total_cost": float(total_cost)})
+                ended.append((cid, consultation.astrologer_id, "insufficient_balance"))
+                continue
+
+            balance -= cost
+            balances[consultation.seeker_id] = balance
+            debited_users.add(consultation.seeker_id)
+            total_cost += cost
+            consultation_rows.append({"id": cid, "duration_seconds": duration, "total_cost": total_cost})
+
+            is_promo_minute = consultation.promotional_rate_total is not None and duration <= PROMO_WINDOW_SECONDS
+            txn_rows.append({
+                "user_id": consultation.seeker_id,
+                "amount": -cost,
+                "transaction_type": models.TransactionType.CHAT_DEDUCTION,
+                "reference_id": str(cid),
+                "description": f"Chat deduction min {int(duration / 60)}" + (" (promotional rate)" if is_promo_minute else ""),
+                "created_at": now,
+            })
+
+            remaining_balance = float(balance)
+            next_rate = _effective_rate_per_min(consultation, rate_per_min, duration)
+            minutes_remaining = remaining_balance / next_rate if next_rate > 0 else 0
+            room = frames.setdefault(cid, [])
+            room.append({
+                "type": "BALANCE_UPDATE",
+                "balance": remaining_balance,
+                "spent": float(total_cost),
+                "minutes_remaining": round(minutes_remaining, 1),
+                "duration_seconds": duration
+            })
+            if minutes_remaining <= 5:
+                room.append({
+                    "type": "BALANCE_WARNING",
+                    "balance": remaining_balance,
+                    "minutes_remaining": round(minutes_remaining, 1),
+                    "source": "wallet"
+                })
+
+        if consultation_rows:
+            db.bulk_update_mappings(models.Consultation, consultation_rows)
+        if debited_users:
+            db.bulk_update_mappings(models.UserWallet, [
+                {"user_id": uid, "balance": balances[uid]} for uid in debited_users
+            ])
+        if txn_rows:
+            db.bulk_insert_mappings(models.WalletTransaction, txn_rows)
+        db.commit()
+        # Bulk updates skip the flush hooks, so report the auto-ends ourselves.
+        astrologer_directory.apply_transitions(
+            (astrologer_id, models.ConsultationStatus.ACTIVE, models.ConsultationStatus.AUTO_ENDED)
+            for _cid, astrologer_id, _reason in ended
+        )
+        return frames, ended, stopped
+
+    @staticmethod
+    async def _send_frames(consultation_id: int, room_frames: list[dict]):
+        # Sequential within a room so BALANCE_UPDATE always precedes its WARNING.
+        for frame in room_frames:
+            await manager.broadcast(consultation_id, frame)
+
+
+billing_scheduler = BillingScheduler()
+
+
+def _accept_if_free(db: Session, consultation: "models.Consultation") -> bool:
+    """REQUESTED -> ACCEPTED when the astrologer joins, unless they're already
+    in another session (one chat at a time)."""
+    if astrologer_has_other_active(db, consultation.astrologer_id, consultation.id):
+        return False
+    consultation.status = models.ConsultationStatus.ACCEPTED
+    db.commit()
+    db.refresh(consultation)
+    return True
+
+
+def _start_timer_if_free(db: Session, consultation: "models.Consultation") -> bool:
+    """ACCEPTED -> ACTIVE on the astrologer's first message (same one-chat rule)."""
+    if astrologer_has_other_active(db, consultation.astrologer_id, consultation.id):
+        return False
+    consultation.status = models.ConsultationStatus.ACTIVE
+    consultation.start_time = datetime.utcnow()
+    db.commit()
+    return True
+
+
+def _state_sync(db: Session, consultation: "models.Consultation", last_message_id: int | None = None) -> dict:
+    is_active = consultation.status == models.ConsultationStatus.ACTIVE
+    wallet_balance = 0.0
+    spent = 0.0
+    rate = _effective_rate_per_min(consultation, float(consultation.rate_per_min) if consultation.rate_per_min else 0.0)
+    if consultation.seeker_id:
+        u_wallet = db.query(models.UserWallet).filter(models.UserWallet.user_id == consultation.seeker_id).first()
+        if u_wallet: wallet_balance = float(u_wallet.balance)
+
+    if consultation.total_cost:
+        spent = float(consultation.total_cost)
+
+    minutes_remaining = round(wallet_balance / rate, 1) if rate > 0 else 0
+
+    sync = {
+        "type": "STATE_SYNC",
+        "status": consultation.status.value if hasattr(consultation.status, 'value') else consultation.status,
+        "timer_active": is_active,
+        "balance": wallet_balance,
+        "spent": spent,
+        "minutes_remaining": minutes_remaining,
+        "duration_seconds": consultation.duration_seconds or 0
+    }
+    # A reconnecting client said what it last saw: send only what it missed.
+    # messages_complete=False means there's more than a page; the rest comes
+    # from GET /chat/history?since_id=.
+    if last_message_id is not None:
+        missed, has_more = chat_history.page(db, consultation.id, since_id=last_message_id)
+        sync["messages"] = missed
+        sync["messages_complete"] = not has_more
+    return sync
+
+
+def _resume_if_funded(db: Session, consultation: "models.Consultation"):
+    """PAUSED -> ACTIVE when the seeker's wallet covers another minute.
+    Returns the wallet balance on success, None otherwise."""
+    wallet = db.query(models.UserWallet).filter(models.UserWallet.user_id == consultation.seeker_id).first()
+    if wallet and float(wallet.balance) >= float(consultation.rate_per_min):
+        consultation.status = models.ConsultationStatus.ACTIVE
+        consultation.paused_at = None
+        db.commit()
+        return float(wallet.balance)
+    return None
+
+
+def _end_by_user(db: Session, consultation: "models.Consultation", user_id: int):
+    consultation.status = models.ConsultationStatus.COMPLETED
+    consultation.end_time = datetime.utcnow()
+    audit.log(db, "CHAT_ENDED_BY_USER", actor_id=user_id,
+              resource_type="consultation", resource_id=consultation.id,
+              details={"total_cost": float(consultation.total_cost or 0),
+                       "duration_seconds": consultation.duration_seconds or 0})
+    db.commit()
 
-                    if minutes_remaining <= 5:
-                        await manager.broadcast(consultation_id, {
-                            "type": "BALANCE_WARNING",
-                            "balance": remaining_balance,
-                            "minutes_remaining": round(minutes_remaining, 1),
-                            "source": "wallet"
-                        })
-                
-    except Exception as e:
-        logger.error(f"Billing loop error: {e}")
-        if redis:
-            redis.delete(f"active_consultation:{consultation_id}")
 
 @router.websocket("/ws/{consultation_id}")
 async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
     logger.info(f"New WS connection attempt: consultation_id={consultation_id}")
 
-    # Create a new session for this connection scope
-    db = database.SessionLocal()
+    # Create a new session for this connection scope. Every query/commit on it
+    # goes through database.run_db so a slow Postgres round trip never stalls
+    # the other sockets on this worker; expire_on_commit=False keeps attribute
+    # reads after a commit from lazily re-querying on the event loop (state
+    # that must be fresh is explicitly refreshed first).
+    db = database.SessionLocal(expire_on_commit=False)
+    connected = False
 
     try:
-        token = await receive_ws_token(websocket)
+        hello = await receive_ws_hello(websocket)
+        token = hello["token"] if hello else None
+        last_message_id = hello.get("last_message_id") if hello else None
+        if not isinstance(last_message_id, int) or isinstance(last_message_id, bool):
+            last_message_id = None
         if token is None:
             logger.warning(f"WS reject (consultation {consultation_id}): no auth token received")
             await websocket.close(code=4003)
@@ -618,7 +1043,7 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
             await websocket.close(code=4003)
             return
 
-        consultation = db.query(models.Consultation).filter(models.Consultation.id == consultation_id).first()
+        consultation = await database.run_db(_get_consultation, db, consultation_id)
         if not consultation:
             logger.warning(f"WS reject: consultation {consultation_id} not found")
             await websocket.close(code=4004)
@@ -631,16 +1056,20 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
             return
 
         await manager.connect(websocket, consultation_id, user)
+        connected = True
         logger.info(f"WS connected: user={user.id} role={user.role} consultation={consultation_id}")
     except Exception as e:
         logger.error(f"WS exception during handshake (consultation {consultation_id}): {e}")
         await websocket.close(code=4000)
         return
+    finally:
+        if not connected:
+            await database.run_db(db.close)
 
     try:
         # Auto-accept if astrologer joins — but enforce one chat at a time.
         if user.role == models.UserRole.ASTROLOGER and consultation.status == models.ConsultationStatus.REQUESTED:
-            if astrologer_has_other_active(db, consultation.astrologer_id, consultation.id):
+            if not await database.run_db(_accept_if_free, db, consultation):
                 await websocket.send_text(json.dumps({
                     "type": "ERROR",
                     "code": "ALREADY_IN_SESSION",
@@ -649,37 +1078,13 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
                 await websocket.close(code=4009)
                 manager.disconnect(websocket, consultation_id)
                 return
-            consultation.status = models.ConsultationStatus.ACCEPTED
-            db.commit()
-            db.refresh(consultation)
             # Let the seeker's already-open socket know the astrologer joined —
             # otherwise their UI stays on "waiting" until the astrologer's first
             # message (TIMER_STARTED), even though the astrologer is already in.
             await manager.broadcast(consultation_id, {"type": "CONSULTATION_ACCEPTED"}, exclude_user_id=user.id)
 
         # Send Initial State
-        is_active = consultation.status == models.ConsultationStatus.ACTIVE
-        wallet_balance = 0.0
-        spent = 0.0
-        rate = _effective_rate_per_min(consultation, float(consultation.rate_per_min) if consultation.rate_per_min else 0.0)
-        if consultation.seeker_id:
-            u_wallet = db.query(models.UserWallet).filter(models.UserWallet.user_id == consultation.seeker_id).first()
-            if u_wallet: wallet_balance = float(u_wallet.balance)
-
-        if consultation.total_cost:
-            spent = float(consultation.total_cost)
-
-        minutes_remaining = round(wallet_balance / rate, 1) if rate > 0 else 0
-
-        await websocket.send_text(json.dumps({
-            "type": "STATE_SYNC",
-            "status": consultation.status.value if hasattr(consultation.status, 'value') else consultation.status,
-            "timer_active": is_active,
-            "balance": wallet_balance,
-            "spent": spent,
-            "minutes_remaining": minutes_remaining,
-            "duration_seconds": consultation.duration_seconds or 0
-        }))
+        await websocket.send_text(json.dumps(await database.run_db(_state_sync, db, consultation, last_message_id)))
         
         # Per-connection rate limiter: max 20 messages per 10 seconds
         _rate_window_start = datetime.utcnow().timestamp()
@@ -710,11 +1115,11 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
             if msg_type == "MESSAGE":
                 content = message_data.get("content")
 
-                # Re-read latest status first; billing_loop runs on a separate session
+                # Re-read latest status first; the billing scheduler runs on a separate session
                 # and may have paused/ended the consultation (e.g. seeker disconnected)
                 # since this socket connected. Reject messages sent while not
                 # ACCEPTED/ACTIVE instead of silently persisting them.
-                db.refresh(consultation)
+                await database.run_db(db.refresh, consultation)
                 if consultation.status not in (
                     models.ConsultationStatus.ACCEPTED,
                     models.ConsultationStatus.ACTIVE,
@@ -727,26 +1132,23 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
                     continue
 
                 # Save to DB (+ moderation). broadcast_content has contact info masked.
-                new_msg, broadcast_content = persist_and_moderate(db, consultation, user.id, content)
+                new_msg, broadcast_content = await persist_and_moderate_async(db, consultation, user.id, content)
 
                 # Check for Timer Start (First Astrologer Message)
                 if user.role == models.UserRole.ASTROLOGER and consultation.status == models.ConsultationStatus.ACCEPTED:
-                    if astrologer_has_other_active(db, consultation.astrologer_id, consultation.id):
+                    if not await database.run_db(_start_timer_if_free, db, consultation):
                         await websocket.send_text(json.dumps({
                             "type": "ERROR",
                             "code": "ALREADY_IN_SESSION",
                             "message": "Finish your current chat before starting a new one.",
                         }))
                         continue
-                    consultation.status = models.ConsultationStatus.ACTIVE
-                    consultation.start_time = datetime.utcnow()
-                    db.commit()
 
                     # Notify Timer Start
                     await manager.broadcast(consultation_id, {"type": "TIMER_STARTED"})
                     
-                    # Start Billing Loop
-                    asyncio.create_task(billing_loop(consultation_id, float(consultation.rate_per_min), database.SessionLocal))
+                    # Start billing
+                    billing_scheduler.register(consultation_id, float(consultation.rate_per_min))
                 
                 # Broadcast (masked content if flagged)
                 await manager.broadcast(consultation_id, {
@@ -761,24 +1163,11 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
 
                 # Check if recipient is online, if not send Push
                 recipient_id = consultation.astrologer_id if user.id == consultation.seeker_id else consultation.seeker_id
-                
-                is_recipient_online = False
-                if consultation_id in manager.active_connections:
-                     for conn in manager.active_connections[consultation_id]:
-                         if conn["user_id"] == recipient_id:
-                             is_recipient_online = True
-                             break
-                
-                if not is_recipient_online:
-                    # Fetch Device Token
-                    tokens = db.query(models.DeviceToken).filter(models.DeviceToken.user_id == recipient_id).all()
-                    for token_obj in tokens:
-                        send_push_notification(
-                            token=token_obj.fcm_token,
-                            title=f"New Message from {user.seeker_profile.full_name if user.role == models.UserRole.SEEKER else user.astrologer_profile.full_name}",
-                            body=broadcast_content[:50] + ("..." if len(broadcast_content) > 50 else ""),
-                            data={"consultation_id": str(consultation_id), "type": "CHAT_MESSAGE"}
-                        )
+                if not await manager.is_user_in_room(consultation_id, recipient_id):
+                    await database.run_db(
+                        _push_chat_message, db, recipient_id, user, consultation_id,
+                        broadcast_content[:50] + ("..." if len(broadcast_content) > 50 else ""),
+                    )
                 
             elif msg_type == "PING":
                 await websocket.send_text(json.dumps({"type": "PONG"}))
@@ -790,16 +1179,14 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
                 }, exclude_user_id=user.id)
 
             elif msg_type == "RESUME_CHAT":
-                db.refresh(consultation)
+                await database.run_db(db.refresh, consultation)
                 if consultation.status == models.ConsultationStatus.PAUSED:
-                    wallet = db.query(models.UserWallet).filter(models.UserWallet.user_id == consultation.seeker_id).first()
-                    if wallet and float(wallet.balance) >= float(consultation.rate_per_min):
-                        consultation.status = models.ConsultationStatus.ACTIVE
-                        db.commit()
-                        asyncio.create_task(billing_loop(consultation_id, float(consultation.rate_per_min), database.SessionLocal))
+                    balance = await database.run_db(_resume_if_funded, db, consultation)
+                    if balance is not None:
+                        billing_scheduler.register(consultation_id, float(consultation.rate_per_min))
                         await manager.broadcast(consultation_id, {
                             "type": "CONSULTATION_RESUMED",
-                            "balance": float(wallet.balance)
+                            "balance": balance
                         })
                     else:
                         await websocket.send_text(json.dumps({
@@ -808,21 +1195,15 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
                         }))
 
             elif msg_type == "END_CHAT":
-                db.refresh(consultation)
-                # Don't overwrite a terminal status already set by billing_loop
+                await database.run_db(db.refresh, consultation)
+                # Don't overwrite a terminal status already set by the billing scheduler
                 if consultation.status in (models.ConsultationStatus.COMPLETED, models.ConsultationStatus.AUTO_ENDED):
                     await manager.broadcast(consultation_id, {"type": "CHAT_ENDED", "reason": "already_ended"})
                     break
-                consultation.status = models.ConsultationStatus.COMPLETED
-                consultation.end_time = datetime.utcnow()
-                audit.log(db, "CHAT_ENDED_BY_USER", actor_id=user.id,
-                          resource_type="consultation", resource_id=consultation_id,
-                          details={"total_cost": float(consultation.total_cost or 0),
-                                   "duration_seconds": consultation.duration_seconds or 0})
-                db.commit()
+                await database.run_db(_end_by_user, db, consultation, user.id)
                 await manager.broadcast(consultation_id, {"type": "CHAT_ENDED", "reason": "user_ended"})
                 # Astrologer is now free — alert the next seeker in their queue.
-                promote_next_in_queue(db, consultation.astrologer_id)
+                await database.run_db(promote_next_in_queue, db, consultation.astrologer_id)
                 break
 
     except WebSocketDisconnect:
@@ -841,33 +1222,41 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: int):
         await _pause_active_consultation_on_disconnect(consultation_id, user.role)
 
     finally:
-        db.close()
+        await database.run_db(db.close)
 
 
-async def _pause_active_consultation_on_disconnect(consultation_id: int, disconnected_role: "models.UserRole"):
-    """Flip an ACTIVE consultation to PAUSED when its socket drops, regardless of
-    whether that surfaces as a clean WebSocketDisconnect or some other error —
-    a dead connection is a dead connection either way, and billing_loop must stop
-    deducting from the seeker's wallet once nobody is actually connected."""
+def _pause_if_active(consultation_id: int, disconnected_role: "models.UserRole") -> bool:
     with database.SessionLocal() as db_disc:
         cons = db_disc.query(models.Consultation).filter(models.Consultation.id == consultation_id).first()
         if not cons or cons.status != models.ConsultationStatus.ACTIVE:
-            return
+            return False
+        paused_at = datetime.utcnow()
         cons.status = models.ConsultationStatus.PAUSED
-        # Populate disconnection_snapshot for crash recovery (and for the
-        # stale-paused sweep in main.py, which reads paused_at from it).
+        # paused_at is the stale-paused sweep's clock (sweeps.py);
+        # disconnection_snapshot keeps the resume state for crash recovery.
+        cons.paused_at = paused_at
         seeker_wallet = db_disc.query(models.UserWallet).filter(models.UserWallet.user_id == cons.seeker_id).first()
         cons.disconnection_snapshot = json.dumps({
-            "paused_at": datetime.utcnow().isoformat(),
+            "paused_at": paused_at.isoformat(),
             "paused_by": disconnected_role.value,
             "balance_at_pause": float(seeker_wallet.balance) if seeker_wallet else 0,
             "total_cost_at_pause": float(cons.total_cost or 0),
             "duration_seconds_at_pause": cons.duration_seconds or 0
         })
         db_disc.commit()
-        reason = "astrologer_disconnected" if disconnected_role == models.UserRole.ASTROLOGER else "seeker_disconnected"
-        await manager.broadcast(consultation_id, {"type": "CONSULTATION_PAUSED", "reason": reason})
-        logger.info(f"Consultation {consultation_id} paused due to {reason}")
+        return True
+
+
+async def _pause_active_consultation_on_disconnect(consultation_id: int, disconnected_role: "models.UserRole"):
+    """Flip an ACTIVE consultation to PAUSED when its socket drops, regardless of
+    whether that surfaces as a clean WebSocketDisconnect or some other error —
+    a dead connection is a dead connection either way, and billing must stop
+    deducting from the seeker's wallet once nobody is actually connected."""
+    if not await database.run_db(_pause_if_active, consultation_id, disconnected_role):
+        return
+    reason = "astrologer_disconnected" if disconnected_role == models.UserRole.ASTROLOGER else "seeker_disconnected"
+    await manager.broadcast(consultation_id, {"type": "CONSULTATION_PAUSED", "reason": reason})
+    logger.info(f"Consultation {consultation_id} paused due to {reason}")
 
 
 # --- Message translation (Hindi <-> English) ---
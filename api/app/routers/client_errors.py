@@ -3,7 +3,7 @@ Crash/error reporting endpoint for the frontend (web + Capacitor mobile app).
 Captures uncaught JS errors, unhandled promise rejections, and React render
 crashes that would otherwise only be visible in a devtools console or
 `adb logcat` at the moment they happen, then never again. Feeds the same
-`error_logs` table as backend 500s (see main.py's `log_requests` middleware),
+`error_logs` table as backend 500s (see app/edge.py's EdgeMiddleware),
 tagged with source="client" so the two are distinguishable in the admin UI.
 
 No auth required — a crash can happen before login (e.g. on the login screen
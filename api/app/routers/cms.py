@@ -9,7 +9,7 @@ import uuid
 import httpx
 from slugify import slugify
 from datetime import datetime
-from .. import models, database, schemas_cms
+from .. import models, database, response_cache, schemas_cms
 from .auth import get_current_admin
 from ..services import settings_service, content_studio_images
 
@@ -50,6 +50,7 @@ def create_post(post: schemas_cms.PostCreate, db: Session = Depends(database.get
     db.add(db_post)
     db.commit()
     db.refresh(db_post)
+    response_cache.invalidate("posts")
     return db_post
 
 @router.get("/posts", response_model=schemas_cms.PostListResponse)
@@ -119,6 +120,7 @@ def update_post(post_id: int, post_update: schemas_cms.PostUpdate, db: Session =
             
     db.commit()
     db.refresh(db_post)
+    response_cache.invalidate("posts")
     return db_post
 
 @router.delete("/posts/{post_id}")
@@ -128,6 +130,7 @@ def delete_post(post_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Post not found")
     db.delete(db_post)
     db.commit()
+    response_cache.invalidate("posts")
     return {"message": "Post deleted"}
 
 # --- Horoscopes (editorial content: daily/weekly/monthly/yearly per sign) ---
@@ -150,6 +153,7 @@ def create_horoscope(horoscope: schemas_cms.HoroscopeCreate, db: Session = Depen
     db.add(db_horoscope)
     db.commit()
     db.refresh(db_horoscope)
+    response_cache.invalidate("horoscopes")
     return db_horoscope
 
 @router.get("/horoscopes", response_model=HoroscopeListResponse)
@@ -185,6 +189,7 @@ def update_horoscope(horoscope_id: int, horoscope_update: schemas_cms.HoroscopeU
         db_horoscope.content = horoscope_update.content
     db.commit()
     db.refresh(db_horoscope)
+    response_cache.invalidate("horoscopes")
     return db_horoscope
 
 @router.delete("/horoscopes/{horoscope_id}")
@@ -194,6 +199,7 @@ def delete_horoscope(horoscope_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Horoscope not found")
     db.delete(db_horoscope)
     db.commit()
+    response_cache.invalidate("horoscopes")
     return {"message": "Horoscope deleted"}
 
 # --- Social Media Share / Generation endpoints ---
@@ -1,11 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Response, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from decimal import Decimal
 from datetime import datetime
-import asyncio
-from .. import models, schemas, database, audit
+from .. import models, schemas, database, audit, chat_history, response_cache
 from .auth import get_current_user
 
 router = APIRouter(
@@ -43,7 +42,7 @@ def request_consultation(request: schemas.ConsultationCreate, current_user: mode
         raise HTTPException(status_code=404, detail="Astrologer not found")
 
     # A seeker's very first-ever consultation is billed at a flat promotional rate
-    # for the first 5 minutes (see billing_loop in chat.py), instead of the
+    # for the first 5 minutes (see BillingScheduler in chat.py), instead of the
     # astrologer's normal per-minute rate.
     is_first_chat = db.query(models.Consultation).filter(
         models.Consultation.seeker_id == current_user.id
@@ -90,8 +89,7 @@ def request_consultation(request: schemas.ConsultationCreate, current_user: mode
 
 def _notify_astrologer_of_request(db: Session, consultation: models.Consultation, seeker: models.User):
     from .realtime import notify_user
-    from ..notifications import send_push_notification
-    from ..services.whatsapp_service import send_whatsapp
+    from ..notification_outbox import enqueue_push, enqueue_whatsapp
     from ..services.settings_service import get_setting
 
     seeker_name = (seeker.seeker_profile.full_name if seeker.seeker_profile else None) or "A seeker"
@@ -107,23 +105,22 @@ def _notify_astrologer_of_request(db: Session, consultation: models.Consultation
     except Exception as e:
         print(f"realtime notify failed: {e}")
 
-    # 2. FCM push.
+    # 2. FCM push (queued; see notification_outbox).
     try:
-        for tok in db.query(models.DeviceToken).filter(models.DeviceToken.user_id == consultation.astrologer_id).all():
-            send_push_notification(
-                token=tok.fcm_token,
-                title="New consultation request",
-                body=f"{seeker_name} wants to chat with you.",
-                data={"consultation_id": str(consultation.id), "type": "NEW_REQUEST"},
-                android_channel_id="knock_alerts",
-            )
+        enqueue_push(
+            db, consultation.astrologer_id,
+            title="New consultation request",
+            body=f"{seeker_name} wants to chat with you.",
+            data={"consultation_id": str(consultation.id), "type": "NEW_REQUEST"},
+            android_channel_id="knock_alerts",
+        )
     except Exception as e:
         print(f"push notify failed: {e}")
 
     # 3. WhatsApp nudge (pulls the astrologer back into the app).
     try:
         if astro and astro.phone_number:
-            send_whatsapp(astro.phone_number, "waplex_template_new_request", {
+            enqueue_whatsapp(db, astro.phone_number, "waplex_template_new_request", {
                 "seeker": seeker_name,
                 "app": get_setting("APP_NAME") or "Aadikarta",
                 "link": (get_setting("FRONTEND_URL") or "https://aadikarta.org") + "/dashboard",
@@ -221,10 +218,11 @@ async def resume_consultation(
         raise HTTPException(status_code=400, detail="Insufficient balance to resume consultation")
 
     consultation.status = models.ConsultationStatus.ACTIVE
+    consultation.paused_at = None
     db.commit()
 
-    from .chat import billing_loop, manager
-    asyncio.create_task(billing_loop(consultation_id, float(consultation.rate_per_min), database.SessionLocal))
+    from .chat import billing_scheduler, manager
+    billing_scheduler.register(consultation_id, float(consultation.rate_per_min))
 
     await manager.broadcast(consultation_id, {
         "type": "CONSULTATION_RESUMED",
@@ -320,14 +318,27 @@ def submit_review(review: schemas.ReviewCreate, current_user: models.User = Depe
 
     db.commit()
     db.refresh(new_review)
+    response_cache.invalidate("reviews", "trust_stats")
     return new_review
 
 # --- Chat ---
 
 # WebSocket logic moved to routers/chat.py
 
-@router.get("/{consultation_id}/messages", response_model=List[schemas.ChatMessage])
-def get_chat_history(consultation_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+@router.get("/{consultation_id}/messages", response_model=List[schemas.ChatMessage],
+            responses=chat_history.HISTORY_RESPONSES)
+def get_chat_history(
+    consultation_id: int,
+    response: Response,
+    since_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    """Same as GET /chat/history/{consultation_id}: the whole chat without
+    parameters, a page with since_id/before_id/limit, `X-Has-More: true` when
+    there are more messages to fetch."""
     # Verify access
     consultation = db.query(models.Consultation).filter(models.Consultation.id == consultation_id).first()
     if not consultation:
@@ -337,5 +348,6 @@ def get_chat_history(consultation_id: int, current_user: models.User = Depends(g
         if consultation.seeker_id != current_user.id and consultation.astrologer_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized to view this chat history")
 
-    msgs = db.query(models.ChatMessage).filter(models.ChatMessage.consultation_id == consultation_id).order_by(models.ChatMessage.timestamp).all()
-    return msgs
+    messages, has_more = chat_history.page(db, consultation_id, since_id, before_id, limit)
+    response.headers[chat_history.HAS_MORE_HEADER] = "true" if has_more else "false"
+    return messages
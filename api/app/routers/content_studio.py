@@ -615,7 +615,7 @@ async def update_youtube_video(
 
 async def _run_render_job(job_id: int):
     """Runs off the request/response cycle (scheduled via asyncio.create_task,
-    same pattern as main.py's billing_loop/_stale_request_sweep). Opens its own
+    same pattern as main.py's _stale_request_sweep). Opens its own
     DB session since the request-scoped one closes when the response returns.
     Blocking TTS/image/ffmpeg calls run in a thread so this doesn't stall the
     single event loop (shared with live chat billing) for the whole render.
@@ -155,7 +155,8 @@ def resolve_dispute(
 
     audit.log(db, "DISPUTE_UPDATED", actor_id=_admin.id,
               resource_type="dispute", resource_id=dispute_id,
-              details={"new_status": data.status, "refund_amount": float(data.refund_amount or 0)})
+              details={"new_status": data.status, "refund_amount": float(data.refund_amount or 0)},
+              sync=True)
     db.commit()
     db.refresh(dispute)
     return dispute
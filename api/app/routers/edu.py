@@ -247,7 +247,8 @@ def enroll_student(enrollment: schemas_edu.BatchEnrollmentCreate, db: Session =
             actor_id=current_user.id,
             resource_type="course",
             resource_id=course.id,
-            details={"batch_id": enrollment.batch_id, "amount": float(course.price)}
+            details={"batch_id": enrollment.batch_id, "amount": float(course.price)},
+            sync=True,
         )
 
     # Create Enrollment
@@ -19,7 +19,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, Field
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from .. import database, models, schemas
+from .. import database, models, schemas, single_flight
 from ..free_astro_service import (
     generate_full_kundli,
     generate_kuta_match,
@@ -311,58 +311,62 @@ async def kundli_chart(
 ):
     """Full Kundli — chart, vargas, vimshottari dasha, yogas, birth panchang,
     shadbala, and ashtakavarga — for a birth chart."""
-    existing = db.query(models.FreeKundliChart).filter(
-        models.FreeKundliChart.date_of_birth == request.date_of_birth,
-        models.FreeKundliChart.time_of_birth == request.time_of_birth,
-        models.FreeKundliChart.place_of_birth == request.place_of_birth,
-    ).first()
-    if existing:
-        return existing
-
-    try:
-        lat, lon = await geocode_place(request.place_of_birth)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception:
-        raise HTTPException(status_code=500, detail="Geocoding service unavailable. Please try again.")
-
-    try:
-        chart_data = await generate_full_kundli(
-            year=request.date_of_birth.year,
-            month=request.date_of_birth.month,
-            day=request.date_of_birth.day,
-            hour=request.time_of_birth.hour,
-            minute=request.time_of_birth.minute,
-            latitude=lat,
-            longitude=lon,
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"FreeAstroAPI error: {str(e)}")
-
-    record = models.FreeKundliChart(
-        full_name=request.full_name,
-        date_of_birth=request.date_of_birth,
-        time_of_birth=request.time_of_birth,
-        place_of_birth=request.place_of_birth,
-        chart_data=chart_data,
-    )
-    db.add(record)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        existing = db.query(models.FreeKundliChart).filter(
+    def lookup():
+        return db.query(models.FreeKundliChart).filter(
             models.FreeKundliChart.date_of_birth == request.date_of_birth,
             models.FreeKundliChart.time_of_birth == request.time_of_birth,
             models.FreeKundliChart.place_of_birth == request.place_of_birth,
         ).first()
-        if existing:
-            return existing
-        raise
-    db.refresh(record)
-    return record
+
+    existing = lookup()
+    if existing:
+        return existing
+
+    async def fetch():
+        try:
+            lat, lon = await geocode_place(request.place_of_birth)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception:
+            raise HTTPException(status_code=500, detail="Geocoding service unavailable. Please try again.")
+
+        try:
+            chart_data = await generate_full_kundli(
+                year=request.date_of_birth.year,
+                month=request.date_of_birth.month,
+                day=request.date_of_birth.day,
+                hour=request.time_of_birth.hour,
+                minute=request.time_of_birth.minute,
+                latitude=lat,
+                longitude=lon,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"FreeAstroAPI error: {str(e)}")
+
+        record = models.FreeKundliChart(
+            full_name=request.full_name,
+            date_of_birth=request.date_of_birth,
+            time_of_birth=request.time_of_birth,
+            place_of_birth=request.place_of_birth,
+            chart_data=chart_data,
+        )
+        db.add(record)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            existing = lookup()
+            if existing:
+                return existing
+            raise
+        db.refresh(record)
+        return record
+
+    # Same key as ai_astrologer._compute_chart_summary, which fills the same table.
+    key = single_flight.make_key("free_kundli", request.date_of_birth, request.time_of_birth, request.place_of_birth)
+    return await single_flight.run(key, lookup, fetch)
 
 
 @router.post("/kundli-match", response_model=schemas.FreeMatchReportResponse)
@@ -5,7 +5,7 @@ Astrologer-only endpoints that use FreeAstroAPI for compatibility calculation.
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from .. import models, schemas, database
+from .. import models, schemas, database, single_flight
 from ..vedic_rishi_service import geocode_place
 from ..free_astro_service import generate_kuta_match
 from .auth import get_current_user
@@ -81,62 +81,69 @@ async def generate_match_report(
     boy_dob, boy_tob, boy_place, boy_name = await _resolve_person(request.boy, db)
     girl_dob, girl_tob, girl_place, girl_name = await _resolve_person(request.girl, db)
 
-    existing = _find_reusable_match_report(db, boy_dob, boy_tob, boy_place, girl_dob, girl_tob, girl_place)
+    def lookup():
+        return _find_reusable_match_report(db, boy_dob, boy_tob, boy_place, girl_dob, girl_tob, girl_place)
+
+    existing = lookup()
 
     if existing:
         return existing
 
-    try:
-        boy_lat, boy_lon = await geocode_place(boy_place)
-        girl_lat, girl_lon = await geocode_place(girl_place)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception:
-        raise HTTPException(status_code=500, detail="Geocoding service unavailable. Please try again.")
-
-    try:
-        match_data = await generate_kuta_match(
-            person1={
-                "year": boy_dob.year, "month": boy_dob.month, "day": boy_dob.day,
-                "hour": boy_tob.hour, "minute": boy_tob.minute,
-                "lat": boy_lat, "lng": boy_lon, "tz_str": "Asia/Kolkata",
-                "label": boy_name or "Boy",
-            },
-            person2={
-                "year": girl_dob.year, "month": girl_dob.month, "day": girl_dob.day,
-                "hour": girl_tob.hour, "minute": girl_tob.minute,
-                "lat": girl_lat, "lng": girl_lon, "tz_str": "Asia/Kolkata",
-                "label": girl_name or "Girl",
-            },
+    async def fetch():
+        try:
+            boy_lat, boy_lon = await geocode_place(boy_place)
+            girl_lat, girl_lon = await geocode_place(girl_place)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception:
+            raise HTTPException(status_code=500, detail="Geocoding service unavailable. Please try again.")
+
+        try:
+            match_data = await generate_kuta_match(
+                person1={
+                    "year": boy_dob.year, "month": boy_dob.month, "day": boy_dob.day,
+                    "hour": boy_tob.hour, "minute": boy_tob.minute,
+                    "lat": boy_lat, "lng": boy_lon, "tz_str": "Asia/Kolkata",
+                    "label": boy_name or "Boy",
+                },
+                person2={
+                    "year": girl_dob.year, "month": girl_dob.month, "day": girl_dob.day,
+                    "hour": girl_tob.hour, "minute": girl_tob.minute,
+                    "lat": girl_lat, "lng": girl_lon, "tz_str": "Asia/Kolkata",
+                    "label": girl_name or "Girl",
+                },
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"FreeAstroAPI error: {str(e)}")
+
+        report = models.KundliMatchReport(
+            generated_by=current_user.id,
+            boy_seeker_id=request.boy.seeker_id,
+            girl_seeker_id=request.girl.seeker_id,
+            boy_full_name=boy_name,
+            boy_date_of_birth=boy_dob,
+            boy_time_of_birth=boy_tob,
+            boy_place_of_birth=boy_place,
+            boy_latitude=boy_lat,
+            boy_longitude=boy_lon,
+            girl_full_name=girl_name,
+            girl_date_of_birth=girl_dob,
+            girl_time_of_birth=girl_tob,
+            girl_place_of_birth=girl_place,
+            girl_latitude=girl_lat,
+            girl_longitude=girl_lon,
+            match_data=match_data,
         )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"FreeAstroAPI error: {str(e)}")
-
-    report = models.KundliMatchReport(
-        generated_by=current_user.id,
-        boy_seeker_id=request.boy.seeker_id,
-        girl_seeker_id=request.girl.seeker_id,
-        boy_full_name=boy_name,
-        boy_date_of_birth=boy_dob,
-        boy_time_of_birth=boy_tob,
-        boy_place_of_birth=boy_place,
-        boy_latitude=boy_lat,
-        boy_longitude=boy_lon,
-        girl_full_name=girl_name,
-        girl_date_of_birth=girl_dob,
-        girl_time_of_birth=girl_tob,
-        girl_place_of_birth=girl_place,
-        girl_latitude=girl_lat,
-        girl_longitude=girl_lon,
-        match_data=match_data,
-    )
-    db.add(report)
-    db.commit()
-    db.refresh(report)
+        db.add(report)
+        db.commit()
+        db.refresh(report)
 
-    return report
+        return report
+
+    key = single_flight.make_key("match", boy_dob, boy_tob, boy_place, girl_dob, girl_tob, girl_place)
+    return await single_flight.run(key, lookup, fetch)
 
 
 @router.get("/{report_id}", response_model=schemas.MatchReportResponse)
@@ -1,6 +1,7 @@
 """
 Live Muhurat router — current Hora, Choghadiya, 15-muhurta ("Do Ghati") day
-division, and current sidereal Lagna for a location, right now.
+division, and current sidereal Lagna for a location, right now, plus the full
+day's Lagna timeline.
 
 Sunrise/sunset come from the same cached FreeAstroAPI Panchang lookup used by
 /panchang/daily. Hora/Choghadiya/Muhurta/Lagna themselves are computed locally
@@ -23,6 +24,13 @@ router = APIRouter(
 IST_OFFSET_HOURS = 5.5  # matches generate_panchang's fixed Asia/Kolkata default
 
 
+def _now_ist() -> datetime:
+    """"Now" in the same naive-local convention as the sunrise/sunset
+    timestamps (Asia/Kolkata wall-clock time, unlabelled)."""
+    now = datetime.now(timezone.utc) + timedelta(hours=IST_OFFSET_HOURS)
+    return now.replace(tzinfo=None)
+
+
 def _parse_hms(value: str, on_date: date_cls) -> datetime:
     """FreeAstroAPI returns "HH:MM:SS" local time-of-day strings for sunrise/sunset."""
     h, m, s = (int(x) for x in value.split(":"))
@@ -57,10 +65,7 @@ async def get_live_muhurat(
     except (KeyError, ValueError) as e:
         raise HTTPException(status_code=502, detail=f"FreeAstroAPI Panchang response missing sunrise/sunset: {e}")
 
-    # Reference "now" in the same naive-local convention as the sunrise/sunset
-    # timestamps above (both are Asia/Kolkata wall-clock time, unlabelled).
-    now = datetime.now(timezone.utc) + timedelta(hours=IST_OFFSET_HOURS)
-    now = now.replace(tzinfo=None)
+    now = _now_ist()
 
     if now < today_sunrise:
         eff_sunrise, eff_sunset, eff_next_sunrise = prev_sunrise, prev_sunset, today_sunrise
@@ -93,3 +98,35 @@ async def get_live_muhurat(
         muhurtas=muhurtas,
         current_lagna=lagna,
     )
+
+
+@router.get("/lagna-timeline", response_model=schemas.LagnaTimelineResponse)
+async def get_lagna_timeline(
+    date: Optional[date_cls] = Query(None, description="Defaults to today (Asia/Kolkata)"),
+    lat: Optional[float] = Query(None, description="Latitude — when provided with lon, skips geocoding"),
+    lon: Optional[float] = Query(None, description="Longitude — when provided with lat, skips geocoding"),
+    place: Optional[str] = Query(None, description="Display label for the location; also used to geocode when lat/lon aren't provided"),
+):
+    """Every Lagna rising on `date` (local midnight to midnight), in order, with
+    start/end to the second — windows straddling midnight keep their true
+    start/end. Computed locally, so unlike /live this needs no Panchang lookup."""
+    target_date = date or _now_ist().date()
+    place_label = place or DEFAULT_CITY
+
+    resolved_lat, resolved_lon = await resolve_location(lat, lon, place_label)
+
+    day_start = datetime.combine(target_date, time.min)
+    lagnas = muhurat_calc.lagna_timeline(
+        day_start, day_start + timedelta(days=1), IST_OFFSET_HOURS, resolved_lat, resolved_lon,
+    )
+    now = _now_ist()
+    for w in lagnas:
+        w["is_current"] = w["start"] <= now < w["end"]
+
+    return schemas.LagnaTimelineResponse(
+        date=target_date,
+        place_label=place_label,
+        latitude=resolved_lat,
+        longitude=resolved_lon,
+        lagnas=lagnas,
+    )
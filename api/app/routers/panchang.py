@@ -1,7 +1,8 @@
 """
 Panchang router — public daily almanac widget.
 Uses FreeAstroAPI for calculation, cached per (date, rounded location) so repeat
-requests for the same day/city don't re-hit the API.
+requests for the same day/city don't re-hit the API, and coalesced through
+single_flight so a burst of identical cache misses makes one upstream call.
 """
 from datetime import date as date_cls
 from fastapi import APIRouter, HTTPException, Query
@@ -9,7 +10,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import Depends
 from typing import Optional
-from .. import models, schemas, database
+from .. import models, schemas, database, single_flight
 from ..vedic_rishi_service import geocode_place
 from ..free_astro_service import generate_panchang
 
@@ -43,50 +44,53 @@ async def get_or_fetch_panchang(
     rounded_lat = round(resolved_lat, 2)
     rounded_lon = round(resolved_lon, 2)
 
-    existing = db.query(models.PanchangCache).filter(
-        models.PanchangCache.date == target_date,
-        models.PanchangCache.latitude == rounded_lat,
-        models.PanchangCache.longitude == rounded_lon,
-    ).first()
+    def lookup():
+        return db.query(models.PanchangCache).filter(
+            models.PanchangCache.date == target_date,
+            models.PanchangCache.latitude == rounded_lat,
+            models.PanchangCache.longitude == rounded_lon,
+        ).first()
+
+    existing = lookup()
     if existing:
         return existing
 
-    try:
-        panchang_data = await generate_panchang(
-            year=target_date.year,
-            month=target_date.month,
-            day=target_date.day,
-            latitude=resolved_lat,
-            longitude=resolved_lon,
+    async def fetch():
+        try:
+            panchang_data = await generate_panchang(
+                year=target_date.year,
+                month=target_date.month,
+                day=target_date.day,
+                latitude=resolved_lat,
+                longitude=resolved_lon,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"FreeAstroAPI error: {str(e)}")
+
+        cached = models.PanchangCache(
+            date=target_date,
+            latitude=rounded_lat,
+            longitude=rounded_lon,
+            place_label=place_label,
+            panchang_data=panchang_data,
         )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"FreeAstroAPI error: {str(e)}")
+        db.add(cached)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker cached this (date, location) after its lock expired — use it.
+            db.rollback()
+            existing = lookup()
+            if existing:
+                return existing
+            raise
+        db.refresh(cached)
+        return cached
 
-    cached = models.PanchangCache(
-        date=target_date,
-        latitude=rounded_lat,
-        longitude=rounded_lon,
-        place_label=place_label,
-        panchang_data=panchang_data,
-    )
-    db.add(cached)
-    try:
-        db.commit()
-    except IntegrityError:
-        # Concurrent request already cached this (date, location) combo — use it.
-        db.rollback()
-        existing = db.query(models.PanchangCache).filter(
-            models.PanchangCache.date == target_date,
-            models.PanchangCache.latitude == rounded_lat,
-            models.PanchangCache.longitude == rounded_lon,
-        ).first()
-        if existing:
-            return existing
-        raise
-    db.refresh(cached)
-    return cached
+    key = single_flight.make_key("panchang", target_date, rounded_lat, rounded_lon)
+    return await single_flight.run(key, lookup, fetch)
 
 
 @router.get("/daily", response_model=schemas.PanchangResponse)
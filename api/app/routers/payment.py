@@ -405,7 +405,8 @@ async def razorpay_webhook(request: Request, db: Session = Depends(database.get_
     if order:
         order.consumed = True
     audit.log(db, "WALLET_TOPPED_UP_VIA_WEBHOOK", resource_type="user", resource_id=user_id,
-              details={"amount": amount_inr, "bonus_amount": float(bonus_amount), "order_id": order_id, "payment_id": payment_id})
+              details={"amount": amount_inr, "bonus_amount": float(bonus_amount), "order_id": order_id, "payment_id": payment_id},
+              sync=True)
 
     # See /verify: the order-creation cap check already blocks most overages;
     # this only catches the rare race of two concurrent orders. Money's
@@ -508,7 +509,8 @@ def refund_payment(
     audit.log(db, "PAYMENT_REFUNDED", actor_id=admin.id, resource_type="wallet_transaction",
               resource_id=transaction_id,
               details={"refund_amount": float(refund_amount), "razorpay_refund_id": razorpay_refund['id'],
-                        "user_id": original.user_id})
+                        "user_id": original.user_id},
+              sync=True)
     db.commit()
 
     return {
@@ -132,7 +132,8 @@ def generate_payout(
     db.add(payout)
     audit.log(db, "PAYOUT_GENERATED", actor_id=current_user.id,
               resource_type="payout", resource_id=None,
-              details={"astrologer_id": astrologer_id, "net_amount": amount, "tds_deducted": tds_deducted, "pg_charge_deducted": pg_charge_deducted})
+              details={"astrologer_id": astrologer_id, "net_amount": amount, "tds_deducted": tds_deducted, "pg_charge_deducted": pg_charge_deducted},
+              sync=True)
     db.commit()
     db.refresh(payout)
     return payout
@@ -179,7 +180,8 @@ def mark_payout_paid(
 
     audit.log(db, "PAYOUT_MARKED_PAID", actor_id=current_user.id,
               resource_type="payout", resource_id=payout_id,
-              details={"astrologer_id": payout.astrologer_id, "amount": payout_amount, "ref": transaction_reference})
+              details={"astrologer_id": payout.astrologer_id, "amount": payout_amount, "ref": transaction_reference},
+              sync=True)
     db.commit()
 
     if astrologer_email:
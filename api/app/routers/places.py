@@ -6,11 +6,14 @@ complete words, so partial input like "Mumb" returned nothing until the user
 finished typing "Mumbai" — Photon is purpose-built for autocomplete and matches
 on partial/prefix input instead.
 No auth required; results are cached in-process since city/state names for a
-given query are effectively static.
+given query are effectively static. When the offline gazetteer is loaded,
+prefix matches are served from geocoding.place_index without calling Photon;
+Photon's suggestions go into geocoding's bounded suggestion LRU so that the
+label the user picks geocodes locally when the form is submitted.
 """
 import time
-import httpx
 from fastapi import APIRouter, Request
+from .. import geocoding, http_clients
 from ..limiter import limiter
 
 router = APIRouter(prefix="/places", tags=["Places"])
@@ -84,20 +87,27 @@ async def autocomplete_place(request: Request, q: str):
     if cached and (time.monotonic() - cached[0]) < _CACHE_TTL_SECONDS:
         return cached[1]
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(
-            PHOTON_URL,
-            params={
-                "q": query,
-                "limit": 30,
-                "lang": "en",
-                "layer": ["city", "locality"],
-                "bbox": _INDIA_BBOX,
-            },
-            headers={"User-Agent": "AadikartaAstroApp/1.0"},
-        )
-        response.raise_for_status()
-        data = response.json()
+    if geocoding.place_index.has_gazetteer:
+        local = geocoding.place_index.prefix(query, limit=8)
+        if local:
+            suggestions = [place.suggestion for place in local]
+            _cache[cache_key] = (time.monotonic(), suggestions)
+            return suggestions
+
+    response = await http_clients.request(
+        "photon", "GET",
+        PHOTON_URL,
+        params={
+            "q": query,
+            "limit": 30,
+            "lang": "en",
+            "layer": ["city", "locality"],
+            "bbox": _INDIA_BBOX,
+        },
+        headers={"User-Agent": "AadikartaAstroApp/1.0"},
+    )
+    response.raise_for_status()
+    data = response.json()
 
     suggestions = []
     seen_labels = set()
@@ -109,5 +119,7 @@ async def autocomplete_place(request: Request, q: str):
         if len(suggestions) >= 8:
             break
 
+    for s in suggestions:
+        geocoding.remember_suggestion(geocoding.Place(s["city"], s["state"], s["lat"], s["lon"]))
     _cache[cache_key] = (time.monotonic(), suggestions)
     return suggestions
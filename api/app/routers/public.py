@@ -2,14 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
-from .. import models, database, schemas_cms, schemas
+from .. import models, database, response_cache, schemas_cms, schemas
 from ..limiter import limiter
 from ..services import settings_service
 from fastapi import Request
 
 router = APIRouter(
     prefix="/public",
-    tags=["Public Content"]
+    tags=["Public Content"],
+    route_class=response_cache.CachingRoute,
 )
 
 # --- Support Contact ---
@@ -25,6 +26,7 @@ def get_support_contact():
 # --- Posts ---
 
 @router.get("/posts", response_model=schemas_cms.PostListResponse)
+@response_cache.cached("posts", ttl=300)
 def get_public_posts(
     skip: int = 0, 
     limit: int = 10, 
@@ -41,6 +43,7 @@ def get_public_posts(
     return {"total": total, "posts": posts}
 
 @router.get("/posts/{slug}", response_model=schemas_cms.Post)
+@response_cache.cached("posts", ttl=300)
 def get_public_post(slug: str, db: Session = Depends(database.get_db)):
     post = db.query(models.Post).filter(
         models.Post.slug == slug,
@@ -53,6 +56,7 @@ def get_public_post(slug: str, db: Session = Depends(database.get_db)):
 # --- Pages ---
 
 @router.get("/pages/{slug}", response_model=schemas_cms.Page)
+@response_cache.cached("pages", ttl=600)
 def get_public_page(slug: str, db: Session = Depends(database.get_db)):
     page = db.query(models.Page).filter(models.Page.slug == slug).first()
     if not page:
@@ -62,6 +66,7 @@ def get_public_page(slug: str, db: Session = Depends(database.get_db)):
 # --- Horoscopes ---
 
 @router.get("/horoscopes", response_model=List[schemas_cms.Horoscope])
+@response_cache.cached("horoscopes", ttl=300)
 def get_public_horoscopes(
     sign: Optional[schemas_cms.ZodiacSign] = None,
     period: Optional[schemas_cms.HoroscopePeriod] = None,
@@ -90,6 +95,7 @@ def _first_name_last_initial(full_name: Optional[str]) -> str:
     return f"{parts[0]} {parts[-1][0]}."
 
 @router.get("/trust-stats", response_model=schemas.TrustStats)
+@response_cache.cached("trust_stats", ttl=300)
 def get_trust_stats(db: Session = Depends(database.get_db)):
     """Real, aggregate platform numbers for homepage trust signals."""
     verified_astrologers = db.query(models.AstrologerProfile).filter(
@@ -106,6 +112,7 @@ def get_trust_stats(db: Session = Depends(database.get_db)):
     )
 
 @router.get("/reviews", response_model=List[schemas.PublicReview])
+@response_cache.cached("reviews", ttl=300)
 def get_public_reviews(limit: int = 8, astrologer_id: Optional[int] = None, db: Session = Depends(database.get_db)):
     """Recent, genuinely submitted reviews with written feedback, for homepage and profile testimonials."""
     limit = max(1, min(limit, 20))
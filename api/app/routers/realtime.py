@@ -5,7 +5,13 @@ server->client notifications (new requests, queue updates, your-turn,
 astrologer-online, moderation alerts) and maintains live presence in Redis so
 seekers see accurate Online/Busy/Offline status.
 
-One user can hold several sockets (dashboard + chat tab); messages fan out to all.
+Any socket, guest or signed in, can also follow an ad-hoc report being
+generated: {"type": "WATCH_REPORT", "order_reference": ...} subscribes it to
+that order's REPORT_PROGRESS events (see app.report_jobs). The unguessable
+order_reference is the same key that opens the report itself.
+
+One user can hold several sockets (dashboard + chat tab), possibly on
+different workers; messages fan out to all of them via the backplane.
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import asyncio
@@ -13,9 +19,10 @@ import json
 import logging
 from datetime import datetime
 
-from .. import models, database
+from .. import astrologer_directory, models, database, fanout, report_jobs
 from .chat import get_user_from_token, receive_ws_token
 from ..redis_client import get_redis
+from ..backplane import backplane
 from ..services.settings_service import get_setting
 
 logger = logging.getLogger(__name__)
@@ -64,6 +71,9 @@ def is_present(user_id: int) -> bool:
         return True
 
 
+_MAX_WATCHED_REPORTS = 5
+
+
 class NotificationManager:
     def __init__(self):
         # user_id -> list[WebSocket]
@@ -72,22 +82,59 @@ class NotificationManager:
         # list/profile) — they get public broadcasts (ASTRO_ONLINE/OFFLINE) only,
         # never per-user sends, and never affect presence.
         self.guest_connections: list[WebSocket] = []
-
-    def is_user_connected(self, user_id: int) -> bool:
-        return user_id in self.connections
+        # Each socket writes through its own bounded queue (see app.fanout);
+        # notifications are droppable, so a slow socket loses its oldest frames.
+        self._outbound: dict[WebSocket, fanout.OutboundSocket] = {}
+        # order_reference -> {socket: its user_id (None for guests)}
+        self.report_watchers: dict[str, dict[WebSocket, int | None]] = {}
+        self._watching: dict[WebSocket, set[str]] = {}
+
+    def _out(self, websocket: WebSocket, user_id: int | None) -> fanout.OutboundSocket:
+        out = self._outbound.get(websocket)
+        if out is None:
+            if user_id is None:
+                label, evict = "realtime:guest", lambda o: self.disconnect_guest(websocket)
+            else:
+                label, evict = "realtime:user", lambda o: self.disconnect(user_id, websocket)
+            out = self._outbound[websocket] = fanout.OutboundSocket(websocket, label, fanout.DROP_OLDEST, evict)
+        return out
+
+    def _release(self, websocket: WebSocket):
+        for ref in self._watching.pop(websocket, ()):
+            watchers = self.report_watchers.get(ref, {})
+            watchers.pop(websocket, None)
+            if not watchers:
+                self.report_watchers.pop(ref, None)
+        out = self._outbound.pop(websocket, None)
+        if out is not None:
+            out.close()
+
+    async def is_user_connected(self, user_id: int) -> bool:
+        """True if the user has a realtime socket open on any worker."""
+        return user_id in self.connections or await backplane.is_member_elsewhere("inbox", user_id)
 
     async def connect(self, user_id: int, websocket: WebSocket):
         # Socket is already accepted by receive_ws_token() during the auth handshake.
         self.connections.setdefault(user_id, []).append(websocket)
+        backplane.join("inbox", user_id)
         mark_present(user_id)
 
     def disconnect(self, user_id: int, websocket: WebSocket):
         conns = self.connections.get(user_id)
         if not conns:
             return
+        if websocket in conns:
+            self._release(websocket)
+            backplane.leave("inbox", user_id)
         self.connections[user_id] = [w for w in conns if w != websocket]
         if not self.connections[user_id]:
             del self.connections[user_id]
+            asyncio.get_running_loop().create_task(self._clear_presence_unless_elsewhere(user_id))
+
+    async def _clear_presence_unless_elsewhere(self, user_id: int):
+        # Another worker may still hold a socket for this user, and this one may
+        # have reconnected meanwhile.
+        if user_id not in self.connections and not await backplane.is_member_elsewhere("inbox", user_id):
             clear_present(user_id)
 
     def connect_guest(self, websocket: WebSocket):
@@ -96,29 +143,60 @@ class NotificationManager:
     def disconnect_guest(self, websocket: WebSocket):
         if websocket in self.guest_connections:
             self.guest_connections.remove(websocket)
+        self._release(websocket)
+
+    def watch_report(self, order_reference: str, websocket: WebSocket, user_id: int | None) -> bool:
+        watching = self._watching.setdefault(websocket, set())
+        if order_reference not in watching and len(watching) >= _MAX_WATCHED_REPORTS:
+            return False
+        watching.add(order_reference)
+        self.report_watchers.setdefault(order_reference, {})[websocket] = user_id
+        return True
 
     async def send(self, user_id: int, payload: dict):
-        for ws in list(self.connections.get(user_id, [])):
-            try:
-                await ws.send_text(json.dumps(payload))
-            except Exception as e:
-                logger.error(f"notify send failed to user {user_id}: {e}")
+        await self.send_local(user_id, payload)
+        await backplane.publish("user", {"user_id": user_id, "payload": payload})
 
     async def broadcast(self, payload: dict):
-        for uid, conns in list(self.connections.items()):
-            for ws in list(conns):
-                try:
-                    await ws.send_text(json.dumps(payload))
-                except Exception as e:
-                    logger.error(f"broadcast send failed to user {uid}: {e}")
-        for ws in list(self.guest_connections):
-            try:
-                await ws.send_text(json.dumps(payload))
-            except Exception as e:
-                logger.error(f"broadcast send failed to guest: {e}")
+        await self.broadcast_local(payload)
+        await backplane.publish("all", {"payload": payload})
+
+    async def send_report(self, order_reference: str, payload: dict):
+        await self.send_report_local(order_reference, payload)
+        await backplane.publish("report", {"order_reference": order_reference, "payload": payload})
+
+    async def send_local(self, user_id: int, payload: dict):
+        sockets = [self._out(ws, user_id) for ws in self.connections.get(user_id, [])]
+        if sockets:
+            await fanout.send_all(sockets, json.dumps(payload))
+
+    async def broadcast_local(self, payload: dict):
+        astrologer_directory.on_broadcast(payload)
+        sockets = [self._out(ws, uid) for uid, conns in list(self.connections.items()) for ws in conns]
+        sockets += [self._out(ws, None) for ws in self.guest_connections]
+        if sockets:
+            await fanout.send_all(sockets, json.dumps(payload))
+
+    async def send_report_local(self, order_reference: str, payload: dict):
+        watchers = self.report_watchers.get(order_reference, {})
+        sockets = [self._out(ws, uid) for ws, uid in list(watchers.items())]
+        if sockets:
+            await fanout.send_all(sockets, json.dumps(payload))
+
+    async def _on_remote_user(self, envelope: dict):
+        await self.send_local(int(envelope["user_id"]), envelope["payload"])
+
+    async def _on_remote_all(self, envelope: dict):
+        await self.broadcast_local(envelope["payload"])
+
+    async def _on_remote_report(self, envelope: dict):
+        await self.send_report_local(envelope["order_reference"], envelope["payload"])
 
 
 notifier = NotificationManager()
+backplane.subscribe("user", notifier._on_remote_user)
+backplane.subscribe("all", notifier._on_remote_all)
+backplane.subscribe("report", notifier._on_remote_report)
 
 # The main asyncio loop the WebSockets live on. Captured at app startup so that
 # sync request handlers (run in FastAPI's threadpool) can schedule sends safely.
@@ -178,6 +256,37 @@ def broadcast_event(payload: dict):
         logger.warning("broadcast_event: no event loop available; broadcast dropped")
 
 
+def _astrologer_reconnected(astrologer_id: int) -> bool:
+    """True if the astrologer's manual online toggle is on. Reconnecting (e.g.
+    unlocking the phone and reopening the app, without tapping the
+    notification) makes the astrologer reachable again just like the manual
+    online toggle does — resolve pending Knock subscriptions here too, not only
+    from that toggle endpoint, otherwise seekers who knocked never get told the
+    astrologer is back."""
+    with database.SessionLocal() as db:
+        profile = db.query(models.AstrologerProfile).filter(models.AstrologerProfile.user_id == astrologer_id).first()
+        if not (profile and profile.is_online):
+            return False
+        from .astrologers import _notify_waiting_seekers
+        try:
+            _notify_waiting_seekers(db, astrologer_id)
+        except Exception as e:
+            logger.error(f"notify_waiting_seekers on reconnect failed for {astrologer_id}: {e}")
+        return True
+
+
+async def _watch_report(websocket: WebSocket, msg: dict, user_id: int | None):
+    """WATCH_REPORT: follow an order's REPORT_PROGRESS, starting with where it is now."""
+    ref = msg.get("order_reference")
+    if not isinstance(ref, str) or not 0 < len(ref) <= 64:
+        return
+    if not notifier.watch_report(ref, websocket, user_id):
+        return
+    snapshot = await database.run_db(report_jobs.progress_snapshot, ref)
+    if snapshot:
+        await websocket.send_text(json.dumps(snapshot))
+
+
 @router.websocket("/ws")
 async def realtime_endpoint(websocket: WebSocket):
     token = await receive_ws_token(websocket)
@@ -188,7 +297,7 @@ async def realtime_endpoint(websocket: WebSocket):
         try:
             user = await get_user_from_token(token, db)
         finally:
-            db.close()
+            await database.run_db(db.close)
 
     if not user:
         # Guest connection (logged-out visitor, or an expired/invalid token) —
@@ -205,6 +314,8 @@ async def realtime_endpoint(websocket: WebSocket):
                     continue
                 if msg.get("type") == "PING":
                     await websocket.send_text(json.dumps({"type": "PONG"}))
+                elif msg.get("type") == "WATCH_REPORT":
+                    await _watch_report(websocket, msg, None)
         except WebSocketDisconnect:
             pass
         except Exception as e:
@@ -218,23 +329,8 @@ async def realtime_endpoint(websocket: WebSocket):
 
     # If astrologer connects and is set to online manually, broadcast online status
     if user.role == models.UserRole.ASTROLOGER:
-        db = database.SessionLocal()
-        try:
-            profile = db.query(models.AstrologerProfile).filter(models.AstrologerProfile.user_id == user.id).first()
-            if profile and profile.is_online:
-                asyncio.create_task(notifier.broadcast({"type": "ASTRO_ONLINE", "astrologer_id": user.id}))
-                # Reconnecting (e.g. unlocking the phone and reopening the app,
-                # without tapping the notification) makes the astrologer reachable
-                # again just like the manual online toggle does — resolve pending
-                # Knock subscriptions here too, not only from that toggle endpoint,
-                # otherwise seekers who knocked never get told the astrologer is back.
-                from .astrologers import _notify_waiting_seekers
-                try:
-                    _notify_waiting_seekers(db, user.id)
-                except Exception as e:
-                    logger.error(f"notify_waiting_seekers on reconnect failed for {user.id}: {e}")
-        finally:
-            db.close()
+        if await database.run_db(_astrologer_reconnected, user.id):
+            asyncio.create_task(notifier.broadcast({"type": "ASTRO_ONLINE", "astrologer_id": user.id}))
 
     try:
         while True:
@@ -246,6 +342,8 @@ async def realtime_endpoint(websocket: WebSocket):
             if msg.get("type") == "PING":
                 mark_present(user.id)  # heartbeat refreshes presence TTL
                 await websocket.send_text(json.dumps({"type": "PONG"}))
+            elif msg.get("type") == "WATCH_REPORT":
+                await _watch_report(websocket, msg, user.id)
     except WebSocketDisconnect:
         notifier.disconnect(user.id, websocket)
         logger.info(f"Realtime disconnected: user={user.id}")
@@ -254,10 +352,10 @@ async def realtime_endpoint(websocket: WebSocket):
         # manual is_online preference, or navigating between pages (e.g. into a chat,
         # which doesn't hold this socket) permanently flips them offline even after
         # they return and reconnect.
-        if user.role == models.UserRole.ASTROLOGER and not notifier.is_user_connected(user.id):
+        if user.role == models.UserRole.ASTROLOGER and not await notifier.is_user_connected(user.id):
             asyncio.create_task(notifier.broadcast({"type": "ASTRO_OFFLINE", "astrologer_id": user.id}))
     except Exception as e:
         logger.error(f"Realtime socket error (user {user.id}): {e}")
         notifier.disconnect(user.id, websocket)
-        if user.role == models.UserRole.ASTROLOGER and not notifier.is_user_connected(user.id):
+        if user.role == models.UserRole.ASTROLOGER and not await notifier.is_user_connected(user.id):
             asyncio.create_task(notifier.broadcast({"type": "ASTRO_OFFLINE", "astrologer_id": user.id}))
@@ -2,35 +2,25 @@
 Reports Router — Ad-Hoc Report Ordering, Lead Capture, Direct Payment & Analytics.
 """
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func
 from pydantic import BaseModel, Field, model_validator
 from typing import Optional, Dict, Any
 from datetime import date, time
 import hmac
 import hashlib
 import json
-import os
 import uuid
 
-from .. import models
+from .. import exports, models, pdf_store, report_jobs
 from ..database import get_db
 from .auth import get_current_admin
 from .payment import get_razorpay_client, get_razorpay_mode, get_razorpay_keys
-from ..models_reports import ReportLead, AdHocReportOrder, ReportAnalytics, ReportType, PaymentStatus, ReportStatus
-from ..report_generator_service import generate_full_kundli_report, generate_gun_milan_report, generate_career_finance_report
-from ..report_pdf_service import generate_report_pdf
+from ..models_reports import ReportLead, AdHocReportOrder, ReportAnalytics, ReportJob, ReportType, PaymentStatus, ReportStatus
+from ..report_pdf_service import TEMPLATE_VERSION, generate_report_pdf, report_digest
 from ..services.settings_service import get_setting
-from ..services.whatsapp_service import send_report_pdf
 
 
-# Deliberately NOT under "uploads/" — that whole directory is served
-# unauthenticated via the app.mount("/static", ...) in main.py, which would
-# let anyone who knows/guesses an order_reference fetch the PDF directly and
-# skip the payment-status check in get_report_pdf below.
-REPORTS_PDF_DIR = "generated_report_pdfs"
-
 router = APIRouter(
     prefix="/reports",
     tags=["Ad-Hoc Reports"]
@@ -98,90 +88,20 @@ class VerifyPaymentRequest(BaseModel):
 
 # --- Internal helpers ---
 
-async def _complete_report_order(db: Session, order: AdHocReportOrder) -> Dict[str, Any]:
-    """Generate the AI report payload, persist it, and dispatch WhatsApp delivery.
-    Shared by the client-side verify callback and the server-to-server webhook
-    so a completed order is only ever processed once from either path."""
-    if order.report_status == ReportStatus.COMPLETED:
-        return {
-            "status": "COMPLETED",
-            "order_reference": order.order_reference,
-            "pdf_url": order.pdf_url,
-            "whatsapp_sent": order.whatsapp_sent,
-        }
-
-    order.report_status = ReportStatus.GENERATING
-    db.commit()
-
-    lead = order.lead
-    report_payload: Dict[str, Any] = {}
-    if order.report_type == ReportType.FULL_KUNDLI:
-        report_payload = await generate_full_kundli_report(
-            full_name=lead.full_name,
-            dob=lead.date_of_birth,
-            tob=lead.time_of_birth,
-            pob=lead.place_of_birth,
-            gender=lead.gender or "MALE",
-            language=order.language
-        )
-    elif order.report_type == ReportType.GUN_MILAN:
-        person1 = {
-            "full_name": lead.full_name,
-            "year": lead.date_of_birth.year, "month": lead.date_of_birth.month, "day": lead.date_of_birth.day,
-            "hour": lead.time_of_birth.hour, "minute": lead.time_of_birth.minute,
-            "place": lead.place_of_birth
-        }
-        person2 = {
-            "full_name": lead.partner_full_name,
-            "year": lead.partner_date_of_birth.year, "month": lead.partner_date_of_birth.month, "day": lead.partner_date_of_birth.day,
-            "hour": lead.partner_time_of_birth.hour, "minute": lead.partner_time_of_birth.minute,
-            "place": lead.partner_place_of_birth
-        }
-        report_payload = await generate_gun_milan_report(person1, person2, language=order.language)
-    elif order.report_type == ReportType.CAREER_FINANCE:
-        report_payload = await generate_career_finance_report(
-            full_name=lead.full_name,
-            dob=lead.date_of_birth,
-            tob=lead.time_of_birth,
-            pob=lead.place_of_birth,
-            language=order.language
-        )
-
-    report_title = report_payload.get("report_title", "Aadikarta Vedic Report")
-
-    os.makedirs(REPORTS_PDF_DIR, exist_ok=True)
-    pdf_bytes = generate_report_pdf(order.report_type.value, report_payload, order.order_reference)
-    with open(os.path.join(REPORTS_PDF_DIR, f"{order.order_reference}.pdf"), "wb") as f:
-        f.write(pdf_bytes)
-
-    order.report_data = report_payload
-    order.pdf_url = f"/reports/{order.order_reference}/pdf"
-    order.report_status = ReportStatus.COMPLETED
-    db.commit()
-
-    public_base = (get_setting("content_studio_public_base_url") or "https://api.aadikarta.org").rstrip("/")
-    whatsapp_sent = send_report_pdf(
-        to_phone=lead.phone_number,
-        full_name=lead.full_name,
-        report_title=report_title,
-        pdf_url=f"{public_base}{order.pdf_url}",
-    )
-    order.whatsapp_sent = whatsapp_sent
-    db.commit()
-
-    analytics = ReportAnalytics(
-        report_type=order.report_type,
-        action="PAYMENT_SUCCESS",
-        order_id=order.id
-    )
-    db.add(analytics)
-    db.commit()
-
+def _queue_report(db: Session, order: AdHocReportOrder) -> Dict[str, Any]:
+    """Queue the report for generation (see app.report_jobs) and answer
+    straight away. Shared by the client-side verify callback and the
+    server-to-server webhook; whichever arrives first queues the one job, the
+    other gets the same job back. Progress follows as REPORT_PROGRESS events
+    on /realtime/ws (WATCH_REPORT) or via GET /reports/{order_reference}."""
+    job = report_jobs.enqueue(db, order)
     return {
-        "status": "COMPLETED",
+        "status": "COMPLETED" if order.report_status == ReportStatus.COMPLETED else "QUEUED",
         "order_reference": order.order_reference,
+        "job_id": job.id if job else None,
+        "stage": job.stage if job else report_jobs.COMPLETED,
         "pdf_url": order.pdf_url,
-        "whatsapp_sent": whatsapp_sent
+        "whatsapp_sent": order.whatsapp_sent,
     }
 
 
@@ -307,22 +227,22 @@ def create_direct_order(
 
 
 @router.post("/verify-payment")
-async def verify_report_payment(
+def verify_report_payment(
     req: VerifyPaymentRequest,
     db: Session = Depends(get_db)
 ):
     """
     Step 3: Client-side callback after Razorpay Checkout succeeds. Verifies the
     payment signature server-side (never trusts the browser's word alone) before
-    marking the order paid and generating the report — mirrors /payment/verify.
+    marking the order paid and queueing the report — mirrors /payment/verify.
+    Returns as soon as the report is queued, with its job_id.
     """
     order = db.query(AdHocReportOrder).filter(AdHocReportOrder.order_reference == req.order_reference).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order reference not found")
 
     if order.payment_status == PaymentStatus.PAID:
-        result = await _complete_report_order(db, order)
-        return result
+        return _queue_report(db, order)
 
     if req.razorpay_order_id != order.gateway_order_id:
         raise HTTPException(status_code=400, detail="Order mismatch")
@@ -340,8 +260,7 @@ async def verify_report_payment(
     order.gateway_payment_id = req.razorpay_payment_id
     db.commit()
 
-    result = await _complete_report_order(db, order)
-    return result
+    return _queue_report(db, order)
 
 
 @router.post("/payment-webhook")
@@ -393,7 +312,7 @@ async def process_payment_webhook(request: Request, db: Session = Depends(get_db
         order.gateway_payment_id = payment_id
         db.commit()
 
-    await _complete_report_order(db, order)
+    _queue_report(db, order)
     return {"status": "ok"}
 
 
@@ -431,13 +350,13 @@ def get_report_analytics_dashboard(
 
 
 @router.post("/internal-test-generate")
-async def generate_internal_test_report(
+def generate_internal_test_report(
     req: InternalTestGenerateRequest,
     db: Session = Depends(get_db),
     current_admin: models.User = Depends(get_current_admin),
 ):
     """
-    Admin-only QA bypass: generates a real AI report end-to-end (synthesis, PDF,
+    Admin-only QA bypass: queues a real AI report end-to-end (synthesis, PDF,
     WhatsApp dispatch to the phone number supplied in the request) WITHOUT going
     through Razorpay, so the team can review report quality for free. Marked
     PaymentStatus.INTERNAL_TEST so it's excluded from revenue/conversion metrics
@@ -479,8 +398,7 @@ async def generate_internal_test_report(
     db.commit()
     db.refresh(order)
 
-    result = await _complete_report_order(db, order)
-    return {**result, "lead_id": lead.id}
+    return {**_queue_report(db, order), "lead_id": lead.id}
 
 
 def _lead_summary(lead: ReportLead, orders: list) -> Dict[str, Any]:
@@ -555,10 +473,18 @@ def export_report_leads(
 ):
     """CSV export of captured leads (Full Name, Mobile, Email + context) for
     marketing follow-up / remarketing use, per admin request."""
-    import csv
-    import io
-
-    query = db.query(ReportLead)
+    orders = (
+        db.query(
+            AdHocReportOrder.lead_id.label("lead_id"),
+            func.count(AdHocReportOrder.id).label("order_count"),
+            func.sum(case((AdHocReportOrder.payment_status == PaymentStatus.PAID, 1), else_=0)).label("paid_count"),
+        )
+        .group_by(AdHocReportOrder.lead_id)
+        .subquery()
+    )
+    order_count = func.coalesce(orders.c.order_count, 0)
+    paid_count = func.coalesce(orders.c.paid_count, 0)
+    query = db.query(ReportLead, order_count, paid_count).outerjoin(orders, orders.c.lead_id == ReportLead.id)
     if report_type:
         query = query.filter(ReportLead.report_type == report_type)
     if search:
@@ -568,43 +494,29 @@ def export_report_leads(
             (ReportLead.phone_number.ilike(like)) |
             (ReportLead.email.ilike(like))
         )
+    if converted_only:
+        query = query.filter(paid_count > 0)
+
+    leads = exports.stream(query.order_by(ReportLead.created_at.desc(), ReportLead.id.desc()))
+
+    def rows():
+        for lead, orders_placed, paid in leads:
+            yield [
+                lead.full_name,
+                lead.phone_number,
+                lead.email or "",
+                lead.report_type.value if lead.report_type else "",
+                lead.marketing_segment or "",
+                lead.campaign_source or "",
+                "Yes" if paid else "No",
+                orders_placed,
+                lead.created_at.strftime("%Y-%m-%d %H:%M:%S") if lead.created_at else "",
+            ]
 
-    leads = query.order_by(ReportLead.created_at.desc()).all()
-
-    lead_ids = [l.id for l in leads]
-    orders_by_lead: Dict[int, list] = {lid: [] for lid in lead_ids}
-    if lead_ids:
-        for order in db.query(AdHocReportOrder).filter(AdHocReportOrder.lead_id.in_(lead_ids)).all():
-            orders_by_lead[order.lead_id].append(order)
-
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow([
+    return exports.csv_response("report-leads.csv", [
         "Full Name", "Mobile", "Email", "Report Type", "Marketing Segment",
         "Campaign Source", "Converted (Paid)", "Order Count", "Captured At",
-    ])
-    for lead in leads:
-        orders = orders_by_lead[lead.id]
-        summary = _lead_summary(lead, orders)
-        if converted_only and not summary["converted"]:
-            continue
-        writer.writerow([
-            lead.full_name,
-            lead.phone_number,
-            lead.email or "",
-            lead.report_type.value if lead.report_type else "",
-            lead.marketing_segment or "",
-            lead.campaign_source or "",
-            "Yes" if summary["converted"] else "No",
-            summary["order_count"],
-            lead.created_at.strftime("%Y-%m-%d %H:%M:%S") if lead.created_at else "",
-        ])
-    buffer.seek(0)
-    return StreamingResponse(
-        iter([buffer.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=report-leads.csv"},
-    )
+    ], rows())
 
 
 @router.get("/leads/{lead_id}")
@@ -646,38 +558,38 @@ def get_report_lead_detail(
 @router.get("/{order_reference}/pdf")
 def get_report_pdf(
     order_reference: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Stream the generated report PDF. Same access model as get_report_details:
-    gated on the unguessable order_reference plus a PAID (or admin INTERNAL_TEST) payment status."""
+    gated on the unguessable order_reference plus a PAID (or admin INTERNAL_TEST) payment status.
+    Served from the pdf_store (Range requests, ETag revalidation); a PDF that
+    isn't there, e.g. after a template change the pre-warmer hasn't reached
+    yet, is rendered once from the stored report data."""
     order = db.query(AdHocReportOrder).filter(AdHocReportOrder.order_reference == order_reference).first()
     if not order:
         raise HTTPException(status_code=404, detail="Report order not found")
     if order.payment_status not in (PaymentStatus.PAID, PaymentStatus.INTERNAL_TEST):
         raise HTTPException(status_code=402, detail="Payment pending for this report")
+    if order.report_status != ReportStatus.COMPLETED or not order.report_data:
+        raise HTTPException(status_code=404, detail="Report PDF not yet generated")
+
+    key = order.pdf_sha256
+    if not key or order.pdf_template_version != TEMPLATE_VERSION:
+        key = report_digest(order.report_type.value, order.report_data, order.order_reference)
+    pdf_store.get_or_build(
+        pdf_store.REPORT, key,
+        lambda: generate_report_pdf(order.report_type.value, order.report_data, order.order_reference),
+    )
+    if (order.pdf_sha256, order.pdf_template_version) != (key, TEMPLATE_VERSION):
+        order.pdf_sha256, order.pdf_template_version = key, TEMPLATE_VERSION
+        db.commit()
 
-    pdf_path = os.path.join(REPORTS_PDF_DIR, f"{order_reference}.pdf")
-    if not os.path.exists(pdf_path):
-        if order.report_status != ReportStatus.COMPLETED or not order.report_data:
-            raise HTTPException(status_code=404, detail="Report PDF not yet generated")
-        # Regenerate — e.g. the file was lost from disk but the report data survives in the DB.
-        os.makedirs(REPORTS_PDF_DIR, exist_ok=True)
-        pdf_bytes = generate_report_pdf(order.report_type.value, order.report_data, order.order_reference)
-        with open(pdf_path, "wb") as f:
-            f.write(pdf_bytes)
-    else:
-        with open(pdf_path, "rb") as f:
-            pdf_bytes = f.read()
-
-    raw_title = (order.report_data.get("report_title") if order.report_data else None) or "Aadikarta-Report"
+    raw_title = order.report_data.get("report_title") or "Aadikarta-Report"
     # Content-Disposition filenames must be latin-1 safe (e.g. Hindi-language
     # report titles aren't) — strip to a plain ASCII-safe fallback.
     safe_title = "".join(c if c.isascii() and c not in '"\\' else "-" for c in raw_title).strip("- ") or "Aadikarta-Report"
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'inline; filename="{safe_title}.pdf"'},
-    )
+    return pdf_store.response(request, pdf_store.REPORT, key, f"{safe_title}.pdf")
 
 
 @router.get("/{order_reference}")
@@ -695,11 +607,15 @@ def get_report_details(
     if order.payment_status not in (PaymentStatus.PAID, PaymentStatus.INTERNAL_TEST):
         raise HTTPException(status_code=402, detail="Payment pending for this report")
 
+    job = db.query(ReportJob).filter(ReportJob.order_id == order.id).first()
     return {
         "order_id": order.id,
         "order_reference": order.order_reference,
         "report_type": order.report_type,
         "language": order.language,
+        "report_status": order.report_status,
+        "job_id": job.id if job else None,
+        "stage": job.stage if job else None,
         "report_data": order.report_data,
         "pdf_url": order.pdf_url,
         "created_at": order.created_at,
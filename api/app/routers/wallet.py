@@ -97,7 +97,8 @@ def add_money(
             "adjustment_amount": body.amount,
             "new_balance": float(new_balance),
             "description": body.description,
-        }
+        },
+        sync=True,
     )
 
     try:
@@ -301,7 +301,7 @@ class TrustStats(BaseModel):
 
 class ChatMessage(BaseModel):
     id: int
-    sender_id: int
+    sender_id: Optional[int] = None  # NULL once the sender account is deleted
     message: str
     message_type: str = "text"
     media_url: Optional[str] = None
@@ -459,6 +459,20 @@ class CurrentLagna(BaseModel):
     start: datetime
     end: datetime
 
+class LagnaWindow(BaseModel):
+    sign: str
+    sign_id: int
+    start: datetime
+    end: datetime
+    is_current: bool = False
+
+class LagnaTimelineResponse(BaseModel):
+    date: date
+    place_label: Optional[str]
+    latitude: float
+    longitude: float
+    lagnas: List[LagnaWindow]
+
 class LiveMuhuratResponse(BaseModel):
     date: date
     place_label: Optional[str]
@@ -14,9 +14,10 @@ from datetime import datetime, timedelta
 from typing import List, Optional, Tuple
 from zoneinfo import ZoneInfo
 
-import httpx
 from fastapi import BackgroundTasks
 
+from .. import http_clients
+
 logger = logging.getLogger(__name__)
 
 # --- Configuration -----------------------------------------------------------
@@ -669,14 +670,16 @@ def _send_via_resend(
     if attachments:
         payload["attachments"] = attachments
     try:
-        resp = httpx.post(
+        # Not idempotent: only retried when the request never reached Resend.
+        resp = http_clients.request_sync(
+            "resend", "POST",
             RESEND_API_URL,
             headers={
                 "Authorization": f"Bearer {RESEND_API_KEY}",
                 "Content-Type": "application/json",
             },
             json=payload,
-            timeout=15.0,
+            idempotent=False,
         )
         if resp.status_code >= 400:
             logger.error(
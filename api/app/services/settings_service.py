@@ -1,18 +1,34 @@
 """Runtime configuration backed by the app_settings table.
 
 Super admin edits these via /admin/settings; the rest of the app reads them
-through get_setting(). A short in-process cache avoids a DB hit on every call
-(e.g. the per-message moderation path)."""
+through get_setting(), which is a plain dict lookup — it's called from async
+hot paths (per-message moderation, sweeps, queue promotion, Razorpay keys).
+
+In the API process start() loads the table once at startup and reloads it in
+the background every SETTINGS_REFRESH_SECS. set_setting()/set_many() reload
+the writing worker immediately and announce the change on the backplane
+"settings" topic, so every other worker reloads within milliseconds.
+Processes that never call start() (scripts, tests) reload on read once the
+cache is older than 30s, as before.
+
+Tunables (env):
+  SETTINGS_REFRESH_SECS   background reload interval (default 300)
+"""
+import asyncio
 import os
 import time
 import logging
 from typing import Optional
 from sqlalchemy.orm import Session
 from .. import models
-from ..database import SessionLocal
+from ..backplane import backplane
+from ..database import SessionLocal, run_db
 
 logger = logging.getLogger(__name__)
 
+SETTINGS_REFRESH_SECS = float(os.getenv("SETTINGS_REFRESH_SECS", "300"))
+_TOPIC = "settings"
+
 # Default values seeded/returned when a key has not been configured yet.
 DEFAULTS: dict[str, str] = {
     # Shown in every outgoing email footer and available to other support-facing UI.
@@ -83,10 +99,44 @@ def _refresh_cache():
         logger.error(f"settings_service: failed to refresh cache: {e}")
 
 
+_refresher: Optional[asyncio.Task] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _refresh_periodically():
+    while True:
+        await run_db(_refresh_cache)
+        await asyncio.sleep(SETTINGS_REFRESH_SECS)
+
+
+async def _on_changed(message: dict):
+    await run_db(_refresh_cache)
+
+
+backplane.subscribe(_TOPIC, _on_changed)
+
+
+def start():
+    """Load now and keep reloading in the background on the running loop."""
+    global _refresher, _loop
+    loop = asyncio.get_running_loop()
+    _loop = loop
+    if _refresher is None or _refresher.done() or _refresher.get_loop() is not loop:
+        _refresher = loop.create_task(_refresh_periodically())
+
+
+def _announce_change():
+    """Tell the other workers to reload. Safe from request threads."""
+    if _loop is not None and _loop.is_running():
+        asyncio.run_coroutine_threadsafe(backplane.publish(_TOPIC, {}), _loop)
+
+
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
     """Return a configured value, falling back to DEFAULTS then the passed default."""
-    global _CACHE_TS
-    if time.time() - _CACHE_TS > _CACHE_TTL_SECONDS:
+    refreshing = _refresher is not None and not _refresher.done()
+    # Without the background refresher, fall back to reload-on-read; with it,
+    # only a read racing the very first startup load can get here.
+    if not _CACHE_TS or (not refreshing and time.time() - _CACHE_TS > _CACHE_TTL_SECONDS):
         _refresh_cache()
     val = _CACHE.get(key)
     if val is None or val == "":
@@ -113,6 +163,7 @@ def set_setting(db: Session, key: str, value: str):
         db.add(models.AppSetting(key=key, value=value))
     db.commit()
     _refresh_cache()
+    _announce_change()
 
 
 def set_many(db: Session, values: dict[str, str]):
@@ -127,3 +178,4 @@ def set_many(db: Session, values: dict[str, str]):
             db.add(models.AppSetting(key=key, value=value))
     db.commit()
     _refresh_cache()
+    _announce_change()
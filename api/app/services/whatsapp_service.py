@@ -48,18 +48,20 @@ def _render(template: str, params: dict) -> str:
         return template
 
 
-def send_whatsapp(to_phone: str, template_key: str, params: dict | None = None):
-    """Send a WhatsApp message via WAPlex. Best-effort: never raises to the caller."""
+def send_whatsapp(to_phone: str, template_key: str, params: dict | None = None) -> bool:
+    """Send a WhatsApp message via WAPlex. Best-effort: never raises to the caller.
+    Returns False only when the gateway send itself failed (worth retrying);
+    an unconfigured gateway or missing recipient counts as done."""
     params = params or {}
     api_key = get_setting("waplex_api_key")
     if not api_key:
         logger.info(f"[MOCK WAPlex] (Not connected) To: {to_phone} | template: {template_key} | params: {params}")
-        return
+        return True
         
     config = _get_config()
     if not config.base_url:
         logger.warning("WAPlex send failed: waplex_base_url is not configured")
-        return
+        return True
 
     # Use hardcoded templates for direct keys, otherwise check settings DB
     template = HARDCODED_TEMPLATES.get(template_key) or get_setting(template_key) or template_key
@@ -67,14 +69,16 @@ def send_whatsapp(to_phone: str, template_key: str, params: dict | None = None):
 
     if not to_phone:
         logger.info(f"[WAPlex] skipped — no recipient phone (template={template_key})")
-        return
+        return True
 
     try:
         sender = WaplexSender(config)
         sender.send_text(api_key, to_phone, body)
         logger.info(f"[WAPlex] sent to {to_phone} (template={template_key})")
+        return True
     except Exception as e:
         logger.error(f"[WAPlex] send failed to {to_phone}: {e}")
+        return False
 
 
 def send_report_pdf(to_phone: str, full_name: str, report_title: str, pdf_url: str) -> bool:
@@ -0,0 +1,186 @@
+"""
+Single-flight coalescing for cached FreeAstroAPI computations.
+
+Panchang, free Kundli charts (also used by the AI astrologer) and match
+reports all follow "look in the cache table, else call FreeAstroAPI and
+insert". Under a burst of identical requests — a shared horoscope link going
+viral — every request misses the cache at once, so N identical upstream calls
+run and N-1 inserts lose the unique-key race.
+
+run(key, lookup, compute) lets exactly one caller per key do the work:
+  - within a worker, concurrent callers await the leader's in-flight future
+  - across workers, the leader also takes a Redis lock (SET NX PX); a worker
+    that finds the lock held polls `lookup`, backing off from _POLL_SECS to
+    _MAX_POLL_SECS, until the holder has stored the row (or released the lock
+    / SINGLE_FLIGHT_WAIT_SECS passes, after which it computes itself)
+Followers return `lookup()` run on their own DB session, so nothing ORM-bound
+crosses requests. The lock goes through the asyncio Redis client and a
+waiting worker's polls run on the DB executor, so a herd of waiters never
+blocks the event loop. Without Redis (or while it's unreachable) only the
+in-process coalescing applies.
+
+Tunables (env):
+  SINGLE_FLIGHT_LOCK_TTL_SECS  lock expiry if a holder dies mid-call (default 120)
+  SINGLE_FLIGHT_WAIT_SECS      longest a worker waits on another's lock (default 60)
+"""
+import asyncio
+import collections
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from . import database
+from .redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_LOCK_TTL_SECS = int(os.getenv("SINGLE_FLIGHT_LOCK_TTL_SECS", "120"))
+SINGLE_FLIGHT_WAIT_SECS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECS", "60"))
+_POLL_SECS = 0.25
+_MAX_POLL_SECS = 2.0
+# After a Redis error, skip the cross-worker lock for a while rather than
+# paying a failed connect on every cache miss.
+_REDIS_RETRY_SECS = 30.0
+
+# Compare-and-delete so a holder whose lock already expired can't release the
+# next holder's lock.
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+T = TypeVar("T")
+
+_flights: dict[str, asyncio.Future] = {}
+_stats: collections.Counter = collections.Counter()
+_redis_down_until = 0.0
+
+
+def make_key(kind: str, *parts) -> str:
+    """Stable key for a computation's canonical inputs."""
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+    return f"{kind}:{digest}"
+
+
+def _redis():
+    if time.monotonic() < _redis_down_until:
+        return None
+    return get_async_redis()
+
+
+def _redis_failed(action: str, key: str, e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECS
+    logger.warning(f"single-flight {action} for {key} failed, coalescing in-process only: {e}")
+
+
+async def _acquire(key: str) -> tuple[bool, Optional[str]]:
+    """(got_lock, token). got_lock is True when Redis is unavailable — the
+    in-process flight is then the only coordination."""
+    redis = _redis()
+    if not redis:
+        return True, None
+    token = uuid.uuid4().hex
+    try:
+        if await redis.set(f"sf:{key}", token, nx=True, ex=SINGLE_FLIGHT_LOCK_TTL_SECS):
+            return True, token
+        return False, None
+    except Exception as e:
+        _redis_failed("lock", key, e)
+        return True, None
+
+
+async def _release(key: str, token: str):
+    redis = _redis()
+    if not redis:
+        return
+    try:
+        await redis.eval(_RELEASE_SCRIPT, 1, f"sf:{key}", token)
+    except Exception as e:
+        _redis_failed("unlock", key, e)
+
+
+async def _lock_held(key: str) -> bool:
+    redis = _redis()
+    if not redis:
+        return False
+    try:
+        return bool(await redis.exists(f"sf:{key}"))
+    except Exception as e:
+        _redis_failed("lock check", key, e)
+        return False
+
+
+async def _wait_for_peer(key: str, lookup: Callable[[], Optional[T]]) -> Optional[T]:
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT_SECS
+    delay = _POLL_SECS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, _MAX_POLL_SECS)
+        found = await database.run_db(lookup)
+        if found is not None:
+            return found
+        if not await _lock_held(key):
+            break
+    return await database.run_db(lookup)
+
+
+async def _lead(key: str, lookup: Callable[[], Optional[T]], compute: Callable[[], Awaitable[T]]) -> T:
+    got_lock, token = await _acquire(key)
+    if not got_lock:
+        _stats["peer_wait"] += 1
+        found = await _wait_for_peer(key, lookup)
+        if found is not None:
+            _stats["peer_hit"] += 1
+            return found
+        # The other worker failed or timed out — do it ourselves.
+        got_lock, token = await _acquire(key)
+    try:
+        _stats["computed"] += 1
+        return await compute()
+    finally:
+        if token:
+            await _release(key, token)
+
+
+async def run(key: str, lookup: Callable[[], Optional[T]], compute: Callable[[], Awaitable[T]]) -> T:
+    """Return compute()'s result, running it at most once at a time per key.
+
+    `lookup` reads the cached result with the caller's own session (None on a
+    miss); `compute` fetches upstream, stores the row and returns the result.
+    Concurrent callers wait for the running compute() and then return
+    lookup(), or re-raise the leader's exception."""
+    flight = _flights.get(key)
+    if flight is not None:
+        _stats["coalesced"] += 1
+        try:
+            await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            # The leader's request was cancelled (client went away), not ours.
+            if flight.cancelled() and not asyncio.current_task().cancelling():
+                return await run(key, lookup, compute)
+            raise
+        found = lookup()
+        return found if found is not None else await compute()
+
+    flight = asyncio.get_running_loop().create_future()
+    _flights[key] = flight
+    try:
+        result = await _lead(key, lookup, compute)
+    except asyncio.CancelledError:
+        flight.cancel()
+        raise
+    except BaseException as e:
+        flight.set_exception(e)
+        flight.exception()  # mark retrieved — there may be no followers
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        _flights.pop(key, None)
+
+
+def snapshot() -> dict:
+    """leader computations vs. requests that piggybacked on one."""
+    return {"in_flight": len(_flights), **_stats}
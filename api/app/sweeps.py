@@ -0,0 +1,191 @@
+"""
+Background sweeps over consultations nobody is going to finish:
+  - REQUESTED longer than request_stale_minutes -> MISSED (astrologer never answered)
+  - PAUSED longer than paused_stale_minutes     -> AUTO_ENDED (nobody came back)
+
+Each sweep is a single UPDATE ... RETURNING on (status, created_at) /
+(status, paused_at) indexes, so a tick costs what actually expires rather than
+the size of the consultations table. The returned rows get their audit entries
+and queued pushes in the same transaction (one commit per sweep), then the
+astrologer directory's live counters are moved (a bulk UPDATE bypasses its
+flush hook) and the realtime frames and queue promotions go out.
+
+Only the worker holding the Redis sweep lease runs the sweeps. If Redis is
+unavailable every worker sweeps, which stays correct: a row can only be
+claimed by one UPDATE, so nobody is notified twice.
+
+Tunables (env):
+  SWEEP_INTERVAL_SECS   default 60
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+
+from . import astrologer_directory, audit, database, models
+from .backplane import NODE_ID
+from .notification_outbox import enqueue_push_bulk
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL_SECS = float(os.getenv("SWEEP_INTERVAL_SECS", "60"))
+_LEADER_KEY = "sweep_leader"
+# Renew our lease, or take it if it's free. Returns 1 when we hold it.
+_LEADER_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('expire', KEYS[1], ARGV[2])
+end
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then return 1 end
+return 0
+"""
+
+
+def hold_lease(key: str, ttl_secs: int) -> bool:
+    """Take or renew this worker's Redis lease on `key`; True while we hold it.
+    Without Redis (or while it's failing) every worker counts as the holder, so
+    the work it guards must stay correct when run on several at once."""
+    redis = get_redis()
+    if not redis:
+        return True
+    try:
+        return bool(redis.eval(_LEADER_SCRIPT, 1, key, NODE_ID, ttl_secs))
+    except Exception as e:
+        logger.warning(f"Leader lease {key} unavailable, running on this worker: {e}")
+        return True
+
+
+def _stale_minutes(key: str, default: int) -> int:
+    from .services.settings_service import get_setting
+    try:
+        return int(get_setting(key) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def expire_stale_requests(now: datetime) -> list:
+    """REQUESTED -> MISSED for requests nobody answered. Returns
+    (id, seeker_id, astrologer_id) rows."""
+    cutoff = now - timedelta(minutes=_stale_minutes("request_stale_minutes", 5))
+    with database.SessionLocal() as db:
+        expired = db.execute(
+            update(models.Consultation)
+            .where(
+                models.Consultation.status == models.ConsultationStatus.REQUESTED,
+                models.Consultation.created_at < cutoff,
+            )
+            .values(status=models.ConsultationStatus.MISSED)
+            .returning(models.Consultation.id, models.Consultation.seeker_id, models.Consultation.astrologer_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not expired:
+            return []
+        for cid, _seeker_id, _astrologer_id in expired:
+            audit.log(db, "CONSULTATION_MISSED", resource_type="consultation",
+                      resource_id=cid, details={"reason": "astrologer_no_response"})
+        enqueue_push_bulk(db, [{
+            "user_id": seeker_id,
+            "title": "Astrologer unavailable",
+            "body": "Your consultation request expired. Please try another astrologer.",
+            "data": {"consultation_id": str(cid), "type": "REQUEST_EXPIRED"},
+        } for cid, seeker_id, _astrologer_id in expired], commit=False)
+        db.commit()
+        astrologer_directory.apply_transitions(
+            (astrologer_id, models.ConsultationStatus.REQUESTED, models.ConsultationStatus.MISSED)
+            for _cid, _seeker_id, astrologer_id in expired
+        )
+        return expired
+
+
+def end_stale_paused(now: datetime) -> list:
+    """PAUSED -> AUTO_ENDED for sessions left paused too long. A row with no
+    paused_at (shouldn't happen — it's set with PAUSED) counts as stale rather
+    than lingering forever. Returns (id, seeker_id, astrologer_id) rows."""
+    cutoff = now - timedelta(minutes=_stale_minutes("paused_stale_minutes", 15))
+    with database.SessionLocal() as db:
+        ended = db.execute(
+            update(models.Consultation)
+            .where(
+                models.Consultation.status == models.ConsultationStatus.PAUSED,
+                or_(models.Consultation.paused_at.is_(None), models.Consultation.paused_at < cutoff),
+            )
+            .values(status=models.ConsultationStatus.AUTO_ENDED, end_time=now)
+            .returning(models.Consultation.id, models.Consultation.seeker_id,
+                       models.Consultation.astrologer_id, models.Consultation.total_cost)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not ended:
+            return []
+        for cid, _seeker_id, _astrologer_id, total_cost in ended:
+            audit.log(db, "CHAT_AUTO_ENDED", resource_type="consultation", resource_id=cid,
+                      details={"reason": "paused_timeout", "total_cost": float(total_cost or 0)})
+        enqueue_push_bulk(db, [{
+            "user_id": seeker_id,
+            "title": "Chat ended",
+            "body": "Your paused consultation timed out and was ended.",
+            "data": {"consultation_id": str(cid), "type": "CHAT_ENDED"},
+        } for cid, seeker_id, _astrologer_id, _cost in ended], commit=False)
+        db.commit()
+        astrologer_directory.apply_transitions(
+            (astrologer_id, models.ConsultationStatus.PAUSED, models.ConsultationStatus.AUTO_ENDED)
+            for _cid, _seeker_id, astrologer_id, _cost in ended
+        )
+        return [(cid, seeker_id, astrologer_id) for cid, seeker_id, astrologer_id, _cost in ended]
+
+
+def _promote_queues(astrologer_ids: set[int]):
+    from .routers.chat import promote_next_in_queue
+    with database.SessionLocal() as db:
+        for astrologer_id in astrologer_ids:
+            promote_next_in_queue(db, astrologer_id)
+
+
+class SweepEngine:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    def _is_leader(self) -> bool:
+        return hold_lease(_LEADER_KEY, int(SWEEP_INTERVAL_SECS * 3))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL_SECS)
+            try:
+                if self._is_leader():
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"Consultation sweep error: {e}")
+
+    async def run_once(self, now: datetime | None = None):
+        from .routers.chat import manager
+        from .routers.realtime import notify_user
+
+        now = now or datetime.utcnow()
+        for cid, seeker_id, astrologer_id in await database.run_db(expire_stale_requests, now):
+            notify_user(seeker_id, {
+                "type": "REQUEST_EXPIRED",
+                "consultation_id": cid,
+                "astrologer_id": astrologer_id,
+            })
+
+        ended = await database.run_db(end_stale_paused, now)
+        for cid, _seeker_id, _astrologer_id in ended:
+            await manager.broadcast(cid, {"type": "CHAT_ENDED", "reason": "paused_timeout"})
+        if ended:
+            await database.run_db(_promote_queues, {astrologer_id for _, _, astrologer_id in ended})
+        for cid, seeker_id, _astrologer_id in ended:
+            notify_user(seeker_id, {
+                "type": "CHAT_ENDED",
+                "consultation_id": cid,
+                "reason": "paused_timeout",
+            })
+
+
+sweep_engine = SweepEngine()
@@ -8,6 +8,8 @@ import os
 import httpx
 from fastapi import HTTPException
 
+from . import http_clients
+
 logger = logging.getLogger(__name__)
 
 _GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
@@ -40,7 +42,8 @@ def translate_text(text: str, target_lang: str) -> str:
     }
 
     try:
-        response = httpx.post(
+        response = http_clients.request_sync(
+            "groq", "POST",
             _GROQ_URL,
             json=body,
             headers={"Authorization": f"Bearer {api_key}"},
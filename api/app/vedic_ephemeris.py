@@ -0,0 +1,700 @@
+"""
+In-process Vedic chart engine — the chart/vargas/vimshottari_dasha sections of
+FreeAstroAPI's /api/v2/vedic/calculate response, computed locally.
+
+Positions use closed-form theories rather than a bundled ephemeris file:
+  Sun      Meeus, Astronomical Algorithms ch.25 (~0.01 deg)
+  Moon     Meeus ch.47 main periodic terms (~10 arcsec)
+  Planets  Schlyter's mean orbital elements of date, with the Jupiter/Saturn
+           great-inequality perturbations and light-time (~1-2 arcmin)
+  Rahu     mean lunar node (Ketu opposite)
+The ascendant and Lahiri ayanamsha are muhurat_calc's, already calibrated
+against FreeAstroAPI. Sidereal = tropical (mean equinox of date) - ayanamsha;
+nutation cancels out of that difference so it's left out of both.
+
+Houses are whole-sign, matching the house_system every caller passes. The
+output keeps FreeAstroAPI's field names so stored chart_data, the PDF renderer
+and the web KundliPanel read either source unchanged; scripts/
+verify_local_ephemeris.py diffs this module against cached KundliReport rows.
+"""
+import math
+from datetime import date, datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .muhurat_calc import RASHIS, _julian_day_ut, _lahiri_ayanamsha_deg, sidereal_ascendant_deg
+
+PLANETS = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn", "Rahu", "Ketu"]
+
+NAKSHATRAS = [
+    "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra", "Punarvasu",
+    "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni", "Hasta",
+    "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha", "Mula", "Purva Ashadha",
+    "Uttara Ashadha", "Shravana", "Dhanishta", "Shatabhisha", "Purva Bhadrapada",
+    "Uttara Bhadrapada", "Revati",
+]
+NAKSHATRA_SPAN = 360.0 / 27
+
+# Vimshottari mahadasha order (starting from Ashwini's lord) and years.
+DASHA_ORDER = ["Ketu", "Venus", "Sun", "Moon", "Mars", "Rahu", "Jupiter", "Saturn", "Mercury"]
+DASHA_YEARS = {
+    "Ketu": 7, "Venus": 20, "Sun": 6, "Moon": 10, "Mars": 7,
+    "Rahu": 18, "Jupiter": 16, "Saturn": 19, "Mercury": 17,
+}
+DASHA_LEVELS = ["Mahadasha", "Antardasha", "Pratyantardasha", "Sukshma", "Prana"]
+DAYS_PER_YEAR = 365.2425
+
+VARGA_NAMES = {
+    1: "Rashi", 2: "Hora", 3: "Drekkana", 4: "Chaturthamsa", 7: "Saptamsa",
+    9: "Navamsa", 10: "Dasamsa", 12: "Dwadasamsa", 16: "Shodasamsa",
+    20: "Vimsamsa", 24: "Chaturvimsamsa", 27: "Saptavimsamsa", 30: "Trimsamsa",
+    40: "Khavedamsa", 45: "Akshavedamsa", 60: "Shashtiamsa",
+}
+
+BALADI_STATES = [("Bala", "infant"), ("Kumara", "child"), ("Yuva", "youth"), ("Vriddha", "old"), ("Mrita", "dead")]
+
+
+# --- Time -----------------------------------------------------------------
+
+def _delta_t_seconds(year: float) -> float:
+    """TT - UT (Espenak & Meeus polynomials for the 20th/21st century)."""
+    if 1900 <= year < 1920:
+        t = year - 1900
+        return -2.79 + 1.494119 * t - 0.0598939 * t ** 2 + 0.0061966 * t ** 3 - 0.000197 * t ** 4
+    if 1920 <= year < 1941:
+        t = year - 1920
+        return 21.20 + 0.84493 * t - 0.076100 * t ** 2 + 0.0020936 * t ** 3
+    if 1941 <= year < 1961:
+        t = year - 1950
+        return 29.07 + 0.407 * t - t ** 2 / 233 + t ** 3 / 2547
+    if 1961 <= year < 1986:
+        t = year - 1975
+        return 45.45 + 1.067 * t - t ** 2 / 260 - t ** 3 / 718
+    if 1986 <= year < 2005:
+        t = year - 2000
+        return (63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3
+                + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5)
+    if 2005 <= year < 2050:
+        t = year - 2000
+        return 62.92 + 0.32217 * t + 0.005589 * t ** 2
+    u = (year - 1820) / 100
+    return -20 + 32 * u ** 2
+
+
+def _jd_tt(jd_ut: float) -> float:
+    year = 2000.0 + (jd_ut - 2451545.0) / 365.25
+    return jd_ut + _delta_t_seconds(year) / 86400.0
+
+
+def tz_offset_hours(tz_str: str, local: datetime) -> float:
+    """UTC offset (hours east) of `tz_str` at the local civil time `local`,
+    including historical offsets (e.g. pre-1945 Indian local times)."""
+    try:
+        offset = local.replace(tzinfo=ZoneInfo(tz_str)).utcoffset()
+    except (ZoneInfoNotFoundError, ValueError):
+        if tz_str == "Asia/Kolkata":
+            return 5.5
+        raise ValueError(f"Unknown timezone: {tz_str}")
+    return offset.total_seconds() / 3600.0
+
+
+def _now_in(tz_str: str) -> datetime:
+    """Current naive local civil time in `tz_str` (birth times are naive local too)."""
+    now = datetime.utcnow()
+    return now + timedelta(hours=tz_offset_hours(tz_str, now))
+
+
+# --- Positions --------------------------------------------------------------
+
+def _norm(deg: float) -> float:
+    return deg % 360.0
+
+
+def _sin(deg: float) -> float:
+    return math.sin(math.radians(deg))
+
+
+def _cos(deg: float) -> float:
+    return math.cos(math.radians(deg))
+
+
+def _sun(jd_tt: float) -> tuple[float, float]:
+    """Geometric tropical longitude (deg) and distance (AU) of the Sun."""
+    t = (jd_tt - 2451545.0) / 36525.0
+    l0 = 280.46646 + 36000.76983 * t + 0.0003032 * t ** 2
+    m = 357.52911 + 35999.05029 * t - 0.0001537 * t ** 2
+    e = 0.016708634 - 0.000042037 * t - 0.0000001267 * t ** 2
+    c = ((1.914602 - 0.004817 * t - 0.000014 * t ** 2) * _sin(m)
+         + (0.019993 - 0.000101 * t) * _sin(2 * m)
+         + 0.000289 * _sin(3 * m))
+    r = 1.000001018 * (1 - e * e) / (1 + e * _cos(m + c))
+    return _norm(l0 + c), r
+
+
+# Meeus table 47.A: multiples of (D, M, M', F) and the longitude coefficient
+# in 1e-6 degrees.
+_MOON_TERMS = [
+    (0, 0, 1, 0, 6288774), (2, 0, -1, 0, 1274027), (2, 0, 0, 0, 658314),
+    (0, 0, 2, 0, 213618), (0, 1, 0, 0, -185116), (0, 0, 0, 2, -114332),
+    (2, 0, -2, 0, 58793), (2, -1, -1, 0, 57066), (2, 0, 1, 0, 53322),
+    (2, -1, 0, 0, 45758), (0, 1, -1, 0, -40923), (1, 0, 0, 0, -34720),
+    (0, 1, 1, 0, -30383), (2, 0, 0, -2, 15327), (0, 0, 1, 2, -12528),
+    (0, 0, 1, -2, 10980), (4, 0, -1, 0, 10675), (0, 0, 3, 0, 10034),
+    (4, 0, -2, 0, 8548), (2, 1, -1, 0, -7888), (2, 1, 0, 0, -6766),
+    (1, 0, -1, 0, -5163), (1, 1, 0, 0, 4987), (2, -1, 1, 0, 4036),
+    (2, 0, 2, 0, 3994), (4, 0, 0, 0, 3861), (2, 0, -3, 0, 3665),
+    (0, 1, -2, 0, -2689), (2, 0, -1, 2, -2602), (2, -1, -2, 0, 2390),
+    (1, 0, 1, 0, -2348), (2, -2, 0, 0, 2236), (0, 1, 2, 0, -2120),
+    (0, 2, 0, 0, -2069), (2, -2, -1, 0, 2048), (2, 0, 1, -2, -1773),
+    (2, 0, 0, 2, -1595), (4, -1, -1, 0, 1215), (0, 0, 2, 2, -1110),
+    (3, 0, -1, 0, -892), (2, 1, 1, 0, -810), (4, -1, -2, 0, 759),
+    (0, 2, -1, 0, -713), (2, 2, -1, 0, -700), (2, 1, -2, 0, 691),
+    (2, -1, 0, -2, 596), (4, 0, 1, 0, 549), (0, 0, 4, 0, 537),
+    (4, -1, 0, 0, 520), (1, 0, -2, 0, -487), (2, 1, 0, -2, -399),
+    (0, 0, 2, -2, -381), (1, 1, 1, 0, 351), (3, 0, -2, 0, -340),
+    (4, 0, -3, 0, 330), (2, -1, 2, 0, 327), (0, 2, 1, 0, -323),
+    (1, 1, -1, 0, 299), (2, 0, 3, 0, 294),
+]
+
+
+def _moon(jd_tt: float) -> float:
+    """Geometric tropical longitude of the Moon (deg)."""
+    t = (jd_tt - 2451545.0) / 36525.0
+    lp = 218.3164477 + 481267.88123421 * t - 0.0015786 * t ** 2 + t ** 3 / 538841 - t ** 4 / 65194000
+    d = 297.8501921 + 445267.1114034 * t - 0.0018819 * t ** 2 + t ** 3 / 545868 - t ** 4 / 113065000
+    m = 357.5291092 + 35999.0502909 * t - 0.0001536 * t ** 2 + t ** 3 / 24490000
+    mp = 134.9633964 + 477198.8675055 * t + 0.0087414 * t ** 2 + t ** 3 / 69699 - t ** 4 / 14712000
+    f = 93.2720950 + 483202.0175233 * t - 0.0036539 * t ** 2 - t ** 3 / 3526000 + t ** 4 / 863310000
+    e = 1 - 0.002516 * t - 0.0000074 * t ** 2
+    total = 0.0
+    for cd, cm, cmp, cf, coeff in _MOON_TERMS:
+        term = coeff * _sin(cd * d + cm * m + cmp * mp + cf * f)
+        if cm:
+            term *= e ** abs(cm)
+        total += term
+    a1 = 119.75 + 131.849 * t
+    a2 = 53.09 + 479264.290 * t
+    total += 3958 * _sin(a1) + 1962 * _sin(lp - f) + 318 * _sin(a2)
+    return _norm(lp + total / 1e6)
+
+
+def _mean_node(jd_tt: float) -> float:
+    t = (jd_tt - 2451545.0) / 36525.0
+    return _norm(125.0445479 - 1934.1362891 * t + 0.0020754 * t ** 2 + t ** 3 / 467441)
+
+
+# Schlyter, "How to compute planetary positions": (N, i, w, a, e, M) as
+# (value at d=0, rate per day), d = days since 1999-12-31 0h TT.
+_ELEMENTS = {
+    "Mercury": ((48.3313, 3.24587e-5), (7.0047, 5.00e-8), (29.1241, 1.01444e-5),
+                (0.387098, 0), (0.205635, 5.59e-10), (168.6562, 4.0923344368)),
+    "Venus": ((76.6799, 2.46590e-5), (3.3946, 2.75e-8), (54.8910, 1.38374e-5),
+              (0.723330, 0), (0.006773, -1.302e-9), (48.0052, 1.6021302244)),
+    "Mars": ((49.5574, 2.11081e-5), (1.8497, -1.78e-8), (286.5016, 2.92961e-5),
+             (1.523688, 0), (0.093405, 2.516e-9), (18.6021, 0.5240207766)),
+    "Jupiter": ((100.4542, 2.76854e-5), (1.3030, -1.557e-7), (273.8777, 1.64505e-5),
+                (5.20256, 0), (0.048498, 4.469e-9), (19.8950, 0.0830853001)),
+    "Saturn": ((113.6634, 2.38980e-5), (2.4886, -1.081e-7), (339.3939, 2.97661e-5),
+               (9.55475, 0), (0.055546, -9.499e-9), (316.9670, 0.0334442282)),
+}
+
+
+def _mean_anomaly(name: str, d: float) -> float:
+    m0, m1 = _ELEMENTS[name][5]
+    return _norm(m0 + m1 * d)
+
+
+def _heliocentric(name: str, d: float) -> tuple[float, float, float]:
+    (n0, n1), (i0, i1), (w0, w1), (a, _), (e0, e1), (m0, m1) = _ELEMENTS[name]
+    n, i, w, e, m = n0 + n1 * d, i0 + i1 * d, w0 + w1 * d, e0 + e1 * d, _norm(m0 + m1 * d)
+
+    ecc = math.radians(m) + e * math.sin(math.radians(m)) * (1 + e * math.cos(math.radians(m)))
+    for _ in range(10):
+        delta = (ecc - e * math.sin(ecc) - math.radians(m)) / (1 - e * math.cos(ecc))
+        ecc -= delta
+        if abs(delta) < 1e-12:
+            break
+    xv = a * (math.cos(ecc) - e)
+    yv = a * math.sqrt(1 - e * e) * math.sin(ecc)
+    v = math.degrees(math.atan2(yv, xv))
+    r = math.hypot(xv, yv)
+
+    lon = math.degrees(math.atan2(
+        _sin(n) * _cos(v + w) + _cos(n) * _sin(v + w) * _cos(i),
+        _cos(n) * _cos(v + w) - _sin(n) * _sin(v + w) * _cos(i),
+    ))
+    lat = math.degrees(math.asin(_sin(v + w) * _sin(i)))
+
+    if name in ("Jupiter", "Saturn"):
+        mj, ms = _mean_anomaly("Jupiter", d), _mean_anomaly("Saturn", d)
+        if name == "Jupiter":
+            lon += (-0.332 * _sin(2 * mj - 5 * ms - 67.6) - 0.056 * _sin(2 * mj - 2 * ms + 21)
+                    + 0.042 * _sin(3 * mj - 5 * ms + 21) - 0.036 * _sin(mj - 2 * ms)
+                    + 0.022 * _cos(mj - ms) + 0.023 * _sin(2 * mj - 3 * ms + 52)
+                    - 0.016 * _sin(mj - 5 * ms - 69))
+        else:
+            lon += (0.812 * _sin(2 * mj - 5 * ms - 67.6) - 0.229 * _cos(2 * mj - 4 * ms - 2)
+                    + 0.119 * _sin(mj - 2 * ms - 3) + 0.046 * _sin(2 * mj - 6 * ms - 69)
+                    + 0.014 * _sin(mj - 3 * ms + 32))
+            lat += -0.020 * _cos(2 * mj - 4 * ms - 2) + 0.018 * _sin(2 * mj - 6 * ms - 49)
+
+    return (r * _cos(lon) * _cos(lat), r * _sin(lon) * _cos(lat), r * _sin(lat))
+
+
+def _planet(name: str, jd_tt: float) -> float:
+    """Geocentric tropical longitude of a planet, corrected for light-time."""
+    sun_lon, sun_r = _sun(jd_tt)
+    xs, ys = sun_r * _cos(sun_lon), sun_r * _sin(sun_lon)
+    d = jd_tt - 2451543.5
+    for _ in range(2):
+        xh, yh, zh = _heliocentric(name, d)
+        xg, yg, zg = xh + xs, yh + ys, zh
+        dist = math.sqrt(xg * xg + yg * yg + zg * zg)
+        d = jd_tt - 2451543.5 - 0.0057755183 * dist
+    return _norm(math.degrees(math.atan2(yg, xg)))
+
+
+def _tropical_longitude(name: str, jd_tt: float) -> float:
+    if name == "Sun":
+        # Apparent: include the annual aberration (-20.5").
+        return _norm(_sun(jd_tt)[0] - 0.00569)
+    if name == "Moon":
+        return _moon(jd_tt)
+    if name == "Rahu":
+        return _mean_node(jd_tt)
+    if name == "Ketu":
+        return _norm(_mean_node(jd_tt) + 180.0)
+    return _planet(name, jd_tt)
+
+
+def sidereal_longitudes(jd_ut: float, names: Optional[list] = None) -> dict[str, dict]:
+    """{name: {"longitude": sidereal deg, "speed": deg/day}} at a UT Julian day."""
+    jd_tt = _jd_tt(jd_ut)
+    ayanamsha = _lahiri_ayanamsha_deg(jd_ut)
+    out = {}
+    for name in names or PLANETS:
+        lon = _tropical_longitude(name, jd_tt)
+        ahead = _tropical_longitude(name, jd_tt + 0.5)
+        behind = _tropical_longitude(name, jd_tt - 0.5)
+        speed = ((ahead - behind + 180.0) % 360.0) - 180.0
+        out[name] = {"longitude": _norm(lon - ayanamsha), "speed": speed}
+    return out
+
+
+# --- Chart assembly ---------------------------------------------------------
+
+def _nakshatra(lon: float) -> dict:
+    idx = int(lon // NAKSHATRA_SPAN) % 27
+    pada = int((lon % NAKSHATRA_SPAN) // (NAKSHATRA_SPAN / 4)) + 1
+    return {"id": idx + 1, "name": NAKSHATRAS[idx], "pada": pada, "lord": DASHA_ORDER[idx % 9]}
+
+
+def _baladi_avastha(sign_idx: int, degree_in_sign: float) -> dict:
+    step = min(int(degree_in_sign // 6), 4)
+    # Odd signs (Aries, Gemini, ...) run Bala -> Mrita; even signs run backwards.
+    state, quality = BALADI_STATES[step if sign_idx % 2 == 0 else 4 - step]
+    return {
+        "type": "baladi", "state": state, "quality": quality,
+        "degree_range": {"start": step * 6, "end": step * 6 + 6}, "scheme": "parashari",
+    }
+
+
+def varga_sign(lon: float, division: int) -> int:
+    """Sign index (0 = Aries) of a sidereal longitude in the D-`division` chart
+    (Parashari rules)."""
+    sign = int(lon // 30) % 12
+    deg = lon % 30
+    part = int(deg // (30.0 / division))
+    odd = sign % 2 == 0  # Aries is the 1st (odd) sign
+    modality = sign % 3  # 0 movable, 1 fixed, 2 dual
+
+    if division == 1:
+        return sign
+    if division == 2:
+        return (4 if part == 0 else 3) if odd else (3 if part == 0 else 4)
+    if division == 3:
+        return (sign + 4 * part) % 12
+    if division == 4:
+        return (sign + 3 * part) % 12
+    if division == 7:
+        return (sign + part + (0 if odd else 6)) % 12
+    if division in (9, 27):
+        return int(lon // (30.0 / division)) % 12
+    if division == 10:
+        return (sign + part + (0 if odd else 8)) % 12
+    if division == 12:
+        return (sign + part) % 12
+    if division in (16, 45):
+        return ([0, 4, 8][modality] + part) % 12
+    if division == 20:
+        return ([0, 8, 4][modality] + part) % 12
+    if division == 24:
+        return ((4 if odd else 3) + part) % 12
+    if division == 30:
+        bounds = [(5, 0), (10, 10), (18, 8), (25, 2), (30, 6)] if odd else \
+                 [(5, 1), (12, 5), (20, 11), (25, 9), (30, 7)]
+        return next(s for limit, s in bounds if deg < limit)
+    if division == 40:
+        return ((0 if odd else 6) + part) % 12
+    if division == 60:
+        return (sign + int(deg * 2)) % 12
+    raise ValueError(f"Unsupported varga: D{division}")
+
+
+def _sign_fields(sign_idx: int) -> dict:
+    return {"sign": RASHIS[sign_idx], "sign_id": sign_idx + 1}
+
+
+def _whole_sign_houses(asc_sign: int) -> list[dict]:
+    return [
+        {"house": h + 1, **_sign_fields((asc_sign + h) % 12), "degree_cusp": float(((asc_sign + h) % 12) * 30)}
+        for h in range(12)
+    ]
+
+
+def _d1_chart(asc_lon: float, positions: dict) -> dict:
+    asc_sign = int(asc_lon // 30)
+    planets = []
+    for name in PLANETS:
+        lon = positions[name]["longitude"]
+        sign = int(lon // 30)
+        nak = _nakshatra(lon)
+        planets.append({
+            "name": name,
+            **_sign_fields(sign),
+            "house": (sign - asc_sign) % 12 + 1,
+            "degree_in_sign": round(lon % 30, 4),
+            "absolute_degree": round(lon, 4),
+            "is_retrograde": name in ("Rahu", "Ketu") or positions[name]["speed"] < 0,
+            "nakshatra": nak["name"],
+            "nakshatra_id": nak["id"],
+            "pada": nak["pada"],
+            "nakshatra_lord": nak["lord"],
+            "avastha": _baladi_avastha(sign, lon % 30),
+        })
+    return {
+        "division": 1,
+        "name": VARGA_NAMES[1],
+        "ascendant": {
+            **_sign_fields(asc_sign),
+            "degree": round(asc_lon % 30, 4),
+            "absolute_degree": round(asc_lon, 4),
+            "house": 1,
+            "nakshatra": _nakshatra(asc_lon),
+        },
+        "planets": planets,
+        "houses": _whole_sign_houses(asc_sign),
+    }
+
+
+def _varga_chart(division: int, asc_lon: float, positions: dict) -> dict:
+    asc_sign = varga_sign(asc_lon, division)
+    planets = []
+    for name in PLANETS:
+        sign = varga_sign(positions[name]["longitude"], division)
+        planets.append({
+            "name": name,
+            **_sign_fields(sign),
+            "house": (sign - asc_sign) % 12 + 1,
+            "is_retrograde": name in ("Rahu", "Ketu") or positions[name]["speed"] < 0,
+        })
+    return {
+        "division": division,
+        "name": VARGA_NAMES.get(division, f"D{division}"),
+        "ascendant": {**_sign_fields(asc_sign), "house": 1},
+        "planets": planets,
+        "houses": _whole_sign_houses(asc_sign),
+    }
+
+
+# --- Vimshottari -------------------------------------------------------------
+
+def _years_between(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() / 86400.0 / DAYS_PER_YEAR
+
+
+def _add_years(start: datetime, years: float) -> datetime:
+    return start + timedelta(days=years * DAYS_PER_YEAR)
+
+
+def _sub_periods(lord: str, start: datetime, years: float) -> list[tuple[str, datetime, datetime, float]]:
+    """Split a (lord, start, years) period into its nine proportional sub-periods."""
+    out = []
+    idx = DASHA_ORDER.index(lord)
+    cursor = start
+    for k in range(9):
+        sub = DASHA_ORDER[(idx + k) % 9]
+        sub_years = years * DASHA_YEARS[sub] / 120.0
+        end = _add_years(cursor, sub_years)
+        out.append((sub, cursor, end, sub_years))
+        cursor = end
+    return out
+
+
+def _iso(dt: datetime) -> str:
+    return dt.replace(microsecond=0).isoformat()
+
+
+def vimshottari(moon_lon: float, birth: datetime, levels: int = 2, reference: Optional[datetime] = None) -> dict:
+    """Birth balance, the 9 mahadashas from birth, and the periods active at
+    `reference` down to `levels` (1 = Mahadasha ... 5 = Prana). Datetimes are
+    naive local civil time, same as the birth time."""
+    nak = _nakshatra(moon_lon)
+    lord = nak["lord"]
+    elapsed_fraction = (moon_lon % NAKSHATRA_SPAN) / NAKSHATRA_SPAN
+    full_years = DASHA_YEARS[lord]
+    actual_start = _add_years(birth, -elapsed_fraction * full_years)
+    first_end = _add_years(actual_start, full_years)
+
+    timeline = []
+    idx = DASHA_ORDER.index(lord)
+    cursor = actual_start
+    for k in range(9):
+        maha = DASHA_ORDER[(idx + k) % 9]
+        end = _add_years(cursor, DASHA_YEARS[maha])
+        timeline.append({
+            "lord": maha, "start": _iso(max(cursor, birth)), "end": _iso(end),
+            "duration_years": DASHA_YEARS[maha],
+        })
+        cursor = end
+
+    reference = reference or datetime.now()
+    active = []
+    path = []
+    candidates = [
+        (t["lord"], _add_years(actual_start, sum(DASHA_YEARS[p["lord"]] for p in timeline[:k])),
+         datetime.fromisoformat(t["end"]), float(t["duration_years"]))
+        for k, t in enumerate(timeline)
+    ]
+
+    for level in range(max(0, min(levels, len(DASHA_LEVELS)))):
+        current = next((c for c in candidates if c[1] <= reference < c[2]), None)
+        if current is None:
+            break
+        period_lord, period_start, period_end, period_years = current
+        path = path + [period_lord]
+        elapsed = max(0.0, _years_between(period_start, reference))
+        active.append({
+            "level": DASHA_LEVELS[level],
+            "lord": period_lord,
+            "start": _iso(period_start),
+            "end": _iso(period_end),
+            "duration_years": round(period_years, 6),
+            "elapsed_years": round(elapsed, 6),
+            "remaining_years": round(max(0.0, period_years - elapsed), 6),
+            "progress_fraction": round(min(1.0, elapsed / period_years), 6),
+            "path": path,
+        })
+        candidates = _sub_periods(period_lord, period_start, period_years)
+
+    return {
+        "system": "vimshottari",
+        "moon_nakshatra": nak,
+        "birth_balance": {
+            "lord": lord,
+            "actual_start": _iso(actual_start),
+            "birth_date": _iso(birth),
+            "end": _iso(first_end),
+            "full_duration_years": full_years,
+            "elapsed_years": round(elapsed_fraction * full_years, 6),
+            "remaining_years": round((1 - elapsed_fraction) * full_years, 6),
+        },
+        "timeline": timeline,
+        "active_periods": active,
+    }
+
+
+# --- Sade Sati ---------------------------------------------------------------
+
+_SADE_SATI_PHASES = {
+    11: ("Rising", "Saturn is transiting the 12th sign from the natal Moon — the first phase of Sade Sati."),
+    0: ("Peak", "Saturn is transiting the natal Moon sign — the peak phase of Sade Sati."),
+    1: ("Setting", "Saturn is transiting the 2nd sign from the natal Moon — the final phase of Sade Sati."),
+}
+
+
+def sade_sati_status(moon_lon: float, reference: date, tz_str: str = "Asia/Kolkata") -> dict:
+    """Sade Sati state on `reference` (transit Saturn vs natal Moon sign)."""
+    noon = datetime(reference.year, reference.month, reference.day, 12, 0)
+    jd = _julian_day_ut(noon - timedelta(hours=tz_offset_hours(tz_str, noon)))
+    saturn = sidereal_longitudes(jd, ["Saturn"])["Saturn"]
+    moon_sign = int(moon_lon // 30)
+    saturn_sign = int(saturn["longitude"] // 30)
+    phase = _SADE_SATI_PHASES.get((saturn_sign - moon_sign) % 12)
+    return {
+        "active": phase is not None,
+        "phase": phase[0] if phase else None,
+        "description": phase[1] if phase else "Saturn is not transiting the 12th, 1st or 2nd sign from the natal Moon.",
+        "reference_date": reference.isoformat(),
+        "timezone": tz_str,
+        "moon_sign": RASHIS[moon_sign],
+        "moon_sign_id": moon_sign + 1,
+        "saturn_sign": RASHIS[saturn_sign],
+        "saturn_sign_id": saturn_sign + 1,
+        "saturn_degree_in_sign": round(saturn["longitude"] % 30, 4),
+        "saturn_absolute_degree": round(saturn["longitude"], 4),
+        "saturn_is_retrograde": saturn["speed"] < 0,
+    }
+
+
+def natal_moon_longitude(birth: datetime, timezone: str = "Asia/Kolkata") -> float:
+    """Sidereal Moon longitude at a local birth datetime."""
+    jd = _julian_day_ut(birth - timedelta(hours=tz_offset_hours(timezone, birth)))
+    return _sidereal_longitude("Moon", jd)
+
+
+def natal_sade_sati(
+    year: int, month: int, day: int, hour: int, minute: int,
+    reference: date, timezone: str = "Asia/Kolkata",
+) -> dict:
+    """sade_sati_status for a birth moment — only the natal Moon is computed."""
+    moon_lon = natal_moon_longitude(datetime(year, month, day, hour, minute), timezone)
+    return sade_sati_status(moon_lon, reference, timezone)
+
+
+# Saturn needs ~2.5 years per sign and its retrograde loops keep it on one
+# side of a sign edge for months, so a 20-day sweep sees every ingress; each
+# one is then bisected to under a day.
+SATURN_SAMPLE_DAYS = 20
+LIFETIME_YEARS = 100
+# Retrograde dips back out of a transit window last a few months; anything
+# shorter than this between two runs is treated as the same window.
+_SATURN_RETRO_MERGE_DAYS = 365
+# A Sade Sati can already be under way at birth — look back far enough to
+# report its true start.
+_SATURN_LOOKBACK_DAYS = 8 * 366
+
+_DHAIYA = {3: "Kantaka Shani", 7: "Ashtama Shani"}  # 4th / 8th from the Moon
+
+
+def _sidereal_longitude(name: str, jd_ut: float) -> float:
+    return _norm(_tropical_longitude(name, _jd_tt(jd_ut)) - _lahiri_ayanamsha_deg(jd_ut))
+
+
+def _jd_to_local_date(jd_ut: float, tz_str: str) -> date:
+    utc = datetime(2000, 1, 1, 12) + timedelta(days=jd_ut - 2451545.0)
+    return (utc + timedelta(hours=tz_offset_hours(tz_str, utc))).date()
+
+
+def _saturn_sign_runs(start_jd: float, end_jd: float) -> list[tuple[float, float, int]]:
+    """(start_jd, end_jd, sign index) for each stay of Saturn in a sidereal sign."""
+    def sign_at(jd):
+        return int(_sidereal_longitude("Saturn", jd) // 30)
+
+    steps = max(1, math.ceil((end_jd - start_jd) / SATURN_SAMPLE_DAYS))
+    jds = [start_jd + (end_jd - start_jd) * i / steps for i in range(steps + 1)]
+    signs = [sign_at(jd) for jd in jds]
+
+    runs, run_start = [], start_jd
+    for i in range(1, len(jds)):
+        if signs[i] == signs[i - 1]:
+            continue
+        lo, hi = jds[i - 1], jds[i]
+        while hi - lo > 0.5:
+            mid = (lo + hi) / 2
+            if sign_at(mid) == signs[i - 1]:
+                lo = mid
+            else:
+                hi = mid
+        runs.append((run_start, hi, signs[i - 1]))
+        run_start = hi
+    runs.append((run_start, end_jd, signs[-1]))
+    return runs
+
+
+def saturn_transit_windows(
+    moon_lon: float, birth: datetime, timezone: str = "Asia/Kolkata", years: int = LIFETIME_YEARS,
+) -> list[dict]:
+    """Every Sade Sati (Saturn in the 12th, 1st and 2nd from the natal Moon,
+    with its Rising/Peak/Setting phases) and Dhaiya (Saturn in the 4th —
+    Kantaka — or 8th — Ashtama) window from birth to `years` later, in date
+    order. Retrograde re-entries are folded into the window they interrupt,
+    so start is the first ingress and end the final egress."""
+    moon_sign = int(moon_lon // 30)
+    birth_jd = _julian_day_ut(birth - timedelta(hours=tz_offset_hours(timezone, birth)))
+    runs = _saturn_sign_runs(birth_jd - _SATURN_LOOKBACK_DAYS, birth_jd + years * DAYS_PER_YEAR)
+
+    groups: list[dict] = []
+    for start, end, sign in runs:
+        house = (sign - moon_sign) % 12
+        if house in _SADE_SATI_PHASES:
+            key = "sade_sati"
+        elif house in _DHAIYA:
+            key = f"dhaiya:{house}"
+        else:
+            continue
+        last = next((g for g in reversed(groups) if g["key"] == key), None)
+        if last is not None and start - last["end"] < _SATURN_RETRO_MERGE_DAYS:
+            last["end"] = end
+            last["runs"].append((start, end, house))
+        else:
+            groups.append({"key": key, "start": start, "end": end, "runs": [(start, end, house)]})
+
+    windows = []
+    for g in sorted(groups, key=lambda g: g["start"]):
+        if g["end"] <= birth_jd:
+            continue
+        window = {
+            "start": _jd_to_local_date(g["start"], timezone).isoformat(),
+            "end": _jd_to_local_date(g["end"], timezone).isoformat(),
+        }
+        if g["key"] == "sade_sati":
+            phases = []
+            for house in (11, 0, 1):
+                spans = [(s, e) for s, e, h in g["runs"] if h == house]
+                if spans:
+                    phases.append({
+                        "phase": _SADE_SATI_PHASES[house][0],
+                        "start": _jd_to_local_date(spans[0][0], timezone).isoformat(),
+                        "end": _jd_to_local_date(spans[-1][1], timezone).isoformat(),
+                    })
+            windows.append({"type": "sade_sati", "name": "Sade Sati", **window, "phases": phases})
+        else:
+            house = g["runs"][0][2]
+            windows.append({"type": "dhaiya", "name": _DHAIYA[house], "house_from_moon": house + 1, **window})
+    return windows
+
+
+# --- Entry point ---------------------------------------------------------------
+
+def calculate(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    latitude: float,
+    longitude: float,
+    timezone: str = "Asia/Kolkata",
+    vargas: Optional[list] = None,
+    dasha_levels: int = 2,
+    reference_date: Optional[date] = None,
+) -> dict:
+    """Local equivalent of the chart, vargas and vimshottari_dasha sections of
+    free_astro_service.generate_full_kundli (Lahiri, whole-sign houses)."""
+    birth = datetime(year, month, day, hour, minute)
+    offset = tz_offset_hours(timezone, birth)
+    jd = _julian_day_ut(birth - timedelta(hours=offset))
+
+    positions = sidereal_longitudes(jd)
+    asc_lon = sidereal_ascendant_deg(birth, offset, latitude, longitude)
+    moon_lon = positions["Moon"]["longitude"]
+    reference_date = reference_date or _now_in(timezone).date()
+
+    chart = _d1_chart(asc_lon, positions)
+    chart["sade_sati"] = sade_sati_status(moon_lon, reference_date, timezone)
+
+    divisions = [1, 9, 10, 60] if vargas is None else vargas
+    result = {
+        "engine": "local",
+        "ayanamsha": "lahiri",
+        "house_system": "whole_sign",
+        "timezone_used": timezone,
+        "chart": chart,
+        "vargas": {"vargas": {f"D{int(n)}": _varga_chart(int(n), asc_lon, positions) for n in divisions}},
+    }
+    if dasha_levels:
+        now_local = _now_in(timezone)
+        reference = now_local if reference_date == now_local.date() else datetime.combine(reference_date, now_local.time())
+        result["vimshottari_dasha"] = vimshottari(moon_lon, birth, dasha_levels, reference)
+    return result
@@ -1,26 +1,57 @@
 """
 Geocoding for place of birth.
 """
-import httpx
 from typing import Tuple
 
+from . import geocoding, http_clients
+
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 
 
 async def geocode_place(place_name: str) -> Tuple[float, float]:
     """
-    Convert a place name to latitude/longitude using Nominatim (OpenStreetMap).
+    Convert a place name to latitude/longitude. Answered from the geocoding
+    cache/place index when possible (see geocoding.py), otherwise from
+    Nominatim (OpenStreetMap) and cached.
     Returns (latitude, longitude).
     Raises ValueError if place not found.
     """
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(
+    key = geocoding.normalize_place(place_name)
+    coords = await geocoding.cached(key)
+    if coords is not None:
+        return coords
+
+    coords = await _nominatim_lookup(place_name)
+    await geocoding.remember(key, coords)
+    return coords
+
+
+async def _nominatim_lookup(place_name: str) -> Tuple[float, float]:
+    response = await http_clients.request(
+        "nominatim", "GET",
+        NOMINATIM_URL,
+        params={
+            "q": place_name,
+            "format": "json",
+            "limit": 1,
+            "countrycodes": "in",  # Prioritize India
+        },
+        headers={
+            "User-Agent": "AadikartaAstroApp/1.0"
+        }
+    )
+    response.raise_for_status()
+    results = response.json()
+
+    if not results:
+        # Retry without country restriction
+        response = await http_clients.request(
+            "nominatim", "GET",
             NOMINATIM_URL,
             params={
                 "q": place_name,
                 "format": "json",
                 "limit": 1,
-                "countrycodes": "in",  # Prioritize India
             },
             headers={
                 "User-Agent": "AadikartaAstroApp/1.0"
@@ -29,29 +60,9 @@ async def geocode_place(place_name: str) -> Tuple[float, float]:
         response.raise_for_status()
         results = response.json()
 
-        if not results:
-            # Retry without country restriction
-            response = await client.get(
-                NOMINATIM_URL,
-                params={
-                    "q": place_name,
-                    "format": "json",
-                    "limit": 1,
-                },
-                headers={
-                    "User-Agent": "AadikartaAstroApp/1.0"
-                }
-            )
-            response.raise_for_status()
-            results = response.json()
-
-        if not results:
-            raise ValueError(f"Could not find coordinates for place: {place_name}")
-
-        lat = float(results[0]["lat"])
-        lon = float(results[0]["lon"])
-        return lat, lon
-
-
-
+    if not results:
+        raise ValueError(f"Could not find coordinates for place: {place_name}")
 
+    lat = float(results[0]["lat"])
+    lon = float(results[0]["lon"])
+    return lat, lon
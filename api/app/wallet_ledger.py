@@ -0,0 +1,296 @@
+"""
+Wallet ledger checkpoints for the reconciliation check
+(GET /admin/wallets/reconciliation).
+
+The check used to SUM(amount) GROUP BY user_id over the whole of
+wallet_transactions — one row per billed chat minute — and join every wallet
+on each call. Now:
+
+  - wallet_ledger_checkpoints holds, per user, the last transaction folded in
+    (last_txn_id) and the ledger sum up to it (running_sum)
+  - the checkpointer (leader worker only, like the consultation sweeps)
+    advances them every LEDGER_CHECKPOINT_INTERVAL_SECS over the transactions
+    up to a settled id (below), a range scan on the primary key above the
+    highest checkpoint (everything at or below it is already folded)
+  - an id is settled once no transaction can still commit a row at or below
+    it. On PostgreSQL an advance notes the id sequence's last value and the
+    time; once no transaction of this application that began before that
+    time is still open (pg_stat_activity), every id up to the noted value is
+    committed or gone for good. That's usually the same tick, or the next one
+    behind a long transaction; one open longer than
+    LEDGER_CHECKPOINT_SETTLE_SECS is assumed not to be writing the ledger.
+    Elsewhere (SQLite in tests) transactions older than
+    LEDGER_CHECKPOINT_SETTLE_SECS count as settled
+  - reconcile() compares each stored balance with running_sum + that user's
+    transactions after their own checkpoint, filtering and ordering in SQL,
+    so a check costs the transactions since the last advance
+  - reconcile(rebuild=True) refolds every checkpoint from the full ledger, for
+    when one is suspect
+  - an advance records, for each wallet it touches whose balance matches,
+    balanced_txn_id; drift_report() lists a wallet's transactions after that
+    point with the running ledger balance, i.e. where its drift came in
+
+Tunables (env):
+  LEDGER_CHECKPOINT_INTERVAL_SECS  default 300
+  LEDGER_CHECKPOINT_SETTLE_SECS    settle delay off PostgreSQL, and the age past
+                                   which an open transaction is ignored on it
+                                   (default 300)
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .sweeps import hold_lease
+
+logger = logging.getLogger(__name__)
+
+LEDGER_CHECKPOINT_INTERVAL_SECS = float(os.getenv("LEDGER_CHECKPOINT_INTERVAL_SECS", "300"))
+LEDGER_CHECKPOINT_SETTLE_SECS = float(os.getenv("LEDGER_CHECKPOINT_SETTLE_SECS", "300"))
+_LEADER_KEY = "ledger_checkpoint_leader"
+# Balances and sums are DECIMAL(·, 2): anything under a paisa is a match.
+_BALANCED = Decimal("0.005")
+
+Txn = models.WalletTransaction
+Checkpoint = models.WalletLedgerCheckpoint
+
+# (ids handed out so far, when), read together. pg_sequence_last_value is
+# NULL until the sequence is first used.
+_SEQUENCE_MARK = text(
+    f"SELECT pg_sequence_last_value(pg_get_serial_sequence('{Txn.__tablename__}', 'id')::regclass), "
+    "clock_timestamp()"
+)
+# Other sessions of this application whose transaction began at or before
+# :taken_at; any of them may still hold an id from before the mark. Idle
+# backends, other applications and transactions open for more than
+# LEDGER_CHECKPOINT_SETTLE_SECS (a long-lived WebSocket session, an export's
+# server-side cursor) don't count, so none of them can stall the checkpoints.
+_OPEN_SINCE = text(
+    "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() "
+    "AND pid <> pg_backend_pid() AND state <> 'idle' "
+    "AND application_name = current_setting('application_name') "
+    "AND xact_start <= :taken_at "
+    "AND xact_start > clock_timestamp() - make_interval(secs => :max_age)"
+)
+# The oldest mark not yet settled; advance() retries it on the next tick.
+_pending_mark: Optional[tuple[int, datetime]] = None
+
+
+def _floor(db: Session) -> int:
+    """Every transaction at or below this id is folded into its user's
+    checkpoint, so scans start above it. A checkpoint is only deleted along
+    with its user's transactions, which can lower this but never uncovers
+    unfolded rows; the per-user comparison with last_txn_id does the rest."""
+    return db.query(func.max(Checkpoint.last_txn_id)).scalar() or 0
+
+
+def _settled_upto(db: Session, now: datetime) -> Optional[int]:
+    """Highest id no open transaction can still commit at or below."""
+    global _pending_mark
+    if db.get_bind().dialect.name != "postgresql":
+        horizon = now - timedelta(seconds=LEDGER_CHECKPOINT_SETTLE_SECS)
+        return db.query(func.max(Txn.id)).filter(Txn.created_at < horizon).scalar()
+    mark = tuple(db.execute(_SEQUENCE_MARK).one())
+    if mark[0] is None:
+        return None
+    for candidate in (mark, _pending_mark):
+        if candidate is not None and not db.execute(
+            _OPEN_SINCE, {"taken_at": candidate[1], "max_age": LEDGER_CHECKPOINT_SETTLE_SECS}
+        ).scalar():
+            _pending_mark = None if candidate is mark else mark
+            return candidate[0]
+    _pending_mark = _pending_mark or mark
+    return None
+
+
+def _fold(db: Session, floor: int, now: datetime, rebuild: bool = False) -> int:
+    """Fold each user's settled transactions after their checkpoint (all of
+    them on a rebuild) into it and commit. Returns the number of users moved."""
+    upto = _settled_upto(db, now)
+    if upto is None or upto <= floor:
+        return 0
+    base = func.coalesce(Checkpoint.last_txn_id, 0)
+    deltas = (
+        db.query(Txn.user_id, base, func.max(Txn.id), func.sum(Txn.amount))
+        .outerjoin(Checkpoint, Checkpoint.user_id == Txn.user_id)
+        .filter(Txn.id > floor, Txn.id <= upto)
+    )
+    if not rebuild:
+        deltas = deltas.filter(Txn.id > base)
+    deltas = deltas.group_by(Txn.user_id, base).all()
+    user_ids = [user_id for user_id, _, _, _ in deltas]
+    existing = {cp.user_id: cp for cp in db.query(Checkpoint).filter(Checkpoint.user_id.in_(user_ids))}
+    if rebuild:
+        db.query(Checkpoint).filter(Checkpoint.user_id.notin_(user_ids)).delete(synchronize_session=False)
+
+    moved = []
+    for user_id, folded_through, last_txn_id, amount in deltas:
+        cp = existing.get(user_id)
+        if cp is None:
+            cp = Checkpoint(user_id=user_id, last_txn_id=last_txn_id, running_sum=amount)
+            db.add(cp)
+        elif rebuild:
+            cp.last_txn_id, cp.running_sum = last_txn_id, amount
+            if cp.balanced_txn_id is not None and cp.balanced_txn_id > last_txn_id:
+                cp.balanced_txn_id = None
+        elif cp.last_txn_id != folded_through:
+            continue  # moved since the sums were read (a rebuild got here first)
+        else:
+            cp.last_txn_id, cp.running_sum = last_txn_id, cp.running_sum + amount
+        moved.append(cp)
+
+    _mark_balanced(db, moved, upto)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Raced a rebuild inserting the same checkpoints; the next tick retries.
+        db.rollback()
+        return 0
+    return len(moved)
+
+
+def _mark_balanced(db: Session, checkpoints: list, upto: int):
+    if not checkpoints:
+        return
+    user_ids = [cp.user_id for cp in checkpoints]
+    balances = dict(db.query(models.UserWallet.user_id, models.UserWallet.balance)
+                    .filter(models.UserWallet.user_id.in_(user_ids)))
+    after = dict(db.query(Txn.user_id, func.sum(Txn.amount))
+                 .filter(Txn.id > upto, Txn.user_id.in_(user_ids))
+                 .group_by(Txn.user_id))
+    for cp in checkpoints:
+        if cp.user_id not in balances:
+            continue
+        ledger = Decimal(str(cp.running_sum)) + Decimal(str(after.get(cp.user_id) or 0))
+        if abs(Decimal(str(balances[cp.user_id] or 0)) - ledger) < _BALANCED:
+            cp.balanced_txn_id = cp.last_txn_id
+
+
+def advance(db: Session, now: Optional[datetime] = None) -> int:
+    """Move the checkpoints over settled transactions; returns users moved."""
+    return _fold(db, _floor(db), now or datetime.utcnow())
+
+
+def rebuild(db: Session, now: Optional[datetime] = None) -> int:
+    """Recompute every checkpoint from the whole ledger."""
+    return _fold(db, 0, now or datetime.utcnow(), rebuild=True)
+
+
+def reconcile(db: Session, only_mismatches: bool = True, tolerance: float = 0.01,
+              rebuild_first: bool = False) -> dict:
+    """Each wallet's stored balance against its ledger sum (checkpoint +
+    transactions since), largest difference first."""
+    if rebuild_first:
+        rebuild(db)
+    floor = _floor(db)
+    delta = (
+        db.query(Txn.user_id.label("user_id"), func.sum(Txn.amount).label("amount"))
+        .outerjoin(Checkpoint, Checkpoint.user_id == Txn.user_id)
+        .filter(Txn.id > floor, Txn.id > func.coalesce(Checkpoint.last_txn_id, 0))
+        .group_by(Txn.user_id)
+        .subquery()
+    )
+    computed = func.coalesce(Checkpoint.running_sum, 0) + func.coalesce(delta.c.amount, 0)
+    diff = func.abs(func.coalesce(models.UserWallet.balance, 0) - computed)
+    query = (
+        db.query(models.UserWallet.user_id, models.User.email, models.User.phone_number, models.User.role,
+                 models.UserWallet.balance, computed.label("computed"), Checkpoint.balanced_txn_id)
+        .join(models.User, models.UserWallet.user_id == models.User.id)
+        .outerjoin(Checkpoint, Checkpoint.user_id == models.UserWallet.user_id)
+        .outerjoin(delta, delta.c.user_id == models.UserWallet.user_id)
+    )
+    if only_mismatches:
+        query = query.filter(diff > tolerance)
+
+    results = []
+    for user_id, email, phone_number, role, balance, ledger, balanced_txn_id in query.order_by(diff.desc()):
+        stored, computed_balance = float(balance or 0), float(ledger or 0)
+        results.append({
+            "user_id": user_id,
+            "email": email,
+            "phone_number": phone_number,
+            "role": role,
+            "stored_balance": stored,
+            "computed_balance": computed_balance,
+            "diff": round(stored - computed_balance, 2),
+            "balanced_through_txn_id": balanced_txn_id,
+        })
+    return {
+        "total_wallets_checked": db.query(func.count(models.UserWallet.user_id)).scalar(),
+        "mismatches": len(results),
+        "checkpoint_txn_id": floor,
+        "rebuilt": rebuild_first,
+        "results": results,
+    }
+
+
+def drift_report(db: Session, user_id: int) -> dict:
+    """A wallet's transactions since its balance last matched the ledger, each
+    with the ledger balance after it — the ones that can have introduced the
+    current difference (or, if none did, a direct balance edit in that span)."""
+    cp = db.get(Checkpoint, user_id)
+    since = cp.balanced_txn_id if cp is not None and cp.balanced_txn_id is not None else 0
+    user_txns = db.query(Txn).filter(Txn.user_id == user_id)
+    running = Decimal(str(user_txns.with_entities(func.sum(Txn.amount)).filter(Txn.id <= since).scalar() or 0))
+    transactions = []
+    for txn in user_txns.filter(Txn.id > since).order_by(Txn.id):
+        running += Decimal(str(txn.amount))
+        transactions.append({
+            "id": txn.id,
+            "amount": float(txn.amount),
+            "transaction_type": txn.transaction_type,
+            "reference_id": txn.reference_id,
+            "description": txn.description,
+            "created_at": txn.created_at,
+            "ledger_balance": float(running),
+        })
+    wallet = db.get(models.UserWallet, user_id)
+    stored = float(wallet.balance or 0) if wallet else 0.0
+    return {
+        "user_id": user_id,
+        "stored_balance": stored,
+        "computed_balance": float(running),
+        "diff": round(stored - float(running), 2),
+        "balanced_through_txn_id": since or None,
+        "transactions": transactions,
+    }
+
+
+def _advance_once():
+    with database.SessionLocal() as db:
+        return advance(db)
+
+
+class LedgerCheckpointer:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    def _is_leader(self) -> bool:
+        return hold_lease(_LEADER_KEY, int(LEDGER_CHECKPOINT_INTERVAL_SECS * 3))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LEDGER_CHECKPOINT_INTERVAL_SECS)
+            try:
+                if self._is_leader():
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"Ledger checkpoint error: {e}")
+
+    async def run_once(self) -> int:
+        return await database.run_db(_advance_once)
+
+
+checkpointer = LedgerCheckpointer()
@@ -0,0 +1,106 @@
+"""Chat fan-out latency benchmark: sync ORM on the event loop vs. database.run_db.
+
+Simulates ROOMS simultaneous consultations, each with a seeker and an
+astrologer socket connected to chat.ConnectionManager. Every room sends
+MESSAGES messages, one per --interval-ms window at a random offset inside it;
+each message does one blocking "commit" (time.sleep of --commit-ms, standing
+in for a Postgres round trip) and then broadcasts NEW_MESSAGE to its room, the
+same shape as the MESSAGE branch of websocket_endpoint. Latency is measured
+from the message's scheduled arrival until the recipient's socket has it, so
+time spent waiting behind other rooms' commits counts.
+
+  inline   - the commit runs directly on the event loop (old behaviour)
+  executor - the commit runs on database.run_db's bounded thread pool
+
+Run from api/:  python -m scripts.bench_chat_fanout --rooms 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+
+from app import database, models  # noqa: E402
+from app.metrics import latency_summary  # noqa: E402
+from app.routers.chat import ConnectionManager  # noqa: E402
+
+
+class _RecipientSocket:
+    def __init__(self, latencies: list[float], sent_at: dict[int, float]):
+        self.latencies = latencies
+        self.sent_at = sent_at
+
+    async def send_text(self, text):
+        # Message ids are globally unique; the sender records when it started.
+        msg_id = int(text.split('"id": ', 1)[1].split(",", 1)[0])
+        self.latencies.append((time.perf_counter() - self.sent_at[msg_id]) * 1000)
+
+
+class _SenderSocket:
+    async def send_text(self, text):
+        pass
+
+
+def _blocking_commit(commit_ms: float):
+    time.sleep(commit_ms / 1000)
+
+
+async def _run(mode: str, rooms: int, messages: int, commit_ms: float, interval_ms: float) -> list[float]:
+    manager = ConnectionManager()
+    latencies: list[float] = []
+    sent_at: dict[int, float] = {}
+
+    for room in range(rooms):
+        seeker = models.User(id=room * 2 + 1, role=models.UserRole.SEEKER)
+        astro = models.User(id=room * 2 + 2, role=models.UserRole.ASTROLOGER)
+        await manager.connect(_SenderSocket(), room, seeker)
+        await manager.connect(_RecipientSocket(latencies, sent_at), room, astro)
+
+    rng = random.Random(42)
+    t0 = time.perf_counter() + 0.05
+
+    async def room_traffic(room: int):
+        for n in range(messages):
+            msg_id = room * messages + n
+            arrival = t0 + (n + rng.random()) * interval_ms / 1000
+            sent_at[msg_id] = arrival
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if mode == "inline":
+                _blocking_commit(commit_ms)
+            else:
+                await database.run_db(_blocking_commit, commit_ms)
+            await manager.broadcast(room, {"type": "NEW_MESSAGE", "id": msg_id, "content": "hello"},
+                                    exclude_user_id=room * 2 + 1)
+
+    await asyncio.gather(*(room_traffic(room) for room in range(rooms)))
+    return latencies
+
+
+def _report(mode: str, latencies: list[float]):
+    summary = latency_summary(latencies, 1)
+    print(f"{mode:<9} n={len(latencies):<6} p50={summary['p50']:8.1f} ms  "
+          f"p99={summary['p99']:8.1f} ms  max={summary['max']:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=3)
+    parser.add_argument("--commit-ms", type=float, default=3.0)
+    parser.add_argument("--interval-ms", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    print(f"{args.rooms} rooms x {args.messages} messages (one per {args.interval_ms:.0f} ms), "
+          f"{args.commit_ms} ms per commit, "
+          f"DB_EXECUTOR_WORKERS={database.DB_EXECUTOR_WORKERS}")
+    for mode in ("inline", "executor"):
+        _report(mode, asyncio.run(_run(mode, args.rooms, args.messages, args.commit_ms, args.interval_ms)))
+
+
+if __name__ == "__main__":
+    main()
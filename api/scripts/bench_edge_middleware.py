@@ -0,0 +1,164 @@
+"""Per-request middleware overhead: stacked BaseHTTPMiddleware vs. EdgeMiddleware.
+
+Drives the real app's ASGI stack directly (no sockets, no HTTP client) with
+REQUESTS sequential requests per path and reports mean and p50/p99 latency:
+
+  legacy - CORS -> GZip -> log_requests -> add_security_headers ->
+           csrf_middleware -> SlowAPIMiddleware, the @app.middleware("http")
+           layers main.py used to stack (reproduced below, same logic)
+  edge   - CORS -> GZip -> EdgeMiddleware, as main.py builds it now
+
+Paths: GET / (trivial handler, so the number is almost all middleware) and
+GET /public/posts (served from the response cache after the first request,
+as it is in production). Each request comes from its own client address so
+the 200/minute default limit never trips; stdout (the legacy per-request
+print and the access-log listener) goes to /dev/null.
+
+Run from api/:  python -m scripts.bench_edge_middleware --requests 5000
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import secrets
+import statistics
+import sys
+import time
+
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key")
+os.environ.setdefault("MIROTALK_JWT_SECRET", "bench-mirotalk-secret")
+os.environ.setdefault("MIROTALK_PEER_PASSWORD", "bench-mirotalk-password")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from slowapi.middleware import SlowAPIMiddleware  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app import database, edge  # noqa: E402
+from app.limiter import limiter  # noqa: E402
+from app.metrics import percentile  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+async def _legacy_csrf(request, call_next):
+    csrf_token = request.cookies.get("csrf_token") or secrets.token_urlsafe(32)
+    auth_header = request.headers.get("Authorization")
+    is_jwt = auth_header and auth_header.startswith("Bearer ")
+    is_cron = request.url.path.startswith("/cron/")
+    if request.method in ["POST", "PUT", "DELETE", "PATCH"] and request.url.path not in list(edge.CSRF_EXEMPT_PATHS) \
+            and not is_jwt and not is_cron:
+        header_token = request.headers.get("X-CSRF-Token")
+        if not header_token or header_token != csrf_token:
+            return JSONResponse(status_code=403, content={"detail": "CSRF token validation failed"})
+    response = await call_next(request)
+    response.set_cookie(key="csrf_token", value=csrf_token, httponly=False, samesite="None", secure=True)
+    return response
+
+
+async def _legacy_security_headers(request, call_next):
+    response = await call_next(request)
+    for name, value in edge._SECURITY_HEADERS:
+        response.headers[name.decode()] = value.decode()
+    if request.url.path.startswith("/static/"):
+        response.headers["Cache-Control"] = edge._STATIC_CACHE_CONTROL.decode()
+    elif "cache-control" not in response.headers:
+        response.headers["Cache-Control"] = edge._DEFAULT_CACHE_CONTROL.decode()
+    return response
+
+
+async def _legacy_log_requests(request, call_next):
+    origin = request.headers.get("origin")
+    print(f"REQUEST: {request.method} {request.url} ORIGIN: {origin}")
+    try:
+        return await call_next(request)
+    except Exception:
+        return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+
+
+# CORS and GZip, as main.py adds them; both modes share these.
+_OUTER = [m for m in app.user_middleware if m.cls is not edge.EdgeMiddleware]
+
+
+def _stack(mode: str):
+    if mode == "legacy":
+        app.user_middleware = _OUTER + [
+            Middleware(BaseHTTPMiddleware, dispatch=_legacy_log_requests),
+            Middleware(BaseHTTPMiddleware, dispatch=_legacy_security_headers),
+            Middleware(BaseHTTPMiddleware, dispatch=_legacy_csrf),
+            Middleware(SlowAPIMiddleware),
+        ]
+    else:
+        app.user_middleware = _OUTER + [Middleware(edge.EdgeMiddleware)]
+    return app.build_middleware_stack()
+
+
+async def _request(stack, path: str, n: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "https", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "server": ("testserver", 443),
+        "client": (f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}", 50000),
+        "headers": [(b"host", b"testserver"), (b"accept-encoding", b"gzip"),
+                    (b"origin", b"https://aadikarta.org"), (b"cookie", b"csrf_token=abc123")],
+        "app": app, "state": {},
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    started = time.perf_counter()
+    await stack(scope, receive, send)
+    elapsed = (time.perf_counter() - started) * 1e6
+    assert status == [200], (path, status)
+    return elapsed
+
+
+async def _run(mode: str, path: str, requests: int) -> list[float]:
+    limiter.reset()
+    stack = _stack(mode)
+    for i in range(50):  # warm-up: imports, response-cache fill, route lookup
+        await _request(stack, path, i)
+    return [await _request(stack, path, 100 + i) for i in range(requests)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(bind=engine)
+    bench_session = sessionmaker(bind=engine)
+
+    def get_db():
+        with bench_session() as db:
+            yield db
+    app.dependency_overrides[database.get_db] = get_db
+
+    rows = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        sys.stdout = devnull
+        for path in ("/", "/public/posts"):
+            for mode in ("legacy", "edge"):
+                rows.append((path, mode, asyncio.run(_run(mode, path, args.requests))))
+    sys.stdout = sys.__stdout__
+
+    print(f"{'path':<16}{'stack':<8}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for path, mode, samples in rows:
+        samples.sort()
+        print(f"{path:<16}{mode:<8}{statistics.fmean(samples):>10.0f}"
+              f"{percentile(samples, 0.5):>10.0f}{percentile(samples, 0.99):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
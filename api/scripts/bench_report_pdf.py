@@ -0,0 +1,155 @@
+"""Report PDF throughput: reports/second from generate_report_pdf per report type.
+
+Renders the recorded payloads in scripts/bench_report_payloads.json (one
+completed order's report_data each for FULL_KUNDLI, GUN_MILAN and
+CAREER_FINANCE) back to back in this process and reports, per type:
+
+  first ms   the type's first render; the first type's also builds the
+             per-process template parts (styles, chart geometry, encoded
+             cover image)
+  reports/s  sustained rate over --reports renders after that
+  mean/p50/p99 ms, and the PDF size
+
+The rate is for one process; the report worker runs REPORT_PDF_PROCESSES of
+them.
+
+The payloads are recorded rather than generated on each run so numbers stay
+comparable across commits. --record rewrites them: chart data from the local
+ephemeris (app/vedic_ephemeris.py) for a fixed birth and reference date, plus
+the yogas/ashtakavarga sections and an AI reading of the size FreeAstroAPI and
+the LLM return, which the local engine doesn't produce.
+
+Run from api/:  python -m scripts.bench_report_pdf --reports 200
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import date, time as dtime
+
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key")
+os.environ.setdefault("MIROTALK_JWT_SECRET", "bench-mirotalk-secret")
+os.environ.setdefault("MIROTALK_PEER_PASSWORD", "bench-mirotalk-password")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+
+from app.metrics import percentile  # noqa: E402
+from app.report_pdf_service import generate_report_pdf  # noqa: E402
+
+PAYLOADS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_report_payloads.json")
+REPORT_TYPES = ("FULL_KUNDLI", "GUN_MILAN", "CAREER_FINANCE")
+
+
+def _reading(sections: list[str]) -> str:
+    paragraph = (
+        "The placement of the **Moon** in the {n} house colours the emotional life with steadiness and a "
+        "quiet need for security, while the aspect from Jupiter softens old tensions and brings timely "
+        "guidance from elders. Saturn's slow transit asks for patience in the coming period: commitments "
+        "made now are tested, but those built on honest effort hold. Mercury's dignity supports study, "
+        "writing and negotiation, and the ruling dasha lord favours steady progress over sudden leaps."
+    )
+    parts = []
+    for i, section in enumerate(sections):
+        parts.append(f"**{section}**")
+        parts.extend(paragraph.format(n=f"{(i * 3) % 12 + 1}th") for _ in range(3))
+    return "\n\n".join(parts)
+
+
+def _record():
+    from app import vedic_ephemeris
+    from app.report_generator_service import _attach_saturn_transits, _saturn_transit_windows
+
+    dob, tob, lat, lon = date(1990, 5, 17), dtime(6, 30), 18.5204, 73.8567
+    birth = dict(year=dob.year, month=dob.month, day=dob.day, hour=tob.hour, minute=tob.minute,
+                 latitude=lat, longitude=lon, timezone="Asia/Kolkata", reference_date=date(2026, 1, 1))
+
+    kundli = vedic_ephemeris.calculate(**birth, dasha_levels=3)
+    _attach_saturn_transits(kundli["chart"]["sade_sati"], _saturn_transit_windows(dob, tob))
+    kundli["yogas"] = {"yogas": [
+        {"id": "manglik_dosha", "name": "Manglik Dosha", "type": "dosha", "active": True,
+         "description": "Mars occupies the 7th house from the ascendant."},
+        {"id": "kala_sarpa_yoga", "name": "Kala Sarpa Yoga", "type": "dosha", "active": False,
+         "description": "Planets are not hemmed between Rahu and Ketu."},
+        {"id": "gaja_kesari_yoga", "name": "Gaja Kesari Yoga", "type": "yoga", "active": True,
+         "description": "Jupiter in a kendra from the Moon."},
+        {"id": "budha_aditya_yoga", "name": "Budha Aditya Yoga", "type": "yoga", "active": True,
+         "description": "Sun and Mercury conjunct."},
+    ]}
+    kundli["ashtakavarga"] = {"sarvashtakavarga": [28, 31, 25, 33, 27, 29, 30, 24, 26, 32, 30, 22],
+                              "total_points": 337}
+    seeker = {"full_name": "Asha Kulkarni", "dob": dob.isoformat(), "tob": tob.isoformat(),
+              "pob": "Pune, Maharashtra"}
+    career = vedic_ephemeris.calculate(**birth, vargas=[1, 10], dasha_levels=2)
+
+    payloads = {
+        "FULL_KUNDLI": {
+            "report_title": "Full Life Kundli & Planetary Dasha Report - Asha Kulkarni",
+            "seeker_details": {**seeker, "gender": "FEMALE", "latitude": lat, "longitude": lon},
+            "chart_data": kundli,
+            "dasha_insights": {"status": "active", "note": "Vimshottari periods active"},
+            "ai_synthesis": _reading(["Executive Summary", "Core Personality & Mind", "Wealth & Life Path",
+                                      "Upcoming Dasha Guidance", "Remedial Strategy"]),
+        },
+        "GUN_MILAN": {
+            "report_title": "Gun Milan & Marriage Compatibility Report - Asha Kulkarni & Rohan Deshpande",
+            "person1": {"full_name": "Asha Kulkarni", "year": 1990, "month": 5, "day": 17, "hour": 6, "minute": 30,
+                        "place": "Pune, Maharashtra"},
+            "person2": {"full_name": "Rohan Deshpande", "year": 1988, "month": 11, "day": 2, "hour": 21,
+                        "minute": 15, "place": "Nashik, Maharashtra"},
+            "match_data": {"score": 27.5, "total": 36, "result": "Good Match"},
+            "ai_synthesis": _reading(["Emotional Bonding", "Financial Synergy", "Health & Offspring",
+                                      "Dosha Mitigation"]),
+        },
+        "CAREER_FINANCE": {
+            "report_title": "Career & Financial Transit Report - Asha Kulkarni",
+            "seeker_details": seeker,
+            "chart_data": career,
+            "ai_synthesis": _reading(["10th House & Vocation", "D10 Dasamsha", "Wealth Yogas",
+                                      "Job Change Windows", "Business vs Employment"]),
+        },
+    }
+    with open(PAYLOADS_PATH, "w") as f:
+        json.dump(payloads, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    print(f"recorded {', '.join(payloads)} -> {PAYLOADS_PATH}")
+
+
+def _bench(report_type: str, payload: dict, reports: int) -> tuple:
+    reference = "AADI_REP_BENCH0001"
+    started = time.perf_counter()
+    size = len(generate_report_pdf(report_type, payload, reference))
+    first = (time.perf_counter() - started) * 1000
+
+    samples = []
+    total_started = time.perf_counter()
+    for _ in range(reports):
+        started = time.perf_counter()
+        generate_report_pdf(report_type, payload, reference)
+        samples.append((time.perf_counter() - started) * 1000)
+    rate = reports / (time.perf_counter() - total_started)
+    return first, rate, samples, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--record", action="store_true", help="rewrite the recorded payloads and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        _record()
+        return
+
+    with open(PAYLOADS_PATH) as f:
+        payloads = json.load(f)
+
+    print(f"{'report':<16}{'first ms':>10}{'reports/s':>11}{'mean ms':>10}{'p50 ms':>9}{'p99 ms':>9}{'KB':>7}")
+    for report_type in REPORT_TYPES:
+        first, rate, samples, size = _bench(report_type, payloads[report_type], args.reports)
+        samples.sort()
+        print(f"{report_type:<16}{first:>10.1f}{rate:>11.1f}{statistics.fmean(samples):>10.1f}"
+              f"{percentile(samples, 0.5):>9.1f}{percentile(samples, 0.99):>9.1f}{size / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Build the offline gazetteer used by app/geocoding.py from a GeoNames dump, so
+most birth-place geocodes and autocomplete prefixes are answered in-process.
+
+Inputs (https://download.geonames.org/export/dump/):
+  IN.txt                 India, one row per feature (unzip IN.zip)
+  admin1CodesASCII.txt   state names for the admin1 codes in IN.txt
+
+Keeps populated places (feature class P) at or above --min-population and
+writes name/state/lat/lon/population TSV, most populous first. Point the app
+at it with GEOCODE_GAZETTEER_PATH, or write it to the default
+app/data/india_places.tsv.
+
+Usage:
+    python scripts/build_gazetteer.py IN.txt admin1CodesASCII.txt
+    python scripts/build_gazetteer.py IN.txt admin1CodesASCII.txt --min-population 1000 -o /srv/india_places.tsv
+"""
+import argparse
+import os
+import sys
+
+api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# GeoNames column positions in IN.txt
+NAME, ASCII_NAME, LAT, LON, FEATURE_CLASS, COUNTRY, ADMIN1, POPULATION = 1, 2, 4, 5, 6, 8, 10, 14
+
+
+def load_states(path):
+    states = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) >= 2 and cols[0].startswith("IN."):
+                states[cols[0][3:]] = cols[1]
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("places", help="GeoNames IN.txt")
+    parser.add_argument("admin1", help="GeoNames admin1CodesASCII.txt")
+    parser.add_argument("--min-population", type=int, default=5000)
+    parser.add_argument("-o", "--output", default=os.path.join(api_dir, "app", "data", "india_places.tsv"))
+    args = parser.parse_args()
+
+    states = load_states(args.admin1)
+    rows = {}
+    with open(args.places, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) <= POPULATION or cols[FEATURE_CLASS] != "P" or cols[COUNTRY] != "IN":
+                continue
+            population = int(cols[POPULATION] or 0)
+            state = states.get(cols[ADMIN1])
+            if population < args.min_population or not state:
+                continue
+            name = cols[ASCII_NAME] or cols[NAME]
+            # GeoNames has several points per large city (wards, old names);
+            # keep the most populous per name+state.
+            key = (name.lower(), state.lower())
+            if key not in rows or population > rows[key][4]:
+                rows[key] = (name, state, float(cols[LAT]), float(cols[LON]), population)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as out:
+        out.write("name\tstate\tlatitude\tlongitude\tpopulation\n")
+        for name, state, lat, lon, population in sorted(rows.values(), key=lambda r: -r[4]):
+            out.write(f"{name}\t{state}\t{lat:.5f}\t{lon:.5f}\t{population}\n")
+    print(f"Wrote {len(rows)} places to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
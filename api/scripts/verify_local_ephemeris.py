@@ -0,0 +1,181 @@
+"""
+Regression check for the in-process ephemeris: recomputes every cached
+KundliReport (which holds FreeAstroAPI's chart_data) with app/vedic_ephemeris.py
+and reports where the two disagree.
+
+Compared per report:
+  - ascendant and planet sign / house / nakshatra / pada (D1)
+  - planet absolute_degree delta (max and mean per planet across all reports)
+  - D9 / D10 planet and ascendant signs
+  - Vimshottari birth-balance lord and mahadasha lords, start/end dates
+
+Exits non-zero if any mismatch rate or degree delta exceeds its threshold, so
+it can gate a KUNDLI_ENGINE=local rollout.
+
+Usage:
+    python scripts/verify_local_ephemeris.py
+    python scripts/verify_local_ephemeris.py --limit 200 --max-degree-delta 0.05 --verbose
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(api_dir)
+
+from app.database import SQLALCHEMY_DATABASE_URL
+from app import models, vedic_ephemeris
+
+
+def _by_name(planets: list) -> dict:
+    return {p.get("name"): p for p in planets or [] if isinstance(p, dict)}
+
+
+def _day_delta(a: str, b: str) -> int:
+    return abs((date.fromisoformat(a[:10]) - date.fromisoformat(b[:10])).days)
+
+
+class Tally:
+    def __init__(self):
+        self.checks = defaultdict(int)
+        self.mismatches = defaultdict(int)
+        self.degree_deltas = defaultdict(list)
+        self.day_deltas = []
+
+    def compare(self, field: str, expected, actual) -> bool:
+        if expected is None:
+            return True
+        self.checks[field] += 1
+        if expected != actual:
+            self.mismatches[field] += 1
+            return False
+        return True
+
+    def rate(self, field: str) -> float:
+        return self.mismatches[field] / self.checks[field] if self.checks[field] else 0.0
+
+
+def compare_report(report, tally: Tally, verbose: bool):
+    remote = report.chart_data or {}
+    local = vedic_ephemeris.calculate(
+        report.date_of_birth.year, report.date_of_birth.month, report.date_of_birth.day,
+        report.time_of_birth.hour, report.time_of_birth.minute,
+        float(report.latitude), float(report.longitude),
+        timezone=report.timezone or "Asia/Kolkata",
+        vargas=[1, 9, 10],
+        dasha_levels=1,
+    )
+    diffs = []
+
+    r_chart, l_chart = remote.get("chart") or {}, local["chart"]
+    r_asc, l_asc = r_chart.get("ascendant") or {}, l_chart["ascendant"]
+    if not tally.compare("ascendant.sign", r_asc.get("sign"), l_asc["sign"]):
+        diffs.append(f"ascendant {r_asc.get('sign')} -> {l_asc['sign']}")
+
+    l_planets = _by_name(l_chart["planets"])
+    for name, rp in _by_name(r_chart.get("planets")).items():
+        lp = l_planets.get(name)
+        if lp is None:
+            continue
+        for field in ("sign", "house", "nakshatra_id", "pada"):
+            if not tally.compare(f"planet.{field}", rp.get(field), lp[field]):
+                diffs.append(f"{name}.{field} {rp.get(field)} -> {lp[field]}")
+        if rp.get("absolute_degree") is not None:
+            delta = abs((lp["absolute_degree"] - float(rp["absolute_degree"]) + 180) % 360 - 180)
+            tally.degree_deltas[name].append(delta)
+
+    r_vargas = (remote.get("vargas") or {}).get("vargas") or {}
+    for key in ("D9", "D10"):
+        r_varga, l_varga = r_vargas.get(key), local["vargas"]["vargas"][key]
+        if not r_varga:
+            continue
+        if not tally.compare(f"{key}.ascendant", (r_varga.get("ascendant") or {}).get("sign"), l_varga["ascendant"]["sign"]):
+            diffs.append(f"{key} ascendant")
+        l_vp = _by_name(l_varga["planets"])
+        for name, rp in _by_name(r_varga.get("planets")).items():
+            if name in l_vp and not tally.compare(f"{key}.planet", rp.get("sign"), l_vp[name]["sign"]):
+                diffs.append(f"{key} {name} {rp.get('sign')} -> {l_vp[name]['sign']}")
+
+    r_dasha, l_dasha = remote.get("vimshottari_dasha") or {}, local["vimshottari_dasha"]
+    r_balance = r_dasha.get("birth_balance") or {}
+    if not tally.compare("dasha.birth_lord", r_balance.get("lord"), l_dasha["birth_balance"]["lord"]):
+        diffs.append(f"birth dasha {r_balance.get('lord')} -> {l_dasha['birth_balance']['lord']}")
+    for rp, lp in zip(r_dasha.get("timeline") or [], l_dasha["timeline"]):
+        if not tally.compare("dasha.mahadasha_lord", rp.get("lord"), lp["lord"]):
+            diffs.append(f"mahadasha {rp.get('lord')} -> {lp['lord']}")
+            continue
+        for edge in ("start", "end"):
+            if rp.get(edge):
+                tally.day_deltas.append(_day_delta(rp[edge], lp[edge]))
+
+    if diffs and verbose:
+        print(f"  report {report.id} ({report.date_of_birth} {report.time_of_birth}): " + "; ".join(diffs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=None, help="only check the newest N reports")
+    parser.add_argument("--max-mismatch-rate", type=float, default=0.01,
+                        help="allowed fraction of sign/house/nakshatra/varga/dasha-lord mismatches per field")
+    parser.add_argument("--max-degree-delta", type=float, default=0.1,
+                        help="allowed worst-case absolute_degree difference for any planet")
+    parser.add_argument("--max-day-delta", type=int, default=2,
+                        help="allowed worst-case mahadasha start/end difference in days")
+    parser.add_argument("--verbose", action="store_true", help="print every report with a mismatch")
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    session = sessionmaker(bind=engine)()
+
+    query = session.query(models.KundliReport).filter(
+        models.KundliReport.latitude.isnot(None),
+        models.KundliReport.longitude.isnot(None),
+    ).order_by(models.KundliReport.id.desc())
+    if args.limit:
+        query = query.limit(args.limit)
+
+    tally, checked, errors = Tally(), 0, 0
+    for report in query.yield_per(200):
+        try:
+            compare_report(report, tally, args.verbose)
+            checked += 1
+        except Exception as e:
+            errors += 1
+            print(f"  report {report.id}: could not compare ({e})")
+    session.close()
+
+    print(f"\nCompared {checked} report(s), {errors} skipped.\n")
+    failed = errors > 0
+    for field in sorted(tally.checks):
+        rate = tally.rate(field)
+        flag = " !!" if rate > args.max_mismatch_rate else ""
+        failed |= bool(flag)
+        print(f"  {field:<22} {tally.mismatches[field]:>5}/{tally.checks[field]:<6} mismatched ({rate:.2%}){flag}")
+
+    print("\n  absolute_degree delta (deg)   max      mean")
+    for name in vedic_ephemeris.PLANETS:
+        deltas = tally.degree_deltas.get(name)
+        if not deltas:
+            continue
+        worst = max(deltas)
+        flag = " !!" if worst > args.max_degree_delta else ""
+        failed |= bool(flag)
+        print(f"  {name:<28} {worst:8.4f} {sum(deltas) / len(deltas):8.4f}{flag}")
+
+    if tally.day_deltas:
+        worst = max(tally.day_deltas)
+        flag = " !!" if worst > args.max_day_delta else ""
+        failed |= bool(flag)
+        print(f"\n  mahadasha boundary delta: max {worst} day(s){flag}")
+
+    print("\nFAIL" if failed else "\nOK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app  # registers all models + routers on import
-from app import database, models
+from app import astrologer_directory, chat_history, database, identity, models, response_cache
 from app.limiter import limiter
 from app.routers.auth import create_access_token, get_password_hash
 from app.services import email_service
@@ -51,6 +51,12 @@ def _disable_rate_limit():
 def db_session():
     """Fresh schema per test, dropped afterwards for isolation."""
     database.Base.metadata.create_all(bind=engine)
+    # drop_all bypasses the ORM and the write endpoints, so neither the directory
+    # nor the response cache can notice the last test's rows going.
+    astrologer_directory.invalidate()
+    response_cache._lru.clear()
+    identity._l1.clear()  # ids are reused once the tables are recreated
+    chat_history._rings.clear()
     session = TestingSessionLocal()
     try:
         yield session
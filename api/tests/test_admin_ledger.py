@@ -0,0 +1,65 @@
+"""Admin transaction lists: chat minutes are grouped per session in SQL and
+pages are fetched by keyset (created_at, id), with the total from a count."""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app import models
+from tests.conftest import auth_headers
+
+T0 = datetime(2026, 3, 1, 10, 0)
+
+
+def _txn(db, user, minutes, amount, kind=models.TransactionType.DEPOSIT, reference_id=None):
+    db.add(models.WalletTransaction(user_id=user.id, amount=Decimal(amount), transaction_type=kind,
+                                    reference_id=reference_id, description=kind.value.title(),
+                                    created_at=T0 + timedelta(minutes=minutes)))
+
+
+def test_transactions_page_by_cursor(client, db_session, make_user):
+    seeker = make_user()
+    for minute in range(7):
+        _txn(db_session, seeker, minute, "100")
+    _txn(db_session, seeker, 3, "100")  # same created_at as another deposit
+    for minute in (7, 8, 9):
+        _txn(db_session, seeker, minute, "-10", models.TransactionType.CHAT_DEDUCTION, "77")
+    db_session.commit()
+    headers = auth_headers(make_user(models.UserRole.ADMIN))
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"before": cursor} if cursor else {})}
+        body = client.get("/admin/transactions", params=params, headers=headers).json()
+        assert body["total"] == 9
+        pages.append(body["transactions"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    entries = [t for page in pages for t in page]
+    assert len(pages) == 3 and len(entries) == 9
+    assert entries[0]["description"] == "Chat session deduction (3 min)" and entries[0]["amount"] == -30.0
+    assert len({t["id"] for t in entries}) == 9
+    assert [t["created_at"] for t in entries] == sorted((t["created_at"] for t in entries), reverse=True)
+
+    # The OFFSET fallback lands on the same page.
+    assert client.get("/admin/transactions", params={"limit": 3, "skip": 3}, headers=headers).json()["transactions"] == pages[1]
+    assert client.get("/admin/transactions", params={"before": "nope"}, headers=headers).status_code == 400
+
+
+def test_wallet_history_groups_sessions(client, db_session, make_user):
+    seeker, other = make_user(), make_user()
+    _txn(db_session, seeker, 0, "500")
+    for minute in (1, 2):
+        _txn(db_session, seeker, minute, "-10", models.TransactionType.CHAT_DEDUCTION, "5")
+    _txn(db_session, seeker, 3, "-10", models.TransactionType.CHAT_DEDUCTION)  # no consultation
+    _txn(db_session, other, 3, "50")
+    db_session.commit()
+
+    body = client.get(f"/admin/users/{seeker.id}/wallet-history",
+                      headers=auth_headers(make_user(models.UserRole.ADMIN))).json()
+    assert body["total"] == 3 and body["next_cursor"] is None
+    assert [(t["transaction_type"], t["description"], float(t["amount"])) for t in body["transactions"]] == [
+        ("CHAT_DEDUCTION", "Chat_Deduction", -10.0),
+        ("CHAT_DEDUCTION", "Chat session deduction (2 min)", -20.0),
+        ("DEPOSIT", "Deposit", 500.0),
+    ]
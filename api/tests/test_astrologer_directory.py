@@ -0,0 +1,192 @@
+"""Astrologer directory: warm listing pages run no SQL, consultation status
+changes move the live queue/busy counters as they commit (even on expired
+instances), restricted astrologers only show up for allow-listed seekers, and
+ASTRO_ONLINE/OFFLINE broadcasts flip availability in place."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app import astrologer_directory as directory, models
+from app.routers import realtime
+from tests.conftest import auth_headers
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store, self.hashes = {}, {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.ops = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    def execute(self):
+        h, results = self.redis.hashes, []
+        for name, args, kwargs in self.ops:
+            if name == "hincrby":
+                bucket = h.setdefault(args[0], {})
+                bucket[str(args[1])] = str(int(bucket.get(str(args[1]), 0)) + args[2])
+            elif name == "hmget":
+                results.append([h.get(args[0], {}).get(str(i)) for i in args[1]])
+            elif name == "mget":
+                results.append([self.redis.store.get(k) for k in args[0]])
+            elif name == "delete":
+                for k in args:
+                    h.pop(k, None)
+            elif name == "hset":
+                h.setdefault(args[0], {}).update({str(k): str(v) for k, v in kwargs["mapping"].items()})
+        return results
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(directory, "get_redis", lambda: fake)
+    monkeypatch.setattr(directory, "_redis_down_until", 0.0)
+    directory.invalidate()
+    return fake
+
+
+def _listed(db, user, *, online=True, rating="4.0", premium=False, restricted=False):
+    profile = db.query(models.AstrologerProfile).filter_by(user_id=user.id).one()
+    profile.is_approved = True
+    profile.onboarding_stage = models.OnboardingStage.COMPLETED
+    profile.is_online = online
+    profile.rating_avg = Decimal(rating)
+    profile.is_premium = premium
+    profile.is_restricted = restricted
+    db.commit()
+    return user
+
+
+def _present(redis, *users):
+    for u in users:
+        redis.store[realtime._presence_key(u.id)] = "1"
+
+
+def test_warm_pages_run_no_sql_and_keep_sort_order(client, db_session, make_user, redis):
+    a = _listed(db_session, make_user(models.UserRole.ASTROLOGER), rating="4.9")
+    b = _listed(db_session, make_user(models.UserRole.ASTROLOGER), rating="4.2", premium=True)
+    c = _listed(db_session, make_user(models.UserRole.ASTROLOGER), rating="3.1")
+    make_user(models.UserRole.ASTROLOGER)  # not approved: never listed
+    _present(redis, a, b, c)
+
+    assert [p["user_id"] for p in client.get("/astrologers/").json()] == [b.id, a.id, c.id]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        top = client.get("/astrologers/?sort_by=top").json()
+        rating = client.get("/astrologers/?sort_by=rating&skip=1&limit=1").json()
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+    assert statements == []
+    assert [p["user_id"] for p in top] == [a.id, b.id, c.id]
+    assert [p["user_id"] for p in rating] == [a.id]
+    assert {p["availability_status"] for p in top} == {"ONLINE"}
+
+
+def test_consultation_transitions_move_live_counters(client, db_session, make_user, redis):
+    astrologer = _listed(db_session, make_user(models.UserRole.ASTROLOGER))
+    _present(redis, astrologer)
+    first, second = make_user(), make_user()
+    c1 = models.Consultation(seeker_id=first.id, astrologer_id=astrologer.id,
+                             consultation_type=models.ConsultationType.CHAT, rate_per_min=10)
+    c2 = models.Consultation(seeker_id=second.id, astrologer_id=astrologer.id,
+                             consultation_type=models.ConsultationType.CHAT, rate_per_min=10)
+    db_session.add_all([c1, c2])
+    db_session.commit()
+
+    def listing():
+        (entry,) = client.get("/astrologers/").json()
+        return entry["availability_status"], entry["queue_length"]
+
+    assert listing() == ("ONLINE", 2)
+
+    c1.status = models.ConsultationStatus.ACTIVE  # c1 expired by the commit above
+    db_session.commit()
+    assert listing() == ("BUSY", 1)
+
+    c1.status = models.ConsultationStatus.COMPLETED
+    c2.status = models.ConsultationStatus.CANCELLED
+    db_session.flush()
+    db_session.rollback()  # never committed: counters untouched
+    assert listing() == ("BUSY", 1)
+
+    c1.status = models.ConsultationStatus.COMPLETED
+    db_session.commit()
+    assert listing() == ("ONLINE", 1)
+
+
+def test_restricted_astrologer_only_listed_for_allowed_seekers(client, db_session, make_user, redis):
+    public = _listed(db_session, make_user(models.UserRole.ASTROLOGER))
+    private = _listed(db_session, make_user(models.UserRole.ASTROLOGER), restricted=True)
+    allowed, other = make_user(), make_user()
+
+    def ids(user=None):
+        headers = auth_headers(user) if user else {}
+        return {p["user_id"] for p in client.get("/astrologers/", headers=headers).json()}
+
+    assert ids() == ids(allowed) == {public.id}
+
+    db_session.add(models.AstrologerAllowedSeeker(astrologer_id=private.id, seeker_id=allowed.id))
+    db_session.commit()
+    assert ids(allowed) == {public.id, private.id}
+    assert ids(other) == ids() == {public.id}
+
+
+def test_online_broadcast_flips_entry_without_rebuild(client, db_session, make_user, redis):
+    astrologer = _listed(db_session, make_user(models.UserRole.ASTROLOGER), online=False)
+    _present(redis, astrologer)
+    assert client.get("/astrologers/").json()[0]["availability_status"] == "OFFLINE"
+    version = redis.store.get(directory._VERSION_KEY)
+
+    profile = db_session.query(models.AstrologerProfile).filter_by(user_id=astrologer.id).one()
+    profile.is_online = True
+    db_session.commit()
+    assert client.get("/astrologers/").json()[0]["availability_status"] == "ONLINE"
+
+    # Another worker's toggle reaches this one as a broadcast.
+    directory.on_broadcast({"type": "ASTRO_OFFLINE", "astrologer_id": astrologer.id})
+    assert client.get("/astrologers/").json()[0]["availability_status"] == "OFFLINE"
+    assert redis.store.get(directory._VERSION_KEY) == version
+
+
+def test_account_changes_drop_astrologer_from_listing(client, db_session, make_user, redis):
+    demoted = _listed(db_session, make_user(models.UserRole.ASTROLOGER))
+    deactivated = _listed(db_session, make_user(models.UserRole.ASTROLOGER))
+    kept = _listed(db_session, make_user(models.UserRole.ASTROLOGER))
+
+    def ids():
+        return {p["user_id"] for p in client.get("/astrologers/").json()}
+
+    assert ids() == {demoted.id, deactivated.id, kept.id}
+
+    demoted.role = models.UserRole.SEEKER
+    db_session.commit()
+    assert ids() == {deactivated.id, kept.id}
+
+    deactivated.is_active = False
+    db_session.commit()
+    assert ids() == {kept.id}
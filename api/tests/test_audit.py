@@ -0,0 +1,101 @@
+"""Audit writer: events stay out of the caller's transaction and are written
+only once it commits, the running writer batches many commits into one
+multi-row INSERT, events survive a database outage through the spool file,
+and sync=True keeps a financial entry inside the caller's transaction."""
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import audit, database, models
+
+
+@pytest.fixture
+def audit_inserts(db_session):
+    statements = []
+    listener = lambda *args: "INSERT INTO audit_logs" in args[2] and statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    yield statements
+    event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+
+@pytest.fixture
+def writer_db(monkeypatch, db_session, tmp_path):
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(audit, "AUDIT_SPOOL_PATH", str(tmp_path / "audit_spool.jsonl"))
+    monkeypatch.setattr(audit, "AUDIT_FLUSH_MS", 20.0)
+    monkeypatch.setattr(audit, "writer", audit.AuditWriter())
+    return tmp_path
+
+
+def _actions(db_session):
+    db_session.expire_all()
+    return sorted(a.action for a in db_session.query(models.AuditLog))
+
+
+def test_event_is_written_only_after_the_caller_commits(db_session, make_user, audit_inserts):
+    admin = make_user(models.UserRole.ADMIN)
+    audit.log(db_session, "USER_PASSWORD_RESET", actor_id=admin.id, resource_type="user", resource_id=admin.id,
+              client_ip="203.0.113.7", user_agent="x" * 400)
+    db_session.flush()
+    assert audit_inserts == []
+    db_session.rollback()
+    assert _actions(db_session) == []
+
+    audit.log(db_session, "USER_PASSWORD_RESET", actor_id=admin.id, client_ip="203.0.113.7", user_agent="x" * 400)
+    db_session.commit()
+    entry = db_session.query(models.AuditLog).one()
+    assert entry.details is None and entry.client_ip == "203.0.113.7" and len(entry.user_agent) == 255
+
+
+def test_sync_entry_is_part_of_the_callers_transaction(db_session):
+    audit.log(db_session, "WALLET_ADJUSTED", resource_type="user", resource_id=1, details={"amount": 5}, sync=True)
+    assert [e.action for e in db_session.new] == ["WALLET_ADJUSTED"]
+    db_session.rollback()
+    assert _actions(db_session) == []
+
+
+def test_running_writer_batches_commits_into_one_insert(db_session, writer_db, audit_inserts):
+    async def scenario():
+        audit.writer.start()
+        for i in range(5):
+            audit.log(db_session, "CHAT_AUTO_ENDED", resource_type="consultation", resource_id=i)
+            db_session.commit()
+        assert audit_inserts == []
+        await asyncio.sleep(0.1)
+        assert len(audit_inserts) == 1
+
+        audit.log(db_session, "CHAT_ENDED_BY_USER", resource_type="consultation", resource_id=9)
+        db_session.commit()
+        await audit.writer.stop()  # shutdown drains the queue
+
+    asyncio.run(scenario())
+    assert _actions(db_session) == ["CHAT_AUTO_ENDED"] * 5 + ["CHAT_ENDED_BY_USER"]
+
+
+def test_outage_spools_events_and_the_next_flush_replays_them(db_session, writer_db, monkeypatch):
+    working = database.SessionLocal
+
+    def unreachable():
+        raise OperationalError("connect", {}, Exception("connection refused"))
+
+    async def scenario():
+        audit.writer.start()
+        monkeypatch.setattr(database, "SessionLocal", unreachable)
+        audit.log(db_session, "DISPUTE_RAISED", resource_type="consultation", resource_id=1)
+        db_session.commit()
+        await asyncio.sleep(0.1)
+        assert _actions(db_session) == []
+        assert list(writer_db.iterdir())  # on disk, not lost
+
+        monkeypatch.setattr(database, "SessionLocal", working)
+        audit.log(db_session, "CHAT_MODERATION_FLAG", resource_type="consultation", resource_id=1)
+        db_session.commit()
+        await asyncio.sleep(0.1)
+        await audit.writer.stop()
+
+    asyncio.run(scenario())
+    assert _actions(db_session) == ["CHAT_MODERATION_FLAG", "DISPUTE_RAISED"]
+    assert not list(writer_db.iterdir())
@@ -0,0 +1,146 @@
+"""Cross-worker fan-out: a room/user message published by one worker reaches the
+sockets held by another, the publishing worker doesn't deliver its own message
+twice, and the "is the recipient online?" check sees sockets on other workers
+so they aren't sent a duplicate FCM push."""
+import asyncio
+import json
+
+from app import backplane as backplane_mod
+from app import models
+from app.routers import chat as chat_router
+from app.routers import realtime as realtime_router
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def _envelope(message, origin="other-node"):
+    return json.dumps({"o": origin, "m": message})
+
+
+def test_remote_room_message_reaches_local_sockets_except_excluded():
+    manager = chat_router.ConnectionManager()
+    bus = backplane_mod.RedisBackend("redis://unused")
+    bus.subscribe("chat", manager._on_remote)
+    seeker_ws, astro_ws = _FakeWebSocket(), _FakeWebSocket()
+    asyncio.run(manager.connect(seeker_ws, 7, models.User(id=1, role=models.UserRole.SEEKER)))
+    asyncio.run(manager.connect(astro_ws, 7, models.User(id=2, role=models.UserRole.ASTROLOGER)))
+
+    msg = {"consultation_id": 7, "message": {"type": "NEW_MESSAGE", "content": "hi"}, "exclude_user_id": 1}
+    asyncio.run(bus._dispatch("rt:chat", _envelope(msg)))
+
+    assert astro_ws.sent == [{"type": "NEW_MESSAGE", "content": "hi"}]
+    assert seeker_ws.sent == []
+
+
+def test_own_envelopes_are_not_delivered_again():
+    manager = chat_router.ConnectionManager()
+    bus = backplane_mod.RedisBackend("redis://unused")
+    bus.subscribe("chat", manager._on_remote)
+    ws = _FakeWebSocket()
+    asyncio.run(manager.connect(ws, 7, models.User(id=2, role=models.UserRole.ASTROLOGER)))
+
+    msg = {"consultation_id": 7, "message": {"type": "TYPING"}, "exclude_user_id": None}
+    asyncio.run(bus._dispatch("rt:chat", _envelope(msg, origin=backplane_mod.NODE_ID)))
+
+    assert ws.sent == []
+
+
+def test_remote_user_notification_reaches_that_users_sockets_only():
+    notifier = realtime_router.NotificationManager()
+    bus = backplane_mod.RedisBackend("redis://unused")
+    bus.subscribe("user", notifier._on_remote_user)
+    mine, other = _FakeWebSocket(), _FakeWebSocket()
+    notifier.connections = {5: [mine], 6: [other]}
+
+    asyncio.run(bus._dispatch("rt:user", _envelope({"user_id": 5, "payload": {"type": "YOUR_TURN"}})))
+
+    assert mine.sent == [{"type": "YOUR_TURN"}]
+    assert other.sent == []
+
+
+def test_recipient_on_another_worker_counts_as_online(monkeypatch):
+    manager = chat_router.ConnectionManager()
+    asyncio.run(manager.connect(_FakeWebSocket(), 7, models.User(id=1, role=models.UserRole.SEEKER)))
+
+    async def is_member_elsewhere(group, user_id):
+        return group == "chat:7" and user_id == 2
+
+    monkeypatch.setattr(chat_router.backplane, "is_member_elsewhere", is_member_elsewhere)
+
+    assert asyncio.run(manager.is_user_in_room(7, 1))  # local socket
+    assert asyncio.run(manager.is_user_in_room(7, 2))  # socket on another worker
+    assert not asyncio.run(manager.is_user_in_room(7, 3))
+    assert not asyncio.run(manager.is_user_in_room(8, 2))
+
+
+class _FakeAsyncRedis:
+    """The hash/key commands RedisBackend's membership uses, as coroutines."""
+
+    def __init__(self):
+        self.hashes, self.keys = {}, set()
+
+    async def hincrby(self, key, field, delta):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = str(int(bucket.get(field, 0)) + delta)
+        return int(bucket[field])
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def exists(self, *keys):
+        return sum(k in self.keys for k in keys)
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def set(self, key, value, ex=None):
+        self.keys.add(key)
+
+    def pipeline(self):
+        redis, ops = self, []
+
+        class _Pipe:
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: ops.append(getattr(redis, name)(*args, **kwargs))
+
+            async def execute(self):
+                return [await op for op in ops]
+
+        return _Pipe()
+
+
+def test_membership_is_written_in_order_off_the_calling_path():
+    bus = backplane_mod.RedisBackend("redis://unused")
+    fake = bus._client = _FakeAsyncRedis()
+    field = f"2:{backplane_mod.NODE_ID}"
+
+    async def scenario():
+        bus._membership = asyncio.Queue()
+        writer = asyncio.create_task(bus._write_membership())
+        bus.join("chat:7", 2)
+        bus.join("chat:7", 2)
+        bus.leave("chat:7", 2)
+        assert fake.hashes == {}  # nothing awaited yet: join/leave only queue
+        while not bus._membership.empty():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        writer.cancel()
+
+    asyncio.run(scenario())
+    assert fake.hashes["rt_members:chat:7"] == {field: "1"}
+
+    # Another node's socket counts while its heartbeat key is alive.
+    fake.hashes["rt_members:chat:7"]["3:other-node"] = "1"
+    assert not asyncio.run(bus.is_member_elsewhere("chat:7", 3))
+    fake.keys.add("rt_node:other-node")
+    assert asyncio.run(bus.is_member_elsewhere("chat:7", 3))
+    assert not asyncio.run(bus.is_member_elsewhere("chat:7", 2))  # only on this node
@@ -0,0 +1,195 @@
+"""BillingScheduler settles every due ACTIVE consultation in one batch: wallet
+debits, CHAT_DEDUCTION rows and duration/total_cost updates for all of them
+land in a single commit, and sessions that can't pay (or are no longer ACTIVE)
+drop off the schedule instead of being billed again. A row that fails to settle
+only holds back its own charge."""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import astrologer_directory, database, models
+from app.routers import chat as chat_router
+from tests.test_astrologer_directory import _FakeRedis
+
+
+@pytest.fixture
+def scheduler(db_session, monkeypatch):
+    # The scheduler opens its own sessions via database.SessionLocal, same as
+    # _pause_active_consultation_on_disconnect — bind it to the test database.
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    # No Redis in unit tests: no crash-recovery keys, no per-minute lock.
+    monkeypatch.setattr(chat_router, "get_redis", lambda: None)
+    monkeypatch.setattr(chat_router, "promote_next_in_queue", lambda db, astrologer_id: None)
+    return chat_router.BillingScheduler()
+
+
+def _active(db_session, seeker, astro, rate=10.0, **extra):
+    c = models.Consultation(
+        seeker_id=seeker.id,
+        astrologer_id=astro.id,
+        consultation_type=models.ConsultationType.CHAT,
+        rate_per_min=rate,
+        status=models.ConsultationStatus.ACTIVE,
+        **extra,
+    )
+    db_session.add(c)
+    db_session.commit()
+    db_session.refresh(c)
+    return c
+
+
+def _run_next_minute(scheduler):
+    asyncio.run(scheduler.run_due(now=time.monotonic() + chat_router.BILLING_INTERVAL_SECS))
+
+
+def test_due_consultations_are_billed_in_one_tick(db_session, make_user, scheduler):
+    astro = make_user(models.UserRole.ASTROLOGER, fee=10.0)
+    seeker1 = make_user(models.UserRole.SEEKER, balance=100.0)
+    seeker2 = make_user(models.UserRole.SEEKER, balance=50.0)
+    c1 = _active(db_session, seeker1, astro, rate=10.0)
+    c2 = _active(db_session, seeker2, make_user(models.UserRole.ASTROLOGER), rate=20.0)
+
+    scheduler.register(c1.id, 10.0)
+    scheduler.register(c2.id, 20.0)
+    _run_next_minute(scheduler)
+
+    db_session.expire_all()
+    assert float(db_session.get(models.UserWallet, seeker1.id).balance) == 90.0
+    assert float(db_session.get(models.UserWallet, seeker2.id).balance) == 30.0
+    for cons, cost in ((c1, 10.0), (c2, 20.0)):
+        row = db_session.get(models.Consultation, cons.id)
+        assert row.duration_seconds == 60
+        assert float(row.total_cost) == cost
+        txns = db_session.query(models.WalletTransaction).filter(
+            models.WalletTransaction.reference_id == str(cons.id)
+        ).all()
+        assert [(t.transaction_type, float(t.amount)) for t in txns] == [
+            (models.TransactionType.CHAT_DEDUCTION, -cost)
+        ]
+    assert scheduler.is_registered(c1.id) and scheduler.is_registered(c2.id)
+
+
+def test_not_yet_due_consultation_is_left_alone(db_session, make_user, scheduler):
+    seeker = make_user(models.UserRole.SEEKER, balance=100.0)
+    c = _active(db_session, seeker, make_user(models.UserRole.ASTROLOGER))
+
+    scheduler.register(c.id, 10.0)
+    asyncio.run(scheduler.run_due())
+
+    db_session.expire_all()
+    assert float(db_session.get(models.UserWallet, seeker.id).balance) == 100.0
+    assert db_session.query(models.WalletTransaction).count() == 0
+
+
+def test_insufficient_balance_auto_ends_and_unregisters(db_session, make_user, scheduler):
+    seeker = make_user(models.UserRole.SEEKER, balance=5.0)
+    c = _active(db_session, seeker, make_user(models.UserRole.ASTROLOGER))
+
+    scheduler.register(c.id, 10.0)
+    _run_next_minute(scheduler)
+
+    db_session.expire_all()
+    row = db_session.get(models.Consultation, c.id)
+    assert row.status == models.ConsultationStatus.AUTO_ENDED
+    assert row.end_time is not None
+    assert float(db_session.get(models.UserWallet, seeker.id).balance) == 5.0
+    assert db_session.query(models.WalletTransaction).count() == 0
+    assert not scheduler.is_registered(c.id)
+
+
+def test_auto_end_frees_astrologer_in_directory(db_session, make_user, scheduler, monkeypatch):
+    # The auto-end is a bulk UPDATE, which the directory's flush hook never sees.
+    fake = _FakeRedis()
+    monkeypatch.setattr(astrologer_directory, "get_redis", lambda: fake)
+    monkeypatch.setattr(astrologer_directory, "_redis_down_until", 0.0)
+    astro = make_user(models.UserRole.ASTROLOGER)
+    c = _active(db_session, make_user(models.UserRole.SEEKER, balance=5.0), astro)
+
+    def busy():
+        _queued, counts, _present = astrologer_directory._live_state(db_session, [astro.id])
+        return counts[astro.id]
+
+    assert busy() == 1
+    scheduler.register(c.id, 10.0)
+    _run_next_minute(scheduler)
+    assert busy() == 0
+
+
+def test_paused_consultation_stops_billing(db_session, make_user, scheduler):
+    seeker = make_user(models.UserRole.SEEKER, balance=100.0)
+    c = _active(db_session, seeker, make_user(models.UserRole.ASTROLOGER))
+    scheduler.register(c.id, 10.0)
+
+    c.status = models.ConsultationStatus.PAUSED
+    db_session.commit()
+    _run_next_minute(scheduler)
+
+    db_session.expire_all()
+    assert float(db_session.get(models.UserWallet, seeker.id).balance) == 100.0
+    assert not scheduler.is_registered(c.id)
+
+
+def test_package_session_consumes_package_time_not_wallet(db_session, make_user, scheduler):
+    seeker = make_user(models.UserRole.SEEKER, balance=100.0)
+    package = models.ChatPackage(name="10 min", duration_minutes=10, price=80.0)
+    db_session.add(package)
+    db_session.commit()
+    c = _active(db_session, seeker, make_user(models.UserRole.ASTROLOGER),
+                package_id=package.id, package_seconds_remaining=600)
+
+    scheduler.register(c.id, 10.0)
+    _run_next_minute(scheduler)
+
+    db_session.expire_all()
+    row = db_session.get(models.Consultation, c.id)
+    assert row.package_seconds_remaining == 540
+    assert float(row.total_cost) == 10.0
+    assert float(db_session.get(models.UserWallet, seeker.id).balance) == 100.0
+    assert db_session.query(models.WalletTransaction).count() == 0
+
+
+def test_one_failing_consultation_does_not_block_the_batch(db_session, make_user, scheduler, monkeypatch):
+    good_seeker = make_user(models.UserRole.SEEKER, balance=100.0)
+    good = _active(db_session, good_seeker, make_user(models.UserRole.ASTROLOGER))
+    bad = _active(db_session, make_user(models.UserRole.SEEKER, balance=100.0), make_user(models.UserRole.ASTROLOGER))
+    real_rate = chat_router._effective_rate_per_min
+
+    def rate(consultation, *args):
+        if consultation.id == bad.id:
+            raise ValueError("corrupt row")
+        return real_rate(consultation, *args)
+
+    monkeypatch.setattr(chat_router, "_effective_rate_per_min", rate)
+    scheduler.register(good.id, 10.0)
+    scheduler.register(bad.id, 10.0)
+    now = time.monotonic() + chat_router.BILLING_INTERVAL_SECS
+    asyncio.run(scheduler.run_due(now=now))
+
+    db_session.expire_all()
+    assert float(db_session.get(models.UserWallet, good_seeker.id).balance) == 90.0
+    assert db_session.get(models.Consultation, bad.id).duration_seconds in (None, 0)
+    # Still due: retried on the next tick until it is quarantined.
+    assert scheduler._entries[bad.id]["due_at"] <= now
+    for _ in range(chat_router.BILLING_QUARANTINE_AFTER - 1):
+        asyncio.run(scheduler.run_due(now=now))
+    assert scheduler.is_registered(bad.id)
+    assert scheduler._entries[bad.id]["due_at"] == now + chat_router.BILLING_INTERVAL_SECS
+
+
+def test_resume_after_the_tick_dropped_the_session_keeps_its_due_time(db_session, make_user, scheduler):
+    seeker = make_user(models.UserRole.SEEKER, balance=100.0)
+    c = _active(db_session, seeker, make_user(models.UserRole.ASTROLOGER))
+    scheduler.register(c.id, 10.0)
+    due_at = scheduler._entries[c.id]["due_at"]
+
+    c.status = models.ConsultationStatus.PAUSED
+    db_session.commit()
+    _run_next_minute(scheduler)
+    assert not scheduler.is_registered(c.id)
+
+    c.status = models.ConsultationStatus.ACTIVE
+    db_session.commit()
+    scheduler.register(c.id, 10.0)
+    assert scheduler._entries[c.id]["due_at"] == due_at
@@ -1,6 +1,6 @@
 """_pause_active_consultation_on_disconnect must fire for ANY socket-level
 disconnect, not just the clean WebSocketDisconnect case — a network drop or any
-other exception is just as dead a connection, and billing_loop must stop
+other exception is just as dead a connection, and billing must stop
 deducting from the seeker's wallet once nobody is actually connected.
 
 This directly covers the gap where the old code's `except Exception` branch in
@@ -22,7 +22,7 @@ def _request_body(astrologer_id, ctype="CHAT"):
 
 def _bind_session_local_to(db_session, monkeypatch):
     # _pause_active_consultation_on_disconnect opens its own DB session via
-    # database.SessionLocal (same pattern billing_loop uses), independent of the
+    # database.SessionLocal (same pattern the billing scheduler uses), independent of the
     # `db_session`/`client` fixtures' overridden session. Bind a sessionmaker to
     # db_session's own engine (rather than importing tests.conftest's module-level
     # engine, which pytest's plugin loader and a plain `import tests.conftest` can
@@ -50,6 +50,7 @@ def test_pauses_active_consultation_and_records_snapshot(client, db_session, mak
     snapshot = json.loads(row.disconnection_snapshot)
     assert snapshot["paused_by"] == "ASTROLOGER"
     assert "paused_at" in snapshot
+    assert row.paused_at is not None  # the stale-paused sweep's clock
 
 
 def test_noop_when_consultation_is_not_active(db_session, make_user, monkeypatch):
@@ -0,0 +1,55 @@
+"""Edge middleware: the single pure-ASGI layer in front of every HTTP route
+still sets the security headers and csrf_token cookie, enforces CSRF outside
+the exempt paths, applies the default rate limit, and writes one structured
+access-log record per request."""
+import logging
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app import edge
+from app.limiter import limiter
+from app.main import app
+
+
+def test_no_base_http_middleware_left_in_the_stack():
+    assert not any(issubclass(m.cls, BaseHTTPMiddleware) for m in app.user_middleware)
+
+
+def test_security_headers_and_csrf_cookie(client):
+    resp = client.get("/")
+    assert resp.headers["x-frame-options"] == "DENY"
+    assert resp.headers["content-security-policy"].startswith("default-src 'self'")
+    assert resp.headers["cache-control"] == "no-store, no-cache, must-revalidate, max-age=0"
+    assert resp.headers["set-cookie"] == f"csrf_token={client.cookies['csrf_token']}; Path=/; SameSite=None; Secure"
+
+
+def test_csrf_enforced_except_on_exempt_paths(client):
+    client.headers.pop("X-CSRF-Token")
+    assert client.post("/public/contact", json={}).json() == {"detail": "CSRF token validation failed"}
+    # Exempt (no session yet): reaches the route and fails validation there instead.
+    assert client.post("/login", data={}).status_code == 422
+    assert client.post("/cron/anything").status_code == 404
+
+
+def test_default_rate_limit_applies(client, monkeypatch):
+    monkeypatch.setattr(limiter, "enabled", True)
+    try:
+        statuses = [client.get("/").status_code for _ in range(201)]
+    finally:
+        limiter.reset()
+    assert statuses[:200] == [200] * 200 and statuses[200] == 429
+
+
+def test_access_log_record_is_structured(client):
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    edge.access_log.addHandler(handler)
+    try:
+        client.get("/public/support-contact", headers={"Origin": "https://aadikarta.org"})
+    finally:
+        edge.access_log.removeHandler(handler)
+    (record,) = records
+    assert (record.method, record.path, record.status, record.origin) == (
+        "GET", "/public/support-contact", 200, "https://aadikarta.org")
+    assert record.duration_ms >= 0
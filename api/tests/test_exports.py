@@ -0,0 +1,142 @@
+"""Admin exports stream: rows are read in batches and written out as they
+arrive, chat minutes are grouped per session the way the admin lists show
+them, PDFs run across pages up to a row cap (clipping a row too tall for a page)
+and are only re-rendered when the data changes, and the leads export filters
+conversions in SQL."""
+import csv
+import io
+import re
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app import exports, models, pdf_store
+from app.models_reports import AdHocReportOrder, PaymentStatus, ReportLead, ReportType
+from tests.conftest import auth_headers
+
+T0 = datetime(2026, 3, 1, 10, 0)
+
+
+@pytest.fixture
+def small_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_ROWS", 2)
+    monkeypatch.setattr(exports, "EXPORT_CSV_CHUNK_BYTES", 64)
+    monkeypatch.setattr(pdf_store, "PDF_STORE_DIR", str(tmp_path))
+
+
+def _txn(db, user, minutes, amount, kind=models.TransactionType.DEPOSIT, reference_id=None):
+    db.add(models.WalletTransaction(user_id=user.id, amount=Decimal(amount), transaction_type=kind,
+                                    reference_id=reference_id, description=kind.value.title(),
+                                    created_at=T0 + timedelta(minutes=minutes)))
+
+
+def test_transactions_csv_groups_sessions_while_streaming(small_batches, client, db_session, make_user):
+    chat = models.TransactionType.CHAT_DEDUCTION
+    asha, ravi = make_user(), make_user()
+    _txn(db_session, asha, 0, "500")
+    for minute in (1, 2, 4):
+        _txn(db_session, asha, minute, "-10", chat, "101")
+    _txn(db_session, ravi, 3, "-15", chat, "102")  # another session inside asha's
+    _txn(db_session, ravi, 5, "200")
+    _txn(db_session, asha, 6, "-10", chat, "103")
+    db_session.commit()
+
+    resp = client.get("/admin/transactions/export", headers=auth_headers(make_user(models.UserRole.ADMIN)))
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/csv")
+    lines = list(csv.reader(io.StringIO(resp.text)))
+    assert lines[0][:2] == ["ID", "User ID"]
+    assert [(row[6], row[7], row[5], row[8]) for row in lines[1:]] == [
+        ("CHAT_DEDUCTION", "103", "-10.0", "Chat session deduction (1 min)"),
+        ("DEPOSIT", "", "200.0", "Deposit"),
+        ("CHAT_DEDUCTION", "101", "-30.0", "Chat session deduction (3 min)"),
+        ("CHAT_DEDUCTION", "102", "-15.0", "Chat session deduction (1 min)"),
+        ("DEPOSIT", "", "500.0", "Deposit"),
+    ]
+
+    listed = client.get("/admin/transactions", headers=auth_headers(make_user(models.UserRole.ADMIN))).json()
+    assert [t["id"] for t in listed["transactions"]] == [int(row[0]) for row in lines[1:]]
+
+
+def test_wallet_history_pdf_spans_pages(small_batches, client, db_session, make_user):
+    seeker = make_user()
+    for minute in range(150):
+        _txn(db_session, seeker, minute, "5")
+    db_session.commit()
+
+    resp = client.get(f"/admin/users/{seeker.id}/wallet-history/export",
+                      headers=auth_headers(make_user(models.UserRole.ADMIN)))
+    assert resp.status_code == 200 and resp.content.startswith(b"%PDF")
+    assert len(re.findall(rb"/Type /Page\b(?!s)", resp.content)) >= 4
+    assert "etag" in resp.headers
+
+
+def test_wallet_history_pdf_is_capped_and_rebuilt_only_for_new_rows(small_batches, monkeypatch, client,
+                                                                    db_session, make_user):
+    monkeypatch.setattr(exports, "EXPORT_PDF_MAX_ROWS", 30)
+    seeker = make_user()
+    for minute in range(45):
+        _txn(db_session, seeker, minute, "5")
+    db_session.commit()
+    url = f"/admin/users/{seeker.id}/wallet-history/export"
+    headers = auth_headers(make_user(models.UserRole.ADMIN))
+
+    first = client.get(url, headers=headers)
+    assert len(re.findall(rb"/Type /Page\b(?!s)", first.content)) == 2  # 30 rows, not 45
+    assert client.get(url, headers=headers).headers["etag"] == first.headers["etag"]
+
+    _txn(db_session, seeker, 45, "5")
+    db_session.commit()
+    assert client.get(url, headers=headers).headers["etag"] != first.headers["etag"]
+
+
+def test_pdf_table_clips_a_row_taller_than_a_page():
+    out = io.BytesIO()
+    tall = "\n".join(f"line {i}" for i in range(200))
+    exports.write_pdf_table(out, "Title", "Subtitle", ["A", "B"],
+                            [["before", "x"], ["tall", tall], ["after", "y"]], [50, 300])
+
+    pdf = out.getvalue()
+    assert pdf.startswith(b"%PDF")
+    # Title page with the first row, then the clipped row carrying the last one along.
+    assert len(re.findall(rb"/Type /Page\b(?!s)", pdf)) == 2
+
+
+def test_consultation_pdf_is_rebuilt_when_an_astrologer_is_renamed(small_batches, client, db_session,
+                                                                   make_user):
+    seeker, astro = make_user(), make_user(models.UserRole.ASTROLOGER, full_name="Old Name")
+    db_session.add(models.Consultation(seeker_id=seeker.id, astrologer_id=astro.id,
+                                       consultation_type=models.ConsultationType.CHAT, rate_per_min=10.0,
+                                       status=models.ConsultationStatus.COMPLETED))
+    db_session.commit()
+    url = f"/admin/users/{seeker.id}/consultations/export"
+    headers = auth_headers(make_user(models.UserRole.ADMIN))
+
+    first = client.get(url, headers=headers)
+    assert client.get(url, headers=headers).headers["etag"] == first.headers["etag"]
+    db_session.get(models.AstrologerProfile, astro.id).full_name = "New Name"
+    db_session.commit()
+    assert client.get(url, headers=headers).headers["etag"] != first.headers["etag"]
+
+
+def test_leads_csv_counts_orders_and_filters_conversions(small_batches, client, db_session, make_user):
+    def lead(name, *statuses):
+        row = ReportLead(full_name=name, phone_number="9876543210", date_of_birth=date(1990, 5, 17),
+                         time_of_birth=dtime(6, 30), place_of_birth="Pune", report_type=ReportType.FULL_KUNDLI)
+        db_session.add(row)
+        db_session.flush()
+        for i, payment_status in enumerate(statuses):
+            db_session.add(AdHocReportOrder(order_reference=f"AADI_REP_{name}{i}", lead_id=row.id,
+                                            report_type=ReportType.FULL_KUNDLI, amount=199,
+                                            payment_status=payment_status))
+    lead("Asha", PaymentStatus.PENDING, PaymentStatus.PAID)
+    lead("Ravi", PaymentStatus.PENDING)
+    lead("Meera")
+    db_session.commit()
+    headers = auth_headers(make_user(models.UserRole.ADMIN))
+
+    rows = list(csv.reader(io.StringIO(client.get("/reports/leads/export", headers=headers).text)))[1:]
+    assert sorted((r[0], r[6], r[7]) for r in rows) == [("Asha", "Yes", "2"), ("Meera", "No", "0"), ("Ravi", "No", "1")]
+
+    converted = client.get("/reports/leads/export", params={"converted_only": True}, headers=headers)
+    assert [(r[0], r[7]) for r in list(csv.reader(io.StringIO(converted.text)))[1:]] == [("Asha", "2")]
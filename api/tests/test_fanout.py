@@ -0,0 +1,124 @@
+"""Per-socket bounded fan-out: a slow or dead socket must not hold up delivery
+to the rest of its chat room, and is dropped from the room instead of being
+retried forever."""
+import asyncio
+import json
+
+from app import fanout, models
+from app.routers import chat as chat_router
+from app.routers import realtime as realtime_router
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class _StuckWebSocket(_FakeWebSocket):
+    """A phone on a bad network: sends never complete."""
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+
+class _DeadWebSocket(_FakeWebSocket):
+    async def send_text(self, text):
+        raise RuntimeError("connection reset")
+
+
+def _user(uid, role=models.UserRole.SEEKER):
+    return models.User(id=uid, role=role)
+
+
+def test_stuck_socket_does_not_delay_the_rest_of_the_room(monkeypatch):
+    monkeypatch.setattr(fanout, "WS_BROADCAST_WAIT_SECS", 0.05)
+    manager = chat_router.ConnectionManager()
+    fast, stuck = _FakeWebSocket(), _StuckWebSocket()
+
+    async def _run():
+        await manager.connect(stuck, 1, _user(1))
+        await manager.connect(fast, 1, _user(2, models.UserRole.ASTROLOGER))
+        for n in range(3):
+            await manager.broadcast(1, {"type": "NEW_MESSAGE", "n": n})
+
+    asyncio.run(_run())
+
+    assert [m["n"] for m in fast.sent] == [0, 1, 2]
+
+
+def test_full_queue_disconnects_slow_chat_member(monkeypatch):
+    monkeypatch.setattr(fanout, "WS_BROADCAST_WAIT_SECS", 0.0)
+    monkeypatch.setattr(fanout, "WS_OUTBOUND_QUEUE_SIZE", 2)
+    manager = chat_router.ConnectionManager()
+    stuck, other = _StuckWebSocket(), _FakeWebSocket()
+
+    async def _run():
+        await manager.connect(stuck, 1, _user(1))
+        await manager.connect(other, 1, _user(2, models.UserRole.ASTROLOGER))
+        for n in range(5):
+            await manager.broadcast(1, {"type": "NEW_MESSAGE", "n": n})
+        await asyncio.sleep(0)
+
+    asyncio.run(_run())
+
+    assert [c["user_id"] for c in manager.active_connections[1]] == [2]
+    assert stuck.closed_with == 1013
+    assert [m["n"] for m in other.sent] == [0, 1, 2, 3, 4]
+
+
+def test_dead_socket_is_evicted_after_failed_send():
+    manager = chat_router.ConnectionManager()
+    dead = _DeadWebSocket()
+
+    async def _run():
+        await manager.connect(dead, 3, _user(1))
+        await manager.broadcast(3, {"type": "TYPING"})
+
+    asyncio.run(_run())
+
+    assert 3 not in manager.active_connections
+    assert "chat:3" not in fanout.snapshot()
+
+
+def test_realtime_slow_socket_drops_oldest_frames(monkeypatch):
+    monkeypatch.setattr(fanout, "WS_BROADCAST_WAIT_SECS", 0.0)
+    monkeypatch.setattr(fanout, "WS_OUTBOUND_QUEUE_SIZE", 2)
+    notifier = realtime_router.NotificationManager()
+    stuck = _StuckWebSocket()
+    notifier.guest_connections.append(stuck)
+
+    async def _run():
+        for n in range(5):
+            await notifier.broadcast_local({"type": "ASTRO_ONLINE", "n": n})
+        return fanout.snapshot()["realtime:guest"]
+
+    stats = asyncio.run(_run())
+
+    # Still connected, but only the newest frames are kept.
+    assert notifier.guest_connections == [stuck]
+    assert stats["dropped"] >= 2
+    assert stats["max_socket_queue_depth"] <= 2
+
+
+def test_snapshot_reports_send_latency_per_room():
+    manager = chat_router.ConnectionManager()
+    ws = _FakeWebSocket()
+
+    async def _run():
+        await manager.connect(ws, 42, _user(1))
+        await manager.broadcast(42, {"type": "PING"})
+        return fanout.snapshot()["chat:42"]
+
+    stats = asyncio.run(_run())
+    manager.disconnect(ws, 42)
+
+    assert stats["sockets"] == 1 and stats["sent"] == 1
+    assert stats["send_latency_ms"]["p50"] >= 0
+    assert "chat:42" not in fanout.snapshot()
@@ -0,0 +1,107 @@
+"""Birth-place geocoding: repeat lookups are answered from the LRU, the
+geocode_cache table or the offline gazetteer without calling Nominatim, and
+autocomplete serves prefix suggestions from the same index."""
+import asyncio
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import geocoding, vedic_rishi_service
+from app.routers import places
+
+
+@pytest.fixture
+def nominatim(monkeypatch, db_session):
+    """Fresh cache layers on the test DB; returns the list of Nominatim queries."""
+    monkeypatch.setattr(geocoding.database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(geocoding, "_lru", geocoding.collections.OrderedDict())
+    monkeypatch.setattr(geocoding, "place_index", geocoding.PlaceIndex())
+    monkeypatch.setattr(geocoding, "_suggested", geocoding.collections.OrderedDict())
+    monkeypatch.setattr(geocoding, "_hits", geocoding.collections.Counter())
+    calls = []
+
+    async def fake_lookup(place_name):
+        calls.append(place_name)
+        return 18.5204, 73.8567
+
+    monkeypatch.setattr(vedic_rishi_service, "_nominatim_lookup", fake_lookup)
+    return calls
+
+
+def test_normalize_place_ignores_case_spacing_and_country():
+    assert geocoding.normalize_place("  New  Delhi,  INDIA. ") == "new delhi"
+    assert geocoding.normalize_place("Pune, Maharashtra, India") == "pune, maharashtra"
+    assert geocoding.normalize_place("India") == "india"
+
+
+def test_repeat_lookups_skip_nominatim(nominatim):
+    coords = asyncio.run(vedic_rishi_service.geocode_place("Pune, India"))
+    assert coords == (18.5204, 73.8567)
+    assert asyncio.run(vedic_rishi_service.geocode_place("pune")) == coords
+    assert nominatim == ["Pune, India"]
+
+    # A cold worker (empty LRU) still finds it in geocode_cache.
+    geocoding._lru.clear()
+    assert asyncio.run(vedic_rishi_service.geocode_place("PUNE")) == coords
+    assert nominatim == ["Pune, India"]
+    assert geocoding.snapshot()["hits"] == {"miss": 1, "lru": 1, "db": 1}
+
+
+def test_gazetteer_answers_geocode_and_autocomplete(nominatim, tmp_path, monkeypatch):
+    tsv = tmp_path / "india_places.tsv"
+    tsv.write_text(
+        "name\tstate\tlatitude\tlongitude\tpopulation\n"
+        "Aurangabad\tBihar\t24.75\t84.37\t102244\n"
+        "Aurangabad\tMaharashtra\t19.88\t75.34\t1175116\n"
+        "Aurangabad Bangar\tUttar Pradesh\t27.23\t80.97\t5000\n"
+        "Mumbai\tMaharashtra\t19.07\t72.88\t12691836\n",
+        encoding="utf-8",
+    )
+    assert geocoding.place_index.load_gazetteer(str(tsv)) == 4
+
+    geocode = vedic_rishi_service.geocode_place
+    assert asyncio.run(geocode("Aurangabad, Bihar, India")) == (24.75, 84.37)
+    assert asyncio.run(geocode("Aurangabad")) == (19.88, 75.34)  # most populous
+    assert asyncio.run(geocode("Mumbai, Suburban, Maharashtra")) == (19.07, 72.88)
+    assert nominatim == []
+
+    async def no_photon(*args, **kwargs):
+        raise AssertionError("autocomplete should be served from the gazetteer")
+
+    monkeypatch.setattr(places.http_clients, "request", no_photon)
+    monkeypatch.setattr(places, "_cache", {})
+    suggestions = asyncio.run(places.autocomplete_place.__wrapped__(None, q="auran"))
+    assert [s["label"] for s in suggestions] == [
+        "Aurangabad, Maharashtra, India",
+        "Aurangabad, Bihar, India",
+        "Aurangabad Bangar, Uttar Pradesh, India",
+    ]
+
+
+def test_photon_suggestions_geocode_locally_within_a_bound(nominatim, monkeypatch):
+    class Response:
+        def __init__(self, city):
+            self.city = city
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"features": [{
+                "geometry": {"coordinates": [73.0, 19.0]},
+                "properties": {"type": "city", "countrycode": "IN", "name": self.city, "state": "Maharashtra"},
+            }]}
+
+    async def photon(*args, params, **kwargs):
+        return Response(params["q"].title())
+
+    monkeypatch.setattr(places.http_clients, "request", photon)
+    monkeypatch.setattr(places, "_cache", {})
+    monkeypatch.setattr(geocoding, "GEOCODE_SUGGESTION_SIZE", 2)
+    for query in ("alibag", "badlapur", "chiplun"):
+        asyncio.run(places.autocomplete_place.__wrapped__(None, q=query))
+
+    assert len(geocoding.place_index) == 0
+    assert list(geocoding._suggested) == ["badlapur, maharashtra", "chiplun, maharashtra"]
+    assert asyncio.run(vedic_rishi_service.geocode_place("Chiplun, Maharashtra, India")) == (19.0, 73.0)
+    assert nominatim == []
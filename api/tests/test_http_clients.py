@@ -0,0 +1,85 @@
+"""Outbound client registry: transient upstream failures are retried with
+backoff, non-idempotent calls are only retried when nothing was sent, read
+timeouts are only retried for GET lookups, and every attempt shows up in the
+per-upstream counters."""
+import asyncio
+
+import httpx
+import pytest
+
+from app import http_clients
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(http_clients, "HTTP_RETRY_BACKOFF_SECS", 0.0)
+    monkeypatch.setattr(http_clients, "_stats", {name: http_clients._UpstreamStats() for name in http_clients.UPSTREAMS})
+
+
+def _scripted(monkeypatch, name, outcomes):
+    """Pool `name` through a transport that replays `outcomes` (status codes,
+    or exceptions to raise) in order; returns the list of calls seen."""
+    calls = []
+
+    def handler(request):
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(request)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"ok": outcome == 200})
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setitem(http_clients._sync_clients, name, httpx.Client(transport=transport))
+    async_client = httpx.AsyncClient(transport=transport)
+    monkeypatch.setattr(http_clients, "get_async_client", lambda n: async_client)
+    return calls
+
+
+def test_server_error_is_retried_then_succeeds(monkeypatch):
+    calls = _scripted(monkeypatch, "groq", [503, 200])
+
+    response = asyncio.run(http_clients.request("groq", "POST", "https://groq.test/v1", json={}))
+
+    assert response.status_code == 200 and len(calls) == 2
+    stats = http_clients.snapshot()["groq"]
+    assert stats["requests"] == 2 and stats["retries"] == 1
+    assert stats["statuses"] == {"5xx": 1, "2xx": 1}
+
+
+def test_retries_stop_after_configured_attempts(monkeypatch):
+    monkeypatch.setattr(http_clients, "HTTP_RETRY_ATTEMPTS", 2)
+    calls = _scripted(monkeypatch, "nominatim", [502])
+
+    response = asyncio.run(http_clients.request("nominatim", "GET", "https://nominatim.test/search"))
+
+    assert response.status_code == 502 and len(calls) == 3
+
+
+def test_free_astro_quota_429_is_not_retried(monkeypatch):
+    calls = _scripted(monkeypatch, "freeastro", [429, 200])
+
+    response = asyncio.run(http_clients.request("freeastro", "POST", "https://freeastro.test/calc"))
+
+    assert response.status_code == 429 and len(calls) == 1
+
+
+def test_non_idempotent_send_only_retried_when_connect_failed(monkeypatch):
+    calls = _scripted(monkeypatch, "resend", [500, 200])
+    response = http_clients.request_sync("resend", "POST", "https://resend.test/emails", idempotent=False)
+    assert response.status_code == 500 and len(calls) == 1
+
+    calls = _scripted(monkeypatch, "resend", [httpx.ConnectError("refused"), 200])
+    response = http_clients.request_sync("resend", "POST", "https://resend.test/emails", idempotent=False)
+    assert response.status_code == 200 and len(calls) == 2
+    assert http_clients.snapshot()["resend"]["errors"] == 1
+
+
+def test_read_timeout_is_not_retried_unless_upstream_is_read_safe(monkeypatch):
+    calls = _scripted(monkeypatch, "groq", [httpx.ReadTimeout("slow"), 200])
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(http_clients.request("groq", "POST", "https://groq.test/v1", json={}))
+    assert len(calls) == 1
+
+    calls = _scripted(monkeypatch, "photon", [httpx.ReadTimeout("slow"), 200])
+    response = asyncio.run(http_clients.request("photon", "GET", "https://photon.test/api"))
+    assert response.status_code == 200 and len(calls) == 2
@@ -0,0 +1,114 @@
+"""Identity cache: a request verifies its JWT once (shared by the rate
+limiter and the auth dependency), a cached principal authenticates without
+a users SELECT, a committed status/role change drops the cached
+principal in-process and in Redis, and a user deleted behind a stale cached
+principal gets a 401, not a 500."""
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm.exc import ObjectDeletedError
+
+from app import database, identity, models
+from app.routers import chat as chat_router
+from app.routers.auth import get_current_user
+from tests.conftest import auth_headers
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def delete(self, *keys):
+        for k in keys:
+            self.store.pop(k, None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(identity, "get_redis", lambda: fake)
+    monkeypatch.setattr(identity, "_redis_down_until", 0.0)
+    return fake
+
+
+@pytest.fixture
+def user_selects(db_session):
+    statements = []
+    listener = lambda *args: "FROM users" in args[2] and statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    yield statements
+    event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+
+def test_cached_principal_authenticates_without_a_users_query(client, db_session, make_user, redis, user_selects, monkeypatch):
+    admin = make_user(models.UserRole.ADMIN)
+    decodes = []
+    real_decode = identity.jwt.decode
+    monkeypatch.setattr(identity.jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+    db_session.expunge_all()  # a fresh request session knows nobody
+    user_selects.clear()
+    assert client.get("/admin/integrations/http-stats", headers=auth_headers(admin)).status_code == 200
+    assert len(user_selects) == 1 and len(decodes) == 1  # verified once for the whole request
+    assert "principal:%d" % admin.id in redis.store
+
+    db_session.expunge_all()
+    identity._l1.clear()  # another worker: only Redis has it
+    assert client.get("/admin/integrations/http-stats", headers=auth_headers(admin)).status_code == 200
+    assert len(user_selects) == 1
+
+
+def test_status_change_invalidates_cached_principal(client, db_session, make_user, redis):
+    admin, seeker = make_user(models.UserRole.ADMIN), make_user()
+    assert identity._lookup(db_session, seeker.id).is_active is True
+    assert identity._l1 and redis.store
+
+    resp = client.put(f"/admin/users/{seeker.id}/status", json={"is_active": False}, headers=auth_headers(admin))
+    assert resp.status_code == 200
+    assert seeker.id not in identity._l1 and f"principal:{seeker.id}" not in redis.store
+    assert identity._lookup(db_session, seeker.id).is_active is False
+
+
+def test_websocket_handshake_uses_principal_cache(db_session, make_user, redis):
+    astrologer = make_user(models.UserRole.ASTROLOGER)
+    token = auth_headers(astrologer)["Authorization"].split()[1]
+    db_session.expunge_all()
+
+    user = asyncio.run(chat_router.get_user_from_token(token, db_session))
+    assert user.id == astrologer.id and user.role == models.UserRole.ASTROLOGER
+    assert user.email == astrologer.email  # other columns load on demand
+    assert asyncio.run(chat_router.get_user_from_token("not-a-jwt", db_session)) is None
+
+
+def test_user_deleted_behind_a_cached_principal_is_unauthenticated(db_session, make_user, redis):
+    seeker = make_user()
+    headers = auth_headers(seeker)
+    identity._lookup(db_session, seeker.id)
+    # Deleted by another worker: this worker's in-process principal is stale.
+    for model in (models.SeekerProfile, models.UserWallet):
+        db_session.query(model).filter(model.user_id == seeker.id).delete()
+    db_session.query(models.User).filter(models.User.id == seeker.id).delete()
+    db_session.commit()
+    db_session.expunge_all()
+    assert seeker.id in identity._l1
+
+    app = FastAPI()
+    app.add_exception_handler(ObjectDeletedError, identity.deleted_user_response)
+    app.dependency_overrides[database.get_db] = lambda: db_session
+
+    @app.get("/whoami")
+    def whoami(user: models.User = Depends(get_current_user)):
+        return {"email": user.email}  # the first lazy load finds no row
+
+    resp = TestClient(app).get("/whoami", headers=headers)
+    assert resp.status_code == 401
+    assert seeker.id not in identity._l1
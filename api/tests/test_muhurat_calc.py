@@ -0,0 +1,68 @@
+"""Lagna timeline: the vectorized ascendant agrees with the scalar one, the
+bisected sign boundaries are exact to the second, and the endpoint's default
+day is the current date in India."""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import muhurat_calc
+
+DELHI = (28.6139, 77.2090)
+IST = 5.5
+
+
+def _sign_at(dt):
+    return muhurat_calc.rashi_for_degree(muhurat_calc.sidereal_ascendant_deg(dt, IST, *DELHI))[0]
+
+
+def test_vectorized_ascendant_matches_scalar():
+    base = datetime(2026, 3, 1, 4, 0)
+    offsets = np.arange(0, 86400, 3607.0)
+    degs = muhurat_calc.sidereal_ascendant_degs(base, offsets, IST, *DELHI)
+    for off, deg in zip(offsets, degs):
+        scalar = muhurat_calc.sidereal_ascendant_deg(base + timedelta(seconds=float(off)), IST, *DELHI)
+        assert abs(deg - scalar) < 1e-9
+
+
+def test_day_timeline_has_every_lagna_with_exact_boundaries():
+    day = datetime(2026, 3, 1)
+    lagnas = muhurat_calc.lagna_timeline(day, day + timedelta(days=1), IST, *DELHI)
+
+    assert {w["sign"] for w in lagnas} == set(muhurat_calc.RASHIS)
+    assert lagnas[0]["start"] <= day and lagnas[-1]["end"] >= day + timedelta(days=1)
+    for prev, nxt in zip(lagnas, lagnas[1:]):
+        assert prev["end"] == nxt["start"]
+        assert _sign_at(nxt["start"] - timedelta(seconds=1)) == prev["sign"]
+        assert _sign_at(nxt["start"] + timedelta(seconds=1)) == nxt["sign"]
+
+
+def test_current_window_is_the_timeline_window_containing_now():
+    now = datetime(2026, 3, 1, 14, 37, 12)
+    current = muhurat_calc.current_lagna_window(now, IST, *DELHI)
+    day = datetime(2026, 3, 1)
+    match = [w for w in muhurat_calc.lagna_timeline(day, day + timedelta(days=1), IST, *DELHI)
+             if w["start"] <= now < w["end"]]
+
+    assert len(match) == 1 and current["sign"] == match[0]["sign"]
+    # Different sweep grids bracket a boundary differently; both are within a second.
+    assert abs((current["start"] - match[0]["start"]).total_seconds()) <= 1
+    assert abs((current["end"] - match[0]["end"]).total_seconds()) <= 1
+
+
+def test_current_window_is_clamped_to_search_range():
+    now = datetime(2026, 3, 1, 14, 37, 12)
+    current = muhurat_calc.current_lagna_window(
+        now, IST, *DELHI, search_start=now - timedelta(minutes=5), search_end=now + timedelta(minutes=5),
+    )
+
+    assert current["start"] >= now - timedelta(minutes=5)
+    assert current["end"] <= now + timedelta(minutes=5)
+
+
+def test_timeline_defaults_to_todays_date_in_india(client, monkeypatch):
+    from app.routers import muhurat
+
+    # 00:30 IST on 2 March is still 1 March on a UTC server.
+    monkeypatch.setattr(muhurat, "_now_ist", lambda: datetime(2026, 3, 2, 0, 30))
+    body = client.get("/muhurat/lagna-timeline", params={"lat": DELHI[0], "lon": DELHI[1]}).json()
+    assert body["date"] == "2026-03-02"
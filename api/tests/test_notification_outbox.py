@@ -0,0 +1,148 @@
+"""Notification outbox: request paths only insert a row; the dispatcher
+multicasts identical pushes to every device in one FCM call, deletes tokens
+FCM reports as unregistered, retries only the tokens that failed transiently, and
+retries failed WhatsApp sends with backoff until it gives up."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import models, notification_outbox as outbox
+from app.routers import chat as chat_router
+from app.services import whatsapp_service
+
+
+class _FakeFCM:
+    """Stands in for notifications.send_multicast: records each multicast's
+    tokens and answers with `outcome(tokens)` -> (dead, retry)."""
+
+    def __init__(self):
+        self.calls = []
+        self.outcome = lambda tokens: ([], [])
+
+    def __call__(self, tokens, title, body, data=None, android_channel_id=None):
+        self.calls.append(sorted(tokens))
+        return self.outcome(tokens)
+
+
+@pytest.fixture
+def fcm(monkeypatch, db_session):
+    monkeypatch.setattr(outbox.database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    fake = _FakeFCM()
+    monkeypatch.setattr(outbox.notifications, "send_multicast", fake)
+    return fake
+
+
+def _tokens(db, user, *tokens):
+    for t in tokens:
+        db.add(models.DeviceToken(user_id=user.id, fcm_token=t, platform="android"))
+    db.commit()
+
+
+def _run_once():
+    return asyncio.run(outbox.OutboxDispatcher().run_once())
+
+
+def _make_due(db):
+    db.query(models.NotificationOutbox).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+
+def test_chat_push_is_one_insert_and_identical_pushes_share_a_multicast(fcm, db_session, make_user):
+    a, b, sender = make_user(), make_user(), make_user(models.UserRole.ASTROLOGER, full_name="Guru")
+    _tokens(db_session, a, "a1", "a2")
+    _tokens(db_session, b, "b1")
+
+    chat_router._push_chat_message(db_session, a.id, sender, 7, "hello")
+    outbox.enqueue_push(db_session, b.id, "New Message from Guru", "hello", {"consultation_id": "7", "type": "CHAT_MESSAGE"})
+    outbox.enqueue_push(db_session, b.id, "Chat ended", "bye")
+    assert fcm.calls == []  # nothing sent on the request path
+
+    assert _run_once() == 3
+    assert sorted(fcm.calls) == [["a1", "a2", "b1"], ["b1"]]
+    statuses = {r.status for r in db_session.query(models.NotificationOutbox)}
+    assert statuses == {"sent"}
+
+
+def test_dead_tokens_pruned_and_only_transient_failures_retried(fcm, db_session, make_user):
+    user = make_user()
+    _tokens(db_session, user, "ok", "dead", "flaky")
+    fcm.outcome = lambda tokens: (["dead"] if "dead" in tokens else [], ["flaky"] if "flaky" in tokens else [])
+
+    outbox.enqueue_push(db_session, user.id, "It's your turn!", "go")
+    _run_once()
+
+    row = db_session.query(models.NotificationOutbox).one()
+    db_session.refresh(row)
+    assert row.status == "pending" and row.attempts == 1
+    assert row.payload["tokens"] == ["flaky"]
+    assert row.next_attempt_at > datetime.utcnow()
+    assert [t.fcm_token for t in db_session.query(models.DeviceToken)] == ["ok", "flaky"]
+
+    fcm.outcome = lambda tokens: ([], [])
+    _make_due(db_session)
+    _run_once()
+    db_session.refresh(row)
+    assert fcm.calls[-1] == ["flaky"] and row.status == "sent"
+
+
+def test_only_unregistered_tokens_count_as_dead(monkeypatch):
+    from firebase_admin import exceptions, messaging
+
+    from app import notifications
+
+    class _Resp:
+        def __init__(self, exception=None):
+            self.success, self.exception = exception is None, exception
+
+    errors = {"gone": messaging.UnregisteredError("unregistered"),
+              "other-project": messaging.SenderIdMismatchError("mismatch"),
+              "bad-payload": exceptions.InvalidArgumentError("invalid"),
+              "busy": exceptions.UnavailableError("unavailable")}
+    monkeypatch.setattr(notifications.firebase_admin, "_apps", {"[DEFAULT]": object()})
+    monkeypatch.setattr(notifications.messaging, "send_each_for_multicast", lambda message: type(
+        "_Batch", (), {"success_count": 1, "responses": [_Resp(errors.get(t)) for t in message.tokens]}))
+
+    dead, retry = notifications.send_multicast(["ok", *errors], "t", "b")
+
+    assert dead == ["gone", "other-project"]
+    assert retry == ["bad-payload", "busy"]
+
+
+def test_whatsapp_failures_retry_then_give_up(fcm, db_session, monkeypatch):
+    sends = []
+    monkeypatch.setattr(whatsapp_service, "send_whatsapp", lambda *args: sends.append(args) or False)
+    monkeypatch.setattr(outbox, "NOTIFY_MAX_ATTEMPTS", 2)
+
+    outbox.enqueue_whatsapp(db_session, "+919800000000", "waplex_template_your_turn", {"astrologer": "Guru"})
+    _run_once()
+    _make_due(db_session)
+    _run_once()
+    _make_due(db_session)
+    assert _run_once() == 0
+
+    row = db_session.query(models.NotificationOutbox).one()
+    db_session.refresh(row)
+    assert len(sends) == 2 and row.status == "failed" and row.attempts == 2
+    assert sends[0] == ("+919800000000", "waplex_template_your_turn", {"astrologer": "Guru"})
+
+
+def test_queue_promotion_queues_both_nudges_in_one_commit(db_session, make_user, monkeypatch):
+    astro, seeker = make_user(models.UserRole.ASTROLOGER), make_user()
+    db_session.add(models.Consultation(seeker_id=seeker.id, astrologer_id=astro.id,
+                                       consultation_type=models.ConsultationType.CHAT, rate_per_min=10.0,
+                                       status=models.ConsultationStatus.REQUESTED))
+    db_session.commit()
+    queued_at_commit = []
+    real_commit = db_session.commit
+
+    def commit():
+        queued_at_commit.append(sum(isinstance(o, models.NotificationOutbox) for o in db_session.new))
+        real_commit()
+
+    monkeypatch.setattr(db_session, "commit", commit)
+    chat_router.promote_next_in_queue(db_session, astro.id)
+
+    assert queued_at_commit == [2]  # push + WhatsApp, not a commit per row
+    assert db_session.query(models.NotificationOutbox).count() == 2
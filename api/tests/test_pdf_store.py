@@ -0,0 +1,120 @@
+"""PDF store: artifacts are keyed by a digest of their inputs and written
+atomically; report PDFs are served with an ETag (304 on revalidation) and
+Range support, rendered at most once, and re-rendered by the pre-warmer after
+a template change; admin exports come from the same store."""
+import asyncio
+import os
+from datetime import date, time as dtime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import exports, models, pdf_store, report_jobs, report_pdf_service
+from app.models_reports import AdHocReportOrder, PaymentStatus, ReportLead, ReportStatus, ReportType
+from app.routers import reports
+from tests.conftest import auth_headers
+
+PDF = b"%PDF-1.4 " + b"x" * 2048
+
+
+@pytest.fixture
+def renders(monkeypatch, db_session, tmp_path):
+    monkeypatch.setattr(pdf_store, "PDF_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(report_jobs.database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(report_jobs, "REPORT_PDF_PROCESSES", 0)
+    calls = []
+
+    def render(report_type, payload, ref):
+        calls.append(ref)
+        return PDF
+    monkeypatch.setattr(reports, "generate_report_pdf", render)
+    monkeypatch.setattr(report_jobs, "generate_report_pdf", render)
+    return calls
+
+
+def _completed_order(db, ref="AADI_REP_PDF0001") -> AdHocReportOrder:
+    lead = ReportLead(full_name="Asha", phone_number="9876543210", date_of_birth=date(1990, 5, 17),
+                      time_of_birth=dtime(6, 30), place_of_birth="Pune")
+    db.add(lead)
+    db.flush()
+    order = AdHocReportOrder(order_reference=ref, lead_id=lead.id, report_type=ReportType.FULL_KUNDLI,
+                             amount=199, payment_status=PaymentStatus.PAID, report_status=ReportStatus.COMPLETED,
+                             report_data={"report_title": "Kundli - Asha", "ai_synthesis": "..."})
+    db.add(order)
+    db.commit()
+    return order
+
+
+def test_put_is_atomic(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_store, "PDF_STORE_DIR", str(tmp_path))
+    key = pdf_store.digest(pdf_store.REPORT, 1, {"a": 1, "b": 2})
+    assert key == pdf_store.digest(pdf_store.REPORT, 1, {"b": 2, "a": 1})
+    assert key != pdf_store.digest(pdf_store.REPORT, 2, {"a": 1, "b": 2})
+
+    def broken():
+        raise RuntimeError("render failed")
+    with pytest.raises(RuntimeError):
+        pdf_store.get_or_build(pdf_store.REPORT, key, broken)
+    assert not pdf_store.exists(pdf_store.REPORT, key)
+
+    built = []
+    for _ in range(2):
+        path = pdf_store.get_or_build(pdf_store.REPORT, key, lambda: built.append(1) or PDF)
+    assert built == [1]
+    assert os.listdir(os.path.dirname(path)) == [f"{key}.pdf"]  # no temp files left behind
+
+
+def test_report_pdf_is_rendered_once_and_revalidated(renders, client, db_session):
+    order = _completed_order(db_session)
+    url = f"/reports/{order.order_reference}/pdf"
+
+    resp = client.get(url)
+    assert resp.status_code == 200 and resp.content == PDF
+    assert resp.headers["content-disposition"] == 'inline; filename="Kundli - Asha.pdf"'
+    etag = resp.headers["etag"]
+    db_session.expire_all()
+    assert (order.pdf_sha256, order.pdf_template_version) == (etag.strip('"'), report_pdf_service.TEMPLATE_VERSION)
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    partial = client.get(url, headers={"Range": "bytes=0-8"})
+    assert partial.status_code == 206 and partial.content == PDF[:9]
+    assert renders == [order.order_reference]
+
+
+def test_prewarm_rerenders_after_a_template_change(renders, db_session, monkeypatch):
+    order = _completed_order(db_session)
+    worker = report_jobs.ReportWorker()
+
+    assert asyncio.run(worker.prewarm_once()) == 1
+    db_session.expire_all()
+    first = order.pdf_sha256
+    assert pdf_store.exists(pdf_store.REPORT, first)
+    assert asyncio.run(worker.prewarm_once()) == 0
+
+    monkeypatch.setattr(report_jobs, "TEMPLATE_VERSION", 2)
+    monkeypatch.setattr(report_pdf_service, "TEMPLATE_VERSION", 2)
+    assert asyncio.run(worker.prewarm_once()) == 1
+    db_session.expire_all()
+    assert order.pdf_template_version == 2 and order.pdf_sha256 not in (None, first)
+    assert renders == [order.order_reference] * 2
+
+
+def test_admin_export_is_served_from_the_store(monkeypatch, tmp_path, client, make_user):
+    monkeypatch.setattr(pdf_store, "PDF_STORE_DIR", str(tmp_path))
+    builds = []
+    write_pdf_table = exports.write_pdf_table
+    monkeypatch.setattr(exports, "write_pdf_table", lambda *args: builds.append(1) or write_pdf_table(*args))
+    staff = make_user(models.UserRole.ADMIN)
+    seeker = make_user()
+    url = f"/admin/users/{seeker.id}/consultations/export"
+
+    first = client.get(url, headers=auth_headers(staff))
+    second = client.get(url, headers=auth_headers(staff))
+    assert first.status_code == second.status_code == 200
+    assert first.content.startswith(b"%PDF") and first.content == second.content
+    assert first.headers["content-disposition"].startswith("attachment;")
+    assert first.headers["etag"] == second.headers["etag"]
+    revalidated = client.get(url, headers={**auth_headers(staff), "If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert builds == [1]
+    assert pdf_store.prune(pdf_store.ADMIN_EXPORT, -1) == 1
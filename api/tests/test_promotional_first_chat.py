@@ -1,7 +1,7 @@
 """Tests for the first-chat promotional rate: a seeker's very first-ever
 consultation is billed at a flat rate for the first 5 minutes instead of the
 astrologer's normal per-minute fee (see consultations.py request_consultation
-and chat.py's _effective_rate_per_min/billing_loop)."""
+and chat.py's _effective_rate_per_min/BillingScheduler)."""
 from app import models
 from app.routers.chat import _effective_rate_per_min, PROMO_WINDOW_SECONDS
 from tests.conftest import auth_headers
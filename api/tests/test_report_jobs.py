@@ -0,0 +1,213 @@
+"""Report jobs: paying only queues the report and answers with a job id; a
+worker generates, renders and delivers it, publishing each stage as
+REPORT_PROGRESS; a running job's lease is renewed until it finishes, and a
+job another worker took over stops; failures retry with backoff and then fail
+the order; the kundli's independent API calls overlap and its Sade Sati
+window is picked by the date in India; sockets can watch a report."""
+import asyncio
+import time
+from datetime import date, datetime, time as dtime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import models, report_generator_service, report_jobs
+from app.models_reports import AdHocReportOrder, PaymentStatus, ReportJob, ReportLead, ReportStatus, ReportType
+from app.routers.realtime import notifier
+from tests.conftest import auth_headers
+
+
+@pytest.fixture
+def jobs(monkeypatch, db_session, tmp_path):
+    monkeypatch.setattr(report_jobs.database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(report_jobs.pdf_store, "PDF_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(report_jobs, "REPORT_PDF_PROCESSES", 0)
+    monkeypatch.setattr(report_jobs, "generate_report_pdf", lambda report_type, payload, ref: b"%PDF-1.4 test")
+    monkeypatch.setattr(report_jobs, "_send_report", lambda inputs, title, pdf_url: True)
+
+    async def generate(full_name, dob, tob, pob, gender, language, on_stage):
+        await on_stage("writing")
+        return {"report_title": f"Kundli - {full_name}", "ai_synthesis": "..."}
+    monkeypatch.setattr(report_jobs, "generate_full_kundli_report", generate)
+
+    published = []
+
+    async def send_report(order_reference, payload):
+        published.append(payload)
+    monkeypatch.setattr(notifier, "send_report", send_report)
+    return published
+
+
+def _paid_order(db, status=PaymentStatus.PAID) -> AdHocReportOrder:
+    lead = ReportLead(full_name="Asha", phone_number="9876543210", date_of_birth=date(1990, 5, 17),
+                      time_of_birth=dtime(6, 30), place_of_birth="Pune")
+    db.add(lead)
+    db.flush()
+    order = AdHocReportOrder(order_reference="AADI_REP_TEST0001", lead_id=lead.id, report_type=ReportType.FULL_KUNDLI,
+                             amount=199, payment_status=status, report_status=ReportStatus.PENDING)
+    db.add(order)
+    db.commit()
+    return order
+
+
+async def _work(worker: report_jobs.ReportWorker) -> int:
+    claimed = await worker.run_once()
+    await asyncio.gather(*list(worker._jobs))
+    return claimed
+
+
+def test_internal_test_generate_only_queues(jobs, client, db_session, make_user):
+    admin = make_user(models.UserRole.ADMIN)
+    resp = client.post("/reports/internal-test-generate", headers=auth_headers(admin), json={
+        "full_name": "QA", "phone_number": "9000000000", "date_of_birth": "1990-01-01",
+        "time_of_birth": "10:00:00", "place_of_birth": "Delhi", "report_type": "FULL_KUNDLI",
+    })
+    body = resp.json()
+    job = db_session.query(ReportJob).one()
+    assert (body["status"], body["job_id"], body["stage"], body["pdf_url"]) == ("QUEUED", job.id, "queued", None)
+    assert job.status == "pending" and jobs == []
+
+    # The webhook/verify racing in for the same order gets the same job back.
+    order = db_session.get(AdHocReportOrder, job.order_id)
+    assert report_jobs.enqueue(db_session, order).id == job.id
+    assert db_session.query(ReportJob).count() == 1
+
+
+def test_worker_generates_delivers_and_publishes_stages(jobs, db_session):
+    order = _paid_order(db_session)
+    job = report_jobs.enqueue(db_session, order)
+
+    assert asyncio.run(_work(report_jobs.ReportWorker())) == 1
+
+    assert [(e["stage"], e["status"]) for e in jobs] == [
+        ("calculating", "running"), ("writing", "running"), ("rendering", "running"),
+        ("delivering", "running"), ("completed", "done"),
+    ]
+    assert jobs[-1]["pdf_url"] == "/reports/AADI_REP_TEST0001/pdf"
+    db_session.expire_all()
+    assert (order.report_status, order.whatsapp_sent, order.report_data["report_title"]) == (
+        ReportStatus.COMPLETED, True, "Kundli - Asha")
+    assert (job.status, job.stage, job.attempts) == ("done", "completed", 1)
+    assert report_jobs.pdf_store.exists("report", order.pdf_sha256)
+    assert report_jobs.progress_snapshot(order.order_reference)["pdf_url"] == order.pdf_url
+
+
+def test_failures_retry_with_backoff_then_fail_the_order(jobs, db_session, monkeypatch):
+    async def broken(**kwargs):
+        raise RuntimeError("LLM down")
+    monkeypatch.setattr(report_jobs, "generate_full_kundli_report", broken)
+    monkeypatch.setattr(report_jobs, "REPORT_JOB_MAX_ATTEMPTS", 2)
+    order = _paid_order(db_session)
+    job = report_jobs.enqueue(db_session, order)
+    worker = report_jobs.ReportWorker()
+
+    asyncio.run(_work(worker))
+    db_session.expire_all()
+    assert (job.status, job.attempts, job.last_error) == ("pending", 1, "LLM down")
+    assert job.next_attempt_at > datetime.utcnow()
+    assert asyncio.run(_work(worker)) == 0  # not due yet
+
+    job.next_attempt_at = datetime.utcnow()
+    db_session.commit()
+    asyncio.run(_work(worker))
+    db_session.expire_all()
+    assert job.status == "failed" and order.report_status == ReportStatus.FAILED
+    assert (jobs[-1]["stage"], jobs[-1]["status"]) == ("calculating", "failed")
+
+    # Paying customer retries: the failed job is queued again.
+    assert report_jobs.enqueue(db_session, order).status == "pending"
+
+
+def test_lease_is_renewed_while_a_slow_job_runs(jobs, db_session, monkeypatch):
+    monkeypatch.setattr(report_jobs, "REPORT_JOB_LEASE_SECS", 0.3)
+
+    async def slow(full_name, dob, tob, pob, gender, language, on_stage):
+        await asyncio.sleep(0.8)
+        return {"report_title": "slow"}
+    monkeypatch.setattr(report_jobs, "generate_full_kundli_report", slow)
+    job = report_jobs.enqueue(db_session, _paid_order(db_session))
+
+    async def scenario():
+        worker = report_jobs.ReportWorker()
+        assert await worker.run_once() == 1
+        await asyncio.sleep(0.5)  # past the first lease
+        taken = await report_jobs.database.run_db(report_jobs._claim, datetime.utcnow(), 1)
+        await asyncio.gather(*list(worker._jobs))
+        return taken
+
+    assert asyncio.run(scenario()) == []
+    db_session.expire_all()
+    assert (job.status, job.attempts) == ("done", 1)
+
+
+def test_job_taken_over_by_another_worker_stops_here(jobs, db_session, monkeypatch):
+    monkeypatch.setattr(report_jobs, "REPORT_JOB_LEASE_SECS", 0.3)
+    sent = []
+    monkeypatch.setattr(report_jobs, "_send_report", lambda inputs, title, pdf_url: sent.append(pdf_url))
+
+    async def slow(full_name, dob, tob, pob, gender, language, on_stage):
+        await asyncio.sleep(0.5)
+        return {"report_title": "slow"}
+    monkeypatch.setattr(report_jobs, "generate_full_kundli_report", slow)
+    job = report_jobs.enqueue(db_session, _paid_order(db_session))
+
+    async def scenario():
+        worker = report_jobs.ReportWorker()
+        assert await worker.run_once() == 1
+        # Another worker's claim after a missed renewal (e.g. a long pause).
+        db_session.query(ReportJob).update({"attempts": 2})
+        db_session.commit()
+        await asyncio.gather(*list(worker._jobs), return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert sent == []
+
+
+def test_kundli_chart_and_dasha_insights_run_concurrently(monkeypatch):
+    async def slow(result):
+        await asyncio.sleep(0.2)
+        return result
+
+    monkeypatch.setattr(report_generator_service, "geocode_place", lambda pob: slow((18.52, 73.85)))
+    monkeypatch.setattr(report_generator_service, "generate_full_kundli", lambda **kw: slow({"chart": {}}))
+    monkeypatch.setattr(report_generator_service, "generate_dasha_insights", lambda **kw: slow({"facts": []}))
+    monkeypatch.setattr(report_generator_service, "_call_llm", lambda system, user: slow("reading"))
+    stages = []
+
+    async def on_stage(stage):
+        stages.append(stage)
+
+    started = time.perf_counter()
+    report = asyncio.run(report_generator_service.generate_full_kundli_report(
+        "Asha", date(1990, 5, 17), dtime(6, 30), "Pune", on_stage=on_stage))
+    # geocode -> (chart | dasha) -> LLM: three rounds, not four.
+    assert time.perf_counter() - started < 0.75
+    assert report["dasha_insights"] == {"facts": []} and report["seeker_details"]["latitude"] == 18.52
+    assert stages == ["writing"]
+
+
+def test_current_sade_sati_window_uses_the_date_in_india(monkeypatch):
+    from app.routers import muhurat
+
+    # 00:30 IST on 1 Jan is still 31 Dec in UTC.
+    monkeypatch.setattr(muhurat, "_now_ist", lambda: datetime(2026, 1, 1, 0, 30))
+    windows = [
+        {"type": "sade_sati", "start": "2023-01-17", "end": "2026-01-01"},
+        {"type": "sade_sati", "start": "2026-01-01", "end": "2033-06-01"},
+    ]
+    sade_sati = {"active": True}
+    report_generator_service._attach_saturn_transits(sade_sati, windows)
+    assert sade_sati["window"] == {"start": "2026-01-01", "end": "2033-06-01"}
+
+
+def test_socket_watching_a_report_gets_its_current_progress(jobs, client, db_session):
+    order = _paid_order(db_session)
+    job = report_jobs.enqueue(db_session, order)
+
+    with client.websocket_connect("/realtime/ws") as ws:
+        ws.send_json({"token": ""})  # guest
+        ws.send_json({"type": "WATCH_REPORT", "order_reference": order.order_reference})
+        assert ws.receive_json() == {"type": "REPORT_PROGRESS", "order_reference": order.order_reference,
+                                     "job_id": job.id, "stage": "queued", "status": "pending"}
+        assert list(notifier.report_watchers) == [order.order_reference]
+    assert notifier.report_watchers == {}
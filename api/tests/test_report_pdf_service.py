@@ -0,0 +1,33 @@
+"""Report PDF rendering: the invariant template parts are built once per
+process and every document gets the same full cover image, including
+documents rendered at the same time on different threads."""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from app import report_pdf_service
+
+KUNDLI = {
+    "report_title": "Full Life Kundli - Asha",
+    "seeker_details": {"full_name": "Asha", "dob": "1990-05-17", "tob": "06:30:00", "pob": "Pune"},
+    "chart_data": {"chart": {
+        "houses": [{"house": h, "sign": "Aries", "sign_id": h} for h in range(1, 13)],
+        "planets": [{"name": "Sun", "sign": "Taurus", "house": 2, "degree_in_sign": 2.5},
+                    {"name": "Mars", "sign": "Libra", "house": 7, "is_retrograde": True}],
+        "sade_sati": {"active": True, "phase": "Peak", "description": "Saturn over the Moon"},
+    }, "yogas": {"yogas": [{"id": "manglik_dosha", "name": "Manglik Dosha", "active": True, "type": "dosha"}]}},
+    "ai_synthesis": "**Executive Summary**\n\nA **steady** year.",
+}
+
+
+def _image_streams(pdf: bytes) -> list[bytes]:
+    return re.findall(rb"/Subtype /Image.*?stream\r?\n(.*?)endstream", pdf, re.S)
+
+
+def test_concurrent_renders_all_get_the_cover_image():
+    with ThreadPoolExecutor(4) as pool:
+        pdfs = list(pool.map(lambda _: report_pdf_service.generate_report_pdf("FULL_KUNDLI", KUNDLI, "REF"), range(8)))
+
+    streams = [_image_streams(pdf) for pdf in pdfs]
+    assert all(len(s) == 1 for s in streams)
+    assert len({s[0] for s in streams}) == 1 and len(streams[0][0]) > 1000
+    assert report_pdf_service._styles() is report_pdf_service._styles()
@@ -0,0 +1,123 @@
+"""Response cache on the public content routes: repeat reads run no SQL,
+If-None-Match gets a 304, large bodies go out pre-gzipped, the CMS/review
+moderation writes invalidate what they change, and a fill made by one worker
+is served to another from Redis."""
+import pytest
+from sqlalchemy import event
+
+from app import models, response_cache
+from tests.conftest import auth_headers
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store, self.hashes = {}, {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, b"0")) + 1).encode()
+        return int(self.store[key])
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.ops = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    def execute(self):
+        results = []
+        for name, args, kwargs in self.ops:
+            if name == "hgetall":
+                results.append(self.redis.hashes.get(args[0], {}))
+            elif name == "ttl":
+                results.append(60 if args[0] in self.redis.hashes else -2)
+            elif name == "hset":
+                self.redis.hashes[args[0]] = {k.encode(): v.encode() if isinstance(v, str) else v
+                                              for k, v in kwargs["mapping"].items()}
+        return results
+
+
+@pytest.fixture
+def sql(db_session):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    yield statements
+    event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+
+def _post(client, admin, title, content="Short."):
+    resp = client.post("/cms/posts", json={"title": title, "content": content, "status": "PUBLISHED"},
+                       headers=auth_headers(admin))
+    assert resp.status_code == 200
+
+
+def test_repeat_reads_are_served_from_cache_with_etag(client, make_user, sql):
+    first = client.get("/public/trust-stats")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == response_cache.CACHE_CONTROL
+
+    sql.clear()
+    again = client.get("/public/trust-stats")
+    assert sql == []
+    assert again.json() == first.json() and again.headers["etag"] == etag
+
+    not_modified = client.get("/public/trust-stats", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    # Routes that don't opt in keep the no-store default.
+    assert "no-store" in client.get("/public/support-contact").headers["cache-control"]
+
+
+def test_cms_writes_invalidate_posts_and_bodies_are_pregzipped(client, make_user):
+    admin = make_user(models.UserRole.ADMIN)
+    _post(client, admin, "First", content="<p>" + "Saturn transit notes. " * 200 + "</p>")
+
+    listing = client.get("/public/posts")
+    assert listing.headers["content-encoding"] == "gzip"
+    assert [p["title"] for p in listing.json()["posts"]] == ["First"]
+
+    _post(client, admin, "Second")
+    assert [p["title"] for p in client.get("/public/posts").json()["posts"]] == ["Second", "First"]
+
+
+def test_review_moderation_invalidates_testimonials(client, make_user, db_session):
+    admin, seeker, astro = make_user(models.UserRole.ADMIN), make_user(), make_user(models.UserRole.ASTROLOGER)
+    consultation = models.Consultation(seeker_id=seeker.id, astrologer_id=astro.id, rate_per_min=10,
+                                       consultation_type=models.ConsultationType.CHAT,
+                                       status=models.ConsultationStatus.COMPLETED)
+    db_session.add(consultation)
+    db_session.commit()
+    review = models.Review(consultation_id=consultation.id, astrologer_id=astro.id, seeker_id=seeker.id,
+                           rating=5, comment="Spot on.", display_status=models.ReviewDisplayStatus.PENDING)
+    db_session.add(review)
+    db_session.commit()
+
+    assert client.get("/public/reviews").json() == []
+    resp = client.post(f"/admin/reviews/{review.id}/approve", headers=auth_headers(admin))
+    assert resp.status_code == 200
+    assert [r["comment"] for r in client.get("/public/reviews").json()] == ["Spot on."]
+
+
+def test_fill_is_shared_between_workers_through_redis(client, monkeypatch, sql):
+    fake = _FakeRedis()
+    monkeypatch.setattr(response_cache, "get_redis_bytes", lambda: fake)
+    monkeypatch.setattr(response_cache, "_redis_down_until", 0.0)
+
+    body = client.get("/public/horoscopes").json()
+    response_cache._lru.clear()  # another worker: nothing in its L1
+
+    sql.clear()
+    assert client.get("/public/horoscopes").json() == body
+    assert sql == []
+
+    response_cache.invalidate("horoscopes")
+    client.get("/public/horoscopes")
+    assert sql  # new version: refilled from Postgres
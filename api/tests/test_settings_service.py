@@ -0,0 +1,60 @@
+"""Settings service: once the background refresher is running, reads never
+touch the database; a write reloads the writing worker and announces the
+change on the backplane, and that announcement reloads the other workers."""
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.services import settings_service
+
+
+@pytest.fixture
+def settings(monkeypatch, db_session):
+    monkeypatch.setattr(settings_service, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(settings_service, "_refresher", None)
+    monkeypatch.setattr(settings_service, "_loop", None)
+    monkeypatch.setattr(settings_service, "_CACHE", {})
+    monkeypatch.setattr(settings_service, "_CACHE_TS", 0.0)
+    published = []
+
+    async def publish(topic, message):
+        published.append(topic)
+    monkeypatch.setattr(settings_service.backplane, "publish", publish)
+    return published
+
+
+def test_reads_are_dict_lookups_and_writes_propagate(settings, db_session):
+    async def scenario():
+        settings_service.start()
+        await asyncio.sleep(0.05)  # startup load on the DB executor
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+        try:
+            assert settings_service.get_setting("request_stale_minutes") == "5"
+            # Another worker's write: the row changes under us...
+            db_session.add(models.AppSetting(key="request_stale_minutes", value="9"))
+            db_session.commit()
+            statements.clear()
+            settings_service._CACHE_TS -= 3600  # ...long past the old 30s TTL
+            assert settings_service.get_setting("request_stale_minutes") == "5"
+            assert statements == []
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+        # ...and its announcement reaches this worker over the backplane.
+        await settings_service._on_changed({})
+        assert settings_service.get_setting("request_stale_minutes") == "9"
+
+        await asyncio.to_thread(settings_service.set_setting, db_session, "presence_ttl_seconds", "90")
+        await asyncio.sleep(0)
+        assert settings_service.get_setting("presence_ttl_seconds") == "90"
+        assert settings == ["settings"]
+
+        settings_service._refresher.cancel()
+
+    asyncio.run(scenario())
@@ -0,0 +1,134 @@
+"""Single-flight coalescing: concurrent identical cache misses make one
+upstream call, followers read the stored row, a failing leader fails its
+followers instead of each retrying, and a worker that finds another worker's
+Redis lock waits for that worker's row (polling off the event loop) instead of
+computing it again."""
+import asyncio
+import threading
+from datetime import date
+
+import pytest
+
+from app import single_flight
+from app.routers import panchang as panchang_router
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.store)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(single_flight, "get_async_redis", lambda: fake)
+    monkeypatch.setattr(single_flight, "_POLL_SECS", 0.01)
+    monkeypatch.setattr(single_flight, "_stats", single_flight.collections.Counter())
+    return fake
+
+
+def test_concurrent_callers_share_one_computation(redis):
+    stored, calls = {}, []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        stored["row"] = "chart"
+        return "chart"
+
+    async def main():
+        return await asyncio.gather(*[
+            single_flight.run("k", lambda: stored.get("row"), compute) for _ in range(5)
+        ])
+
+    assert asyncio.run(main()) == ["chart"] * 5
+    assert len(calls) == 1
+    assert redis.store == {}  # lock released
+    assert single_flight.snapshot()["coalesced"] == 4
+
+
+def test_leader_failure_is_shared_not_retried(redis):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(
+            *[single_flight.run("k", lambda: None, compute) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results) and len(calls) == 1
+
+    # The failed flight doesn't linger — the next request tries again.
+    with pytest.raises(ValueError):
+        asyncio.run(single_flight.run("k", lambda: None, compute))
+    assert len(calls) == 2
+
+
+def test_waits_for_another_workers_lock_instead_of_computing(redis):
+    redis.store["sf:k"] = "other-worker"
+    stored, lookup_threads = {}, set()
+
+    def lookup():
+        lookup_threads.add(threading.current_thread())
+        return stored.get("row")
+
+    async def compute():
+        raise AssertionError("the lock holder is already computing this")
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.05)
+        stored["row"] = "chart"
+        del redis.store["sf:k"]
+
+    async def main():
+        result, _ = await asyncio.gather(
+            single_flight.run("k", lookup, compute), other_worker_finishes(),
+        )
+        return result
+
+    assert asyncio.run(main()) == "chart"
+    assert single_flight.snapshot()["peer_hit"] == 1
+    # Polled on the DB executor, not the event loop's thread.
+    assert lookup_threads and threading.main_thread() not in lookup_threads
+
+
+def test_panchang_burst_makes_one_upstream_call(redis, db_session, monkeypatch):
+    calls = []
+
+    async def fake_generate_panchang(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        return {"tithi": {"name": "Pratipada"}}
+
+    monkeypatch.setattr(panchang_router, "generate_panchang", fake_generate_panchang)
+
+    async def main():
+        return await asyncio.gather(*[
+            panchang_router.get_or_fetch_panchang(db_session, date(2026, 10, 18), 28.6139, 77.209, "New Delhi")
+            for _ in range(5)
+        ])
+
+    rows = asyncio.run(main())
+    assert len(calls) == 1
+    assert {row.id for row in rows} == {rows[0].id}
@@ -0,0 +1,83 @@
+"""Stale consultation sweeps: one set-based UPDATE per sweep expires exactly the
+rows past their cutoff (PAUSED judged by the paused_at column), queues their
+pushes and audit entries in bulk, and only the lease-holding worker sweeps."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import models, sweeps
+from app.routers import chat as chat_router
+from app.routers import realtime as realtime_router
+
+
+@pytest.fixture
+def sweep_env(monkeypatch, db_session):
+    monkeypatch.setattr(sweeps.database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(sweeps, "_stale_minutes", lambda key, default: default)
+    notified, promoted = [], []
+    monkeypatch.setattr(realtime_router, "notify_user", lambda user_id, payload: notified.append((user_id, payload["type"])))
+    monkeypatch.setattr(chat_router, "promote_next_in_queue", lambda db, astrologer_id: promoted.append(astrologer_id))
+    return notified, promoted
+
+
+def _consultation(db, seeker, astro, status, **fields):
+    cons = models.Consultation(
+        seeker_id=seeker.id, astrologer_id=astro.id,
+        consultation_type=models.ConsultationType.CHAT, rate_per_min=10.0,
+        status=status, **fields,
+    )
+    db.add(cons)
+    db.commit()
+    return cons.id
+
+
+def test_sweeps_expire_only_stale_rows_and_queue_notifications(sweep_env, db_session, make_user):
+    notified, promoted = sweep_env
+    seeker, astro = make_user(), make_user(models.UserRole.ASTROLOGER)
+    now = datetime.utcnow()
+    R, P = models.ConsultationStatus.REQUESTED, models.ConsultationStatus.PAUSED
+
+    stale_req = _consultation(db_session, seeker, astro, R, created_at=now - timedelta(minutes=10))
+    fresh_req = _consultation(db_session, seeker, astro, R, created_at=now - timedelta(minutes=1))
+    stale_pause = _consultation(db_session, seeker, astro, P, paused_at=now - timedelta(minutes=30))
+    no_clock = _consultation(db_session, seeker, astro, P)
+    fresh_pause = _consultation(db_session, seeker, astro, P, paused_at=now - timedelta(minutes=2))
+
+    asyncio.run(sweeps.sweep_engine.run_once(now))
+
+    db_session.expire_all()
+    status = {c.id: c.status for c in db_session.query(models.Consultation)}
+    assert status[stale_req] == models.ConsultationStatus.MISSED
+    assert status[fresh_req] == R
+    assert status[stale_pause] == status[no_clock] == models.ConsultationStatus.AUTO_ENDED
+    assert status[fresh_pause] == P
+
+    pushes = sorted(r.payload["data"]["consultation_id"] for r in db_session.query(models.NotificationOutbox))
+    assert pushes == sorted(str(i) for i in (stale_req, stale_pause, no_clock))
+    actions = sorted(a.action for a in db_session.query(models.AuditLog))
+    assert actions == ["CHAT_AUTO_ENDED", "CHAT_AUTO_ENDED", "CONSULTATION_MISSED"]
+    assert sorted(notified) == sorted([(seeker.id, "REQUEST_EXPIRED"), (seeker.id, "CHAT_ENDED"), (seeker.id, "CHAT_ENDED")])
+    assert promoted == [astro.id]  # once per astrologer, not per ended row
+
+    # A second tick finds nothing left to do.
+    asyncio.run(sweeps.sweep_engine.run_once(now))
+    assert db_session.query(models.NotificationOutbox).count() == 3
+
+
+def test_only_the_lease_holder_sweeps(monkeypatch):
+    class _FakeRedis:
+        def __init__(self):
+            self.store = {}
+
+        def eval(self, script, numkeys, key, node, ttl):
+            holder = self.store.setdefault(key, node)
+            return int(holder == node)
+
+    fake = _FakeRedis()
+    monkeypatch.setattr(sweeps, "get_redis", lambda: fake)
+
+    assert sweeps.sweep_engine._is_leader()
+    monkeypatch.setattr(sweeps, "NODE_ID", "another-worker")
+    assert not sweeps.sweep_engine._is_leader()
@@ -0,0 +1,99 @@
+"""Local chart engine: positions against published J2000 values, divisional
+chart rules, and the Vimshottari period arithmetic the reports rely on."""
+import asyncio
+import time
+from datetime import date, datetime
+
+import pytest
+
+from app import free_astro_service
+from app import vedic_ephemeris as ve
+
+J2000_UT = 2451545.0 - 64.0 / 86400  # 2000-01-01 12:00 TT
+
+
+@pytest.mark.parametrize("name,tropical", [
+    ("Sun", 280.377),
+    ("Moon", 223.328),
+    ("Mars", 327.973),
+    ("Jupiter", 25.270),
+    ("Saturn", 40.374),
+])
+def test_j2000_longitudes(name, tropical):
+    ayanamsha = ve._lahiri_ayanamsha_deg(J2000_UT)
+    sidereal = ve.sidereal_longitudes(J2000_UT, [name])[name]["longitude"]
+    assert abs((sidereal + ayanamsha - tropical + 180) % 360 - 180) < 0.05
+
+
+def test_navamsa_starts_from_movable_fixed_dual_sign():
+    assert ve.varga_sign(0.1, 9) == 0     # Aries -> Aries
+    assert ve.varga_sign(30.1, 9) == 9    # Taurus -> Capricorn
+    assert ve.varga_sign(60.1, 9) == 6    # Gemini -> Libra
+    # Navamsa runs continuously through the zodiac: 108 padas, one sign each.
+    assert [ve.varga_sign(i * 360 / 108 + 0.01, 9) for i in range(108)] == [i % 12 for i in range(108)]
+
+
+def test_dasha_timeline_runs_from_birth_balance():
+    birth = datetime(1990, 5, 15, 10, 30)
+    dasha = ve.vimshottari(100.0, birth, levels=2, reference=datetime(2026, 1, 1))
+    timeline = dasha["timeline"]
+
+    assert len(timeline) == 9
+    assert timeline[0]["lord"] == dasha["birth_balance"]["lord"] == "Saturn"  # Pushya
+    # Moon half-way through Pushya: half of Saturn's 19 years remain at birth.
+    assert dasha["birth_balance"]["remaining_years"] == pytest.approx(9.5)
+    first_start = datetime.fromisoformat(timeline[0]["start"])
+    last_end = datetime.fromisoformat(timeline[-1]["end"])
+    assert first_start == birth
+    assert ve._years_between(first_start, last_end) == pytest.approx(120 - 9.5)
+    assert [p["level"] for p in dasha["active_periods"]] == ["Mahadasha", "Antardasha"]
+
+
+def test_calculate_matches_free_astro_response_shape():
+    result = ve.calculate(1990, 5, 15, 10, 30, 28.6139, 77.2090, vargas=[1, 9], dasha_levels=3,
+                          reference_date=date(2026, 1, 1))
+
+    chart = result["chart"]
+    assert chart["ascendant"]["sign"] in ve.RASHIS
+    assert [p["name"] for p in chart["planets"]] == ve.PLANETS
+    sun = chart["planets"][0]
+    assert sun["sign"] == "Taurus" and sun["house"] == (sun["sign_id"] - chart["ascendant"]["sign_id"]) % 12 + 1
+    assert set(result["vargas"]["vargas"]) == {"D1", "D9"}
+    assert len(result["vimshottari_dasha"]["active_periods"]) == 3
+    assert chart["sade_sati"]["reference_date"] == "2026-01-01"
+
+
+def test_full_kundli_fetches_extras_while_the_chart_is_computed(monkeypatch):
+    async def remote(*args, **kwargs):
+        await asyncio.sleep(0.3)
+        return {"chart": {"remote": True}, "yogas": {"yogas": []}, "shadbala": {}}
+
+    def local(*args, **kwargs):
+        time.sleep(0.3)
+        return {"chart": {"local": True}}
+
+    monkeypatch.setattr(free_astro_service, "KUNDLI_ENGINE", "local")
+    monkeypatch.setattr(free_astro_service, "_calculate_remote", remote)
+    monkeypatch.setattr(ve, "calculate", local)
+    started = time.monotonic()
+    result = asyncio.run(free_astro_service.generate_full_kundli(1990, 5, 15, 10, 30, 28.6, 77.2))
+
+    assert time.monotonic() - started < 0.5
+    assert result == {"chart": {"local": True}, "yogas": {"yogas": []}, "shadbala": {}}
+
+
+def test_saturn_transit_windows_match_known_ingresses():
+    # Sagittarius Moon: Sade Sati ran from Saturn's Scorpio ingress (Nov 2014)
+    # to its Aquarius ingress (Jan 2023), peaking from the Capricorn ingress.
+    windows = ve.saturn_transit_windows(255.0, datetime(1990, 5, 15, 10, 30))
+    sade_sati = [w for w in windows if w["type"] == "sade_sati"]
+    cycle = next(w for w in sade_sati if w["start"].startswith("2014"))
+
+    assert cycle["start"] == "2014-11-02" and cycle["end"] == "2023-01-17"
+    assert [p["phase"] for p in cycle["phases"]] == ["Rising", "Peak", "Setting"]
+    assert cycle["phases"][2]["start"] == "2020-01-24"
+    # Roughly every 30 years, with a Kantaka and an Ashtama Dhaiya in between.
+    assert len(sade_sati) in (3, 4)
+    kinds = [w.get("house_from_moon") for w in windows if w["type"] == "dhaiya"]
+    assert kinds[:2] in ([4, 8], [8, 4]) and set(kinds) == {4, 8}
+    assert [w["start"] for w in windows] == sorted(w["start"] for w in windows)
@@ -0,0 +1,95 @@
+"""Wallet reconciliation: ledger checkpoints advance over settled transactions
+only, the check compares balances with checkpoint + delta, a rebuild refolds
+from the whole ledger, and the drift report lists the transactions since a
+wallet last balanced."""
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy.orm import sessionmaker
+
+from app import models, wallet_ledger
+from tests.conftest import auth_headers
+
+
+def _txn(db, user, amount, age_minutes):
+    db.add(models.WalletTransaction(user_id=user.id, amount=Decimal(amount),
+                                    transaction_type=models.TransactionType.DEPOSIT,
+                                    created_at=datetime.utcnow() - timedelta(minutes=age_minutes)))
+    db.get(models.UserWallet, user.id).balance += Decimal(amount)
+    db.commit()
+
+
+def _checkpoint(db, user):
+    db.expire_all()
+    return db.get(models.WalletLedgerCheckpoint, user.id)
+
+
+def test_checkpoints_advance_and_reconcile_incrementally(client, db_session, make_user, monkeypatch):
+    monkeypatch.setattr(wallet_ledger.database, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    asha, ravi = make_user(), make_user()
+    _txn(db_session, asha, "100", 30)
+    _txn(db_session, ravi, "40", 20)
+    _txn(db_session, asha, "-25", 1)  # not settled yet
+
+    assert asyncio.run(wallet_ledger.checkpointer.run_once()) == 2
+    cp = _checkpoint(db_session, asha)
+    assert cp.running_sum == Decimal("100") and cp.balanced_txn_id == cp.last_txn_id
+    assert wallet_ledger.advance(db_session) == 0
+
+    headers = auth_headers(make_user(models.UserRole.ADMIN))
+    body = client.get("/admin/wallets/reconciliation", headers=headers).json()
+    assert (body["mismatches"], body["checkpoint_txn_id"]) == (0, 2)
+
+    # A balance edited behind the ledger's back, then more activity.
+    db_session.get(models.UserWallet, asha.id).balance += Decimal("7")
+    db_session.commit()
+    _txn(db_session, asha, "10", 0)
+
+    body = client.get("/admin/wallets/reconciliation", headers=headers).json()
+    assert [(r["user_id"], r["stored_balance"], r["computed_balance"], r["diff"]) for r in body["results"]] == [
+        (asha.id, 92.0, 85.0, 7.0)]
+    everyone = client.get("/admin/wallets/reconciliation", params={"only_mismatches": False}, headers=headers).json()
+    assert everyone["total_wallets_checked"] == len(everyone["results"]) == 2
+
+    report = client.get(f"/admin/wallets/{asha.id}/reconciliation", headers=headers).json()
+    assert report["balanced_through_txn_id"] == cp.last_txn_id
+    assert [(t["amount"], t["ledger_balance"]) for t in report["transactions"]] == [(-25.0, 75.0), (10.0, 85.0)]
+    assert report["diff"] == 7.0
+
+
+def test_rebuild_refolds_from_the_whole_ledger(client, db_session, make_user):
+    seeker = make_user()
+    _txn(db_session, seeker, "100", 30)
+    _txn(db_session, seeker, "50", 20)
+    wallet_ledger.advance(db_session)
+    cp = _checkpoint(db_session, seeker)
+    cp.running_sum = Decimal("1")  # a bad checkpoint
+    db_session.commit()
+
+    headers = auth_headers(make_user(models.UserRole.ADMIN))
+    assert client.get("/admin/wallets/reconciliation", headers=headers).json()["mismatches"] == 1
+    body = client.get("/admin/wallets/reconciliation", params={"rebuild": True}, headers=headers).json()
+    assert body["rebuilt"] and body["mismatches"] == 0
+    assert _checkpoint(db_session, seeker).running_sum == Decimal("150")
+
+
+def test_deleting_the_newest_checkpoint_does_not_refold_others(client, db_session, make_user):
+    asha, ravi = make_user(), make_user()
+    _txn(db_session, asha, "100", 30)
+    _txn(db_session, ravi, "40", 20)
+    _txn(db_session, ravi, "5", 15)
+    _txn(db_session, asha, "60", 10)
+    assert wallet_ledger.advance(db_session) == 2
+
+    # The mock-data cleanup drops asha's transactions and checkpoint, which
+    # held the highest folded id, so the scan floor drops back to ravi's.
+    db_session.query(models.WalletTransaction).filter_by(user_id=asha.id).delete()
+    db_session.query(models.WalletLedgerCheckpoint).filter_by(user_id=asha.id).delete()
+    db_session.get(models.UserWallet, asha.id).balance = Decimal("0")
+    db_session.commit()
+
+    headers = auth_headers(make_user(models.UserRole.ADMIN))
+    assert client.get("/admin/wallets/reconciliation", headers=headers).json()["mismatches"] == 0
+    assert wallet_ledger.advance(db_session) == 0
+    assert _checkpoint(db_session, ravi).running_sum == Decimal("45")
@@ -39,7 +39,7 @@ const ConsultationDetailModal: React.FC<Props> = ({ consultation, onClose }) =>
             setLoading(true);
             setMessages([]);
             setActiveTab('transcript');
-            api.consultations.getChatHistory(consultation.id)
+            api.consultations.getFullChatHistory(consultation.id)
                 .then((data: ChatHistoryItem[]) => {
                     setMessages(data);
                     setLoading(false);
@@ -30,7 +30,7 @@ const SeekerChatTranscriptModal: React.FC<Props> = ({ consultation, onClose }) =
         if (consultation) {
             setLoading(true);
             setMessages([]);
-            api.consultations.getChatHistory(consultation.id)
+            api.consultations.getFullChatHistory(consultation.id)
                 .then((data: ChatHistoryItem[]) => setMessages(data))
                 .catch((err: unknown) => console.error('Failed to load chat history', err))
                 .finally(() => setLoading(false));
@@ -9,6 +9,8 @@ const WS_URL = API_URL.replace(/^http/, 'ws') + '/chat/ws';
 const HEARTBEAT_INTERVAL_MS = 25_000;
 const PONG_TIMEOUT_MS = 10_000;
 const MAX_RECONNECT_DELAY_MS = 30_000;
+// Matches the server's CHAT_HISTORY_PAGE: a full page means there may be more.
+const HISTORY_PAGE = 200;
 
 export interface Message {
     id?: number;
@@ -20,6 +22,25 @@ export interface Message {
     media_url?: string | null;
 }
 
+const toMessage = (msg: ChatHistoryItem): Message => ({
+    id: msg.id,
+    sender_id: msg.sender_id,
+    content: msg.message,
+    timestamp: msg.timestamp,
+    message_type: msg.message_type ?? 'text',
+    media_url: msg.media_url ?? null,
+    type: 'MESSAGE' as const
+});
+
+// Merge by id, keeping id order (history pages, sync deltas and live
+// NEW_MESSAGE frames can overlap).
+const mergeMessages = (prev: Message[], incoming: Message[]): Message[] => {
+    const known = new Set(prev.map(m => m.id));
+    const added = incoming.filter(m => !known.has(m.id));
+    if (!added.length) return prev;
+    return [...prev, ...added].sort((a, b) => (a.id ?? 0) - (b.id ?? 0));
+};
+
 export const useChat = (consultationId: string) => {
     const { token } = useAuth();
     const ws = useRef<WebSocket | null>(null);
@@ -46,6 +67,25 @@ export const useChat = (consultationId: string) => {
     const pongTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
     const lastPongReceived = useRef(true);
     const typingTimeout = useRef<ReturnType<typeof setTimeout> | null>(null);
+    // Newest message id held, sent on (re)connect so STATE_SYNC only carries
+    // what was missed instead of the client re-fetching the whole history.
+    const lastMessageId = useRef<number | null>(null);
+
+    useEffect(() => {
+        const last = messages[messages.length - 1];
+        if (last?.id !== undefined) lastMessageId.current = Math.max(lastMessageId.current ?? 0, last.id);
+    }, [messages]);
+
+    const catchUp = useCallback(async (sinceId: number) => {
+        let since = sinceId;
+        for (;;) {
+            const page: ChatHistoryItem[] = await api.consultations.getChatHistory(consultationId, { since_id: since });
+            if (!page.length) return;
+            setMessages(prev => mergeMessages(prev, page.map(toMessage)));
+            if (page.length < HISTORY_PAGE) return;
+            since = page[page.length - 1].id;
+        }
+    }, [consultationId]);
 
     const clearHeartbeat = useCallback(() => {
         if (heartbeatTimer.current) { clearInterval(heartbeatTimer.current); heartbeatTimer.current = null; }
@@ -77,7 +117,9 @@ export const useChat = (consultationId: string) => {
         socket.onopen = () => {
             // Auth token goes in the first message, not the URL — a `?token=`
             // query string ends up in access logs/proxies/browser history.
-            socket.send(JSON.stringify({ token }));
+            const hello: { token: string; last_message_id?: number } = { token };
+            if (lastMessageId.current !== null) hello.last_message_id = lastMessageId.current;
+            socket.send(JSON.stringify(hello));
             reconnectAttempt.current = 0;
             startHeartbeat(socket);
             setStatus(prev => (prev === 'ENDED' || prev === 'PAUSED' || prev === 'ACCEPTED') ? prev : 'CONNECTING');
@@ -92,6 +134,13 @@ export const useChat = (consultationId: string) => {
                     if (pongTimer.current) { clearTimeout(pongTimer.current); pongTimer.current = null; }
                     break;
                 case 'STATE_SYNC':
+                    if (Array.isArray(data.messages)) {
+                        const missed: Message[] = data.messages.map(toMessage);
+                        setMessages(prev => mergeMessages(prev, missed));
+                        if (data.messages_complete === false && missed.length) {
+                            catchUp(missed[missed.length - 1].id as number).catch(console.error);
+                        }
+                    }
                     if (data.timer_active) setTimerActive(true);
                     setBillingInfo({ balance: data.balance, spent: data.spent, minutes_remaining: data.minutes_remaining ?? 0 });
                     setTalkTimeSeconds(data.duration_seconds ?? 0);
@@ -191,7 +240,7 @@ export const useChat = (consultationId: string) => {
         socket.onerror = () => {
             // onclose fires immediately after, which handles reconnect
         };
-    }, [consultationId, token, startHeartbeat, clearHeartbeat]);
+    }, [consultationId, token, startHeartbeat, clearHeartbeat, catchUp]);
 
     // Tick the talk-time clock locally between server duration syncs
     useEffect(() => {
@@ -200,20 +249,20 @@ export const useChat = (consultationId: string) => {
         return () => clearInterval(interval);
     }, [timerActive]);
 
-    // Fetch History
+    // Fetch History: the latest page, then earlier pages until the start.
     useEffect(() => {
         if (!token || !consultationId) return;
-        api.consultations.getChatHistory(consultationId).then((history: ChatHistoryItem[]) => {
-            setMessages(history.map(msg => ({
-                id: msg.id,
-                sender_id: msg.sender_id,
-                content: msg.message,
-                timestamp: msg.timestamp,
-                message_type: msg.message_type ?? 'text',
-                media_url: msg.media_url ?? null,
-                type: 'MESSAGE' as const
-            })));
-        }).catch(console.error);
+        let cancelled = false;
+        const load = async () => {
+            let page: ChatHistoryItem[] = await api.consultations.getChatHistory(consultationId, { limit: HISTORY_PAGE });
+            while (!cancelled) {
+                setMessages(prev => mergeMessages(prev, page.map(toMessage)));
+                if (page.length < HISTORY_PAGE) return;
+                page = await api.consultations.getChatHistory(consultationId, { before_id: page[0].id });
+            }
+        };
+        load().catch(console.error);
+        return () => { cancelled = true; };
     }, [consultationId, token]);
 
     // Connect on mount
@@ -160,11 +160,24 @@ interface ReportDetails {
     order_reference: string;
     report_type: string;
     language: string;
+    report_status: 'PENDING' | 'GENERATING' | 'COMPLETED' | 'FAILED';
+    stage: string | null;
     report_data: any;
     pdf_url: string;
     created_at: string;
 }
 
+// Reports are generated by a background job after payment; until it finishes
+// the viewer re-fetches and shows which stage it's at.
+const STAGE_LABELS: Record<string, string> = {
+    queued: 'Queued for generation',
+    calculating: 'Calculating your chart',
+    writing: 'Writing your reading',
+    rendering: 'Preparing your PDF',
+    delivering: 'Sending it to your WhatsApp',
+};
+const POLL_MS = 4000;
+
 export const ReportViewer: React.FC = () => {
     const { orderId } = useParams<{ orderId: string }>();
     const [report, setReport] = useState<ReportDetails | null>(null);
@@ -172,10 +185,14 @@ export const ReportViewer: React.FC = () => {
     const [error, setError] = useState<string | null>(null);
 
     useEffect(() => {
+        let timer: ReturnType<typeof setTimeout> | undefined;
         const fetchReport = async () => {
             try {
                 const data = await api.reports.getReport(orderId!);
                 setReport(data);
+                if (data.report_status === 'PENDING' || data.report_status === 'GENERATING') {
+                    timer = setTimeout(fetchReport, POLL_MS);
+                }
             } catch (err: any) {
                 setError(err.message || 'Report not found or payment pending');
             } finally {
@@ -184,6 +201,7 @@ export const ReportViewer: React.FC = () => {
         };
 
         if (orderId) fetchReport();
+        return () => clearTimeout(timer);
     }, [orderId]);
 
     if (loading) {
@@ -214,6 +232,19 @@ export const ReportViewer: React.FC = () => {
         );
     }
 
+    if (report.report_status === 'PENDING' || report.report_status === 'GENERATING') {
+        return (
+            <div className="min-h-screen bg-slate-950 flex items-center justify-center text-slate-100">
+                <SEO title="Preparing Your Report" description="Your Vedic astrology report is being generated." noindex />
+                <div className="flex flex-col items-center gap-3">
+                    <Sparkles className="w-8 h-8 text-amber-400 animate-pulse" />
+                    <p className="text-sm font-serif text-amber-200">{STAGE_LABELS[report.stage || 'queued'] || 'Preparing your report'}...</p>
+                    <p className="text-xs text-slate-400">This usually takes a minute or two.</p>
+                </div>
+            </div>
+        );
+    }
+
     const { report_data, pdf_url } = report;
 
     return (
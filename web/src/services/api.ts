@@ -1,5 +1,6 @@
 import { storage } from '../utils/storage';
 import { isNative } from '../utils/platform';
+import type { ChatHistoryItem } from '../types';
 
 const API_URL = import.meta.env.VITE_API_URL;
 
@@ -420,12 +421,34 @@ export const api = {
             });
             return handleResponse(response, 'Failed to submit review');
         },
-        getChatHistory: async (consultation_id: number | string) => {
-            const response = await customFetch(`${API_URL}/chat/history/${consultation_id}`, {
+        // Without a page argument the whole transcript; with one, a page of at
+        // most `limit` (server cap 200) and X-Has-More while more remain.
+        getChatHistory: async (consultation_id: number | string, page: { since_id?: number; before_id?: number; limit?: number } = {}) => {
+            const query = new URLSearchParams();
+            if (page.since_id !== undefined) query.set('since_id', String(page.since_id));
+            if (page.before_id !== undefined) query.set('before_id', String(page.before_id));
+            if (page.limit !== undefined) query.set('limit', String(page.limit));
+            const qs = query.toString();
+            const response = await customFetch(`${API_URL}/chat/history/${consultation_id}${qs ? `?${qs}` : ''}`, {
                 headers: await authHeaders()
             });
             return handleResponse(response, 'Failed to fetch chat history');
         },
+        // The whole transcript, oldest first, in bounded pages walked back
+        // with before_id while X-Has-More says older messages remain.
+        getFullChatHistory: async (consultation_id: number | string) => {
+            let messages: ChatHistoryItem[] = [];
+            let qs = '?limit=200';
+            while (true) {
+                const response = await customFetch(`${API_URL}/chat/history/${consultation_id}${qs}`, {
+                    headers: await authHeaders()
+                });
+                const page = await handleResponse(response, 'Failed to fetch chat history');
+                messages = [...page, ...messages];
+                if (response.headers.get('X-Has-More') !== 'true' || page.length === 0) return messages;
+                qs = `?before_id=${page[0].id}`;
+            }
+        },
         postMessage: async (consultation_id: number | string, content: string) => {
             const response = await customFetch(`${API_URL}/chat/send`, {
                 method: 'POST',
@@ -793,6 +816,15 @@ export const api = {
             if (opts.place) params.append('place', opts.place);
             const response = await customFetch(`${API_URL}/muhurat/live?${params}`);
             return handleResponse(response, 'Failed to fetch live Muhurat data');
+        },
+        getLagnaTimeline: async (opts: { date?: string; lat?: number; lon?: number; place?: string } = {}) => {
+            const params = new URLSearchParams();
+            if (opts.date) params.append('date', opts.date);
+            if (opts.lat !== undefined) params.append('lat', opts.lat.toString());
+            if (opts.lon !== undefined) params.append('lon', opts.lon.toString());
+            if (opts.place) params.append('place', opts.place);
+            const response = await customFetch(`${API_URL}/muhurat/lagna-timeline?${params}`);
+            return handleResponse(response, 'Failed to fetch Lagna timeline');
         }
     },
     places: {
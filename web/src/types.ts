@@ -270,6 +270,15 @@ export interface DivisionChart {
     houses: HousePosition[];
 }
 
+export interface SaturnTransitWindow {
+    type: 'sade_sati' | 'dhaiya';
+    name: string;
+    start: string;
+    end: string;
+    house_from_moon?: number;
+    phases?: { phase: string; start: string; end: string }[];
+}
+
 export interface SadeSati {
     active: boolean;
     phase?: string | null;
@@ -283,6 +292,8 @@ export interface SadeSati {
     saturn_degree_in_sign?: number;
     saturn_absolute_degree?: number;
     saturn_is_retrograde?: boolean;
+    window?: { start: string | null; end: string | null };
+    lifetime?: SaturnTransitWindow[];
 }
 
 export interface DashaPeriod {
@@ -376,6 +387,22 @@ export interface CurrentLagna {
     end: string;
 }
 
+export interface LagnaWindow {
+    sign: string;
+    sign_id: number;
+    start: string;
+    end: string;
+    is_current: boolean;
+}
+
+export interface LagnaTimelineResponse {
+    date: string;
+    place_label?: string | null;
+    latitude: number;
+    longitude: number;
+    lagnas: LagnaWindow[];
+}
+
 export interface LiveMuhuratResponse {
     date: string;
     place_label?: string | null;